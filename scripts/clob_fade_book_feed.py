@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Shared market-data feed for CLOB fade observers.
+
+What it does:
+- Selects the fade universe (same Gamma filters/flags as polymarket_clob_fade_observe.py).
+- Samples order books once per --poll-sec (REST, or market websocket with REST fallback).
+- Extracts the fade book features and appends one sample row per cycle to --feed-file.
+
+Any number of observers started with `--book-source feed --feed-file <same path>`
+(e.g. long/short/both canaries) then consume identical samples at the API cost of one.
+
+This script never places orders.
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lib.clob_feature_feed import FeatureFeedWriter
+from lib.clob_ws_books import ClobMarketBookFeed, merge_ws_and_rest_books
+from polymarket_clob_fade_observe import (
+    Logger,
+    TokenState,
+    UniverseRefresher,
+    acquire_state_lock,
+    build_parser,
+    extract_book_features,
+    fetch_books_parallel,
+    iso_now,
+    now_ts,
+    universe_row,
+)
+
+
+def sample_features(books: Dict[str, dict], token_ids: List[str], depth_levels: int) -> Dict[str, dict]:
+    out: Dict[str, dict] = {}
+    for tid in token_ids:
+        feat = extract_book_features(books.get(tid), depth_levels=int(depth_levels))
+        if feat:
+            out[tid] = feat
+    return out
+
+
+def parse_args():
+    script_dir = Path(__file__).resolve().parent
+    p = build_parser()
+    p.description = "Shared book-feature feed for polymarket_clob_fade_observe.py (--book-source feed)"
+    p.add_argument(
+        "--feed-max-mb",
+        type=float,
+        default=256.0,
+        help="Start a fresh feed file once it exceeds this size in MB (0=never)",
+    )
+    p.set_defaults(log_file=str(script_dir.parent / "logs" / "clob-fade-feed.log"))
+    return p.parse_args()
+
+
+def run(args) -> int:
+    logger = Logger(args.log_file)
+    feed_file = Path(args.feed_file)
+    try:
+        release_lock = acquire_state_lock(feed_file)
+    except Exception as e:
+        logger.info(f"[{iso_now()}] startup aborted: {type(e).__name__}: {e}")
+        return 2
+
+    writer = FeatureFeedWriter(str(feed_file), max_bytes=int(max(0.0, float(args.feed_max_mb)) * 1024 * 1024))
+    ws_feed: Optional[ClobMarketBookFeed] = None
+    if str(args.book_source) == "ws":
+        ws_feed = ClobMarketBookFeed(ws_url=str(args.ws_url), stale_sec=float(args.ws_stale_sec)).start()
+    logger.info("Polymarket CLOB Fade Feed")
+    logger.info("=" * 60)
+    logger.info(
+        f"file={feed_file} tokens={args.max_tokens} poll={args.poll_sec}s workers={args.workers} "
+        f"source={args.book_source} depth_levels={args.book_depth_levels}"
+    )
+
+    refresher = UniverseRefresher()
+    universe: List[TokenState] = []
+    last_refresh = 0.0
+    t0 = now_ts()
+    last_summary = now_ts()
+    samples = 0
+    rows = 0
+
+    while True:
+        if args.run_seconds and (now_ts() - t0) >= int(args.run_seconds):
+            logger.info("run-seconds reached. stopping.")
+            break
+
+        refresh_sec = float(args.universe_refresh_sec)
+        if (now_ts() - last_refresh) >= refresh_sec:
+            refresher.submit(args)
+        result = refresher.poll(wait=refresher.pending and not universe)
+        if result is not None:
+            uni, err = result
+            took = now_ts() - refresher.started_ts
+            if err is not None:
+                last_refresh = now_ts() - refresh_sec + min(60.0, refresh_sec)
+                logger.info(f"[{iso_now()}] universe refresh error ({took:.1f}s): {type(err).__name__}: {err}")
+            elif uni:
+                universe = uni
+                last_refresh = now_ts()
+                writer.publish_universe([universe_row(t) for t in universe])
+                logger.info(f"[{iso_now()}] universe published: tokens={len(universe)} took={took:.1f}s")
+
+        token_ids = [t.token_id for t in universe]
+        if token_ids:
+            if ws_feed is not None:
+                ws_feed.set_assets(token_ids)
+                books, _ = merge_ws_and_rest_books(
+                    ws_feed,
+                    token_ids,
+                    lambda ids: fetch_books_parallel(ids, workers=int(args.workers)),
+                )
+            else:
+                books = fetch_books_parallel(token_ids, workers=int(args.workers))
+            feats = sample_features(books, token_ids, int(args.book_depth_levels))
+            try:
+                writer.publish_sample(feats)
+                samples += 1
+                rows += len(feats)
+            except Exception as e:
+                logger.info(f"[{iso_now()}] feed write error: {type(e).__name__}: {e}")
+
+        if float(args.summary_every_sec) > 0 and (now_ts() - last_summary) >= float(args.summary_every_sec):
+            last_summary = now_ts()
+            logger.info(
+                f"[{iso_now()}] summary({int(args.summary_every_sec)}s): tokens={len(token_ids)} "
+                f"samples={samples} rows={rows} rotations={writer.rotations}"
+            )
+        time.sleep(max(0.2, float(args.poll_sec)))
+
+    refresher.close()
+    if ws_feed is not None:
+        ws_feed.stop()
+    try:
+        release_lock()
+    except Exception:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run(parse_args()))
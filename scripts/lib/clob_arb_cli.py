@@ -36,6 +36,7 @@ def _apply_env_overrides(args, cli_tokens: Sequence[str], default_espn_paths: Se
     maybe("min_edge_cents", "CLOBBOT_MIN_EDGE_CENTS", 1.0, float)
     maybe("winner_fee_rate", "CLOBBOT_WINNER_FEE_RATE", 0.0, float)
     maybe("fixed_cost", "CLOBBOT_FIXED_COST", 0.0, float)
+    maybe("size_ladder", "CLOBBOT_SIZE_LADDER", "", str)
     maybe("alert_cooldown_sec", "CLOBBOT_ALERT_COOLDOWN_SEC", 10.0, float)
 
     maybe("gamma_limit", "CLOBBOT_GAMMA_LIMIT", 500, lambda s: int(float(s)))
@@ -351,6 +352,16 @@ def build_clob_arb_parser(ws_url: str, default_espn_paths: Sequence[str]) -> arg
     p.add_argument("--min-edge-cents", type=float, default=1.0, help="Alert/execution threshold in cents")
     p.add_argument("--winner-fee-rate", type=float, default=0.0, help="Winner fee rate (default 0.0)")
     p.add_argument("--fixed-cost", type=float, default=0.0, help="Per-event fixed USD cost")
+    p.add_argument(
+        "--size-ladder",
+        default="",
+        help="Comma multiples of --shares to price in one depth pass, e.g. 0.5,1,2,4 (empty=single size)",
+    )
+    p.add_argument(
+        "--size-ladder-live",
+        action="store_true",
+        help="Size candidates (alerts/execution) at the best ladder size instead of --shares",
+    )
     p.add_argument("--alert-cooldown-sec", type=float, default=10.0, help="Suppress duplicate alerts")
     p.add_argument("--run-seconds", type=int, default=0, help="Auto-exit after N seconds (0=run forever)")
     p.add_argument("--summary-every-sec", type=float, default=0.0, help="Emit periodic summary line (0=disabled)")
@@ -315,7 +315,7 @@ def compute_candidate_metrics_row(
     fill_ratio_avg = (sum(fill_ratios) / len(fill_ratios)) if fill_ratios else 0.0
     worst_stale_sec = max(stale_secs) if stale_secs else -1.0
 
-    return {
+    row = {
         "ts": iso_now(),
         "ts_ms": int(ts_now * 1000.0),
         "universe": str(getattr(args, "universe", "") or ""),
@@ -349,6 +349,12 @@ def compute_candidate_metrics_row(
         "wallet_signal_confidence": float(getattr(basket, "wallet_signal_confidence", 0.0) or 0.0),
         "gamma_combined_score": float(getattr(basket, "combined_score", 0.0) or 0.0),
     }
+    if candidate.size_ladder:
+        row["ladder_best_shares"] = float(candidate.best_shares)
+        row["ladder_best_net_edge"] = float(candidate.best_net_edge)
+        row["ladder_marginal_zero_shares"] = float(candidate.marginal_zero_shares)
+        row["ladder"] = [[float(sz), round(float(e), 6)] for sz, e in candidate.size_ladder]
+    return row
 
 
 def update_book_from_snapshot(item: dict, books: Dict[str, LocalBook]) -> Optional[str]:
@@ -441,20 +447,117 @@ def collect_impacted_events_from_payload(
     return impacted_events
 
 
+def parse_size_ladder(raw: str) -> List[float]:
+    """Parse `--size-ladder` multiples ("0.5,1,2,4") into sorted positive floats."""
+    out: Set[float] = set()
+    for part in str(raw or "").split(","):
+        v = as_float(part.strip(), math.nan)
+        if math.isfinite(v) and v > 0:
+            out.add(v)
+    return sorted(out)
+
+
+def _sorted_ask_levels(asks: List[dict]) -> List[Tuple[float, float]]:
+    levels: List[Tuple[float, float]] = []
+    for a in asks or []:
+        p = as_float(a.get("price"), math.nan)
+        sz = as_float(a.get("size"), 0.0)
+        if not math.isfinite(p) or p <= 0 or sz <= 0:
+            continue
+        levels.append((p, sz))
+    levels.sort(key=lambda x: x[0])
+    return levels
+
+
+def _cost_from_levels(levels: List[Tuple[float, float]], shares: float) -> Optional[float]:
+    remaining = shares
+    total = 0.0
+    for price, size in levels:
+        take = min(remaining, size)
+        total += take * price
+        remaining -= take
+        if remaining <= 1e-9:
+            return total
+    return None
+
+
+def basket_size_ladder(
+    leg_levels: List[List[Tuple[float, float]]],
+    sizes: List[float],
+    payout_per_share: float,
+) -> Tuple[List[Tuple[float, Optional[float]]], float]:
+    """
+    Basket cost at every ladder size from one merged walk over all legs' ask depth.
+
+    Basket cost is piecewise linear in shares with slope = sum of each leg's current
+    marginal ask, so every size is priced on the way past it. Returns
+    ([(shares, basket_cost or None if depth runs out)], marginal_zero_shares), where
+    marginal_zero_shares is where the summed marginal ask first reaches
+    `payout_per_share` (the thinnest leg's depth if it never does).
+    """
+    targets = sorted({float(x) for x in sizes if float(x) > 0})
+    if not leg_levels or any(not lv for lv in leg_levels):
+        return [(t, None) for t in targets], 0.0
+
+    idx = [0] * len(leg_levels)
+    ends = [lv[0][1] for lv in leg_levels]
+    slope = sum(lv[0][0] for lv in leg_levels)
+    pos = 0.0
+    cost = 0.0
+    zero: Optional[float] = None
+    out: List[Tuple[float, Optional[float]]] = []
+    ti = 0
+    while True:
+        if zero is None and slope >= payout_per_share - 1e-12:
+            zero = pos
+        seg_end = min(ends)
+        while ti < len(targets) and targets[ti] <= seg_end + 1e-9:
+            out.append((targets[ti], cost + slope * (targets[ti] - pos)))
+            ti += 1
+        if ti >= len(targets) and zero is not None:
+            break
+        cost += slope * (seg_end - pos)
+        pos = seg_end
+        exhausted = False
+        for i, lv in enumerate(leg_levels):
+            if ends[i] > pos + 1e-12:
+                continue
+            prev_price = lv[idx[i]][0]
+            idx[i] += 1
+            if idx[i] >= len(lv):
+                exhausted = True
+                break
+            ends[i] += lv[idx[i]][1]
+            slope += lv[idx[i]][0] - prev_price
+        if exhausted:
+            if zero is None:
+                zero = pos
+            break
+    out.extend((t, None) for t in targets[ti:])
+    return out, float(zero or 0.0)
+
+
 def compute_candidate(
     basket: EventBasket,
     books: Dict[str, LocalBook],
     shares_per_leg: float,
     winner_fee_rate: float,
     fixed_cost: float,
+    size_ladder: Optional[List[float]] = None,
+    ladder_live: bool = False,
 ) -> Optional[Candidate]:
+    """
+    Price the basket at `shares_per_leg`. With `size_ladder` (multiples of
+    shares_per_leg), also fill the edge curve, best size and marginal-zero point;
+    `ladder_live` prices the returned candidate at the best ladder size instead.
+    """
     leg_costs: List[Tuple[Leg, float]] = []
+    min_order_size = float(getattr(basket, "min_order_size", 0.0) or 0.0)
 
-    if float(getattr(basket, "min_order_size", 0.0) or 0.0) > 0 and shares_per_leg < float(
-        basket.min_order_size
-    ):
+    if not size_ladder and min_order_size > 0 and shares_per_leg < min_order_size:
         return None
 
+    leg_asks: List[List[dict]] = []
     for leg in basket.legs:
         book = books.get(leg.token_id)
         if not book:
@@ -463,14 +566,47 @@ def compute_candidate(
         asks = book.asks
         if not asks and book.best_ask:
             asks = [{"price": book.best_ask, "size": 1e9}]
-
-        cost = order_cost_for_shares(asks, shares_per_leg)
-        if cost is None:
+        leg_asks.append(asks)
+
+    payout_per_share = 1.0 - winner_fee_rate
+    ladder: List[Tuple[float, float]] = []
+    best_shares = 0.0
+    best_edge = 0.0
+    marginal_zero = 0.0
+    if size_ladder:
+        whole = float(shares_per_leg).is_integer()
+        sizes: Set[float] = {float(shares_per_leg)}
+        for m in size_ladder:
+            # Keep whole-share ladders whole: clob execution requires integer-like sizes.
+            sz = float(math.floor(shares_per_leg * m)) if whole else float(shares_per_leg * m)
+            sizes.add(sz)
+        sizes = {x for x in sizes if x > 0 and x >= min_order_size}
+        leg_levels = [_sorted_ask_levels(asks) for asks in leg_asks]
+        rows, marginal_zero = basket_size_ladder(leg_levels, sorted(sizes), payout_per_share)
+        for sz, cost in rows:
+            if cost is not None:
+                ladder.append((sz, sz * payout_per_share - cost - fixed_cost))
+        if not ladder:
+            return None
+        best_shares, best_edge = max(ladder, key=lambda x: (x[1], -x[0]))
+        if ladder_live:
+            shares_per_leg = best_shares
+        elif min_order_size > 0 and shares_per_leg < min_order_size:
             return None
-        leg_costs.append((leg, cost))
+        for leg, levels in zip(basket.legs, leg_levels):
+            cost = _cost_from_levels(levels, shares_per_leg)
+            if cost is None:
+                return None
+            leg_costs.append((leg, cost))
+    else:
+        for leg, asks in zip(basket.legs, leg_asks):
+            cost = order_cost_for_shares(asks, shares_per_leg)
+            if cost is None:
+                return None
+            leg_costs.append((leg, cost))
 
     basket_cost = sum(c for _, c in leg_costs)
-    payout = shares_per_leg * (1.0 - winner_fee_rate)
+    payout = shares_per_leg * payout_per_share
     net_edge = payout - basket_cost - fixed_cost
     edge_pct = (net_edge / payout) if payout > 0 else 0.0
     return Candidate(
@@ -484,6 +620,10 @@ def compute_candidate(
         net_edge=net_edge,
         edge_pct=edge_pct,
         leg_costs=leg_costs,
+        size_ladder=ladder,
+        best_shares=best_shares,
+        best_net_edge=best_edge,
+        marginal_zero_shares=marginal_zero,
     )
 
 
@@ -621,6 +761,8 @@ async def process_impacted_event(
         shares_per_leg=args.shares,
         winner_fee_rate=args.winner_fee_rate,
         fixed_cost=args.fixed_cost,
+        size_ladder=parse_size_ladder(getattr(args, "size_ladder", "")),
+        ladder_live=bool(getattr(args, "size_ladder_live", False)),
     )
     if not candidate:
         return last_observe_notify_ts
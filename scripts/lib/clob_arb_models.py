@@ -68,6 +68,11 @@ class Candidate:
     net_edge: float
     edge_pct: float
     leg_costs: List[Tuple[Leg, float]]
+    # Share-size ladder (filled only when a ladder is requested): [(shares, net_edge)].
+    size_ladder: List[Tuple[float, float]] = field(default_factory=list)
+    best_shares: float = 0.0
+    best_net_edge: float = 0.0
+    marginal_zero_shares: float = 0.0
 
 
 @dataclass
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote, urlparse
+
+
+CLOB_API_BASE = "https://clob.polymarket.com"
+USER_AGENT = "Mozilla/5.0 (compatible; clob-books/1.0)"
+# Tokens per POST /books request.
+DEFAULT_CHUNK_SIZE = 100
+DEFAULT_WORKERS = 4
+
+
+class ClobBookClient:
+    """
+    Order book fetcher over pooled keep-alive connections.
+
+    Uses the CLOB multi-token `POST /books` request (chunked, chunks fetched
+    concurrently) and falls back to `GET /book?token_id=` per token when a
+    batch request fails. Each worker thread keeps its own connection.
+    """
+
+    def __init__(
+        self,
+        host: str = CLOB_API_BASE,
+        timeout_sec: float = 10.0,
+        workers: int = DEFAULT_WORKERS,
+        user_agent: str = USER_AGENT,
+    ):
+        u = urlparse(host if "://" in host else f"https://{host}")
+        self.scheme = u.scheme or "https"
+        self.netloc = u.netloc
+        self.base_path = (u.path or "").rstrip("/")
+        self.timeout_sec = float(timeout_sec)
+        self.workers = max(1, int(workers or 1))
+        self.user_agent = user_agent
+        self._local = threading.local()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = cls(self.netloc, timeout=self.timeout_sec)
+            self._local.conn = conn
+        return conn
+
+    def _drop_conn(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _request(self, method: str, path: str, body: Optional[object] = None) -> object:
+        headers = {"User-Agent": self.user_agent, "Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        last_err: Optional[Exception] = None
+        # One retry on a fresh connection covers server-side keep-alive expiry.
+        for _ in range(2):
+            conn = self._conn()
+            try:
+                conn.request(method, self.base_path + path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+                if resp.status != 200:
+                    raise RuntimeError(f"HTTP {resp.status} {method} {path}")
+                return json.loads(raw.decode("utf-8", errors="replace"))
+            except (http.client.HTTPException, OSError) as e:
+                last_err = e
+                self._drop_conn()
+        raise RuntimeError(f"{method} {path} failed: {last_err}")
+
+    def get_book(self, token_id: str) -> Optional[dict]:
+        try:
+            data = self._request("GET", f"/book?token_id={quote(str(token_id))}")
+        except Exception:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def post_books(self, token_ids: List[str]) -> Dict[str, dict]:
+        data = self._request("POST", "/books", body=[{"token_id": str(t)} for t in token_ids])
+        if not isinstance(data, list):
+            raise RuntimeError("unexpected /books payload")
+        out: Dict[str, dict] = {}
+        for book in data:
+            if not isinstance(book, dict):
+                continue
+            tid = str(book.get("asset_id") or book.get("token_id") or "").strip()
+            if tid:
+                out[tid] = book
+        return out
+
+    def _fetch_chunk(self, token_ids: List[str]) -> Dict[str, dict]:
+        try:
+            return self.post_books(token_ids)
+        except Exception:
+            out: Dict[str, dict] = {}
+            for tid in token_ids:
+                book = self.get_book(tid)
+                if book is not None:
+                    out[tid] = book
+            return out
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="clob-books")
+            return self._pool
+
+    def fetch_books(
+        self,
+        token_ids: Iterable[str],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Dict[str, dict]:
+        """
+        Return {token_id: book} for the requested tokens. Missing/failed tokens are omitted.
+        """
+        ids: List[str] = []
+        seen = set()
+        for t in token_ids or []:
+            t = str(t or "").strip()
+            if t and t not in seen:
+                seen.add(t)
+                ids.append(t)
+        if not ids:
+            return {}
+        size = max(1, int(chunk_size or DEFAULT_CHUNK_SIZE))
+        chunks = [ids[i : i + size] for i in range(0, len(ids), size)]
+        if len(chunks) == 1:
+            results = [self._fetch_chunk(chunks[0])]
+        else:
+            results = list(self._executor().map(self._fetch_chunk, chunks))
+        out: Dict[str, dict] = {}
+        for part in results:
+            for tid, book in part.items():
+                if tid in seen:
+                    out[tid] = book
+        return out
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+        self._drop_conn()
+
+
+_DEFAULT_CLIENTS: Dict[tuple, ClobBookClient] = {}
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_client(workers: int = DEFAULT_WORKERS, timeout_sec: float = 10.0) -> ClobBookClient:
+    key = (max(1, int(workers or 1)), float(timeout_sec))
+    with _DEFAULT_LOCK:
+        client = _DEFAULT_CLIENTS.get(key)
+        if client is None:
+            client = ClobBookClient(workers=key[0], timeout_sec=key[1])
+            _DEFAULT_CLIENTS[key] = client
+        return client
+
+
+def fetch_books_batch(
+    token_ids: Iterable[str],
+    workers: int = DEFAULT_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    timeout_sec: float = 10.0,
+) -> Dict[str, dict]:
+    """
+    Fetch many books via the shared process-wide client (pooled connections).
+    """
+    return default_client(workers=workers, timeout_sec=timeout_sec).fetch_books(token_ids, chunk_size=chunk_size)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def universe_sidecar_path(feed_path: Path) -> Path:
+    return feed_path.with_name(feed_path.name + ".universe.json")
+
+
+class FeatureFeedWriter:
+    """
+    Append-only JSONL publisher for sampled book features.
+
+    Records are single lines, written with one `write()` call each:
+      {"type": "universe", "seq": n, "ts_ms": ..., "tokens": [{token_id, label, ...}, ...]}
+      {"type": "sample",   "seq": n, "ts_ms": ..., "books": {token_id: {mid, best_bid, ...}}}
+    The latest universe record is mirrored to `<feed>.universe.json` so readers
+    that attach mid-stream can seed their universe. With `max_bytes > 0` the file
+    is replaced once it grows past the limit, with the universe re-published at
+    its head; readers detect the new file and restart from offset 0.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max(0, int(max_bytes or 0))
+        self.seq = 0
+        self.rotations = 0
+        self._universe: Optional[dict] = None
+
+    def _append(self, rec: dict) -> None:
+        line = json.dumps(rec, ensure_ascii=True, separators=(",", ":")) + "\n"
+        with self.path.open("a", encoding="utf-8", newline="\n") as f:
+            f.write(line)
+
+    def _next(self, kind: str, ts: Optional[float]) -> dict:
+        self.seq += 1
+        now = time.time() if ts is None else float(ts)
+        return {"type": kind, "seq": self.seq, "ts_ms": int(now * 1000.0)}
+
+    def _maybe_rotate(self) -> None:
+        if self.max_bytes <= 0:
+            return
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size < self.max_bytes:
+            return
+        # Replace rather than truncate so readers see a new inode even if they poll late.
+        tmp = self.path.with_name(self.path.name + ".rotate")
+        head = ""
+        if self._universe is not None:
+            head = json.dumps(self._universe, ensure_ascii=True, separators=(",", ":")) + "\n"
+        with tmp.open("w", encoding="utf-8", newline="\n") as f:
+            f.write(head)
+        os.replace(tmp, self.path)
+        self.rotations += 1
+
+    def publish_universe(self, tokens: List[dict], ts: Optional[float] = None) -> dict:
+        rec = self._next("universe", ts)
+        rec["tokens"] = [dict(t) for t in tokens]
+        self._maybe_rotate()
+        self._universe = rec
+        self._append(rec)
+        side = universe_sidecar_path(self.path)
+        tmp = side.with_name(side.name + ".tmp")
+        tmp.write_text(json.dumps(rec, ensure_ascii=True), encoding="utf-8")
+        os.replace(tmp, side)
+        return rec
+
+    def publish_sample(self, books: Dict[str, dict], ts: Optional[float] = None) -> dict:
+        rec = self._next("sample", ts)
+        rec["books"] = books
+        self._maybe_rotate()
+        self._append(rec)
+        return rec
+
+
+class FeatureFeedReader:
+    """
+    Tail a `FeatureFeedWriter` file. `poll()` returns complete records appended
+    since the last call, in order; a trailing partial line is held back until
+    its newline arrives. By default reading starts at the current end of file
+    (use `initial_universe()` to seed the universe); `from_start=True` replays.
+    """
+
+    def __init__(self, path: str, from_start: bool = False):
+        self.path = Path(path)
+        self.from_start = bool(from_start)
+        self.resets = 0
+        self.last_sample_ts = 0.0
+        self._offset: Optional[int] = None
+        self._ino: Optional[int] = None
+        self._buf = b""
+
+    def initial_universe(self) -> Optional[dict]:
+        try:
+            raw = json.loads(universe_sidecar_path(self.path).read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        if not isinstance(raw, dict) or raw.get("type") != "universe":
+            return None
+        return raw
+
+    def _stat(self) -> Optional[os.stat_result]:
+        try:
+            return os.stat(self.path)
+        except OSError:
+            return None
+
+    def _has_new_data(self, st: Optional[os.stat_result]) -> bool:
+        if st is None:
+            return False
+        if self._offset is None:
+            return self.from_start and st.st_size > 0
+        return st.st_ino != self._ino or st.st_size != self._offset
+
+    def poll(self) -> List[dict]:
+        st = self._stat()
+        if st is None:
+            return []
+        if self._offset is None:
+            self._offset = 0 if self.from_start else int(st.st_size)
+            self._ino = st.st_ino
+        elif st.st_ino != self._ino or st.st_size < self._offset:
+            # Writer rotated (truncate or replace): restart from the new head.
+            self._offset = 0
+            self._ino = st.st_ino
+            self._buf = b""
+            self.resets += 1
+        if st.st_size <= self._offset:
+            return []
+        with self.path.open("rb") as f:
+            f.seek(self._offset)
+            data = f.read(int(st.st_size) - self._offset)
+        self._offset += len(data)
+        lines = (self._buf + data).split(b"\n")
+        self._buf = lines.pop()
+
+        out: List[dict] = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line.decode("utf-8"))
+            except Exception:
+                # Partial first line when attaching mid-write, or a torn write.
+                continue
+            if not isinstance(rec, dict):
+                continue
+            if rec.get("type") == "sample":
+                try:
+                    self.last_sample_ts = float(rec.get("ts_ms") or 0) / 1000.0
+                except (TypeError, ValueError):
+                    pass
+            out.append(rec)
+        return out
+
+    def wait(self, timeout: float, interval: float = 0.05) -> bool:
+        """Sleep until the file grows/rotates or `timeout` elapses; True when new data is there."""
+        deadline = time.time() + max(0.0, float(timeout))
+        while True:
+            if self._has_new_data(self._stat()):
+                return True
+            left = deadline - time.time()
+            if left <= 0:
+                return False
+            time.sleep(min(max(0.005, float(interval)), left))
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from lib.clob_books import fetch_books_batch
+from polymarket_clob_arb_scanner import as_float, extract_yes_token_id, fetch_active_markets
+
+
+GAMMA_PAGE_SIZE = 500
+CACHE_VERSION = 1
+
+
+@dataclass
+class MMCandidate:
+    token_id: str
+    label: str
+    liquidity: float = 0.0
+    volume24hr: float = 0.0
+    gamma_spread: float = 0.0
+    tick_size: float = 0.01
+    min_order_size: float = 0.0
+    gamma_score: float = 0.0
+    book_spread: float = math.nan
+    book_depth: float = 0.0
+    score: float = 0.0
+
+
+def gamma_score(liquidity: float, volume24hr: float, spread: float) -> float:
+    # Score: prefer high volume, decent liquidity, and non-trivial spreads.
+    return math.log10(1.0 + volume24hr) + 0.3 * math.log10(1.0 + liquidity) + (3.0 * spread)
+
+
+def candidate_from_market(
+    m: dict,
+    min_liquidity: float,
+    min_volume24hr: float,
+    min_spread_cents: float,
+) -> Optional[MMCandidate]:
+    if not isinstance(m, dict):
+        return None
+    if m.get("enableOrderBook") is False:
+        return None
+    if m.get("feesEnabled") is True:
+        return None
+    liq = as_float(m.get("liquidityNum", m.get("liquidity", 0.0)), 0.0)
+    vol = as_float(m.get("volume24hr", 0.0), 0.0)
+    spr = as_float(m.get("spread", 0.0), 0.0)
+    if liq < float(min_liquidity or 0.0) or vol < float(min_volume24hr or 0.0):
+        return None
+    if spr < (float(min_spread_cents or 0.0) / 100.0):
+        return None
+    token_id = extract_yes_token_id(m)
+    if not token_id:
+        return None
+    q = str(m.get("question") or "").strip()
+    if not q:
+        return None
+    tick = as_float(m.get("orderPriceMinTickSize"), 0.0)
+    return MMCandidate(
+        token_id=str(token_id),
+        label=q,
+        liquidity=liq,
+        volume24hr=vol,
+        gamma_spread=spr,
+        tick_size=tick if tick > 0 else 0.01,
+        min_order_size=max(0.0, as_float(m.get("orderMinSize"), 0.0)),
+        gamma_score=gamma_score(liq, vol, spr),
+    )
+
+
+def fetch_gamma_markets_concurrent(
+    limit: int,
+    workers: int = 4,
+    page_size: int = GAMMA_PAGE_SIZE,
+    fetch_page: Optional[Callable[[int, int], List[dict]]] = None,
+    failed: Optional[List[int]] = None,
+) -> List[dict]:
+    """
+    Page Gamma active markets concurrently. Pages are returned in offset order
+    and truncated after the first short page so results match serial paging.
+    A page that errors is retried once; if it still fails it is skipped (not
+    treated as the end of the listing) and its offset is appended to `failed`.
+    """
+    fetch_page = fetch_page or (lambda lim, off: fetch_active_markets(limit=lim, offset=off))
+    total = max(0, int(limit or 0))
+    size = max(1, int(page_size or GAMMA_PAGE_SIZE))
+    offsets = list(range(0, total, size))
+    if not offsets:
+        return []
+
+    pages: Dict[int, List[dict]] = {}
+    errors: List[int] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(int(workers or 1), len(offsets)))) as ex:
+        futures = {ex.submit(fetch_page, min(size, total - off), off): off for off in offsets}
+        for fut in as_completed(futures):
+            off = futures[fut]
+            try:
+                pages[off] = list(fut.result() or [])
+            except Exception:
+                errors.append(off)
+    for off in sorted(errors):
+        try:
+            pages[off] = list(fetch_page(min(size, total - off), off) or [])
+        except Exception:
+            if failed is not None:
+                failed.append(off)
+
+    out: List[dict] = []
+    seen: set = set()
+    for off in offsets:
+        if off not in pages:
+            continue
+        page = pages[off]
+        for m in page:
+            mid = str((m or {}).get("id") or "")
+            if mid and mid in seen:
+                continue
+            if mid:
+                seen.add(mid)
+            out.append(m)
+        if len(page) < min(size, total - off):
+            break
+    return out
+
+
+def _cache_key(gamma_limit: int, min_liquidity: float, min_volume24hr: float, min_spread_cents: float) -> dict:
+    return {
+        "v": CACHE_VERSION,
+        "gamma_limit": int(gamma_limit or 0),
+        "min_liquidity": float(min_liquidity or 0.0),
+        "min_volume24hr": float(min_volume24hr or 0.0),
+        "min_spread_cents": float(min_spread_cents or 0.0),
+    }
+
+
+def load_candidate_cache(path: str, key: dict, ttl_sec: float, now: Optional[float] = None) -> Optional[List[MMCandidate]]:
+    if not path or float(ttl_sec or 0.0) <= 0:
+        return None
+    p = Path(path)
+    if not p.exists():
+        return None
+    try:
+        raw = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if not isinstance(raw, dict) or raw.get("key") != key:
+        return None
+    saved_at = as_float(raw.get("saved_at"), 0.0)
+    now = time.time() if now is None else float(now)
+    if saved_at <= 0 or (now - saved_at) > float(ttl_sec):
+        return None
+    out: List[MMCandidate] = []
+    for row in raw.get("candidates") or []:
+        try:
+            out.append(MMCandidate(**row))
+        except TypeError:
+            return None
+    return out
+
+
+def save_candidate_cache(path: str, key: dict, candidates: Iterable[MMCandidate]) -> None:
+    if not path:
+        return
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    raw = {
+        "saved_at": time.time(),
+        "key": key,
+        "candidates": [asdict(c) for c in candidates],
+    }
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(raw, ensure_ascii=True), encoding="utf-8")
+    tmp.replace(p)
+
+
+def gamma_candidates(
+    gamma_limit: int,
+    min_liquidity: float,
+    min_volume24hr: float,
+    min_spread_cents: float,
+    workers: int = 4,
+    cache_file: str = "",
+    cache_ttl_sec: float = 0.0,
+    log: Optional[Callable[[str], None]] = None,
+) -> List[MMCandidate]:
+    """
+    Gamma-filtered candidates sorted by gamma score, served from the disk cache when fresh.
+    A listing with failed pages is reported through `log` and not cached.
+    """
+    key = _cache_key(gamma_limit, min_liquidity, min_volume24hr, min_spread_cents)
+    cached = load_candidate_cache(cache_file, key, cache_ttl_sec)
+    if cached is not None:
+        return cached
+
+    failed: List[int] = []
+    markets = fetch_gamma_markets_concurrent(limit=max(50, int(gamma_limit or 500)), workers=workers, failed=failed)
+    if failed and log is not None:
+        log(f"warn: gamma pages failed after retry, skipped offsets={sorted(failed)}")
+    out: List[MMCandidate] = []
+    seen: set = set()
+    for m in markets:
+        c = candidate_from_market(m, min_liquidity, min_volume24hr, min_spread_cents)
+        if c is None or c.token_id in seen:
+            continue
+        seen.add(c.token_id)
+        out.append(c)
+    out.sort(key=lambda c: c.gamma_score, reverse=True)
+    if out and not failed:
+        save_candidate_cache(cache_file, key, out)
+    return out
+
+
+def book_quality(book: Optional[dict], depth_cents: float) -> Tuple[float, float]:
+    """
+    Return (spread, depth_shares) from a /book payload. depth counts both sides
+    within `depth_cents` of mid. spread is NaN for one-sided/empty books.
+    """
+    if not isinstance(book, dict):
+        return math.nan, 0.0
+
+    def _levels(key: str) -> List[Tuple[float, float]]:
+        out: List[Tuple[float, float]] = []
+        for lv in book.get(key) or []:
+            p = as_float((lv or {}).get("price"), math.nan)
+            sz = as_float((lv or {}).get("size"), 0.0)
+            if math.isfinite(p) and p > 0 and sz > 0:
+                out.append((p, sz))
+        return out
+
+    bids = _levels("bids")
+    asks = _levels("asks")
+    if not bids or not asks:
+        return math.nan, 0.0
+    best_bid = max(p for p, _ in bids)
+    best_ask = min(p for p, _ in asks)
+    if best_ask <= best_bid:
+        return math.nan, 0.0
+    mid = (best_bid + best_ask) / 2.0
+    band = max(0.0, float(depth_cents or 0.0)) / 100.0
+    depth = sum(sz for p, sz in bids if p >= mid - band) + sum(sz for p, sz in asks if p <= mid + band)
+    return best_ask - best_bid, depth
+
+
+def rank_candidates(
+    candidates: List[MMCandidate],
+    books: Dict[str, dict],
+    min_spread_cents: float,
+    depth_cents: float,
+) -> List[MMCandidate]:
+    """
+    Re-score Gamma candidates by live book spread and depth. Tokens without a
+    two-sided book or with a live spread below `min_spread_cents` are dropped.
+    """
+    out: List[MMCandidate] = []
+    for c in candidates:
+        spread, depth = book_quality(books.get(c.token_id), depth_cents)
+        if not math.isfinite(spread):
+            continue
+        if spread < (float(min_spread_cents or 0.0) / 100.0) - 1e-12:
+            continue
+        c.book_spread = spread
+        c.book_depth = depth
+        c.score = c.gamma_score + (3.0 * spread) + 0.3 * math.log10(1.0 + depth)
+        out.append(c)
+    out.sort(key=lambda x: x.score, reverse=True)
+    return out
+
+
+def select_mm_tokens(
+    gamma_limit: int,
+    min_liquidity: float,
+    min_volume24hr: float,
+    min_spread_cents: float,
+    count: int,
+    workers: int = 4,
+    cache_file: str = "",
+    cache_ttl_sec: float = 0.0,
+    book_check_multiple: float = 3.0,
+    depth_cents: float = 2.0,
+    fetch_books: Optional[Callable[[List[str]], Dict[str, dict]]] = None,
+    log: Optional[Callable[[str], None]] = None,
+) -> List[MMCandidate]:
+    """
+    Rank MM tokens: Gamma prefilter (cached), then live spread/depth from a quick
+    book fetch over the top `count * book_check_multiple` Gamma candidates.
+    book_check_multiple <= 0 skips the book check (Gamma ranking only).
+    """
+    want = max(0, int(count or 0))
+    if want <= 0:
+        return []
+    pool = gamma_candidates(
+        gamma_limit=gamma_limit,
+        min_liquidity=min_liquidity,
+        min_volume24hr=min_volume24hr,
+        min_spread_cents=min_spread_cents,
+        workers=workers,
+        cache_file=cache_file,
+        cache_ttl_sec=cache_ttl_sec,
+        log=log,
+    )
+    if float(book_check_multiple or 0.0) <= 0:
+        for c in pool:
+            c.score = c.gamma_score
+        return pool[:want]
+
+    n_check = max(want, int(math.ceil(want * float(book_check_multiple))))
+    shortlist = pool[:n_check]
+    fetch_books = fetch_books or (lambda ids: fetch_books_batch(ids, workers=workers))
+    books = fetch_books([c.token_id for c in shortlist])
+    return rank_candidates(shortlist, books, min_spread_cents, depth_cents)[:want]
+
+
+def rotate_universe(
+    current_ids: List[str],
+    ranked: List[MMCandidate],
+    count: int,
+    hysteresis: int = 1,
+) -> List[MMCandidate]:
+    """
+    Pick the next universe from a fresh ranking. Incumbents stay while they rank
+    within `count + hysteresis`; freed slots go to the best new tokens.
+    """
+    want = max(0, int(count or 0))
+    keep_rank = want + max(0, int(hysteresis or 0))
+    current = set(current_ids or [])
+    keep = [c for c in ranked[:keep_rank] if c.token_id in current][:want]
+    keep_ids = {c.token_id for c in keep}
+    out = list(keep)
+    for c in ranked:
+        if len(out) >= want:
+            break
+        if c.token_id in keep_ids:
+            continue
+        out.append(c)
+        keep_ids.add(c.token_id)
+    return out
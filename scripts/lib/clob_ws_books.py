@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+WS_MARKET_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+
+
+class LocalLevels:
+    """Price-keyed bid/ask levels for one token, rebuilt from `book` snapshots and `price_change` deltas."""
+
+    __slots__ = ("bids", "asks", "updated_at", "version")
+
+    def __init__(self):
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.updated_at = 0.0
+        self.version = 0
+
+    def to_book(self) -> dict:
+        return {
+            "bids": [{"price": p, "size": s} for p, s in sorted(self.bids.items(), reverse=True)],
+            "asks": [{"price": p, "size": s} for p, s in sorted(self.asks.items())],
+        }
+
+
+def _level_pair(lv) -> Optional[Tuple[float, float]]:
+    if isinstance(lv, dict):
+        p, s = lv.get("price"), lv.get("size")
+    elif isinstance(lv, (list, tuple)) and len(lv) >= 2:
+        p, s = lv[0], lv[1]
+    else:
+        return None
+    try:
+        p = float(p)
+        s = float(s)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(p) or p <= 0 or not math.isfinite(s):
+        return None
+    return p, s
+
+
+def _set_side(side: Dict[float, float], levels) -> None:
+    side.clear()
+    for lv in levels or []:
+        pair = _level_pair(lv)
+        if pair and pair[1] > 0:
+            side[pair[0]] = pair[1]
+
+
+def _apply_change(book: LocalLevels, change: dict) -> bool:
+    pair = _level_pair(change)
+    side_raw = str(change.get("side") or "").upper()
+    if pair is None or side_raw not in {"BUY", "SELL", "BID", "ASK"}:
+        return False
+    side = book.bids if side_raw in {"BUY", "BID"} else book.asks
+    price, size = pair
+    if size <= 0:
+        side.pop(price, None)
+    else:
+        side[price] = size
+    return True
+
+
+def apply_market_message(
+    books: Dict[str, LocalLevels],
+    payload,
+    assets: Optional[Set[str]] = None,
+    ts: Optional[float] = None,
+) -> Set[str]:
+    """
+    Apply one market-channel payload (dict or list of events) to `books`.
+    Handles `book` snapshots and `price_change` deltas in both the nested
+    (`price_changes: [{asset_id, price, size, side}]`) and per-asset
+    (`asset_id` + `changes`) layouts. Returns the changed token ids.
+    """
+    now = time.time() if ts is None else float(ts)
+    changed: Set[str] = set()
+    items = payload if isinstance(payload, list) else [payload]
+
+    def _book(tid: str, create: bool) -> Optional[LocalLevels]:
+        if not tid or (assets is not None and tid not in assets):
+            return None
+        b = books.get(tid)
+        if b is None and create:
+            b = LocalLevels()
+            books[tid] = b
+        return b
+
+    def _touch(tid: str, b: LocalLevels) -> None:
+        b.updated_at = now
+        b.version += 1
+        changed.add(tid)
+
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        event_type = str(item.get("event_type") or "").lower()
+        tid = str(item.get("asset_id") or item.get("assetId") or "")
+        if event_type == "book" or (not event_type and ("bids" in item or "asks" in item)):
+            b = _book(tid, create=True)
+            if b is None:
+                continue
+            _set_side(b.bids, item.get("bids") if "bids" in item else item.get("buys"))
+            _set_side(b.asks, item.get("asks") if "asks" in item else item.get("sells"))
+            _touch(tid, b)
+        elif event_type == "price_change":
+            # Deltas only apply on top of a snapshot; unseeded tokens wait for their `book` event.
+            for ch in item.get("price_changes") or []:
+                if not isinstance(ch, dict):
+                    continue
+                ctid = str(ch.get("asset_id") or tid or "")
+                b = _book(ctid, create=False)
+                if b is not None and _apply_change(b, ch):
+                    _touch(ctid, b)
+            b = _book(tid, create=False) if item.get("changes") else None
+            if b is not None:
+                hit = False
+                for ch in item.get("changes") or []:
+                    if isinstance(ch, dict) and _apply_change(b, ch):
+                        hit = True
+                if hit:
+                    _touch(tid, b)
+    return changed
+
+
+class ClobMarketBookFeed:
+    """
+    Background market-channel subscriber that keeps local books for a token set.
+
+    Runs its own asyncio loop on a daemon thread so synchronous poll loops can
+    read `snapshot()` without blocking. `healthy()` is False until connected and
+    whenever no message arrived within `stale_sec`; callers fall back to REST.
+    Requires the optional `websockets` package; without it the feed never
+    becomes healthy and `last_error` says why.
+    """
+
+    def __init__(self, ws_url: str = WS_MARKET_URL, stale_sec: float = 15.0, reconnect_sec: float = 3.0):
+        self.ws_url = ws_url
+        self.stale_sec = max(1.0, float(stale_sec))
+        self.reconnect_sec = max(0.5, float(reconnect_sec))
+        self.last_error = ""
+        self.connects = 0
+        self._books: Dict[str, LocalLevels] = {}
+        self._assets: Tuple[str, ...] = ()
+        self._assets_gen = 0
+        self._connected = False
+        self._last_msg_ts = 0.0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ClobMarketBookFeed":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="clob-ws-books", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def set_assets(self, token_ids: Iterable[str]) -> bool:
+        """Set the subscribed universe; returns True when it changed (triggers resubscribe)."""
+        assets = tuple(sorted({str(t) for t in token_ids if str(t)}))
+        with self._cond:
+            if assets == self._assets:
+                return False
+            self._assets = assets
+            self._assets_gen += 1
+            keep = set(assets)
+            for tid in [t for t in self._books if t not in keep]:
+                del self._books[tid]
+            return True
+
+    def healthy(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else float(now)
+        with self._cond:
+            return self._connected and (now - self._last_msg_ts) <= self.stale_sec
+
+    def versions(self) -> Dict[str, int]:
+        with self._cond:
+            return {tid: b.version for tid, b in self._books.items()}
+
+    def snapshot(
+        self,
+        token_ids: Optional[Iterable[str]] = None,
+        versions: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, dict]:
+        """
+        Return {token_id: {"bids": [...], "asks": [...]}} for tokens that have a live book.
+        When `versions` is given it is filled with the version of each returned book,
+        read under the same lock so the pair is consistent.
+        """
+        with self._cond:
+            ids = list(token_ids) if token_ids is not None else list(self._books)
+            out: Dict[str, dict] = {}
+            for tid in ids:
+                b = self._books.get(tid)
+                if b is not None and b.version > 0:
+                    out[tid] = b.to_book()
+                    if versions is not None:
+                        versions[tid] = b.version
+            return out
+
+    def wait_for_change(self, since: Dict[str, int], timeout: float) -> bool:
+        """Block until any token version differs from `since` (or timeout / stop)."""
+        deadline = time.time() + max(0.0, float(timeout))
+        with self._cond:
+            while not self._stop.is_set():
+                for tid, b in self._books.items():
+                    if b.version != since.get(tid, 0):
+                        return True
+                left = deadline - time.time()
+                if left <= 0:
+                    return False
+                self._cond.wait(timeout=left)
+        return False
+
+    def _on_raw(self, raw) -> None:
+        try:
+            payload = json.loads(raw)
+        except Exception:
+            return
+        with self._cond:
+            self._last_msg_ts = time.time()
+            if apply_market_message(self._books, payload, assets=set(self._assets), ts=self._last_msg_ts):
+                self._cond.notify_all()
+
+    def _run(self) -> None:
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+
+    async def _main(self) -> None:
+        try:
+            import websockets
+        except ImportError:
+            self.last_error = "websockets package is not installed"
+            return
+
+        while not self._stop.is_set():
+            with self._cond:
+                assets = list(self._assets)
+                gen = self._assets_gen
+            if not assets:
+                await asyncio.sleep(0.5)
+                continue
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=20, ping_timeout=20, max_size=2**24) as ws:
+                    await ws.send(json.dumps({"type": "market", "assets_ids": assets}))
+                    with self._cond:
+                        # Fresh snapshots arrive on subscribe; drop deltas applied to the old session.
+                        self._books.clear()
+                        self._connected = True
+                        self._last_msg_ts = time.time()
+                    self.connects += 1
+                    while not self._stop.is_set():
+                        with self._cond:
+                            if gen != self._assets_gen:
+                                break
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        self._on_raw(raw)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            finally:
+                with self._cond:
+                    self._connected = False
+            if not self._stop.is_set() and gen == self._assets_gen:
+                await asyncio.sleep(self.reconnect_sec)
+
+
+def merge_ws_and_rest_books(
+    feed: Optional[ClobMarketBookFeed],
+    token_ids: List[str],
+    rest_fetch,
+    rest_due: bool = True,
+    versions: Optional[Dict[str, int]] = None,
+) -> Tuple[Dict[str, dict], Set[str]]:
+    """
+    Books from the live feed when healthy, REST for everything else (unhealthy
+    socket or tokens without a snapshot yet). Returns (books, ids_served_by_feed).
+    rest_due=False skips the REST leg so change-driven callers can keep REST on
+    their own cadence; `versions` receives the feed versions of the snapshot.
+    """
+    books: Dict[str, dict] = {}
+    if feed is not None and feed.healthy():
+        books = feed.snapshot(token_ids, versions=versions)
+    from_feed = set(books)
+    missing = [t for t in token_ids if t not in books]
+    if missing and rest_due:
+        books.update(rest_fetch(missing))
+    return books, from_feed
@@ -0,0 +1,459 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+DEFAULT_CATALOG_DB = "logs/closed_markets.sqlite"
+
+# Gamma market keys kept per row; enough for the closed-market candidate builders.
+CATALOG_FIELDS = (
+    "id",
+    "question",
+    "slug",
+    "category",
+    "conditionId",
+    "createdAt",
+    "endDate",
+    "closedTime",
+    "updatedAt",
+    "outcomes",
+    "outcomePrices",
+    "clobTokenIds",
+    "liquidityNum",
+    "liquidity",
+    "volumeNum",
+    "volume",
+    "volume24hr",
+)
+
+# The updatedAt pass re-reads this much before the stored high-water mark (clock skew, same-second updates).
+UPDATE_OVERLAP_SEC = 3600
+
+# fetch(params) -> decoded Gamma /markets response (a list), anything else on failure.
+PageFetcher = Callable[[Dict[str, str]], object]
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS markets (
+        id TEXT PRIMARY KEY,
+        end_ts INTEGER NOT NULL,
+        updated_ts INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        volume REAL NOT NULL,
+        market_json TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS markets_end ON markets (end_ts, id)",
+    "CREATE INDEX IF NOT EXISTS markets_category_end ON markets (category, end_ts)",
+    "CREATE INDEX IF NOT EXISTS markets_volume ON markets (volume)",
+    "CREATE INDEX IF NOT EXISTS markets_updated ON markets (updated_ts)",
+    """
+    CREATE TABLE IF NOT EXISTS coverage (
+        start_ts INTEGER PRIMARY KEY,
+        end_ts INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+)
+
+
+def iso_ts(value: str) -> Optional[int]:
+    """Unix seconds for an ISO date/datetime ("2024-01-01", "...T12:00:00Z"); naive means UTC."""
+    s = str(value or "").strip()
+    if not s:
+        return None
+    try:
+        d = dt.datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=dt.timezone.utc)
+    return int(d.timestamp())
+
+
+def _ts_iso(ts: int) -> str:
+    return dt.datetime.fromtimestamp(int(ts), tz=dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _updated_ts(m: dict) -> int:
+    """Latest of updatedAt / closedTime (unix seconds, 0 when neither parses)."""
+    return max(iso_ts(str(m.get("updatedAt") or "")) or 0, iso_ts(str(m.get("closedTime") or "")) or 0)
+
+
+def _as_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """Thread-safe pacing: acquire() returns at most `rate` times per second (rate <= 0 = unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = (1.0 / float(rate)) if float(rate) > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ClosedMarketCatalog:
+    """
+    Local SQLite catalog of closed Gamma markets, indexed by end date, category and volume.
+
+    `coverage` holds the endDate ranges already crawled completely. Its upper
+    end is the high-water mark, but it never reaches past `now - settle`: recent
+    markets can still resolve or change after their end date, so that tail is
+    re-crawled on every sync(). Markets that change later than that are caught
+    by a second high-water mark on updatedAt/closedTime: each sync() pages
+    Gamma's closed markets by updatedAt descending down to it. page() replays
+    Gamma's closed-market paging (endDate descending) from the local table.
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_DB):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for stmt in _SCHEMA:
+                self._conn.execute(stmt)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ClosedMarketCatalog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def covered(self) -> List[Tuple[int, int]]:
+        with self._lock:
+            cur = self._conn.execute("SELECT start_ts, end_ts FROM coverage ORDER BY start_ts")
+            return [(int(s), int(e)) for s, e in cur.fetchall()]
+
+    def high_water(self) -> Optional[int]:
+        """End of the most recent fully crawled endDate range, if any."""
+        spans = self.covered()
+        return spans[-1][1] if spans else None
+
+    def updated_high_water(self) -> Optional[int]:
+        """updatedAt/closedTime up to which changes have been pulled, if any."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'updated_high_water'").fetchone()
+        return int(row[0]) if row else None
+
+    def _set_updated_high_water(self, ts: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('updated_high_water', ?)", (str(int(ts)),)
+            )
+
+    def missing(self, start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+        """Inclusive endDate sub-ranges of [start_ts, end_ts] not yet crawled."""
+        start_ts, end_ts = int(start_ts), int(end_ts)
+        gaps: List[Tuple[int, int]] = []
+        pos = start_ts
+        for s, e in self.covered():
+            if e < pos:
+                continue
+            if s > end_ts:
+                break
+            if s > pos:
+                gaps.append((pos, s - 1))
+            pos = max(pos, e + 1)
+            if pos > end_ts:
+                break
+        if pos <= end_ts:
+            gaps.append((pos, end_ts))
+        return gaps
+
+    def upsert(self, markets: List[dict]) -> int:
+        """Insert or replace markets (trimmed to CATALOG_FIELDS); rows without id/endDate are skipped."""
+        rows = []
+        for m in markets:
+            if not isinstance(m, dict):
+                continue
+            market_id = str(m.get("id") or "").strip()
+            end_ts = iso_ts(str(m.get("endDate") or ""))
+            if not market_id or end_ts is None:
+                continue
+            keep = {k: m[k] for k in CATALOG_FIELDS if k in m}
+            rows.append(
+                (
+                    market_id,
+                    end_ts,
+                    _updated_ts(m),
+                    str(m.get("category") or ""),
+                    _as_float(m.get("volumeNum"), _as_float(m.get("volume"), 0.0)),
+                    json.dumps(keep, ensure_ascii=False, separators=(",", ":")),
+                )
+            )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO markets (id, end_ts, updated_ts, category, volume, market_json) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def mark_covered(self, start_ts: int, end_ts: int) -> None:
+        lo, hi = int(start_ts), int(end_ts)
+        if hi < lo:
+            return
+        with self._lock, self._conn:
+            for s, e in self._conn.execute(
+                "SELECT start_ts, end_ts FROM coverage WHERE start_ts <= ? AND end_ts >= ?", (hi + 1, lo - 1)
+            ).fetchall():
+                lo, hi = min(lo, int(s)), max(hi, int(e))
+            self._conn.execute("DELETE FROM coverage WHERE start_ts <= ? AND end_ts >= ?", (hi + 1, lo - 1))
+            self._conn.execute("INSERT INTO coverage (start_ts, end_ts) VALUES (?, ?)", (lo, hi))
+
+    def sync(
+        self,
+        start_ts: int,
+        end_ts: int,
+        fetch: PageFetcher,
+        page_size: int = 500,
+        window_days: float = 1.0,
+        workers: int = 4,
+        rate: float = 4.0,
+        settle_days: float = 3.0,
+        now_ts: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, int]:
+        """
+        Crawl the uncovered part of [start_ts, end_ts] (endDate, unix seconds).
+
+        Gaps are split into `window_days` slices, each paged to exhaustion by one
+        of `workers` threads; all requests share one `rate` (requests/second)
+        budget. A slice is marked covered only if every page arrived and only up
+        to `now - settle_days`.
+
+        Then markets changed since the updatedAt/closedTime high-water mark are
+        re-fetched (any endDate) and the mark advances, unless a page failed. The
+        first sync starts the mark at the sync start time. Returns
+        request/market/slice counts.
+        """
+        now_ts = int(time.time()) if now_ts is None else int(now_ts)
+        updated_hw = self.updated_high_water()
+        settled = now_ts - int(float(settle_days) * 86400.0)
+        page_size = max(1, int(page_size))
+        step = max(3600, int(float(window_days) * 86400.0))
+        windows = [
+            (lo, min(hi, lo + step - 1)) for a, hi in self.missing(start_ts, end_ts) for lo in range(a, hi + 1, step)
+        ]
+        limiter = RateLimiter(rate)
+        stats = {"windows": len(windows), "windows_failed": 0, "pages": 0, "markets": 0, "updated_markets": 0}
+        counter = threading.Lock()
+
+        def _crawl(lo: int, hi: int) -> Optional[List[dict]]:
+            # Query one second beyond each edge in case Gamma treats the bounds as exclusive.
+            out: List[dict] = []
+            offset = 0
+            while True:
+                limiter.acquire()
+                data = fetch(
+                    {
+                        "closed": "true",
+                        "end_date_min": _ts_iso(lo - 1),
+                        "end_date_max": _ts_iso(hi + 1),
+                        "order": "endDate",
+                        "ascending": "false",
+                        "limit": str(page_size),
+                        "offset": str(offset),
+                    }
+                )
+                with counter:
+                    stats["pages"] += 1
+                if not isinstance(data, list):
+                    return None
+                out.extend(m for m in data if isinstance(m, dict))
+                if len(data) < page_size:
+                    return out
+                offset += page_size
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+            futs = {ex.submit(_crawl, lo, hi): (lo, hi) for lo, hi in windows}
+            for fut in as_completed(futs):
+                lo, hi = futs[fut]
+                markets = fut.result()
+                done += 1
+                if markets is None:
+                    stats["windows_failed"] += 1
+                else:
+                    stats["markets"] += self.upsert(markets)
+                    self.mark_covered(lo, min(hi, settled))
+                if progress is not None:
+                    progress(done, len(windows))
+
+        if updated_hw is None:
+            self._set_updated_high_water(now_ts)
+            return stats
+        floor = updated_hw - UPDATE_OVERLAP_SEC
+        newest = updated_hw
+        offset = 0
+        while True:
+            limiter.acquire()
+            data = fetch(
+                {
+                    "closed": "true",
+                    "order": "updatedAt",
+                    "ascending": "false",
+                    "limit": str(page_size),
+                    "offset": str(offset),
+                }
+            )
+            stats["pages"] += 1
+            if not isinstance(data, list):
+                return stats
+            changed = [m for m in data if isinstance(m, dict) and _updated_ts(m) >= floor]
+            stats["updated_markets"] += self.upsert(changed)
+            newest = max([newest] + [_updated_ts(m) for m in changed])
+            if len(data) < page_size or len(changed) < len(data):
+                break
+            offset += page_size
+        self._set_updated_high_water(min(newest, now_ts))
+        return stats
+
+    def _where(
+        self, start_ts: int, end_ts: int, category: Optional[str], min_volume: Optional[float]
+    ) -> Tuple[str, list]:
+        sql = "end_ts BETWEEN ? AND ?"
+        params: list = [int(start_ts), int(end_ts)]
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(str(category))
+        if min_volume is not None:
+            sql += " AND volume >= ?"
+            params.append(float(min_volume))
+        return sql, params
+
+    def count(
+        self, start_ts: int, end_ts: int, category: Optional[str] = None, min_volume: Optional[float] = None
+    ) -> int:
+        where, params = self._where(start_ts, end_ts, category, min_volume)
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) FROM markets WHERE {where}", params).fetchone()[0])
+
+    def page(
+        self,
+        start_ts: int,
+        end_ts: int,
+        limit: int,
+        offset: int = 0,
+        category: Optional[str] = None,
+        min_volume: Optional[float] = None,
+    ) -> List[dict]:
+        """Stored markets with endDate in [start_ts, end_ts], endDate descending, as Gamma-shaped dicts."""
+        where, params = self._where(start_ts, end_ts, category, min_volume)
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT market_json FROM markets WHERE {where} ORDER BY end_ts DESC, id DESC LIMIT ? OFFSET ?",
+                params + [max(0, int(limit)), max(0, int(offset))],
+            )
+            return [json.loads(raw) for (raw,) in cur.fetchall()]
+
+
+def closed_market_pages(
+    args,
+    offsets: Sequence[int],
+    fetch: PageFetcher,
+    log: Optional[Callable[[str], None]] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[Tuple[int, List[dict]]]:
+    """
+    (offset, markets) for Gamma's closed-market listing between --date-min and
+    --date-max (endDate descending, --page-size rows per page).
+
+    Without --catalog-db each page is one Gamma request (failed pages come back
+    empty). With it, the catalog is synced first and the same pages are served
+    by local LIMIT/OFFSET queries; sync counts go into `stats`.
+    """
+    if not args.catalog_db:
+        for offset in offsets:
+            data = fetch(
+                {
+                    "closed": "true",
+                    "end_date_min": args.date_min,
+                    "end_date_max": args.date_max,
+                    "order": "endDate",
+                    "ascending": "false",
+                    "limit": str(args.page_size),
+                    "offset": str(offset),
+                }
+            )
+            yield offset, (data if isinstance(data, list) else [])
+        return
+
+    lo = iso_ts(args.date_min) or 0
+    hi = iso_ts(args.date_max) or int(time.time())
+    with ClosedMarketCatalog(args.catalog_db) as catalog:
+        sync = catalog.sync(lo, hi, fetch, page_size=args.page_size, **catalog_sync_kwargs(args))
+        if stats is not None:
+            stats["catalog_pages_fetched"] = sync["pages"]
+            stats["catalog_windows_failed"] = sync["windows_failed"]
+            stats["catalog_updated_markets"] = sync["updated_markets"]
+            stats["catalog_markets"] = catalog.count(lo, hi)
+        if log is not None:
+            hw = catalog.high_water()
+            log(
+                f"[catalog] {args.catalog_db} synced windows={sync['windows']} failed={sync['windows_failed']} "
+                f"pages={sync['pages']} updated={sync['updated_markets']} markets_in_range={catalog.count(lo, hi)} "
+                f"high_water={_ts_iso(hw) if hw is not None else '-'}"
+            )
+        for offset in offsets:
+            yield offset, catalog.page(lo, hi, args.page_size, offset)
+
+
+def catalog_sync_kwargs(args) -> Dict[str, object]:
+    """ClosedMarketCatalog.sync() keyword args from the shared --catalog-* CLI flags."""
+    return {
+        "workers": int(args.catalog_workers),
+        "rate": float(args.catalog_rate),
+        "settle_days": float(args.catalog_settle_days),
+    }
+
+
+def add_catalog_args(p) -> None:
+    """Register the shared closed-market catalog flags on an argparse parser."""
+    p.add_argument(
+        "--catalog-db",
+        default="",
+        help=f"Local closed-market catalog, synced incrementally (e.g. {DEFAULT_CATALOG_DB}; ''=page Gamma)",
+    )
+    p.add_argument("--catalog-workers", type=int, default=4, help="Concurrent catalog sync requests")
+    p.add_argument("--catalog-rate", type=float, default=4.0, help="Catalog sync requests per second (0=unlimited)")
+    p.add_argument(
+        "--catalog-settle-days",
+        type=float,
+        default=3.0,
+        help="Markets ending within this many days are re-crawled on every sync",
+    )
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+CACHE_FORMAT = 1
+_MAGIC = b"COLC"
+_U32 = struct.Struct("<I")
+_HEAD_FINGERPRINT_BYTES = 4096
+
+# (column name, typecode). Typecodes are `array` codes; "s" stores an index into
+# a per-column string table (typecode "I" on disk).
+ColumnSpec = Sequence[Tuple[str, str]]
+LineParser = Callable[[str], Optional[tuple]]
+
+
+class ColumnTable:
+    """Parsed rows held column-wise: `cols[name]` is an array, `strings[name]` the table for "s" columns."""
+
+    def __init__(self, spec: ColumnSpec):
+        self.spec = tuple((str(n), str(c)) for n, c in spec)
+        self.cols: Dict[str, array] = {n: array("I" if c == "s" else c) for n, c in self.spec}
+        self.strings: Dict[str, List[str]] = {n: [] for n, c in self.spec if c == "s"}
+        self._intern: Dict[str, Dict[str, int]] = {n: {} for n in self.strings}
+
+    def __len__(self) -> int:
+        return len(self.cols[self.spec[0][0]]) if self.spec else 0
+
+    def append(self, values: tuple) -> None:
+        for (name, code), v in zip(self.spec, values):
+            if code == "s":
+                table = self._intern[name]
+                idx = table.get(v)
+                if idx is None:
+                    idx = len(self.strings[name])
+                    table[v] = idx
+                    self.strings[name].append(v)
+                v = idx
+            self.cols[name].append(v)
+
+    def string_at(self, name: str, i: int) -> str:
+        return self.strings[name][self.cols[name][i]]
+
+    def _set_strings(self, name: str, values: List[str]) -> None:
+        self.strings[name] = list(values)
+        self._intern[name] = {s: i for i, s in enumerate(self.strings[name])}
+
+
+def default_cache_path(source: Path, cache_dir: str = "") -> Path:
+    if cache_dir:
+        digest = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:12]
+        return Path(cache_dir) / f"{source.name}.{digest}.colcache"
+    return source.with_name(source.name + ".colcache")
+
+
+def _head_fingerprint(path: Path, nbytes: int) -> str:
+    with path.open("rb") as f:
+        return hashlib.sha1(f.read(max(0, int(nbytes)))).hexdigest()
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder != "little" and arr.itemsize > 1:
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _write_cache(cache_path: Path, meta: dict, table: ColumnTable) -> None:
+    meta = dict(meta)
+    meta["n"] = len(table)
+    meta["strings"] = table.strings
+    head = json.dumps(meta, ensure_ascii=True, separators=(",", ":")).encode("utf-8")
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(cache_path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(_MAGIC + _U32.pack(len(head)) + head)
+        for name, _ in table.spec:
+            f.write(_le(table.cols[name]))
+    os.replace(tmp, cache_path)
+
+
+def _read_cache(cache_path: Path, spec: ColumnSpec) -> Tuple[Optional[dict], Optional[ColumnTable]]:
+    try:
+        data = cache_path.read_bytes()
+    except OSError:
+        return None, None
+    if not data.startswith(_MAGIC) or len(data) < len(_MAGIC) + _U32.size:
+        return None, None
+    pos = len(_MAGIC)
+    (head_len,) = _U32.unpack_from(data, pos)
+    pos += _U32.size
+    try:
+        meta = json.loads(data[pos : pos + head_len].decode("utf-8"))
+    except Exception:
+        return None, None
+    pos += head_len
+    table = ColumnTable(spec)
+    n = int(meta.get("n") or 0)
+    for name, code in table.spec:
+        arr = table.cols[name]
+        end = pos + n * arr.itemsize
+        if end > len(data):
+            return None, None
+        arr.frombytes(data[pos:end])
+        if sys.byteorder != "little" and arr.itemsize > 1:
+            arr.byteswap()
+        pos = end
+    for name, values in (meta.get("strings") or {}).items():
+        if name in table.strings:
+            table._set_strings(name, values)
+    return meta, table
+
+
+def _parse_tail(
+    source: Path, start: int, end: int, parse_line: LineParser, table: ColumnTable, final: bool = False
+) -> int:
+    """
+    Parse complete lines in source[start:end]; returns the offset after the last
+    newline consumed. With `final`, an unterminated last line is parsed too but
+    not counted as consumed (a writer may still be completing it).
+    """
+    if end <= start:
+        return start
+    with source.open("rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    cut = data.rfind(b"\n")
+    if final and cut + 1 < len(data):
+        lines = data.split(b"\n")
+    elif cut < 0:
+        return start
+    else:
+        lines = data[: cut + 1].split(b"\n")
+    for raw in lines:
+        if not raw.strip():
+            continue
+        vals = parse_line(raw.decode("utf-8", errors="replace"))
+        if vals is not None:
+            table.append(vals)
+    return start + cut + 1
+
+
+def load_columns(
+    source,
+    spec: ColumnSpec,
+    parse_line: LineParser,
+    version: str = "1",
+    cache_path: Optional[Path] = None,
+    use_cache: bool = True,
+) -> ColumnTable:
+    """
+    Parse a JSONL (or any line-based) file into a ColumnTable via `parse_line`,
+    using a sidecar columnar cache keyed by path, size and mtime.
+
+    - unchanged source (same size/mtime): arrays are read straight from the cache;
+    - appended source (larger, same head fingerprint): only the new bytes are
+      parsed and the cache is extended;
+    - anything else (truncated, rotated, different spec/version): full rebuild.
+    `version` must change whenever `parse_line` semantics change.
+    """
+    src = Path(source)
+    st = src.stat()
+    table = ColumnTable(spec)
+    if not use_cache:
+        _parse_tail(src, 0, st.st_size, parse_line, table, final=True)
+        return table
+
+    cpath = cache_path or default_cache_path(src)
+    key = {"format": CACHE_FORMAT, "version": str(version), "spec": [list(x) for x in table.spec]}
+    meta, cached = _read_cache(cpath, spec)
+    start = 0
+    if meta is not None and cached is not None and meta.get("key") == key and meta.get("path") == str(src.resolve()):
+        parsed = int(meta.get("parsed_bytes") or 0)
+        same = int(meta.get("size") or -1) == int(st.st_size) and int(meta.get("mtime_ns") or -1) == int(st.st_mtime_ns)
+        if same:
+            _parse_tail(src, parsed, int(st.st_size), parse_line, cached, final=True)
+            return cached
+        head_n = min(parsed, _HEAD_FINGERPRINT_BYTES)
+        if st.st_size >= parsed and meta.get("head") == _head_fingerprint(src, head_n):
+            table = cached
+            start = parsed
+
+    parsed = _parse_tail(src, start, int(st.st_size), parse_line, table)
+    meta = {
+        "key": key,
+        "path": str(src.resolve()),
+        "size": int(st.st_size),
+        "mtime_ns": int(st.st_mtime_ns),
+        "parsed_bytes": parsed,
+        "head": _head_fingerprint(src, min(parsed, _HEAD_FINGERPRINT_BYTES)),
+    }
+    try:
+        _write_cache(cpath, meta, table)
+    except OSError:
+        # Read-only log dirs: still return the parsed table.
+        pass
+    # An unterminated last line is returned but kept out of the cache.
+    _parse_tail(src, parsed, int(st.st_size), parse_line, table, final=True)
+    return table
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Tuple
+
+from lib.rolling_window import RollingWindow
+
+
+MAGIC = b"RWL1"
+_U32 = struct.Struct("<I")
+_KEY = struct.Struct("<II")  # key_idx, utf-8 length
+_VALS = struct.Struct("<IBI")  # key_idx, field_idx, value count
+
+
+def _f64_bytes(values) -> bytes:
+    arr = array("d", values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _f64_values(raw: bytes) -> array:
+    arr = array("d")
+    arr.frombytes(raw)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+class HistoryLog:
+    """
+    Append-only binary log of RollingWindow histories keyed by (key, field).
+
+    Layout (little-endian): `RWL1`, u32 length + JSON header {"fields": [...]},
+    then records
+      b"K" u32 key_idx, u32 len, utf-8 key          declare a key
+      b"V" u32 key_idx, u8 field, u32 n, n*float64   append n values
+    `sync()` writes only values appended since the previous sync. A torn tail
+    record is ignored on load and cut off before the next append. The log is
+    rewritten from the live windows (temp file + rename) when it outgrows
+    `compact_ratio` x its live size or when a tracked window was replaced.
+    """
+
+    def __init__(self, path, fields: Iterable[str], compact_ratio: float = 4.0, min_compact_bytes: int = 1 << 20):
+        self.path = Path(path)
+        self.fields = tuple(fields)
+        self.compact_ratio = max(1.5, float(compact_ratio))
+        self.min_compact_bytes = max(0, int(min_compact_bytes))
+        self.compactions = 0
+        self._key_idx: Dict[str, int] = {}
+        self._synced: Dict[Tuple[str, int], Tuple[RollingWindow, int]] = {}
+        self._valid_len = 0
+
+    def _header(self) -> bytes:
+        meta = json.dumps({"fields": list(self.fields)}, separators=(",", ":")).encode("utf-8")
+        return MAGIC + _U32.pack(len(meta)) + meta
+
+    def load(self, maxlen: int) -> Dict[str, Dict[str, RollingWindow]]:
+        """Replay the log into windows of capacity `maxlen`; unknown/corrupt files load as empty."""
+        self._key_idx.clear()
+        self._synced.clear()
+        self._valid_len = 0
+        try:
+            data = self.path.read_bytes()
+        except OSError:
+            return {}
+        if not data.startswith(MAGIC) or len(data) < len(MAGIC) + _U32.size:
+            return {}
+        pos = len(MAGIC)
+        (meta_len,) = _U32.unpack_from(data, pos)
+        pos += _U32.size
+        try:
+            file_fields = list(json.loads(data[pos : pos + meta_len].decode("utf-8")).get("fields") or [])
+        except Exception:
+            return {}
+        pos += meta_len
+        # Map the file's field order onto ours so adding/reordering fields stays readable.
+        field_map = {i: name for i, name in enumerate(file_fields) if name in self.fields}
+
+        names: Dict[int, str] = {}
+        out: Dict[str, Dict[str, RollingWindow]] = {}
+        good = pos
+        size = len(data)
+        while pos < size:
+            tag = data[pos : pos + 1]
+            if tag == b"K" and pos + 1 + _KEY.size <= size:
+                idx, n = _KEY.unpack_from(data, pos + 1)
+                end = pos + 1 + _KEY.size + n
+                if end > size:
+                    break
+                names[idx] = data[pos + 1 + _KEY.size : end].decode("utf-8", errors="replace")
+            elif tag == b"V" and pos + 1 + _VALS.size <= size:
+                idx, fi, n = _VALS.unpack_from(data, pos + 1)
+                start = pos + 1 + _VALS.size
+                end = start + 8 * n
+                if end > size:
+                    break
+                key = names.get(idx)
+                name = field_map.get(fi)
+                if key is not None and name is not None:
+                    w = out.setdefault(key, {}).get(name)
+                    if w is None:
+                        w = RollingWindow(maxlen)
+                        out[key][name] = w
+                    vals = _f64_values(data[start:end])
+                    for x in vals[-w.maxlen :]:
+                        w.append(x)
+            else:
+                break
+            pos = end
+            good = pos
+
+        if tuple(file_fields) == self.fields:
+            # Same layout: keep appending to this file (after truncating any torn tail).
+            self._valid_len = good
+            self._key_idx = {key: idx for idx, key in names.items()}
+            for key, windows in out.items():
+                for fi, name in enumerate(self.fields):
+                    w = windows.get(name)
+                    if w is not None:
+                        self._synced[(key, fi)] = (w, w.total)
+        return out
+
+    def _live_bytes(self, series: Mapping[str, Mapping[str, RollingWindow]]) -> int:
+        n = len(self._header())
+        for key, windows in series.items():
+            n += 1 + _KEY.size + len(key.encode("utf-8"))
+            for name in self.fields:
+                w = windows.get(name)
+                if w is not None and len(w):
+                    n += 1 + _VALS.size + 8 * len(w)
+        return n
+
+    def compact(self, series: Mapping[str, Mapping[str, RollingWindow]]) -> None:
+        """Rewrite the log from the current windows only."""
+        buf = bytearray(self._header())
+        key_idx: Dict[str, int] = {}
+        synced: Dict[Tuple[str, int], Tuple[RollingWindow, int]] = {}
+        for key, windows in series.items():
+            idx = len(key_idx)
+            key_idx[key] = idx
+            kb = key.encode("utf-8")
+            buf += b"K" + _KEY.pack(idx, len(kb)) + kb
+            for fi, name in enumerate(self.fields):
+                w = windows.get(name)
+                if w is None:
+                    continue
+                if len(w):
+                    buf += b"V" + _VALS.pack(idx, fi, len(w)) + _f64_bytes(w)
+                synced[(key, fi)] = (w, w.total)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_bytes(bytes(buf))
+        os.replace(tmp, self.path)
+        self._key_idx = key_idx
+        self._synced = synced
+        self._valid_len = len(buf)
+        self.compactions += 1
+
+    def sync(self, series: Mapping[str, Mapping[str, RollingWindow]]) -> int:
+        """Append values added since the last sync/load/compact; returns bytes written."""
+        if self._valid_len <= 0:
+            self.compact(series)
+            return self._valid_len
+        buf = bytearray()
+        new_keys: Dict[str, int] = {}
+        updates: Dict[Tuple[str, int], Tuple[RollingWindow, int]] = {}
+        for key, windows in series.items():
+            idx = self._key_idx.get(key)
+            if idx is None:
+                idx = len(self._key_idx) + len(new_keys)
+                new_keys[key] = idx
+                kb = key.encode("utf-8")
+                buf += b"K" + _KEY.pack(idx, len(kb)) + kb
+            for fi, name in enumerate(self.fields):
+                w = windows.get(name)
+                if w is None:
+                    continue
+                prev = self._synced.get((key, fi))
+                if prev is None:
+                    fresh = len(w)
+                elif prev[0] is not w or w.total < prev[1]:
+                    # Window replaced (e.g. resized): the log can no longer be extended consistently.
+                    self.compact(series)
+                    return self._valid_len
+                else:
+                    fresh = min(len(w), w.total - prev[1])
+                if fresh > 0:
+                    buf += b"V" + _VALS.pack(idx, fi, fresh) + _f64_bytes(w[len(w) - fresh :])
+                updates[(key, fi)] = (w, w.total)
+        if not buf:
+            return 0
+        if self._valid_len + len(buf) > max(self.min_compact_bytes, self.compact_ratio * self._live_bytes(series)):
+            self.compact(series)
+            return self._valid_len
+        try:
+            f = self.path.open("r+b")
+        except FileNotFoundError:
+            self.compact(series)
+            return self._valid_len
+        with f:
+            f.seek(self._valid_len)
+            f.truncate()
+            f.write(bytes(buf))
+        self._valid_len += len(buf)
+        self._key_idx.update(new_keys)
+        self._synced.update(updates)
+        return len(buf)
+
+
+def history_log_path(state_path: Path) -> Path:
+    return Path(state_path).with_name(Path(state_path).name + ".hist")
+
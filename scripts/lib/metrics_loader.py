@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import datetime as dt
+import glob
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lib.column_cache import ColumnSpec, ColumnTable, LineParser
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+INDEX_FORMAT = 1
+INDEX_BLOCK_BYTES = 1 << 20
+DEFAULT_BATCH_ROWS = 65536
+_READ_CHUNK = 1 << 22
+_HEAD_FINGERPRINT_BYTES = 4096
+_GZIP_MAGIC = b"\x1f\x8b"
+# Rotated siblings of NAME: NAME.1, NAME.20260301-120000, NAME.3.gz, NAME.gz ...
+_ROTATED_SUFFIX_RE = re.compile(r"^(?:\d[\d_.-]*?)?(?:\.?gz)?$")
+_EPOCH = dt.datetime(1970, 1, 1)
+_US = dt.timedelta(microseconds=1)
+
+
+def json_loads(line):
+    """json.loads, via orjson when installed; lines orjson rejects (NaN, Infinity, ...) fall back to json."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(line)
+        except _orjson.JSONDecodeError:
+            pass
+    return json.loads(line)
+
+
+def naive_us(ts: dt.datetime) -> int:
+    """Naive wall-clock microseconds; round-trips through from_naive_us() exactly, without tz conversion."""
+    return (ts - _EPOCH) // _US
+
+
+def from_naive_us(us: int) -> dt.datetime:
+    return _EPOCH + dt.timedelta(microseconds=int(us))
+
+
+def is_gzip(path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(2) == _GZIP_MAGIC
+    except OSError:
+        return False
+
+
+def rotated_siblings(path) -> List[str]:
+    """Rotated / gzipped copies of `path` (NAME.<n|stamp>[.gz], NAME.gz), oldest first by mtime."""
+    src = Path(path)
+    out: List[Tuple[float, str]] = []
+    for p in glob.glob(glob.escape(str(src)) + ".*"):
+        suffix = Path(p).name[len(src.name) + 1 :]
+        if not suffix or not _ROTATED_SUFFIX_RE.match(suffix) or not os.path.isfile(p):
+            continue
+        try:
+            out.append((os.path.getmtime(p), os.path.abspath(p)))
+        except OSError:
+            continue
+    return [p for _, p in sorted(out)]
+
+
+def resolve_files(file_csv: str, pattern: str = "", rotated: bool = False) -> List[str]:
+    """
+    Existing paths from a comma-separated list plus a glob, as sorted unique
+    absolute paths. With `rotated`, each file is preceded by its rotated
+    siblings (oldest first) so rows stream in time order.
+    """
+    paths: List[str] = []
+    for p in (file_csv or "").split(","):
+        pp = p.strip()
+        if pp and os.path.exists(pp):
+            paths.append(pp)
+    pat = (pattern or "").strip()
+    if pat:
+        paths.extend(glob.glob(pat))
+    base = sorted({os.path.abspath(p) for p in paths if os.path.exists(p)})
+    if not rotated:
+        return base
+    out: List[str] = []
+    seen = set()
+    for p in base:
+        for q in rotated_siblings(p) + [p]:
+            if q not in seen:
+                seen.add(q)
+                out.append(q)
+    return out
+
+
+def default_index_path(source: Path, key: dict, index_dir: str = "") -> Path:
+    """<file>.<key digest>.tidx, so tools parsing the same file differently keep separate indexes."""
+    kd = hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    if index_dir:
+        digest = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:12]
+        return Path(index_dir) / f"{source.name}.{digest}.{kd}.tidx"
+    return source.with_name(f"{source.name}.{kd}.tidx")
+
+
+def _head_digest(path: Path, nbytes: int) -> str:
+    with path.open("rb") as f:
+        return hashlib.sha1(f.read(max(0, int(nbytes)))).hexdigest()
+
+
+def _load_index(ipath: Path, key: dict, src: Path, st: os.stat_result, gz: bool) -> Optional[dict]:
+    """The stored index if it still describes `src` (unchanged, or for plain files: appended to)."""
+    try:
+        meta = json.loads(ipath.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(meta, dict) or meta.get("key") != key or meta.get("path") != str(src.resolve()):
+        return None
+    if int(meta.get("size", -1)) == int(st.st_size) and int(meta.get("mtime_ns", -1)) == int(st.st_mtime_ns):
+        return meta
+    indexed = int(meta.get("indexed_bytes") or 0)
+    if gz or st.st_size < indexed:
+        return None
+    if meta.get("head") != _head_digest(src, min(indexed, _HEAD_FINGERPRINT_BYTES)):
+        return None
+    meta["complete"] = False
+    return meta
+
+
+def _save_index(ipath: Path, meta: dict) -> None:
+    try:
+        ipath.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ipath.with_name(ipath.name + ".tmp")
+        tmp.write_text(json.dumps(meta, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, ipath)
+    except OSError:
+        # Read-only log dirs: the index is only an accelerator.
+        pass
+
+
+def _needed(block: list, lo: Optional[float], hi: Optional[float]) -> bool:
+    _, _, bmin, bmax, untimed = block
+    if untimed:
+        return True
+    if bmin is None:
+        return False
+    return (lo is None or bmax >= lo) and (hi is None or bmin <= hi)
+
+
+def _lines(f, start: int, end: Optional[int]) -> Iterator[Tuple[int, bytes, bool]]:
+    """(end offset, line, terminated) for lines of f[start:end]; only an EOF line can be unterminated."""
+    f.seek(start)
+    pos = start
+    buf = b""
+    while end is None or pos < end:
+        data = f.read(_READ_CHUNK if end is None else min(_READ_CHUNK, end - pos))
+        if not data:
+            break
+        pos += len(data)
+        buf += data
+        cut = buf.rfind(b"\n")
+        if cut < 0:
+            continue
+        off = pos - len(buf)
+        for raw in buf[:cut].split(b"\n"):
+            off += len(raw) + 1
+            yield off, raw, True
+        buf = buf[cut + 1 :]
+    if buf:
+        yield pos, buf, False
+
+
+def iter_batches(
+    paths: List[str],
+    spec: ColumnSpec,
+    parse_line: LineParser,
+    ts_col: str,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    version: str = "1",
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    index_dir: str = "",
+    use_index: bool = True,
+) -> Iterator[Tuple[str, ColumnTable]]:
+    """
+    Stream line-based files (plain or gzip) as (path, ColumnTable) batches of
+    `parse_line` tuples whose `ts_col` lies in [since, until] (None = open).
+    A row whose timestamp is not positive (or NaN) is untimed and always kept.
+
+    A sidecar time index (<file>.<key>.tidx, or under `index_dir`) records, per
+    ~1 MiB line-aligned block, the min/max `ts_col` of the rows `parse_line`
+    accepted, so later loads skip blocks outside the window unread (plain
+    files seek past them, gzip files decompress past them without parsing).
+    Appended plain files only index their new tail; any other change rebuilds.
+    `version` must change whenever `parse_line` semantics change.
+    """
+    ts_i = [name for name, _ in spec].index(ts_col)
+    key = {"format": INDEX_FORMAT, "version": str(version), "spec": [list(x) for x in spec], "ts_col": ts_col}
+    lo = None if since is None else float(since)
+    hi = None if until is None else float(until)
+    batch_rows = max(1, int(batch_rows))
+
+    for path in paths:
+        src = Path(path)
+        try:
+            st = src.stat()
+        except OSError:
+            continue
+        gz = is_gzip(src)
+        ipath = default_index_path(src, key, index_dir)
+        meta = _load_index(ipath, key, src, st, gz) if use_index else None
+        blocks: List[list] = [list(b) for b in meta["blocks"]] if meta else []
+        start = int(meta["indexed_bytes"]) if meta else 0
+        batch = ColumnTable(spec)
+
+        def _emit(raw: bytes) -> Optional[float]:
+            # Parse one line into `batch`; returns its ts, NaN when untimed, None when rejected.
+            if not raw.strip():
+                return None
+            vals = parse_line(raw.decode("utf-8", errors="replace").rstrip("\r"))
+            if vals is None:
+                return None
+            ts = float(vals[ts_i])
+            timed = ts > 0.0
+            if not timed or ((lo is None or ts >= lo) and (hi is None or ts <= hi)):
+                batch.append(vals)
+            return ts if timed else math.nan
+
+        opener = gzip.open if gz else open
+        with opener(src, "rb") as f:
+            ranges: List[List[int]] = []
+            for b in blocks:
+                if _needed(b, lo, hi):
+                    if ranges and ranges[-1][1] == b[0]:
+                        ranges[-1][1] = b[1]
+                    else:
+                        ranges.append([b[0], b[1]])
+            for s, e in ranges:
+                for _, raw, _ in _lines(f, s, e):
+                    _emit(raw)
+                    if len(batch) >= batch_rows:
+                        yield path, batch
+                        batch = ColumnTable(spec)
+
+            complete = bool(meta and meta.get("complete"))
+            changed = partial = False
+            if not complete:
+                # Unindexed tail: parse everything and extend the index. A short last
+                # block is reopened so frequent appends do not fragment the index.
+                if blocks and blocks[-1][1] - blocks[-1][0] < INDEX_BLOCK_BYTES:
+                    cur = blocks.pop()
+                else:
+                    cur = [start, start, None, None, 0]
+                indexed = start
+                for off, raw, terminated in _lines(f, start, None if gz else int(st.st_size)):
+                    ts = _emit(raw)
+                    partial = not terminated
+                    if terminated:
+                        if ts is not None:
+                            if ts != ts:
+                                cur[4] = 1
+                            else:
+                                cur[2] = ts if cur[2] is None else min(cur[2], ts)
+                                cur[3] = ts if cur[3] is None else max(cur[3], ts)
+                        cur[1] = indexed = off
+                        if cur[1] - cur[0] >= INDEX_BLOCK_BYTES:
+                            blocks.append(cur)
+                            cur = [off, off, None, None, 0]
+                    if len(batch) >= batch_rows:
+                        yield path, batch
+                        batch = ColumnTable(spec)
+                if cur[1] > cur[0]:
+                    blocks.append(cur)
+                changed = meta is None or indexed != start or int(meta.get("size", -1)) != int(st.st_size)
+                start = indexed
+
+        if len(batch):
+            yield path, batch
+        if use_index and changed:
+            _save_index(
+                ipath,
+                {
+                    "key": key,
+                    "path": str(src.resolve()),
+                    "size": int(st.st_size),
+                    "mtime_ns": int(st.st_mtime_ns),
+                    "indexed_bytes": start,
+                    # gzip archives are immutable; plain files may still grow past indexed_bytes.
+                    "complete": gz and not partial,
+                    "head": _head_digest(src, min(start, _HEAD_FINGERPRINT_BYTES)),
+                    "blocks": blocks,
+                },
+            )
+
+
+def add_loader_args(p) -> None:
+    p.add_argument(
+        "--with-rotated",
+        action="store_true",
+        help="Also read rotated/gzipped siblings of each input file (NAME.1, NAME.<stamp>.gz, ...)",
+    )
+    p.add_argument("--time-index-dir", default="", help="Directory for per-file time index sidecars (default: next to each file)")
+    p.add_argument("--no-time-index", action="store_true", help="Parse every line; do not read or write time indexes")
+
+
+def loader_kwargs(args) -> Dict[str, object]:
+    return {"index_dir": args.time_index_dir, "use_index": not args.no_time_index}
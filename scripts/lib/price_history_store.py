@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+
+DEFAULT_HISTORY_DB = "logs/prices_history.sqlite"
+
+# fetch(token, start_ts, end_ts, fidelity) -> prices-history "history" list, or None on failure.
+HistoryFetcher = Callable[[str, int, int, int], Optional[list]]
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS points (
+        token TEXT NOT NULL,
+        fidelity INTEGER NOT NULL,
+        t INTEGER NOT NULL,
+        p REAL NOT NULL,
+        PRIMARY KEY (token, fidelity, t)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS coverage (
+        token TEXT NOT NULL,
+        fidelity INTEGER NOT NULL,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        PRIMARY KEY (token, fidelity, start_ts)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS trades (
+        market TEXT PRIMARY KEY,
+        max_rows INTEGER NOT NULL,
+        exhausted INTEGER NOT NULL,
+        rows_json TEXT NOT NULL
+    )
+    """,
+)
+
+
+def history_points(hist) -> List[Tuple[int, float]]:
+    """(t, p) pairs from a prices-history `history` list; malformed points are dropped."""
+    out: List[Tuple[int, float]] = []
+    for x in hist if isinstance(hist, list) else []:
+        if not isinstance(x, dict):
+            continue
+        try:
+            out.append((int(x.get("t")), float(x.get("p"))))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+class PriceHistoryStore:
+    """
+    Append-only SQLite cache of CLOB prices-history points keyed by (token, fidelity).
+
+    `coverage` records the inclusive [start_ts, end_ts] ranges already fetched
+    (merged when they overlap or touch), so sync() only requests the gaps and a
+    fully covered window is answered without network. Ranges are clamped to
+    one fidelity bucket before `now`, so still-forming history is refetched.
+    Safe to share across threads: statements run under one lock, fetches outside it.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_DB):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for stmt in _SCHEMA:
+                self._conn.execute(stmt)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "PriceHistoryStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def covered(self, token: str, fidelity: int) -> List[Tuple[int, int]]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT start_ts, end_ts FROM coverage WHERE token = ? AND fidelity = ? ORDER BY start_ts",
+                (str(token), int(fidelity)),
+            )
+            return [(int(s), int(e)) for s, e in cur.fetchall()]
+
+    def missing(self, token: str, fidelity: int, start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+        """Inclusive sub-ranges of [start_ts, end_ts] not yet fetched."""
+        start_ts, end_ts = int(start_ts), int(end_ts)
+        gaps: List[Tuple[int, int]] = []
+        pos = start_ts
+        for s, e in self.covered(token, fidelity):
+            if e < pos:
+                continue
+            if s > end_ts:
+                break
+            if s > pos:
+                gaps.append((pos, s - 1))
+            pos = max(pos, e + 1)
+            if pos > end_ts:
+                break
+        if pos <= end_ts:
+            gaps.append((pos, end_ts))
+        return gaps
+
+    def add(
+        self,
+        token: str,
+        fidelity: int,
+        start_ts: int,
+        end_ts: int,
+        points: List[Tuple[int, float]],
+        now_ts: Optional[int] = None,
+    ) -> None:
+        """Store points fetched for [start_ts, end_ts] and mark that range covered."""
+        token, fidelity, start_ts, end_ts = str(token), int(fidelity), int(start_ts), int(end_ts)
+        now_ts = int(time.time()) if now_ts is None else int(now_ts)
+        settled_end = min(end_ts, now_ts - max(1, fidelity) * 60)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO points (token, fidelity, t, p) VALUES (?, ?, ?, ?)",
+                [(token, fidelity, t, p) for t, p in points if start_ts <= t <= end_ts],
+            )
+            if settled_end < start_ts:
+                return
+            lo, hi = start_ts, settled_end
+            rows = self._conn.execute(
+                "SELECT start_ts, end_ts FROM coverage WHERE token = ? AND fidelity = ? AND start_ts <= ? AND end_ts >= ?",
+                (token, fidelity, hi + 1, lo - 1),
+            ).fetchall()
+            for s, e in rows:
+                lo, hi = min(lo, int(s)), max(hi, int(e))
+            self._conn.execute(
+                "DELETE FROM coverage WHERE token = ? AND fidelity = ? AND start_ts <= ? AND end_ts >= ?",
+                (token, fidelity, hi + 1, lo - 1),
+            )
+            self._conn.execute(
+                "INSERT INTO coverage (token, fidelity, start_ts, end_ts) VALUES (?, ?, ?, ?)",
+                (token, fidelity, lo, hi),
+            )
+
+    def sync(
+        self,
+        token: str,
+        fidelity: int,
+        start_ts: int,
+        end_ts: int,
+        fetch: HistoryFetcher,
+        now_ts: Optional[int] = None,
+    ) -> bool:
+        """Fetch only the missing parts of [start_ts, end_ts]; False if any fetch failed."""
+        ok = True
+        for s, e in self.missing(token, fidelity, start_ts, end_ts):
+            hist = fetch(str(token), s, e, int(fidelity))
+            if hist is None:
+                ok = False
+                continue
+            self.add(token, fidelity, s, e, history_points(hist), now_ts=now_ts)
+        return ok
+
+    def window(self, token: str, fidelity: int, start_ts: int, end_ts: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT t, p FROM points WHERE token = ? AND fidelity = ? AND t BETWEEN ? AND ? ORDER BY t",
+                (str(token), int(fidelity), int(start_ts), int(end_ts)),
+            )
+            return [(int(t), float(p)) for t, p in cur.fetchall()]
+
+    def last_price(
+        self,
+        token: str,
+        fidelity: int,
+        start_ts: int,
+        end_ts: int,
+        fetch: Optional[HistoryFetcher] = None,
+    ) -> Optional[Tuple[int, float, int]]:
+        """
+        Entry quote for a cutoff: (t, p) of the last point in [start_ts, end_ts]
+        plus the number of points in the window, or None if the window is empty.
+        With `fetch`, missing ranges are synced first and a failed fetch yields None.
+        """
+        if fetch is not None and not self.sync(token, fidelity, start_ts, end_ts, fetch):
+            return None
+        with self._lock:
+            n, t = self._conn.execute(
+                "SELECT COUNT(*), MAX(t) FROM points WHERE token = ? AND fidelity = ? AND t BETWEEN ? AND ?",
+                (str(token), int(fidelity), int(start_ts), int(end_ts)),
+            ).fetchone()
+            if not n:
+                return None
+            (p,) = self._conn.execute(
+                "SELECT p FROM points WHERE token = ? AND fidelity = ? AND t = ?",
+                (str(token), int(fidelity), int(t)),
+            ).fetchone()
+        return int(t), float(p), int(n)
+
+    def cached_trades(self, market: str, max_rows: int) -> Optional[list]:
+        """Trade rows stored by save_trades() if they answer a request for `max_rows`, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT max_rows, exhausted, rows_json FROM trades WHERE market = ?", (str(market),)
+            ).fetchone()
+        if row is None:
+            return None
+        stored_max, exhausted, rows_json = row
+        if int(stored_max) < int(max_rows) and not exhausted:
+            return None
+        return json.loads(rows_json)[: max(0, int(max_rows))]
+
+    def save_trades(self, market: str, max_rows: int, rows: list, exhausted: bool) -> None:
+        """Cache a closed market's trade pages; `exhausted` means the API had no rows beyond `rows`."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO trades (market, max_rows, exhausted, rows_json) VALUES (?, ?, ?, ?)",
+                (str(market), int(max_rows), 1 if exhausted else 0, json.dumps(rows, separators=(",", ":"))),
+            )
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+# Worker-side copy of the read-only inputs (inherited via fork or sent once per worker).
+_SHARED: tuple = ()
+
+
+def _init_shared(shared: Optional[tuple]) -> None:
+    global _SHARED
+    if shared is not None:
+        _SHARED = shared
+
+
+def _run_chunk(fn: Callable, chunk: List[Tuple[int, object]]) -> List[Tuple[int, object]]:
+    return [(i, fn(item, *_SHARED)) for i, item in chunk]
+
+
+def pool_map(
+    fn: Callable,
+    items: Sequence,
+    shared: tuple = (),
+    workers: int = 1,
+    max_chunk: int = 32,
+    chunks_per_worker: int = 4,
+) -> Iterator[Tuple[int, object]]:
+    """
+    (index, fn(item, *shared)) for every item. workers <= 1 runs in-process, in
+    order; otherwise chunks run on a process pool and pairs arrive in completion
+    order. `shared` holds the large read-only inputs: workers inherit it by fork
+    (or get one pickle per worker under spawn), never one per task. `fn` must be
+    a module-level function.
+    """
+    workers = max(1, int(workers or 1))
+    if workers <= 1 or len(items) <= 1:
+        for i, item in enumerate(items):
+            yield i, fn(item, *shared)
+        return
+
+    global _SHARED
+    prev, _SHARED = _SHARED, tuple(shared)
+    try:
+        if "fork" in mp.get_all_start_methods():
+            ctx = mp.get_context("fork")
+            initargs: tuple = (None,)
+        else:
+            ctx = mp.get_context("spawn")
+            initargs = (tuple(shared),)
+        todo = list(enumerate(items))
+        size = max(1, min(int(max_chunk), len(todo) // (workers * int(chunks_per_worker))))
+        chunks = [todo[k : k + size] for k in range(0, len(todo), size)]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_shared, initargs=initargs) as ex:
+            for fut in as_completed([ex.submit(_run_chunk, fn, c) for c in chunks]):
+                yield from fut.result()
+    finally:
+        _SHARED = prev
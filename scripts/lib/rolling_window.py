@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import base64
+import math
+import sys
+from array import array
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+
+class RollingWindow:
+    """
+    Fixed-capacity float ring buffer backed by `array('d')`.
+
+    Running prefix sums of (x - ref) and (x - ref)**2 are stored alongside the
+    values, so sum/mean/pstdev over any trailing window are O(1). Values are
+    shifted by `ref` (rebased every `maxlen` appends) to keep the prefix sums
+    small and the variance free of cancellation drift.
+    """
+
+    __slots__ = ("maxlen", "total", "_vals", "_cs", "_cq", "_head", "_n", "_base_s", "_base_q", "_ref", "_since_rebase")
+
+    def __init__(self, maxlen: int, values: Iterable[float] = ()):
+        self.maxlen = max(1, int(maxlen))
+        # Appends ever made (including evicted values); lets persistence write only the new tail.
+        self.total = 0
+        self._vals = array("d", bytes(8 * self.maxlen))
+        self._cs = array("d", bytes(8 * self.maxlen))
+        self._cq = array("d", bytes(8 * self.maxlen))
+        self._head = 0
+        self._n = 0
+        self._base_s = 0.0
+        self._base_q = 0.0
+        self._ref = 0.0
+        self._since_rebase = 0
+        for x in list(values)[-self.maxlen :]:
+            self.append(x)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _pos(self, i: int) -> int:
+        if i < 0:
+            i += self._n
+        if i < 0 or i >= self._n:
+            raise IndexError("RollingWindow index out of range")
+        return (self._head + i) % self.maxlen
+
+    def __getitem__(self, i: Union[int, slice]):
+        if isinstance(i, slice):
+            return [self._vals[self._pos(j)] for j in range(*i.indices(self._n))]
+        return self._vals[self._pos(i)]
+
+    def __iter__(self) -> Iterator[float]:
+        for j in range(self._n):
+            yield self._vals[(self._head + j) % self.maxlen]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RollingWindow):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"RollingWindow(maxlen={self.maxlen}, n={self._n})"
+
+    def to_list(self) -> List[float]:
+        return list(self)
+
+    def append(self, x: float) -> None:
+        x = float(x)
+        if self._n == 0:
+            self._ref = x
+            self._base_s = 0.0
+            self._base_q = 0.0
+            last_s, last_q = 0.0, 0.0
+        else:
+            last = (self._head + self._n - 1) % self.maxlen
+            last_s, last_q = self._cs[last], self._cq[last]
+        if self._n == self.maxlen:
+            self._base_s = self._cs[self._head]
+            self._base_q = self._cq[self._head]
+            self._head = (self._head + 1) % self.maxlen
+            self._n -= 1
+        d = x - self._ref
+        pos = (self._head + self._n) % self.maxlen
+        self._vals[pos] = x
+        self._cs[pos] = last_s + d
+        self._cq[pos] = last_q + d * d
+        self._n += 1
+        self.total += 1
+        self._since_rebase += 1
+        if self._since_rebase >= self.maxlen:
+            self._rebase()
+
+    def _rebase(self) -> None:
+        self._since_rebase = 0
+        if self._n == 0:
+            return
+        ref = self._vals[(self._head + self._n - 1) % self.maxlen]
+        self._ref = ref
+        self._base_s = 0.0
+        self._base_q = 0.0
+        s = 0.0
+        q = 0.0
+        for j in range(self._n):
+            pos = (self._head + j) % self.maxlen
+            d = self._vals[pos] - ref
+            s += d
+            q += d * d
+            self._cs[pos] = s
+            self._cq[pos] = q
+
+    def _tail_sums(self, k: Optional[int]) -> Tuple[int, float, float]:
+        n = self._n if k is None else max(0, min(int(k), self._n))
+        if n <= 0:
+            return 0, 0.0, 0.0
+        last = (self._head + self._n - 1) % self.maxlen
+        if n == self._n:
+            s0, q0 = self._base_s, self._base_q
+        else:
+            before = (self._head + self._n - 1 - n) % self.maxlen
+            s0, q0 = self._cs[before], self._cq[before]
+        return n, self._cs[last] - s0, self._cq[last] - q0
+
+    def sum(self, k: Optional[int] = None) -> float:
+        n, s, _ = self._tail_sums(k)
+        return s + n * self._ref
+
+    def mean(self, k: Optional[int] = None) -> float:
+        n, s, _ = self._tail_sums(k)
+        if n <= 0:
+            return 0.0
+        return self._ref + s / n
+
+    def pstdev(self, k: Optional[int] = None) -> float:
+        """Population stdev of the last k values (all when None); 0.0 below two values."""
+        n, s, q = self._tail_sums(k)
+        if n < 2:
+            return 0.0
+        m = s / n
+        return math.sqrt(max(0.0, q / n - m * m))
+
+    def diff(self, lag: int = 1) -> float:
+        """Newest value minus the value `lag` steps earlier."""
+        return self[-1] - self[-1 - int(lag)]
+
+    def resized(self, maxlen: int) -> "RollingWindow":
+        return RollingWindow(maxlen, self.to_list())
+
+    def to_state(self) -> str:
+        """Compact state encoding: base64 of little-endian float64 values, oldest first."""
+        arr = array("d", self)
+        if sys.byteorder != "little":
+            arr.byteswap()
+        return base64.b64encode(arr.tobytes()).decode("ascii")
+
+    @classmethod
+    def from_state(cls, raw, maxlen: Optional[int] = None) -> "RollingWindow":
+        """
+        Accept `to_state()` output or a plain list of floats (older state files).
+        Capacity defaults to the number of stored values.
+        """
+        if isinstance(raw, RollingWindow):
+            return raw if maxlen is None or raw.maxlen == int(maxlen) else raw.resized(int(maxlen))
+        values: List[float] = []
+        if isinstance(raw, str) and raw:
+            try:
+                arr = array("d")
+                arr.frombytes(base64.b64decode(raw.encode("ascii")))
+                if sys.byteorder != "little":
+                    arr.byteswap()
+                values = list(arr)
+            except Exception:
+                values = []
+        elif isinstance(raw, (list, tuple)):
+            for x in raw:
+                try:
+                    values.append(float(x))
+                except Exception:
+                    continue
+        return cls(maxlen if maxlen is not None else max(1, len(values)), values)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+
+C = TypeVar("C")
+R = TypeVar("R")
+
+
+@dataclass
+class Rung:
+    budget: float
+    evaluated: int
+    kept: int
+
+
+@dataclass
+class HalvingReport(Generic[C, R]):
+    """Outcome of successive_halving(): `final` holds full-budget (candidate, result) pairs, best first."""
+
+    final: List[Tuple[C, R]]
+    rungs: List[Rung] = field(default_factory=list)
+    proposed: int = 0
+    work: float = 0.0  # sum of budget fractions evaluated (1.0 = one full replay)
+    full_work: float = 0.0  # work an exhaustive full-budget search would cost
+
+    @property
+    def work_ratio(self) -> float:
+        return (self.work / self.full_work) if self.full_work > 0 else 0.0
+
+    def summary(self) -> str:
+        parts = " ".join(f"{r.budget:.3g}:{r.evaluated}->{r.kept}" for r in self.rungs)
+        return (
+            f"halving rungs[{parts}] proposed={self.proposed} "
+            f"work={self.work:.1f}/{self.full_work:.0f} ({100.0 * self.work_ratio:.1f}%)"
+        )
+
+
+def budget_schedule(eta: float, min_budget: float) -> List[float]:
+    """Increasing budget fractions min_budget * eta^k, ending exactly at 1.0."""
+    eta = max(1.5, float(eta))
+    b = min(1.0, max(1e-6, float(min_budget)))
+    out: List[float] = []
+    while b < 1.0 - 1e-9:
+        out.append(b)
+        b *= eta
+    out.append(1.0)
+    return out
+
+
+def tail_fraction(seq: Sequence, fraction: float) -> Sequence:
+    """Most recent `fraction` of a time-ordered sequence (at least one element); nested for growing fractions."""
+    n = len(seq)
+    if fraction >= 1.0 or n <= 1:
+        return seq
+    k = max(1, int(math.ceil(n * max(0.0, float(fraction)))))
+    return seq[n - k :]
+
+
+def _normalizer(vectors: Sequence[Sequence[float]]) -> Callable[[Sequence[float]], Tuple[float, ...]]:
+    if not vectors:
+        return lambda v: tuple(float(x) for x in v)
+    dims = len(vectors[0])
+    lo = [min(float(v[i]) for v in vectors) for i in range(dims)]
+    hi = [max(float(v[i]) for v in vectors) for i in range(dims)]
+    span = [(h - l) if h > l else 1.0 for l, h in zip(lo, hi)]
+    return lambda v: tuple((float(x) - l) / s for x, l, s in zip(v, lo, span))
+
+
+def idw_predict(
+    known: Sequence[Tuple[Sequence[float], float]],
+    points: Sequence[Sequence[float]],
+    k: int = 5,
+    power: float = 2.0,
+) -> List[float]:
+    """Inverse-distance-weighted k-nearest-neighbour prediction (exact at known points)."""
+    out: List[float] = []
+    for p in points:
+        dists = sorted(
+            (math.sqrt(sum((a - b) ** 2 for a, b in zip(p, x))), y) for x, y in known
+        )[: max(1, int(k))]
+        if not dists:
+            out.append(0.0)
+            continue
+        if dists[0][0] <= 1e-12:
+            out.append(dists[0][1])
+            continue
+        ws = [1.0 / (d ** power) for d, _ in dists]
+        out.append(sum(w * y for w, (_, y) in zip(ws, dists)) / sum(ws))
+    return out
+
+
+def successive_halving(
+    candidates: Sequence[C],
+    evaluate: Callable[[List[C], float], List[R]],
+    rank_key: Callable[[R], tuple],
+    eta: float = 3.0,
+    min_budget: float = 1.0 / 9.0,
+    keep_min: int = 1,
+    initial: int = 0,
+    features: Optional[Callable[[C], Sequence[float]]] = None,
+    propose: int = 0,
+    rounds: int = 3,
+    seed: int = 0,
+) -> HalvingReport[C, R]:
+    """
+    Successive halving over time-sliced replays.
+
+    `evaluate(cands, budget)` must return one result per candidate, computed on
+    the `budget` fraction of the data (1.0 = the full replay); `rank_key(result)`
+    sorts higher-is-better. Each rung keeps the best ceil(n / eta) candidates
+    (never fewer than `keep_min`) for the next, larger budget, so only the
+    survivors pay for the full replay.
+
+    With `initial` > 0 the first rung scores only a random sample of that size;
+    if `features` and `propose` are also given, an inverse-distance kNN
+    surrogate fitted on first-rung scores (rank_key(result)[0]) then proposes
+    `propose` unevaluated candidates per round for `rounds` rounds.
+    """
+    pool = list(candidates)
+    report: HalvingReport[C, R] = HalvingReport(final=[], full_work=float(len(pool)))
+    if not pool:
+        return report
+    budgets = budget_schedule(eta, min_budget)
+    eta = max(1.5, float(eta))
+    keep_min = max(1, int(keep_min))
+
+    rng = random.Random(int(seed))
+    order = list(range(len(pool)))
+    if 0 < int(initial) < len(pool):
+        rng.shuffle(order)
+        active = sorted(order[: int(initial)])
+    else:
+        active = order
+
+    def _run(idx: List[int], budget: float) -> List[Tuple[int, R]]:
+        res = evaluate([pool[i] for i in idx], budget)
+        if len(res) != len(idx):
+            raise ValueError(f"evaluate returned {len(res)} results for {len(idx)} candidates")
+        report.work += budget * len(idx)
+        return list(zip(idx, res))
+
+    scored = _run(active, budgets[0])
+    if features is not None and int(propose) > 0 and len(scored) < len(pool):
+        vecs = [tuple(float(x) for x in features(c)) for c in pool]
+        norm = _normalizer(vecs)
+        nvecs = [norm(v) for v in vecs]
+        seen = {i for i, _ in scored}
+        for _ in range(max(0, int(rounds))):
+            rest = [i for i in range(len(pool)) if i not in seen]
+            if not rest:
+                break
+            known = [(nvecs[i], float(rank_key(r)[0])) for i, r in scored]
+            preds = idw_predict(known, [nvecs[i] for i in rest])
+            picks = sorted(zip(preds, rest), key=lambda x: (-x[0], x[1]))[: int(propose)]
+            new = sorted(i for _, i in picks)
+            scored.extend(_run(new, budgets[0]))
+            seen.update(new)
+            report.proposed += len(new)
+
+    for k, budget in enumerate(budgets):
+        if k > 0:
+            scored = _run([i for i, _ in scored], budget)
+        scored.sort(key=lambda x: (rank_key(x[1]), -x[0]), reverse=True)
+        last = k == len(budgets) - 1
+        kept = len(scored) if last else min(len(scored), max(keep_min, int(math.ceil(len(scored) / eta))))
+        report.rungs.append(Rung(budget=budget, evaluated=len(scored), kept=kept))
+        scored = scored[:kept]
+
+    report.final = [(pool[i], r) for i, r in scored]
+    return report
+
+
+def halving_kwargs(args) -> Dict[str, object]:
+    """successive_halving() keyword args from the shared --halving-* / --surrogate-* CLI flags."""
+    return {
+        "eta": float(args.halving_eta),
+        "min_budget": float(args.halving_min_budget),
+        "initial": int(args.halving_initial),
+        "propose": int(args.surrogate_propose),
+        "rounds": int(args.surrogate_rounds),
+        "seed": int(args.halving_seed),
+    }
+
+
+def add_halving_args(p) -> None:
+    """Register the shared search-strategy flags on an argparse parser."""
+    p.add_argument(
+        "--search-strategy",
+        choices=("full", "halving"),
+        default="full",
+        help="full=replay every candidate on the whole window; halving=successive halving on recent time slices",
+    )
+    p.add_argument("--halving-eta", type=float, default=3.0, help="Keep the top 1/eta candidates per rung")
+    p.add_argument("--halving-min-budget", type=float, default=1.0 / 9.0, help="Data fraction replayed on the first rung")
+    p.add_argument("--halving-initial", type=int, default=0, help="Random candidates scored on the first rung (0=all)")
+    p.add_argument("--surrogate-propose", type=int, default=0, help="Candidates proposed per surrogate round (0=off)")
+    p.add_argument("--surrogate-rounds", type=int, default=3, help="Surrogate proposal rounds on the first rung")
+    p.add_argument("--halving-seed", type=int, default=42, help="Seed for the --halving-initial sample")
@@ -12,14 +12,21 @@ running a fresh observe-only session.
 from __future__ import annotations
 
 import argparse
+import bisect
 import datetime as dt
 import json
 import math
 import os
 import statistics
+from array import array
 from dataclasses import dataclass
+from itertools import accumulate, chain, compress, groupby, repeat
+from operator import ge, itemgetter, le, lt, mul, or_, sub
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from lib.metrics_loader import add_loader_args, from_naive_us, iter_batches, loader_kwargs, naive_us, resolve_files
+from lib.search_halving import add_halving_args, halving_kwargs, successive_halving, tail_fraction
 
 
 def _parse_ts(s: str) -> dt.datetime:
@@ -56,6 +63,56 @@ class Sample:
     mid_jpy: float
 
 
+@dataclass(frozen=True)
+class SampleArrays:
+    """Samples as columns; ts_us is whole microseconds since the first sample."""
+
+    ts_us: array
+    bid: array
+    ask: array
+    mid: array
+    monotonic: bool
+
+    @classmethod
+    def from_samples(cls, samples: Sequence[Sample]) -> "SampleArrays":
+        t0 = samples[0].ts if samples else None
+        one_us = dt.timedelta(microseconds=1)
+        ts_us = array("q", ((s.ts - t0) // one_us for s in samples))
+        return cls(
+            ts_us=ts_us,
+            bid=array("d", (s.best_bid_jpy for s in samples)),
+            ask=array("d", (s.best_ask_jpy for s in samples)),
+            mid=array("d", (s.mid_jpy for s in samples)),
+            monotonic=all(a <= b for a, b in zip(ts_us, ts_us[1:])),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ts_us)
+
+    def samples(self) -> List[Sample]:
+        """Rows back as Sample objects (timestamps relative to an arbitrary epoch)."""
+        t0 = dt.datetime(2000, 1, 1)
+        return [
+            Sample(t0 + dt.timedelta(microseconds=t), b, a, m)
+            for t, b, a, m in zip(self.ts_us, self.bid, self.ask, self.mid)
+        ]
+
+    def tail(self, fraction: float) -> "SampleArrays":
+        """Same rows as tail_fraction(samples, fraction)."""
+        rows = tail_fraction(range(len(self)), fraction)
+        if len(rows) == len(self):
+            return self
+        a = rows[0]
+        ts_us = self.ts_us[a:]
+        return SampleArrays(
+            ts_us=ts_us,
+            bid=self.bid[a:],
+            ask=self.ask[a:],
+            mid=self.mid[a:],
+            monotonic=self.monotonic or all(x <= y for x, y in zip(ts_us, ts_us[1:])),
+        )
+
+
 @dataclass(frozen=True)
 class SimResult:
     half_spread_yen: float
@@ -106,6 +163,34 @@ def iter_samples(lines: Iterable[str]) -> Iterable[Sample]:
             continue
 
 
+# Columns kept from each metrics line; bump SAMPLE_ROW_VERSION when _sample_values changes.
+SAMPLE_ROW_VERSION = "1"
+SAMPLE_COLUMNS = (("ts_us", "q"), ("bid", "d"), ("ask", "d"), ("mid", "d"))
+
+
+def _sample_values(line: str) -> Optional[tuple]:
+    for s in iter_samples((line,)):
+        return naive_us(s.ts), s.best_bid_jpy, s.best_ask_jpy, s.mid_jpy
+    return None
+
+
+def load_samples(
+    paths: List[str], since: dt.datetime, until: dt.datetime, index_dir: str = "", use_index: bool = True
+) -> List[Sample]:
+    out: List[Sample] = []
+    batches = iter_batches(
+        paths, SAMPLE_COLUMNS, _sample_values, "ts_us", naive_us(since), naive_us(until),
+        version=SAMPLE_ROW_VERSION, index_dir=index_dir, use_index=use_index,
+    )
+    for _path, table in batches:
+        c = table.cols
+        out.extend(
+            Sample(ts=from_naive_us(us), best_bid_jpy=b, best_ask_jpy=a, mid_jpy=m)
+            for us, b, a, m in zip(c["ts_us"], c["bid"], c["ask"], c["mid"])
+        )
+    return out
+
+
 def _simulate(
     samples: list[Sample],
     half_spread_yen: float,
@@ -194,6 +279,247 @@ def _simulate(
     )
 
 
+def _refresh_gap_us(quote_refresh_sec: float) -> Optional[int]:
+    """Smallest whole-microsecond gap g with g / 1e6 >= quote_refresh_sec (timedelta.total_seconds() parity); None = never."""
+    ref = float(quote_refresh_sec)
+    if math.isnan(ref) or ref == math.inf:
+        return None
+    if ref == -math.inf:
+        return -(1 << 80)
+    g = math.ceil(ref * 1_000_000)
+    while (g - 1) / 1_000_000 >= ref:
+        g -= 1
+    while g / 1_000_000 < ref:
+        g += 1
+    return g
+
+
+# Per crossing event: (quote_bid or 0.0, quote_ask or 0.0, hi, lo, more) where (hi, lo) is
+# the first mid block until the next event and `more` holds any further blocks.
+QuoteEvents = List[Tuple[float, float, float, float, Tuple[Tuple[float, float], ...]]]
+
+
+def _mid_blocks(mid: array, a: int, b: int) -> Tuple[Tuple[float, float], ...]:
+    """(running high, lowest mid before the next higher high) for each record-high run of mid[a:b]."""
+    if b - a == 1:
+        return ((mid[a], mid[a]),)
+    seg = mid[a:b]
+    return tuple((hi, min(map(itemgetter(1), g))) for hi, g in groupby(zip(accumulate(seg, max), seg), itemgetter(0)))
+
+
+def _refresh_schedule(arrs: SampleArrays, quote_refresh_sec: float) -> List[int]:
+    """Re-quote sample indices while every quote stays valid (the time-driven refreshes only)."""
+    ts = arrs.ts_us
+    n = len(ts)
+    gap = _refresh_gap_us(quote_refresh_sec)
+    starts: List[int] = []
+    a = 0
+    while a < n:
+        starts.append(a)
+        if gap is None:
+            break
+        if arrs.monotonic:
+            a = bisect.bisect_left(ts, ts[a] + gap, a + 1)
+        else:
+            due = ts[a] + gap
+            a += 1
+            while a < n and ts[a] < due:
+                a += 1
+    return starts
+
+
+def _quote_events(
+    arrs: SampleArrays,
+    half_spread_yen: float,
+    starts: List[int],
+    tick_size_jpy: float,
+    blocks: Dict[Tuple[int, int], Tuple[float, float, Tuple[Tuple[float, float], ...]]],
+) -> Optional[QuoteEvents]:
+    """
+    Samples where a resting quote is crossed, with the mid blocks up to the next one.
+
+    Quotes depend only on (half_spread, refresh), never on fills, so this pass is
+    shared by every order size. The quote set at starts[k] rests over samples
+    starts[k]+1..starts[k+1] (fills there are checked before it re-quotes).
+    Returns None if some quote is non-positive, which forces an untimed re-quote.
+    """
+    bid, ask, mid = arrs.bid, arrs.ask, arrs.mid
+    n = len(mid)
+    if n == 0:
+        return []
+    qbs: List[float] = []
+    qas: List[float] = []
+    tick_gap = max(1.0, tick_size_jpy)
+    for a in starts:
+        qb = _q_down(mid[a] - half_spread_yen, tick_size_jpy)
+        qa = _q_up(mid[a] + half_spread_yen, tick_size_jpy)
+        if qa <= qb:
+            qa = qb + tick_gap
+        if qb <= 0 or qa <= 0:
+            return None
+        qbs.append(qb)
+        qas.append(qa)
+    widths = list(map(sub, starts[1:] + [n - 1], starts))
+    rest_bid = array("d", [0.0])
+    rest_bid.extend(chain.from_iterable(map(repeat, qbs, widths)))
+    rest_ask = array("d", [0.0])
+    rest_ask.extend(chain.from_iterable(map(repeat, qas, widths)))
+
+    buy = list(map(ge, rest_bid, ask))
+    sell = list(map(le, rest_ask, bid))
+    hit = list(map(or_, buy, sell))
+    idx = list(compress(range(n), hit))
+    ends = idx[1:] + [n]
+    at_mid = list(map(mid.__getitem__, idx))
+    out: QuoteEvents = list(
+        zip(compress(map(mul, rest_bid, buy), hit), compress(map(mul, rest_ask, sell), hit), at_mid, at_mid, repeat(()))
+    )
+    # Most events are one sample apart; only longer gaps need their own mid blocks.
+    for k in compress(range(len(idx)), map(lt, repeat(1), map(sub, ends, idx))):
+        i, end = idx[k], ends[k]
+        seg = blocks.get((i, end))
+        if seg is None:
+            first, *more = _mid_blocks(mid, i, end)
+            seg = blocks[(i, end)] = (first[0], first[1], tuple(more))
+        out[k] = out[k][:2] + seg
+    return out
+
+
+def _replay_events(
+    arrs: SampleArrays,
+    events: QuoteEvents,
+    half_spread_yen: float,
+    quote_refresh_sec: float,
+    order_size_btc: float,
+    max_inventory_btc: float,
+    maker_fee_bps: float,
+    dd_penalty: float,
+) -> SimResult:
+    inv = 0.0
+    avg = 0.0
+    realized = 0.0
+    fills_buy = 0
+    fills_sell = 0
+    turnover = 0.0
+
+    peak = 0.0
+    max_dd = 0.0
+    fee_rate = maker_fee_bps / 10000.0
+    inv_cap = max_inventory_btc + 1e-12
+
+    # Hand-inlined min()/max() below keep their exact tie semantics.
+    for quote_bid, quote_ask, hi, lo, more in events:
+        if quote_bid > 0 and (inv + order_size_btc) <= inv_cap:
+            notional = quote_bid * order_size_btc
+            fee = notional * fee_rate
+            cost_before = avg * inv
+            inv += order_size_btc
+            avg = (cost_before + notional + fee) / inv if inv > 0 else 0.0
+            fills_buy += 1
+            turnover += notional
+
+        if quote_ask > 0:
+            size = inv if inv < order_size_btc else order_size_btc
+            if size > 1e-12:
+                notional = quote_ask * size
+                fee = notional * fee_rate
+                proceeds = notional - fee
+                cost = avg * size
+                realized += proceeds - cost
+                left = inv - size
+                inv = left if left > 0.0 else 0.0
+                if inv <= 0:
+                    avg = 0.0
+                fills_sell += 1
+                turnover += notional
+
+        # State is constant until the next event and mark-to-mid is monotone in mid,
+        # so each record-high run contributes its high (peak) and its low (drawdown).
+        if inv > 0 and avg > 0:
+            total = realized + (hi - avg) * inv
+            if total > peak:
+                peak = total
+            dd = peak - (realized + (lo - avg) * inv)
+            if dd > max_dd:
+                max_dd = dd
+            for b_hi, b_lo in more:
+                total = realized + (b_hi - avg) * inv
+                if total > peak:
+                    peak = total
+                dd = peak - (realized + (b_lo - avg) * inv)
+                if dd > max_dd:
+                    max_dd = dd
+        else:
+            total = realized + 0.0
+            if total > peak:
+                peak = total
+            dd = peak - total
+            if dd > max_dd:
+                max_dd = dd
+
+    last_mid = arrs.mid[-1] if len(arrs) else 0.0
+    unrealized = (last_mid - avg) * inv if (inv > 0 and avg > 0 and last_mid > 0) else 0.0
+    total = realized + unrealized
+    score = total - (dd_penalty * max_dd)
+
+    return SimResult(
+        half_spread_yen=half_spread_yen,
+        quote_refresh_sec=quote_refresh_sec,
+        order_size_btc=order_size_btc,
+        max_inventory_btc=max_inventory_btc,
+        fills_buy=fills_buy,
+        fills_sell=fills_sell,
+        inventory_btc=inv,
+        avg_entry_jpy=avg,
+        realized_pnl_jpy=realized,
+        unrealized_pnl_jpy=unrealized,
+        total_pnl_jpy=total,
+        max_drawdown_jpy=max_dd,
+        turnover_jpy=turnover,
+        score=score,
+    )
+
+
+def simulate_grid(
+    arrs: SampleArrays,
+    combos: Sequence[Tuple[float, float, float]],
+    max_inventory_btc: float,
+    tick_size_jpy: float,
+    maker_fee_bps: float,
+    dd_penalty: float,
+) -> List[SimResult]:
+    """
+    _simulate() for every (half_spread, refresh, order_size) combo, in order.
+
+    Combos sharing (half_spread, refresh) share one quote/crossing pass; each
+    combo then walks only its crossing events, not every sample. Results are
+    identical to _simulate().
+    """
+    starts_by: Dict[float, List[int]] = {}
+    events_by: Dict[Tuple[float, float], Optional[QuoteEvents]] = {}
+    blocks: Dict[Tuple[int, int], Tuple[float, float, Tuple[Tuple[float, float], ...]]] = {}
+    out: List[SimResult] = []
+    for h, ref, sz in combos:
+        if (h, ref) not in events_by:
+            starts = starts_by.get(ref)
+            if starts is None:
+                starts = starts_by[ref] = _refresh_schedule(arrs, ref)
+            events_by[(h, ref)] = _quote_events(arrs, h, starts, tick_size_jpy, blocks)
+        events = events_by[(h, ref)]
+        if events is None:
+            # Degenerate quotes (<= 0): fall back to the per-sample reference.
+            out.append(
+                _simulate(arrs.samples(), h, ref, sz, max_inventory_btc, tick_size_jpy, maker_fee_bps, dd_penalty)
+            )
+            continue
+        out.append(_replay_events(arrs, events, h, ref, sz, max_inventory_btc, maker_fee_bps, dd_penalty))
+    return out
+
+
+def _rank_key(r: SimResult) -> tuple:
+    return (r.score, r.total_pnl_jpy, -r.max_drawdown_jpy, r.turnover_jpy)
+
+
 def _format_table(rows: list[SimResult]) -> str:
     header = (
         "rank  half(y)  refresh(s)  size(btc)  max_inv  fills(b/s)  pnl_total  pnl_realized  dd_max  score  turnover"
@@ -226,6 +552,7 @@ def main() -> int:
     p.add_argument("--hours", type=float, default=24.0, help="Lookback window in hours")
     p.add_argument("--since", default="", help='Start timestamp "YYYY-MM-DD HH:MM:SS" (overrides --hours)')
     p.add_argument("--until", default="", help='End timestamp "YYYY-MM-DD HH:MM:SS" (default: now)')
+    add_loader_args(p)
     p.add_argument("--tick-size-jpy", type=float, default=1.0, help="Quote tick size in JPY")
     p.add_argument("--quote-refresh-secs", default="10,30,60,120", help="Comma-separated quote refresh seconds")
     p.add_argument("--maker-fee-bps", type=float, default=0.0, help="Assumed maker fee in bps")
@@ -235,6 +562,7 @@ def main() -> int:
     p.add_argument("--dd-penalty", type=float, default=0.0, help="Score penalty weight for max drawdown (score=total-dd_penalty*dd)")
     p.add_argument("--top-n", type=int, default=10, help="Show top N candidates")
     p.add_argument("--min-samples", type=int, default=50, help="Minimum samples required")
+    add_halving_args(p)
     args = p.parse_args()
 
     if not os.path.exists(args.metrics_file):
@@ -245,8 +573,8 @@ def main() -> int:
     until: dt.datetime = _parse_ts(args.until) if args.until else now
     since: dt.datetime = _parse_ts(args.since) if args.since else (until - dt.timedelta(hours=float(args.hours)))
 
-    with open(args.metrics_file, "r", encoding="utf-8", errors="replace") as f:
-        samples = [s for s in iter_samples(f) if since <= s.ts <= until]
+    paths = resolve_files(args.metrics_file, rotated=args.with_rotated)
+    samples = load_samples(paths, since, until, **loader_kwargs(args))
 
     if len(samples) < int(args.min_samples):
         print(
@@ -262,7 +590,7 @@ def main() -> int:
         print("half-spreads-yen or quote-refresh-secs or order-sizes-btc is empty.")
         return 4
 
-    results: list[SimResult] = []
+    combos: list[tuple[float, float, float]] = []
     for h in half_spreads:
         if h <= 0:
             continue
@@ -272,28 +600,39 @@ def main() -> int:
             for sz in order_sizes:
                 if sz <= 0:
                     continue
-                results.append(
-                    _simulate(
-                        samples=samples,
-                        half_spread_yen=float(h),
-                        quote_refresh_sec=float(ref),
-                        order_size_btc=float(sz),
-                        max_inventory_btc=float(args.max_inventory_btc),
-                        tick_size_jpy=float(args.tick_size_jpy),
-                        maker_fee_bps=float(args.maker_fee_bps),
-                        dd_penalty=float(args.dd_penalty),
-                    )
-                )
+                combos.append((float(h), float(ref), float(sz)))
+
+    arrs = SampleArrays.from_samples(samples)
+
+    def _evaluate(cands: list[tuple[float, float, float]], budget: float) -> list[SimResult]:
+        return simulate_grid(
+            arrs.tail(budget),
+            cands,
+            max_inventory_btc=float(args.max_inventory_btc),
+            tick_size_jpy=float(args.tick_size_jpy),
+            maker_fee_bps=float(args.maker_fee_bps),
+            dd_penalty=float(args.dd_penalty),
+        )
+
+    report = None
+    if args.search_strategy == "halving" and combos:
+        report = successive_halving(
+            combos,
+            _evaluate,
+            _rank_key,
+            keep_min=max(1, int(args.top_n)),
+            features=lambda c: c,
+            **halving_kwargs(args),
+        )
+        results = [r for _, r in report.final]
+    else:
+        results = _evaluate(combos, 1.0)
 
     if not results:
         print("No valid parameter candidates.")
         return 5
 
-    ranked = sorted(
-        results,
-        key=lambda r: (r.score, r.total_pnl_jpy, -r.max_drawdown_jpy, r.turnover_jpy),
-        reverse=True,
-    )
+    ranked = sorted(results, key=_rank_key, reverse=True)
     top_n = max(1, int(args.top_n))
     top = ranked[:top_n]
 
@@ -303,12 +642,14 @@ def main() -> int:
         f"half_spreads={len(half_spreads)} refresh_secs={len(refresh_secs)} order_sizes={len(order_sizes)} "
         f"max_inventory={args.max_inventory_btc} maker_fee_bps={args.maker_fee_bps} dd_penalty={args.dd_penalty}"
     )
+    if report is not None:
+        print(report.summary())
     print(_format_table(top))
 
     totals = [r.total_pnl_jpy for r in results]
     dds = [r.max_drawdown_jpy for r in results]
     print(
-        "All candidates: "
+        f"{'All candidates' if report is None else 'Full-window survivors'}: "
         f"count={len(results)} pnl(mean/median/max)={statistics.mean(totals):.1f}/"
         f"{statistics.median(totals):.1f}/{max(totals):.1f} "
         f"dd(mean/max)={statistics.mean(dds):.1f}/{max(dds):.1f}"
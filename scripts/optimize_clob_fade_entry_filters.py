@@ -14,17 +14,20 @@ It never places live orders.
 from __future__ import annotations
 
 import argparse
+import bisect
 import datetime as dt
-import glob
+import functools
 import itertools
 import math
-import os
+import operator
 import re
 import statistics
 from collections import defaultdict, deque
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from pathlib import Path
 
+from lib.metrics_loader import add_loader_args, from_naive_us, iter_batches, loader_kwargs, naive_us, resolve_files
+
 
 TS_RE = r"(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"
 ENTRY_RE = re.compile(
@@ -119,67 +122,104 @@ class Result:
     timeout_rate: float
 
 
-def resolve_files(log_file: str, log_glob: str) -> list[str]:
-    out: list[str] = []
-    if (log_file or "").strip():
-        for p in (log_file or "").split(","):
-            p = p.strip()
-            if p and os.path.exists(p):
-                out.append(os.path.abspath(p))
-    pat = (log_glob or "").strip()
-    if pat:
-        out.extend(os.path.abspath(p) for p in glob.glob(pat) if os.path.exists(p))
-    return sorted(set(out))
+_RESULT_METRICS = tuple(f.name for f in fields(Result) if f.name != "p")
+
+
+# Entry/exit event columns; bump EVENT_ROW_VERSION when _event_values changes.
+EVENT_ROW_VERSION = "1"
+EVENT_COLUMNS = (
+    ("ts_us", "q"),
+    ("entry", "b"),
+    ("side", "b"),
+    ("score_abs", "d"),
+    ("agree", "q"),
+    ("edge", "d"),
+    ("tp", "d"),
+    ("sl", "d"),
+    ("pnl", "d"),
+    ("reason", "s"),
+    ("label", "s"),
+)
+
+
+def _event_values(line: str) -> tuple | None:
+    m1 = ENTRY_RE.match(line)
+    if m1:
+        return (
+            naive_us(parse_ts(m1.group("ts"))),
+            1,
+            1 if m1.group("side") == "LONG" else -1,
+            abs(float(m1.group("score"))),
+            int(m1.group("agree")),
+            float(m1.group("edge")),
+            float(m1.group("tp")),
+            float(m1.group("sl")),
+            0.0,
+            "",
+            m1.group("label").strip(),
+        )
+    m2 = EXIT_RE.match(line)
+    if not m2:
+        return None
+    return (
+        naive_us(parse_ts(m2.group("ts"))),
+        0,
+        0,
+        0.0,
+        0,
+        0.0,
+        0.0,
+        0.0,
+        float(m2.group("pnl")),
+        m2.group("reason"),
+        m2.group("label").strip(),
+    )
 
 
-def parse_trades(files: list[str], since: dt.datetime, until: dt.datetime) -> list[Trade]:
+def parse_trades(
+    files: list[str], since: dt.datetime, until: dt.datetime, index_dir: str = "", use_index: bool = True
+) -> list[Trade]:
     events: list[tuple[dt.datetime, str, dict]] = []
+    stamps: dict[int, dt.datetime] = {}
     for fp in files:
         try:
-            with open(fp, "r", encoding="utf-8", errors="replace") as f:
-                for line in f:
-                    m1 = ENTRY_RE.match(line)
-                    if m1:
-                        ts = parse_ts(m1.group("ts"))
-                        if ts < since or ts > until:
-                            continue
-                        events.append(
-                            (
-                                ts,
-                                "entry",
-                                {
-                                    "side": 1 if m1.group("side") == "LONG" else -1,
-                                    "score_abs": abs(float(m1.group("score"))),
-                                    "agree": int(m1.group("agree")),
-                                    "edge": float(m1.group("edge")),
-                                    "tp": float(m1.group("tp")),
-                                    "sl": float(m1.group("sl")),
-                                    "label": m1.group("label").strip(),
-                                    "source_file": fp,
-                                },
-                            )
-                        )
-                        continue
-                    m2 = EXIT_RE.match(line)
-                    if not m2:
-                        continue
-                    ts = parse_ts(m2.group("ts"))
-                    if ts < since or ts > until:
-                        continue
-                    events.append(
-                        (
-                            ts,
-                            "exit",
-                            {
-                                "pnl": float(m2.group("pnl")),
-                                "reason": m2.group("reason"),
-                                "label": m2.group("label").strip(),
-                            },
-                        )
-                    )
+            batches = iter_batches(
+                [fp], EVENT_COLUMNS, _event_values, "ts_us", naive_us(since), naive_us(until),
+                version=EVENT_ROW_VERSION, index_dir=index_dir, use_index=use_index,
+            )
+            for _path, table in batches:
+                c = table.cols
+                reasons, labels = table.strings["reason"], table.strings["label"]
+                cols = (
+                    c["ts_us"], c["entry"], c["side"], c["score_abs"], c["agree"], c["edge"], c["tp"], c["sl"],
+                    c["pnl"], c["reason"], c["label"],
+                )
+                for us, entry, side, score_abs, agree, edge, tp, sl, pnl, ri, li in zip(*cols):
+                    ts = stamps.get(us)
+                    if ts is None:
+                        ts = stamps[us] = from_naive_us(us)
+                    if entry:
+                        payload = {
+                            "side": side,
+                            "score_abs": score_abs,
+                            "agree": agree,
+                            "edge": edge,
+                            "tp": tp,
+                            "sl": sl,
+                            "label": labels[li],
+                            "source_file": fp,
+                        }
+                        events.append((ts, "entry", payload))
+                    else:
+                        events.append((ts, "exit", {"pnl": pnl, "reason": reasons[ri], "label": labels[li]}))
         except Exception:
             continue
-    events.sort(key=lambda x: x[0])
+    return pair_events(events)
+
+
+def pair_events(events: list[tuple[dt.datetime, str, dict]]) -> list[Trade]:
+    """Trades from (ts, "entry"/"exit", payload) events: exits close the oldest open entry with the same label."""
+    events = sorted(events, key=lambda x: x[0])
     by_label: dict[str, deque[EntryEvent]] = defaultdict(deque)
     out: list[Trade] = []
     for ts, kind, payload in events:
@@ -238,7 +278,10 @@ def evaluate(trades: list[Trade], p: Param, dd_penalty: float, min_trades: int,
         if p.side_mode == "short" and t.side > 0:
             continue
         filt.append(t)
+    return _result(filt, p, dd_penalty, min_trades, undertrade_penalty)
+
 
+def _result(filt: list[Trade], p: Param, dd_penalty: float, min_trades: int, undertrade_penalty: float) -> Result:
     if not filt:
         return Result(p, 0, 0, 0, 0.0, 0.0, 0.0, 0.0, 0.0, -undertrade_penalty * min_trades, 0.0, 0.0, 0.0, 0.0, 0.0)
 
@@ -295,6 +338,115 @@ def evaluate(trades: list[Trade], p: Param, dd_penalty: float, min_trades: int,
     )
 
 
+def _flag_mask(flags) -> int:
+    # One byte per trade (0/1) packed into an int: `&` intersects filters at C speed and
+    # to_bytes() + itertools.compress() recovers the admitted trades in order.
+    return int.from_bytes(bytes(flags), "little")
+
+
+def _threshold_masks(values: list[float], thresholds) -> dict:
+    """Mask of trades with value >= threshold for each threshold (thresholds between the same values share one)."""
+    n = len(values)
+    order = sorted(range(n), key=values.__getitem__)
+    svals = [values[i] for i in order]
+    by_cut: dict[int, int] = {}
+    out: dict = {}
+    for th in set(thresholds):
+        cut = bisect.bisect_left(svals, th)
+        m = by_cut.get(cut)
+        if m is None:
+            flags = bytearray(n)
+            for i in order[cut:]:
+                flags[i] = 1
+            m = by_cut[cut] = _flag_mask(flags)
+        out[th] = m
+    return out
+
+
+def evaluate_grid(
+    trades: list[Trade], params: list[Param], dd_penalty: float, min_trades: int, undertrade_penalty: float
+) -> list[Result]:
+    """
+    evaluate() for every Param, same results in the same order. Trades are
+    sorted once per threshold axis into byte masks; a combo's filter is the AND
+    of its axis masks, and combos admitting the same trades share one metrics
+    pass. Metrics are accumulated with C-level builtins in exit order, so every
+    float matches evaluate() exactly.
+    """
+    n = len(trades)
+    score_m = _threshold_masks([t.score_abs for t in trades], [pp.min_score for pp in params])
+    agree_m = _threshold_masks([t.agree for t in trades], [pp.min_agree for pp in params])
+    edge_m = _threshold_masks([t.edge for t in trades], [pp.min_edge_c / 100.0 for pp in params])
+    all_m = _flag_mask([1] * n)
+    side_m = {
+        "both": all_m,
+        "long": _flag_mask([0 if t.side < 0 else 1 for t in trades]),
+        "short": _flag_mask([0 if t.side > 0 else 1 for t in trades]),
+    }
+    pnls = [t.pnl for t in trades]
+    win_flags = bytes(1 if t.pnl > 1e-12 else 0 for t in trades)
+    loss_flags = bytes(0 if t.pnl > 1e-12 else 1 for t in trades)
+    win_m = int.from_bytes(win_flags, "little")
+    reason_m = {k: _flag_mask([1 if t.reason == k else 0 for t in trades]) for k in ("tp", "sl", "timeout")}
+    holds_all = [t.hold_sec for t in trades]
+    # statistics.mean() is exact; for whole-second holds an integer sum divided once is the same float.
+    int_holds = [int(h) for h in holds_all] if all(float(h).is_integer() for h in holds_all) else None
+
+    def _metrics(m: int, pp: Param) -> Result:
+        k = m.bit_count()
+        if k == 0:
+            return _result([], pp, dd_penalty, min_trades, undertrade_penalty)
+        sel = m.to_bytes(n, "little")
+        pn = list(itertools.compress(pnls, sel))
+        cum = list(itertools.accumulate(pn, operator.add, initial=0.0))[1:]
+        peaks = list(itertools.accumulate(cum, max, initial=0.0))[1:]
+        dd = functools.reduce(max, map(operator.sub, peaks, cum), 0.0)
+        tot = cum[-1]
+        wins = (m & win_m).bit_count()
+        gw = functools.reduce(operator.add, itertools.compress(pn, itertools.compress(win_flags, sel)), 0.0)
+        gl = functools.reduce(
+            operator.add, map(abs, itertools.compress(pn, itertools.compress(loss_flags, sel))), 0.0
+        )
+        holds = list(itertools.compress(holds_all, sel))
+        if int_holds is not None:
+            hold_mean = sum(itertools.compress(int_holds, sel)) / k
+        else:
+            hold_mean = statistics.mean(holds)
+        hold_p95 = max(holds) if k < 20 else float(statistics.quantiles(holds, n=20)[-1])
+        score = tot - (max(0.0, dd_penalty) * dd)
+        if k < max(0, min_trades):
+            score -= max(0.0, undertrade_penalty) * (int(min_trades) - k)
+        return Result(
+            p=pp,
+            trades=k,
+            wins=wins,
+            losses=k - wins,
+            win_rate=wins / max(1, k),
+            total_pnl=tot,
+            avg_pnl=tot / max(1, k),
+            profit_factor=(gw / gl) if gl > 1e-12 else (float("inf") if gw > 0 else 0.0),
+            max_drawdown=dd,
+            score=score,
+            hold_mean_sec=hold_mean,
+            hold_p95_sec=hold_p95,
+            tp_rate=((m & reason_m["tp"]).bit_count() / k),
+            sl_rate=((m & reason_m["sl"]).bit_count() / k),
+            timeout_rate=((m & reason_m["timeout"]).bit_count() / k),
+        )
+
+    # Metrics (every Result field after p) per distinct admitted-trade mask.
+    done: dict[int, tuple] = {}
+    out: list[Result] = []
+    for pp in params:
+        m = score_m[pp.min_score] & agree_m[pp.min_agree] & edge_m[pp.min_edge_c / 100.0] & side_m.get(pp.side_mode, all_m)
+        vals = done.get(m)
+        if vals is None:
+            r = _metrics(m, pp)
+            vals = done[m] = tuple(getattr(r, f) for f in _RESULT_METRICS)
+        out.append(Result(pp, *vals))
+    return out
+
+
 def fmt_table(rows: list[Result]) -> str:
     h = "rank score    pnl    dd trades win%   pf   avgT holdM hold95 tp%  sl%  to%  minScore agree edge(c) side"
     lines = [h]
@@ -331,6 +483,7 @@ def main() -> int:
     p.add_argument("--hours", type=float, default=72.0)
     p.add_argument("--since", default="")
     p.add_argument("--until", default="")
+    add_loader_args(p)
     p.add_argument("--top-n", type=int, default=10)
     p.add_argument("--min-trades", type=int, default=20)
     p.add_argument("--strict-min-trades", action="store_true")
@@ -342,14 +495,14 @@ def main() -> int:
     p.add_argument("--side-modes", default="both,long,short")
     args = p.parse_args()
 
-    files = resolve_files(args.log_file, args.log_glob)
+    files = resolve_files(args.log_file, args.log_glob, rotated=args.with_rotated)
     if not files:
         print(f"No log files found. --log-file={args.log_file} --log-glob={args.log_glob}")
         return 2
     now = dt.datetime.now()
     until = parse_ts(args.until) if args.until else now
     since = parse_ts(args.since) if args.since else (until - dt.timedelta(hours=float(args.hours)))
-    trades = parse_trades(files, since=since, until=until)
+    trades = parse_trades(files, since=since, until=until, **loader_kwargs(args))
     if not trades:
         print("No paired trades found in selected window.")
         return 3
@@ -376,16 +529,13 @@ def main() -> int:
         f"Window: {since:%Y-%m-%d %H:%M:%S} -> {until:%Y-%m-%d %H:%M:%S} "
         f"| files={len(files)} trades={len(trades)} combos={len(params)}"
     )
-    res = [
-        evaluate(
-            trades=trades,
-            p=pp,
-            dd_penalty=float(args.dd_penalty),
-            min_trades=int(args.min_trades),
-            undertrade_penalty=float(args.undertrade_penalty),
-        )
-        for pp in params
-    ]
+    res = evaluate_grid(
+        trades=trades,
+        params=params,
+        dd_penalty=float(args.dd_penalty),
+        min_trades=int(args.min_trades),
+        undertrade_penalty=float(args.undertrade_penalty),
+    )
     ranked_all = sorted(res, key=lambda r: (r.score, r.total_pnl, -r.max_drawdown, r.win_rate, r.trades), reverse=True)
     min_trades_req = max(0, int(args.min_trades))
     ranked = [r for r in ranked_all if r.trades >= min_trades_req]
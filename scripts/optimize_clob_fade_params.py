@@ -7,16 +7,24 @@ Observe-only utility. Never places real orders.
 from __future__ import annotations
 
 import argparse
+import bisect
 import datetime as dt
+import gzip
+import hashlib
 import itertools
 import json
 import math
+import operator
 import os
-import glob
 import statistics
-from dataclasses import dataclass, field
+from dataclasses import asdict, astuple, dataclass, field, fields, replace
 from pathlib import Path
 
+from lib.column_cache import ColumnTable, default_cache_path, load_columns
+from lib.metrics_loader import add_loader_args, is_gzip, iter_batches, json_loads, loader_kwargs, resolve_files
+from lib.process_pool import pool_map
+from lib.search_halving import add_halving_args, halving_kwargs, successive_halving, tail_fraction
+
 
 def parse_ts(s: str) -> dt.datetime:
     return dt.datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
@@ -142,74 +150,165 @@ class Res:
     disables: int
 
 
+def parse_row(line: str) -> Row | None:
+    line = (line or "").strip()
+    if not line:
+        return None
+    try:
+        o = json_loads(line)
+        ts_raw = str(o.get("ts") or "").strip()
+        ts_ms = int(o.get("ts_ms") or 0)
+        if ts_raw:
+            ts = parse_ts(ts_raw)
+            if ts_ms <= 0:
+                ts_ms = int(ts.timestamp() * 1000.0)
+        else:
+            if ts_ms <= 0:
+                return None
+            ts = dt.datetime.fromtimestamp(ts_ms / 1000.0)
+        tid = str(o.get("token_id") or "").strip()
+        if not tid:
+            return None
+        bid = float(o.get("best_bid") or 0.0)
+        ask = float(o.get("best_ask") or 0.0)
+        mid = float(o.get("mid") or 0.0)
+        if mid <= 0 and bid > 0 and ask > 0 and ask >= bid:
+            mid = (bid + ask) / 2.0
+        if mid <= 0:
+            return None
+        spr = float(o.get("spread") or 0.0)
+        if spr <= 0 and bid > 0 and ask > 0 and ask >= bid:
+            spr = ask - bid
+        return Row(
+            ts=ts,
+            ts_ms=ts_ms,
+            token_id=tid,
+            label=str(o.get("label") or "")[:180],
+            mid=mid,
+            bid=bid,
+            ask=ask,
+            spread=max(0.0, spr),
+            dbid=max(0.0, float(o.get("depth_bid") or 0.0)),
+            dask=max(0.0, float(o.get("depth_ask") or 0.0)),
+            score=float(o.get("consensus_score") or 0.0),
+            cside=int(o.get("consensus_side") or 0),
+            cagree=int(o.get("consensus_agree") or 0),
+            bz=float(o.get("bot_zscore") or 0.0),
+            bv=float(o.get("bot_velocity") or 0.0),
+            bi=float(o.get("bot_imbalance") or 0.0),
+        )
+    except Exception:
+        return None
+
+
 def iter_rows(path: str):
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
+    opener = gzip.open if is_gzip(path) else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
         for line in f:
-            line = (line or "").strip()
-            if not line:
-                continue
-            try:
-                o = json.loads(line)
-                ts_raw = str(o.get("ts") or "").strip()
-                ts_ms = int(o.get("ts_ms") or 0)
-                if ts_raw:
-                    ts = parse_ts(ts_raw)
-                    if ts_ms <= 0:
-                        ts_ms = int(ts.timestamp() * 1000.0)
-                else:
-                    if ts_ms <= 0:
-                        continue
-                    ts = dt.datetime.fromtimestamp(ts_ms / 1000.0)
-                tid = str(o.get("token_id") or "").strip()
-                if not tid:
-                    continue
-                bid = float(o.get("best_bid") or 0.0)
-                ask = float(o.get("best_ask") or 0.0)
-                mid = float(o.get("mid") or 0.0)
-                if mid <= 0 and bid > 0 and ask > 0 and ask >= bid:
-                    mid = (bid + ask) / 2.0
-                if mid <= 0:
-                    continue
-                spr = float(o.get("spread") or 0.0)
-                if spr <= 0 and bid > 0 and ask > 0 and ask >= bid:
-                    spr = ask - bid
-                yield Row(
-                    ts=ts,
-                    ts_ms=ts_ms,
-                    token_id=tid,
-                    label=str(o.get("label") or "")[:180],
-                    mid=mid,
-                    bid=bid,
-                    ask=ask,
-                    spread=max(0.0, spr),
-                    dbid=max(0.0, float(o.get("depth_bid") or 0.0)),
-                    dask=max(0.0, float(o.get("depth_ask") or 0.0)),
-                    score=float(o.get("consensus_score") or 0.0),
-                    cside=int(o.get("consensus_side") or 0),
-                    cagree=int(o.get("consensus_agree") or 0),
-                    bz=float(o.get("bot_zscore") or 0.0),
-                    bv=float(o.get("bot_velocity") or 0.0),
-                    bi=float(o.get("bot_imbalance") or 0.0),
-                )
-            except Exception:
-                continue
+            r = parse_row(line)
+            if r is not None:
+                yield r
+
+
+# Columnar sidecar cache layout for parsed rows. Bump ROW_CACHE_VERSION when parse_row changes.
+ROW_CACHE_VERSION = "1"
+ROW_COLUMNS = (
+    ("ts_us", "q"),
+    ("ts_ms", "q"),
+    ("token_id", "s"),
+    ("label", "s"),
+    ("mid", "d"),
+    ("bid", "d"),
+    ("ask", "d"),
+    ("spread", "d"),
+    ("dbid", "d"),
+    ("dask", "d"),
+    ("score", "d"),
+    ("cside", "i"),
+    ("cagree", "i"),
+    ("bz", "d"),
+    ("bv", "d"),
+    ("bi", "d"),
+)
+_EPOCH = dt.datetime(1970, 1, 1)
+_US = dt.timedelta(microseconds=1)
+
+
+def _naive_us(ts: dt.datetime) -> int:
+    # Naive wall-clock microseconds; round-trips Row.ts exactly without any tz conversion.
+    return (ts - _EPOCH) // _US
+
+
+def _table_rows(table: ColumnTable, lo: int, hi: int, stamps: dict[int, dt.datetime], out: list[Row]) -> None:
+    c = table.cols
+    tok_s, lab_s = table.strings["token_id"], table.strings["label"]
+    cols = (
+        c["ts_us"], c["ts_ms"], c["token_id"], c["label"], c["mid"], c["bid"], c["ask"], c["spread"],
+        c["dbid"], c["dask"], c["score"], c["cside"], c["cagree"], c["bz"], c["bv"], c["bi"],
+    )
+    for us, ts_ms, ti, li, mid, bid, ask, spr, dbid, dask, score, cside, cagree, bz, bv, bi in zip(*cols):
+        if us < lo or us > hi:
+            continue
+        ts = stamps.get(us)
+        if ts is None:
+            # Rows of one sample share a timestamp; build each datetime once.
+            ts = stamps[us] = _EPOCH + dt.timedelta(microseconds=us)
+        out.append(
+            Row(ts, ts_ms, tok_s[ti], lab_s[li], mid, bid, ask, spr, dbid, dask, score, cside, cagree, bz, bv, bi)
+        )
 
 
-def resolve_metric_files(metrics_file: str, metrics_glob: str) -> list[str]:
-    paths: list[str] = []
-    base = (metrics_file or "").strip()
-    if base:
-        for p in base.split(","):
-            pp = p.strip()
-            if not pp:
-                continue
-            if os.path.exists(pp):
-                paths.append(pp)
-    pat = (metrics_glob or "").strip()
-    if pat:
-        paths.extend(sorted(glob.glob(pat)))
-    uniq = sorted({os.path.abspath(p) for p in paths if os.path.exists(p)})
-    return uniq
+def _row_values(line: str) -> tuple | None:
+    r = parse_row(line)
+    if r is None:
+        return None
+    return (
+        _naive_us(r.ts), r.ts_ms, r.token_id, r.label, r.mid, r.bid, r.ask, r.spread,
+        r.dbid, r.dask, r.score, r.cside, r.cagree, r.bz, r.bv, r.bi,
+    )
+
+
+def load_rows(
+    path: str,
+    since: dt.datetime,
+    until: dt.datetime,
+    cache_dir: str = "",
+    use_cache: bool = True,
+    index_dir: str = "",
+    use_index: bool = True,
+) -> list[Row]:
+    """
+    Rows of one metrics file within [since, until]. Plain files go through the
+    columnar sidecar cache (lib/column_cache.py): unchanged files load without
+    JSON parsing and appended files only parse their new tail. Gzipped
+    (rotated) files stream through lib/metrics_loader.py, whose time index
+    skips blocks outside the window.
+    """
+    lo, hi = _naive_us(since), _naive_us(until)
+    stamps: dict[int, dt.datetime] = {}
+    out: list[Row] = []
+    if is_gzip(path):
+        batches = iter_batches(
+            [path], ROW_COLUMNS, _row_values, "ts_us", lo, hi,
+            version=ROW_CACHE_VERSION, index_dir=index_dir, use_index=use_index,
+        )
+        for _path, table in batches:
+            _table_rows(table, lo, hi, stamps, out)
+        return out
+    table = load_columns(
+        path,
+        ROW_COLUMNS,
+        _row_values,
+        version=ROW_CACHE_VERSION,
+        cache_path=default_cache_path(Path(path), cache_dir),
+        use_cache=use_cache,
+    )
+    _table_rows(table, lo, hi, stamps, out)
+    return out
+
+
+def resolve_metric_files(metrics_file: str, metrics_glob: str, rotated: bool = False) -> list[str]:
+    return resolve_files(metrics_file, metrics_glob, rotated=rotated)
 
 
 def group_rows(rows: list[Row]) -> list[tuple[int, list[Row]]]:
@@ -229,15 +328,6 @@ def group_rows(rows: list[Row]) -> list[tuple[int, list[Row]]]:
     return out
 
 
-def tpnl(tokens: dict[str, Tok]) -> tuple[float, float, float]:
-    realized = sum(t.realized for t in tokens.values())
-    unreal = 0.0
-    for t in tokens.values():
-        if t.side != 0 and t.size > 0 and t.mid > 0:
-            unreal += t.side * (t.mid - t.entry_px) * t.size
-    return realized + unreal, realized, unreal
-
-
 def n_nonext(side: int, r: Row) -> int:
     return sum(1 for v in (r.bz, r.bv, r.bi) if sign(v) == side)
 
@@ -302,199 +392,356 @@ def ex_px(t: Tok, side: int, args) -> float:
     return max(0.001, (t.ask if t.ask > 0 else t.mid) + slip)
 
 
-def close_pos(t: Tok, p: Param, args, ts_ms: int, reason: str, force: bool = False) -> float | None:
-    if t.side == 0 or t.size <= 0:
-        t.side, t.size = 0, 0.0
-        return None
-    if (not force) and t.mid <= 0:
-        return None
-    side, size = t.side, t.size
-    px = ex_px(t, side, args)
-    gross = side * (px - t.entry_px) * size
-    notional = abs(t.entry_px * size) + abs(px * size)
-    fees = notional * (max(0.0, args.fee_bps) / 10000.0)
-    pnl = gross - fees
-    t.realized += pnl
-    t.trades += 1
-    if pnl > 1e-12:
-        t.wins += 1
-    else:
-        t.losses += 1
-    t.side, t.size, t.entry_px, t.entry_ts_ms, t.tp, t.sl = 0, 0.0, 0.0, 0, 0.0, 0.0
-    t.cooldown_until = int(ts_ms + max(0.0, args.cooldown_sec) * 1000.0)
-    if reason in ("tp", "sl", "timeout") and t.trades >= max(1, int(args.token_loss_min_trades)):
-        wr = t.wins / max(1, t.trades)
-        disable = False
-        if args.token_loss_cut_usd > 0 and t.realized <= -args.token_loss_cut_usd:
-            disable = True
-        elif wr < clamp(args.token_min_winrate, 0.0, 1.0):
-            disable = True
-        if disable:
-            t.disabled_until = int(ts_ms + max(0.0, args.token_disable_sec) * 1000.0)
-    _ = p
-    return pnl
-
-
-def maybe_close(t: Tok, p: Param, args, ts_ms: int) -> float | None:
-    if t.side == 0 or t.mid <= 0:
-        return None
-    per = t.side * (t.mid - t.entry_px)
-    tp = max(p.tp_c / 100.0, t.tp)
-    sl = max(p.sl_c / 100.0, t.sl)
-    hold = (ts_ms - t.entry_ts_ms) / 1000.0
-    if tp > 0 and per >= tp:
-        return close_pos(t, p, args, ts_ms, "tp")
-    if sl > 0 and per <= -sl:
-        return close_pos(t, p, args, ts_ms, "sl")
-    if p.hold_s > 0 and hold >= p.hold_s:
-        return close_pos(t, p, args, ts_ms, "timeout")
-    return None
+# simulate() args read by the feature pass; the decision pass reads the rest.
+_FEATURE_ARGS = (
+    "history_size", "vol_lookback", "min_mid_prob", "max_mid_prob", "max_spread_cents", "min_depth_shares",
+    "max_volatility_cents", "min_volatility_cents", "execution_mode", "tick_size", "maker_spread_capture",
+    "slippage_ticks", "fee_bps", "expected_move_vol_mult", "tp_cost_mult", "sl_cost_mult",
+)
 
 
-def simulate(batches: list[tuple[int, list[Row]]], p: Param, args) -> Res:
-    toks: dict[str, Tok] = {}
-    entries = exits = signals = halts = disables = 0
-    halted = False
+@dataclass
+class Cand:
+    """A row that passes every Param-independent entry check (side set, regime_ok) at its batch."""
+
+    tok: int
+    side: int
+    abs_score: float
+    agree: int
+    nonext: int
+    em: float
+    cost: float
+    entry_px: float
+    tp_floor: float
+    sl_floor: float
+    state: int  # index into Features.states[tok] for this batch
+
+
+@dataclass
+class Features:
+    """
+    Param-independent part of the replay: per-token book state and rolling
+    volatility, regime checks, costs and expected moves. Built once per
+    (batches, feature args) by fade_features(); simulate() then only runs the
+    per-Param decision pass over it.
+    """
+
+    ts: list[int] = field(default_factory=list)
+    new_day: list[bool] = field(default_factory=list)
+    # Per token (first-seen order): (batch, mid, exit px if long, exit px if short) for each batch it updated in.
+    states: list[list[tuple[int, float, float, float]]] = field(default_factory=list)
+    cands: list[list[Cand]] = field(default_factory=list)  # per batch, in row order
+    _axes: tuple | None = None
+    _ratio_masks: dict[float, int] = field(default_factory=dict)
+    _mask_ids: dict[bytes, int] = field(default_factory=dict)
+    _static: dict[tuple[int, int, int], list[list[Cand]]] = field(default_factory=dict)
+
+    def _sorted_axes(self) -> tuple:
+        if self._axes is None:
+            flat = [c for bc in self.cands for c in bc]
+            self._axes = (
+                sorted(c.abs_score for c in flat),
+                sorted(c.agree for c in flat),
+                sorted(c.nonext for c in flat),
+                sorted(c.em - c.cost for c in flat),
+                [(c.em, c.cost) for c in flat],
+            )
+        return self._axes
+
+    def _ratio_class(self, ratio: float) -> int:
+        cls = self._ratio_masks.get(ratio)
+        if cls is None:
+            mask = bytes(not (em < cost * ratio) for em, cost in self._sorted_axes()[4])
+            cls = self._mask_ids.setdefault(mask, len(self._mask_ids))
+            self._ratio_masks[ratio] = cls
+        return cls
+
+    def _static_class(self, p: Param) -> tuple[int, int, int]:
+        abs_s, agree, nonext = self._sorted_axes()[:3]
+        return (
+            bisect.bisect_left(abs_s, p.min_score),
+            bisect.bisect_left(agree, p.min_agree),
+            bisect.bisect_left(nonext, p.min_nonext_agree),
+        )
+
+    def decision_key(self, p: Param) -> tuple:
+        """
+        Params with equal keys take identical decisions on this data: every
+        threshold is collapsed to the set of candidate rows it admits.
+        """
+        edges = self._sorted_axes()[3]
+        return self._static_class(p) + (
+            self._ratio_class(max(0.1, p.ratio)),
+            bisect.bisect_left(edges, max(0.0, p.edge_c) / 100.0),
+            p.tp_c,
+            p.sl_c,
+            p.hold_s,
+        )
+
+    def candidates(self, p: Param) -> list[list[Cand]]:
+        """Per-batch candidates that clear p's score/agree/non-extreme thresholds (shared by equal classes)."""
+        key = self._static_class(p)
+        out = self._static.get(key)
+        if out is None:
+            ms, ma, mn = p.min_score, p.min_agree, p.min_nonext_agree
+            out = [
+                [c for c in bc if not (c.abs_score < ms or c.agree < ma or c.nonext < mn)] for bc in self.cands
+            ]
+            self._static[key] = out
+        return out
+
+
+def _build_features(batches: list[tuple[int, list[Row]]], args) -> Features:
+    f = Features()
+    toks: list[Tok] = []
+    index: dict[str, int] = {}
+    hist = max(20, int(args.history_size))
+    tp_mult = max(0.1, args.tp_cost_mult)
+    sl_mult = max(0.1, args.sl_cost_mult)
     day_key = ""
-    day_anchor = 0.0
-    peak = dd = 0.0
-    gwin = gloss = 0.0
-    for ts_ms, bucket in batches:
+    for b, (ts_ms, bucket) in enumerate(batches):
         cur_day = bucket[0].ts.astimezone().strftime("%Y-%m-%d")
-        if not day_key:
-            day_key = cur_day
-        elif cur_day != day_key:
-            tot, _, _ = tpnl(toks)
-            day_key, day_anchor, halted = cur_day, tot, False
+        f.ts.append(ts_ms)
+        f.new_day.append(bool(day_key) and cur_day != day_key)
+        day_key = cur_day
 
+        touched: dict[int, Tok] = {}
         for r in bucket:
-            t = toks.get(r.token_id)
-            if t is None:
-                t = Tok(token_id=r.token_id, label=r.label)
-                toks[r.token_id] = t
+            i = index.get(r.token_id)
+            if i is None:
+                i = index[r.token_id] = len(toks)
+                toks.append(Tok(token_id=r.token_id, label=r.label))
+                f.states.append([])
+            t = toks[i]
             prev = t.mid
-            t.label = r.label or t.label
             t.bid, t.ask, t.mid = r.bid, r.ask, r.mid
             t.spread, t.dbid, t.dask = r.spread, r.dbid, r.dask
-            if t.mid > 0:
-                apush(t.mids, t.mid, max(20, int(args.history_size)))
             if prev > 0 and t.mid > 0:
-                apush(t.rets, t.mid - prev, max(20, int(args.history_size)))
+                apush(t.rets, t.mid - prev, hist)
+            touched[i] = t
+        for i, t in touched.items():
+            f.states[i].append((b, t.mid, ex_px(t, 1, args), ex_px(t, -1, args)))
 
-        for t in toks.values():
-            pnl = maybe_close(t, p, args, ts_ms)
-            if pnl is None:
+        cands: list[Cand] = []
+        regime: dict[int, bool] = {}
+        for r in bucket:
+            side = r.cside if r.cside != 0 else sign(r.score)
+            ss = sign(r.score)
+            if ss != 0 and side != ss:
+                side = ss
+            if side == 0:
                 continue
+            i = index[r.token_id]
+            t = toks[i]
+            ok = regime.get(i)
+            if ok is None:
+                ok = regime[i] = regime_ok(t, args)
+            if not ok:
+                continue
+            cost = rt_cost(t, args)
+            cands.append(
+                Cand(
+                    tok=i,
+                    side=side,
+                    abs_score=abs(r.score),
+                    agree=r.cagree,
+                    nonext=n_nonext(side, r),
+                    em=exp_move(t, r.score, args),
+                    cost=cost,
+                    entry_px=ent_px(t, side, args),
+                    tp_floor=cost * tp_mult,
+                    sl_floor=cost * sl_mult,
+                    state=len(f.states[i]) - 1,
+                )
+            )
+        f.cands.append(cands)
+    return f
+
+
+# Last few feature passes, keyed by batches identity and the args they read.
+_FEATURE_MEMO: dict[tuple, tuple[list, Features]] = {}
+
+
+def fade_features(batches: list[tuple[int, list[Row]]], args) -> Features:
+    key = (id(batches), len(batches), tuple(getattr(args, k) for k in _FEATURE_ARGS))
+    hit = _FEATURE_MEMO.get(key)
+    if hit is not None and hit[0] is batches:
+        return hit[1]
+    f = _build_features(batches, args)
+    if len(_FEATURE_MEMO) >= 4:
+        _FEATURE_MEMO.clear()
+    _FEATURE_MEMO[key] = (batches, f)
+    return f
+
+
+def _decide(f: Features, p: Param, args) -> Res:
+    n = len(f.states)
+    realized = [0.0] * n
+    trades = [0] * n
+    wins = [0] * n
+    losses = [0] * n
+    cooldown = [0] * n
+    disabled = [0] * n
+    # tok -> [side, size, entry_px, entry_ts_ms, tp, sl, state index]
+    pos: dict[int, list] = {}
+    states = f.states
+
+    tp_c, sl_c, hold_s = p.tp_c / 100.0, p.sl_c / 100.0, p.hold_s
+    ratio = max(0.1, p.ratio)
+    edge_min = max(0.0, p.edge_c) / 100.0
+    size = max(1.0, args.position_size_shares)
+    fee_rate = max(0.0, args.fee_bps) / 10000.0
+    cool_ms = max(0.0, args.cooldown_sec) * 1000.0
+    disable_ms = max(0.0, args.token_disable_sec) * 1000.0
+    loss_min_trades = max(1, int(args.token_loss_min_trades))
+    min_wr = clamp(args.token_min_winrate, 0.0, 1.0)
+    loss_cut = args.token_loss_cut_usd
+    dll = args.daily_loss_limit_usd
+    max_open = int(args.max_open_positions)
+    cands = f.candidates(p)
+
+    entries = exits = signals = halts = disables = 0
+    halted = False
+    day_anchor = 0.0
+    peak = dd = 0.0
+    gwin = gloss = 0.0
+
+    def _total() -> float:
+        unreal = 0.0
+        for i in sorted(pos):
+            side, sz, entry = pos[i][0], pos[i][1], pos[i][2]
+            mid = states[i][pos[i][6]][1]
+            if mid > 0:
+                unreal += side * (mid - entry) * sz
+        return sum(realized) + unreal
+
+    def _close(i: int, ts_ms: int, reason: str) -> float:
+        side, sz, entry, _, _, _, k = pos.pop(i)
+        st = states[i][k]
+        px = st[2] if side > 0 else st[3]
+        gross = side * (px - entry) * sz
+        notional = abs(entry * sz) + abs(px * sz)
+        pnl = gross - notional * fee_rate
+        realized[i] += pnl
+        trades[i] += 1
+        if pnl > 1e-12:
+            wins[i] += 1
+        else:
+            losses[i] += 1
+        cooldown[i] = int(ts_ms + cool_ms)
+        if reason in ("tp", "sl", "timeout") and trades[i] >= loss_min_trades:
+            wr = wins[i] / max(1, trades[i])
+            if (loss_cut > 0 and realized[i] <= -loss_cut) or wr < min_wr:
+                disabled[i] = int(ts_ms + disable_ms)
+        return pnl
+
+    for b, ts_ms in enumerate(f.ts):
+        if f.new_day[b]:
+            day_anchor, halted = _total(), False
+        for i, ps in pos.items():
+            sts, k = states[i], ps[6]
+            while k + 1 < len(sts) and sts[k + 1][0] <= b:
+                k += 1
+            ps[6] = k
+
+        for i in sorted(pos):
+            side, _, entry, ets, tpv, slv, k = pos[i]
+            mid = states[i][k][1]
+            if mid <= 0:
+                continue
+            per = side * (mid - entry)
+            tp = max(tp_c, tpv)
+            sl = max(sl_c, slv)
+            if tp > 0 and per >= tp:
+                reason = "tp"
+            elif sl > 0 and per <= -sl:
+                reason = "sl"
+            elif hold_s > 0 and (ts_ms - ets) / 1000.0 >= hold_s:
+                reason = "timeout"
+            else:
+                continue
+            pnl = _close(i, ts_ms, reason)
             exits += 1
             if pnl > 0:
                 gwin += pnl
             elif pnl < 0:
                 gloss += abs(pnl)
-            if t.disabled_until > ts_ms:
+            if disabled[i] > ts_ms:
                 disables += 1
 
-        tot, _, _ = tpnl(toks)
-        day = tot - day_anchor
-        if args.daily_loss_limit_usd > 0 and day <= -args.daily_loss_limit_usd:
+        if dll > 0 and _total() - day_anchor <= -dll:
             if not halted:
                 halted = True
                 halts += 1
-            for t in toks.values():
-                if t.side == 0:
-                    continue
-                pnl = close_pos(t, p, args, ts_ms, "daily_loss_guard", force=True)
-                if pnl is None:
-                    continue
+            for i in sorted(pos):
+                pnl = _close(i, ts_ms, "daily_loss_guard")
                 exits += 1
                 if pnl > 0:
                     gwin += pnl
                 elif pnl < 0:
                     gloss += abs(pnl)
 
-        open_n = sum(1 for t in toks.values() if t.side != 0)
-        slots = max(0, int(args.max_open_positions) - open_n)
-        cands: list[tuple[float, str, int, float, float]] = []
-        if (not halted) and slots > 0:
-            for r in bucket:
-                t = toks[r.token_id]
-                if t.side != 0 or ts_ms < t.cooldown_until:
+        slots = max(0, max_open - len(pos))
+        if (not halted) and slots > 0 and cands[b]:
+            picks: list[tuple[float, Cand, float, float]] = []
+            for c in cands[b]:
+                i = c.tok
+                if i in pos or ts_ms < cooldown[i]:
                     continue
-                if t.disabled_until > 0:
-                    if ts_ms < t.disabled_until:
+                if disabled[i] > 0:
+                    if ts_ms < disabled[i]:
                         continue
-                    t.disabled_until = 0
-                side = r.cside if r.cside != 0 else sign(r.score)
-                ss = sign(r.score)
-                if ss != 0 and side != ss:
-                    side = ss
-                if side == 0 or abs(r.score) < p.min_score or r.cagree < p.min_agree:
-                    continue
-                if n_nonext(side, r) < p.min_nonext_agree:
-                    continue
-                if not regime_ok(t, args):
-                    continue
+                    disabled[i] = 0
                 signals += 1
-                cost = rt_cost(t, args)
-                em = exp_move(t, r.score, args)
-                if em < (cost * max(0.1, p.ratio)):
+                if c.em < (c.cost * ratio):
                     continue
-                edge = em - cost
-                if edge < (max(0.0, p.edge_c) / 100.0):
+                if (c.em - c.cost) < edge_min:
                     continue
-                tp = max(p.tp_c / 100.0, cost * max(0.1, args.tp_cost_mult))
-                sl = max(p.sl_c / 100.0, cost * max(0.1, args.sl_cost_mult))
-                cands.append((abs(r.score), r.token_id, side, tp, sl))
-            for _, tid, side, tpv, slv in sorted(cands, key=lambda x: x[0], reverse=True):
+                picks.append((c.abs_score, c, max(tp_c, c.tp_floor), max(sl_c, c.sl_floor)))
+            for _, c, tpv, slv in sorted(picks, key=lambda x: x[0], reverse=True):
                 if slots <= 0:
                     break
-                t = toks[tid]
-                if t.side != 0:
+                if c.tok in pos:
                     continue
-                t.side = side
-                t.size = max(1.0, args.position_size_shares)
-                t.entry_px = ent_px(t, side, args)
-                t.entry_ts_ms = ts_ms
-                t.tp, t.sl = tpv, slv
+                pos[c.tok] = [c.side, size, c.entry_px, ts_ms, tpv, slv, c.state]
                 entries += 1
                 slots -= 1
 
-        tot, _, _ = tpnl(toks)
+        tot = _total()
         peak = max(peak, tot)
         dd = max(dd, peak - tot)
 
-    last_ts = batches[-1][0] if batches else 0
-    for t in toks.values():
-        if t.side == 0:
-            continue
-        pnl = close_pos(t, p, args, last_ts, "end", force=True)
-        if pnl is None:
-            continue
+    last_ts = f.ts[-1] if f.ts else 0
+    for i in sorted(pos):
+        pnl = _close(i, last_ts, "end")
         exits += 1
         if pnl > 0:
             gwin += pnl
         elif pnl < 0:
             gloss += abs(pnl)
 
-    total, realized, unreal = tpnl(toks)
-    trades = sum(t.trades for t in toks.values())
-    wins = sum(t.wins for t in toks.values())
-    losses = sum(t.losses for t in toks.values())
-    wr = wins / max(1, trades)
+    realized_total = sum(realized)
+    unreal = 0.0
+    total = realized_total + unreal
+    n_trades = sum(trades)
+    n_wins = sum(wins)
+    n_losses = sum(losses)
+    wr = n_wins / max(1, n_trades)
     pf = (gwin / gloss) if gloss > 1e-12 else (float("inf") if gwin > 0 else 0.0)
-    avg = realized / max(1, trades)
+    avg = realized_total / max(1, n_trades)
     rank_score = total - (max(0.0, args.dd_penalty) * dd)
-    if trades < max(0, int(args.min_trades)):
-        rank_score -= max(0.0, args.undertrade_penalty) * (int(args.min_trades) - trades)
+    if n_trades < max(0, int(args.min_trades)):
+        rank_score -= max(0.0, args.undertrade_penalty) * (int(args.min_trades) - n_trades)
     return Res(
         p=p,
         score=rank_score,
         total=total,
-        realized=realized,
+        realized=realized_total,
         unreal=unreal,
         dd=dd,
-        trades=trades,
-        wins=wins,
-        losses=losses,
+        trades=n_trades,
+        wins=n_wins,
+        losses=n_losses,
         wr=wr,
         pf=pf,
         avg=avg,
@@ -506,6 +753,141 @@ def simulate(batches: list[tuple[int, list[Row]]], p: Param, args) -> Res:
     )
 
 
+def simulate(batches: list[tuple[int, list[Row]]], p: Param, args) -> Res:
+    """Replay one Param: shared feature pass (memoized) + per-Param decision pass."""
+    return _decide(fade_features(batches, args), p, args)
+
+
+def _simulate_param(p: Param, batches: list[tuple[int, list[Row]]], args) -> Res:
+    return simulate(batches, p, args)
+
+
+# Args that feed simulate() / the score; the checkpoint fingerprint covers exactly these.
+# Grid axes are left out so a grid can be extended and resumed.
+_SIM_ARGS = (
+    "execution_mode", "tick_size", "slippage_ticks", "maker_spread_capture", "fee_bps", "tp_cost_mult",
+    "sl_cost_mult", "expected_move_vol_mult", "max_spread_cents", "min_depth_shares", "vol_lookback",
+    "max_volatility_cents", "min_volatility_cents", "min_mid_prob", "max_mid_prob", "position_size_shares",
+    "max_open_positions", "cooldown_sec", "daily_loss_limit_usd", "history_size", "token_loss_cut_usd",
+    "token_loss_min_trades", "token_min_winrate", "token_disable_sec", "dd_penalty", "min_trades",
+    "undertrade_penalty",
+)
+# Every Row field except `ts` (ts_ms carries the same instant).
+_row_fingerprint = operator.attrgetter(*(f.name for f in fields(Row) if f.name != "ts"))
+
+
+def run_fingerprint(batches: list[tuple[int, list[Row]]], args) -> str:
+    """Identity of (every replayed row, simulation args)."""
+    h = hashlib.sha1()
+    sim_args = {k: getattr(args, k) for k in _SIM_ARGS}
+    h.update(json.dumps(sim_args, sort_keys=True, default=str).encode("utf-8"))
+    for ts_ms, bucket in batches:
+        h.update(f"{ts_ms}:{[_row_fingerprint(r) for r in bucket]!r};".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _res_to_json(r: Res) -> dict:
+    return asdict(r)
+
+
+def _res_from_json(raw: dict) -> Res:
+    raw = dict(raw)
+    raw["p"] = Param(**raw["p"])
+    return Res(**raw)
+
+
+def load_checkpoint(path: str, fingerprint: str) -> dict[Param, Res]:
+    """Results saved by a previous run with the same fingerprint; anything else is ignored."""
+    out: dict[Param, Res] = {}
+    if not path or not os.path.exists(path):
+        return out
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        head = f.readline()
+        try:
+            if json.loads(head).get("fingerprint") != fingerprint:
+                return out
+        except Exception:
+            return out
+        for line in f:
+            try:
+                r = _res_from_json(json.loads(line))
+            except Exception:
+                # Torn last line from an interrupted run.
+                continue
+            out[r.p] = r
+    return out
+
+
+def evaluate_grid(
+    batches: list[tuple[int, list[Row]]],
+    params: list[Param],
+    args,
+    workers: int = 1,
+    checkpoint_file: str = "",
+    progress=None,
+) -> list[Res]:
+    """
+    simulate() every Param, in `params` order. Params with the same
+    Features.decision_key() are simulated once. With workers > 1 chunks of
+    combinations run on a process pool (lib/process_pool.py); batches reach
+    workers by fork (or one pickle per worker under spawn), never per task. Finished results are
+    appended to `checkpoint_file` as they arrive, and a rerun with the same data
+    and simulation args skips them.
+    """
+    fp = run_fingerprint(batches, args) if checkpoint_file else ""
+    done = load_checkpoint(checkpoint_file, fp) if checkpoint_file else {}
+    results: list[Res | None] = [done.get(pp) for pp in params]
+    todo = [(i, pp) for i, pp in enumerate(params) if results[i] is None]
+    n_done = len(params) - len(todo)
+
+    ckpt = None
+    if checkpoint_file:
+        Path(checkpoint_file).parent.mkdir(parents=True, exist_ok=True)
+        fresh = not done
+        ckpt = open(checkpoint_file, "w" if fresh else "a", encoding="utf-8", newline="\n")
+        if fresh:
+            ckpt.write(json.dumps({"fingerprint": fp}) + "\n")
+            ckpt.flush()
+
+    def _collect(pairs: list[tuple[int, Res]]) -> None:
+        nonlocal n_done
+        for i, r in pairs:
+            results[i] = r
+            n_done += 1
+            if ckpt is not None:
+                ckpt.write(json.dumps(_res_to_json(r)) + "\n")
+            if progress is not None:
+                progress(n_done, len(params))
+        if ckpt is not None:
+            ckpt.flush()
+
+    # Combos whose thresholds admit the same rows share one decision pass.
+    feats = fade_features(batches, args)
+    paths: dict[tuple, list[tuple[int, Param]]] = {}
+    for i, pp in todo:
+        paths.setdefault(feats.decision_key(pp), []).append((i, pp))
+    groups = list(paths.values())
+    reps = [grp[0][1] for grp in groups]
+
+    def _collect_paths(pairs: list[tuple[int, Res]]) -> None:
+        out: list[tuple[int, Res]] = []
+        for g, r in pairs:
+            out.extend((i, r if pp == r.p else replace(r, p=pp)) for i, pp in groups[g])
+        _collect(out)
+
+    try:
+        for g, r in pool_map(_simulate_param, reps, (batches, args), workers, max_chunk=64, chunks_per_worker=8):
+            _collect_paths([(g, r)])
+    finally:
+        if ckpt is not None:
+            ckpt.close()
+    return [r for r in results if r is not None]
+
+
+def rank_key(r: Res) -> tuple:
+    return (r.score, r.total, -r.dd, r.wr, r.trades)
+
+
 def fmt_table(rows: list[Res]) -> str:
     h = "rank score    pnl    dd trades win%   pf   avgT scoreThr ag nonEx tp sl hold edge ratio"
     out = [h]
@@ -549,6 +931,20 @@ def main() -> int:
     p.add_argument("--top-n", type=int, default=10)
     p.add_argument("--strict-min-trades", action="store_true")
     p.add_argument("--out-json", default=dflt_out, help="Set empty to disable")
+    p.add_argument(
+        "--cache-dir",
+        default="",
+        help="Directory for parsed-metrics column caches (default: <metrics>.colcache next to each file)",
+    )
+    p.add_argument("--no-cache", action="store_true", help="Always re-parse metrics JSONL")
+    add_loader_args(p)
+    p.add_argument("--workers", type=int, default=1, help="Processes for grid evaluation (0=all cores)")
+    p.add_argument(
+        "--checkpoint-file",
+        default="",
+        help="JSONL of finished combos; rerunning with the same data/args resumes from it",
+    )
+    add_halving_args(p)
 
     p.add_argument("--execution-mode", choices=("taker", "mid"), default="mid")
     p.add_argument("--tick-size", type=float, default=0.001)
@@ -588,7 +984,7 @@ def main() -> int:
     p.add_argument("--expected-move-cost-ratios", default="1.2,1.4,1.8")
     args = p.parse_args()
 
-    metric_files = resolve_metric_files(args.metrics_file, args.metrics_glob)
+    metric_files = resolve_metric_files(args.metrics_file, args.metrics_glob, rotated=args.with_rotated)
     if not metric_files:
         print(f"No metrics files found. --metrics-file={args.metrics_file} --metrics-glob={args.metrics_glob}")
         return 2
@@ -597,7 +993,9 @@ def main() -> int:
     since = parse_ts(args.since) if args.since else (until - dt.timedelta(hours=float(args.hours)))
     rows: list[Row] = []
     for mf in metric_files:
-        rows.extend(r for r in iter_rows(mf) if since <= r.ts <= until)
+        rows.extend(
+            load_rows(mf, since, until, cache_dir=args.cache_dir, use_cache=not args.no_cache, **loader_kwargs(args))
+        )
     if len(rows) < int(args.min_samples):
         print(f"Not enough samples: {len(rows)} < {int(args.min_samples)}")
         return 3
@@ -631,14 +1029,41 @@ def main() -> int:
         f"Window: {since:%Y-%m-%d %H:%M:%S} -> {until:%Y-%m-%d %H:%M:%S} "
         f"| files={len(metric_files)} rows={len(rows)} batches={len(batches)} combos={len(params)}"
     )
-    res: list[Res] = []
-    n_all = len(params)
-    for i, pp in enumerate(params, start=1):
-        res.append(simulate(batches, pp, args))
-        if n_all >= 80 and i % max(1, n_all // 10) == 0:
-            print(f"progress {i}/{n_all}")
-
-    ranked = sorted(res, key=lambda r: (r.score, r.total, -r.dd, r.wr, r.trades), reverse=True)
+    def _progress(i: int, n: int) -> None:
+        if n >= 80 and i % max(1, n // 10) == 0:
+            print(f"progress {i}/{n}")
+
+    workers = int(args.workers) if int(args.workers) > 0 else (os.cpu_count() or 1)
+    report = None
+    if args.search_strategy == "halving":
+        # Short recent slices first; only the full-window rung uses the checkpoint.
+        report = successive_halving(
+            params,
+            lambda ps, b: evaluate_grid(
+                tail_fraction(batches, b),
+                ps,
+                args,
+                workers=workers,
+                checkpoint_file=args.checkpoint_file if b >= 1.0 else "",
+            ),
+            rank_key,
+            keep_min=max(1, int(args.top_n)),
+            features=astuple,
+            **halving_kwargs(args),
+        )
+        res = [r for _, r in report.final]
+        print(report.summary())
+    else:
+        res = evaluate_grid(
+            batches,
+            params,
+            args,
+            workers=workers,
+            checkpoint_file=args.checkpoint_file,
+            progress=_progress,
+        )
+
+    ranked = sorted(res, key=rank_key, reverse=True)
     if args.strict_min_trades:
         flt = [r for r in ranked if r.trades >= int(args.min_trades)]
         if flt:
@@ -669,6 +1094,7 @@ def main() -> int:
             "rows": len(rows),
             "batches": len(batches),
             "combos": len(params),
+            "search": {"strategy": args.search_strategy, "work_ratio": (report.work_ratio if report else 1.0)},
             "best": {
                 "score": best.score,
                 "total": best.total,
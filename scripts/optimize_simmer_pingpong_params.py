@@ -12,16 +12,19 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
-import glob
 import json
 import math
 import os
 import random
 import statistics
 from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
 from typing import Iterable
 
+from lib.metrics_loader import add_loader_args, iter_batches, loader_kwargs, naive_us, resolve_files
+from lib.process_pool import pool_map
+from lib.search_halving import add_halving_args, halving_kwargs, successive_halving, tail_fraction
 from report_simmer_observation import iter_metrics
 
 
@@ -74,15 +77,8 @@ def _clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
 
 
-def _resolve_metric_files(metrics_file: str, metrics_glob: str) -> list[str]:
-    paths: list[str] = []
-    for p in (metrics_file or "").split(","):
-        pp = p.strip()
-        if pp and os.path.exists(pp):
-            paths.append(pp)
-    if metrics_glob.strip():
-        paths.extend(sorted(glob.glob(metrics_glob.strip())))
-    return sorted({os.path.abspath(p) for p in paths if os.path.exists(p)})
+def _resolve_metric_files(metrics_file: str, metrics_glob: str, rotated: bool = False) -> list[str]:
+    return resolve_files(metrics_file, metrics_glob, rotated=rotated)
 
 
 @dataclass(frozen=True)
@@ -92,6 +88,33 @@ class Sample:
     p_yes: float
 
 
+# Columns kept from each metrics line; bump SAMPLE_ROW_VERSION when _sample_values changes.
+SAMPLE_ROW_VERSION = "1"
+SAMPLE_COLUMNS = (("ts_us", "q"), ("ts_ms", "q"), ("market_id", "s"), ("p_yes", "d"))
+
+
+def _sample_values(line: str) -> tuple | None:
+    for r in iter_metrics((line,)):
+        if r.market_id and 0.0 < float(r.p_yes or 0.0) < 1.0:
+            return naive_us(r.ts), int(r.ts_ms), str(r.market_id), float(r.p_yes)
+    return None
+
+
+def load_samples(
+    files: list[str], since: dt.datetime, until: dt.datetime, index_dir: str = "", use_index: bool = True
+) -> list[Sample]:
+    samples: list[Sample] = []
+    batches = iter_batches(
+        files, SAMPLE_COLUMNS, _sample_values, "ts_us", naive_us(since), naive_us(until),
+        version=SAMPLE_ROW_VERSION, index_dir=index_dir, use_index=use_index,
+    )
+    for _path, table in batches:
+        ids = table.strings["market_id"]
+        c = table.cols
+        samples.extend(Sample(int(t), ids[k], float(p)) for t, k, p in zip(c["ts_ms"], c["market_id"], c["p_yes"]))
+    return samples
+
+
 @dataclass
 class MarketState:
     inv: float = 0.0
@@ -173,123 +196,21 @@ def _size_mult(st: MarketState, p: Param) -> float:
     return _clamp(raw, p.min_size_scale, p.max_size_scale)
 
 
-def _simulate(
-    samples: list[Sample],
+def _score_result(
     p: Param,
+    fills_buy: int,
+    fills_sell: int,
+    cycle_pnls: list[float],
+    equity_deltas: list[float],
+    total: float,
+    max_dd: float,
     dd_penalty: float,
     sharpe_weight: float,
     expectancy_weight: float,
-    per_share_fee: float,
-    slippage_cents: float,
-    entry_prob_min: float,
-    entry_prob_max: float,
-    seed_interval_sec: float,
 ) -> SimResult:
-    states: dict[str, MarketState] = {}
-    fills_buy, fills_sell = 0, 0
-    cycle_pnls: list[float] = []
-    equity_deltas: list[float] = []
-    prev_equity: float | None = None
-    portfolio_realized = 0.0
-    portfolio_unrealized = 0.0
-    peak, max_dd = 0.0, 0.0
-
-    half = max(0.0, p.spread_cents) / 200.0
-    slip = max(0.0, slippage_cents) / 100.0
-    fee = max(0.0, per_share_fee)
-    pmin, pmax = _clamp(entry_prob_min, 0.0, 1.0), _clamp(entry_prob_max, 0.0, 1.0)
-    if pmin > pmax:
-        pmin, pmax = pmax, pmin
-
-    for row in samples:
-        py = float(row.p_yes)
-        if py <= 0.0 or py >= 1.0:
-            continue
-        st = states.get(row.market_id)
-        if st is None:
-            st = MarketState()
-            states[row.market_id] = st
-        now = float(row.ts_ms) / 1000.0
-
-        if st.last_price > 0:
-            st.returns.append(py - st.last_price)
-            if len(st.returns) > max(20, p.vol_lookback_samples * 4):
-                del st.returns[:-max(20, p.vol_lookback_samples * 4)]
-        st.last_price = py
-
-        portfolio_unrealized -= st.last_unrealized
-        realized_before = st.realized
-
-        targets_unset = st.buy_target <= 0.0 and st.sell_target <= 0.0
-        flat = st.inv <= 1e-9
-        if targets_unset or (flat and (now - st.last_quote_ts) >= max(1.0, p.quote_refresh_sec)):
-            st.buy_target = max(0.001, py - half)
-            st.sell_target = min(0.999, py + half)
-            st.last_quote_ts = now
-
-        size = max(0.0, p.trade_shares * _size_mult(st, p))
-        remaining = max(0.0, p.max_inventory_shares - st.inv)
-        seed_trigger = False
-        if seed_interval_sec > 0 and st.inv <= 1e-9 and pmin <= py <= pmax:
-            seed_trigger = (st.last_fill_ts <= 0.0) or ((now - st.last_fill_ts) >= float(seed_interval_sec))
-
-        if remaining > 1e-9 and pmin <= py <= pmax and (py <= st.buy_target or seed_trigger) and size > 1e-9:
-            buy_shares = min(size, remaining)
-            fill = _clamp(py + slip, 0.001, 0.999)
-            unit_cost = fill + fee
-            inv_before = st.inv
-            total_cost = st.avg_cost * st.inv + buy_shares * unit_cost
-            st.inv += buy_shares
-            st.avg_cost = total_cost / st.inv if st.inv > 0 else 0.0
-            fills_buy += 1
-            st.buy_target = max(0.001, py - half)
-            st.sell_target = min(0.999, py + half)
-            st.last_quote_ts = now
-            st.last_fill_ts = now
-            if inv_before <= 1e-9 and st.inv > 1e-9:
-                st.cycle_open_ts = now
-                st.cycle_start_realized = st.realized
-
-        if st.inv > 1e-9 and size > 1e-9:
-            hold = max(0.0, now - (st.cycle_open_ts or now))
-            sell_target = st.sell_target
-            if p.sell_decay_cpm > 0 and hold > 0:
-                sell_target = max(0.001, sell_target - (p.sell_decay_cpm / 100.0) * (hold / 60.0))
-            force = p.max_hold_sec > 0 and hold >= p.max_hold_sec
-            if force or py >= sell_target:
-                sell_shares = min(size, st.inv)
-                fill = _clamp(py - slip, 0.001, 0.999)
-                pnl = ((fill - fee) - st.avg_cost) * sell_shares
-                st.realized += pnl
-                st.inv = max(0.0, st.inv - sell_shares)
-                if st.inv <= 1e-9:
-                    st.inv = 0.0
-                    st.avg_cost = 0.0
-                fills_sell += 1
-                st.buy_target = max(0.001, py - half)
-                st.sell_target = min(0.999, py + half)
-                st.last_quote_ts = now
-                st.last_fill_ts = now
-                if st.inv <= 1e-9 and st.cycle_open_ts > 0:
-                    cycle_pnls.append(st.realized - st.cycle_start_realized)
-                    st.cycle_open_ts = 0.0
-                    st.cycle_start_realized = st.realized
-
-        portfolio_realized += st.realized - realized_before
-        st.last_unrealized = (py - st.avg_cost) * st.inv if st.inv > 1e-9 and st.avg_cost > 0 else 0.0
-        portfolio_unrealized += st.last_unrealized
-
-        equity = portfolio_realized + portfolio_unrealized
-        if prev_equity is not None:
-            equity_deltas.append(equity - prev_equity)
-        prev_equity = equity
-        peak = max(peak, equity)
-        max_dd = max(max_dd, peak - equity)
-
     closed = len(cycle_pnls)
     win_rate = (sum(1 for x in cycle_pnls if x > 0) / closed) if closed > 0 else 0.0
     expectancy = _mean(cycle_pnls)
-    total = portfolio_realized + portfolio_unrealized
     sharpe = 0.0
     if len(equity_deltas) >= 2:
         mu, sig = _mean(equity_deltas), _stdev(equity_deltas)
@@ -299,6 +220,205 @@ def _simulate(
     return SimResult(p, fills_buy, fills_sell, closed, win_rate, expectancy, total, max_dd, sharpe, score)
 
 
+class _Replay:
+    """
+    Resumable replay behind _simulate(): feed() samples in time order across any number of calls.
+
+    mark() closes a walk-forward segment at the current boundary: it scores the
+    samples fed since the previous mark (drawdown measured from the segment's
+    opening equity) while per-market MarketState carries on, so later segments
+    and the full run continue from the boundary checkpoint instead of replaying it.
+    """
+
+    def __init__(
+        self,
+        p: Param,
+        per_share_fee: float,
+        slippage_cents: float,
+        entry_prob_min: float,
+        entry_prob_max: float,
+        seed_interval_sec: float,
+    ):
+        self.p = p
+        self.states: dict[str, MarketState] = {}
+        self.fills_buy, self.fills_sell = 0, 0
+        self.cycle_pnls: list[float] = []
+        self.equity_deltas: list[float] = []
+        self.prev_equity: float | None = None
+        self.portfolio_realized = 0.0
+        self.portfolio_unrealized = 0.0
+        self.peak, self.max_dd = 0.0, 0.0
+        self.seg_peak, self.seg_dd = 0.0, 0.0
+        # Counters at the last mark(): fills_buy, fills_sell, cycles, deltas, equity.
+        self._seg_start: tuple[int, int, int, int, float] = (0, 0, 0, 0, 0.0)
+
+        self.half = max(0.0, p.spread_cents) / 200.0
+        self.slip = max(0.0, slippage_cents) / 100.0
+        self.fee = max(0.0, per_share_fee)
+        pmin, pmax = _clamp(entry_prob_min, 0.0, 1.0), _clamp(entry_prob_max, 0.0, 1.0)
+        if pmin > pmax:
+            pmin, pmax = pmax, pmin
+        self.pmin, self.pmax = pmin, pmax
+        self.seed_interval_sec = seed_interval_sec
+
+    def feed(self, samples: Iterable[Sample]) -> "_Replay":
+        p = self.p
+        states = self.states
+        half, slip, fee, pmin, pmax = self.half, self.slip, self.fee, self.pmin, self.pmax
+        seed_interval_sec = self.seed_interval_sec
+        fills_buy, fills_sell = self.fills_buy, self.fills_sell
+        cycle_pnls, equity_deltas = self.cycle_pnls, self.equity_deltas
+        prev_equity = self.prev_equity
+        portfolio_realized, portfolio_unrealized = self.portfolio_realized, self.portfolio_unrealized
+        peak, max_dd = self.peak, self.max_dd
+        seg_peak, seg_dd = self.seg_peak, self.seg_dd
+
+        for row in samples:
+            py = float(row.p_yes)
+            if py <= 0.0 or py >= 1.0:
+                continue
+            st = states.get(row.market_id)
+            if st is None:
+                st = MarketState()
+                states[row.market_id] = st
+            now = float(row.ts_ms) / 1000.0
+
+            if st.last_price > 0:
+                st.returns.append(py - st.last_price)
+                if len(st.returns) > max(20, p.vol_lookback_samples * 4):
+                    del st.returns[:-max(20, p.vol_lookback_samples * 4)]
+            st.last_price = py
+
+            portfolio_unrealized -= st.last_unrealized
+            realized_before = st.realized
+
+            targets_unset = st.buy_target <= 0.0 and st.sell_target <= 0.0
+            flat = st.inv <= 1e-9
+            if targets_unset or (flat and (now - st.last_quote_ts) >= max(1.0, p.quote_refresh_sec)):
+                st.buy_target = max(0.001, py - half)
+                st.sell_target = min(0.999, py + half)
+                st.last_quote_ts = now
+
+            size = max(0.0, p.trade_shares * _size_mult(st, p))
+            remaining = max(0.0, p.max_inventory_shares - st.inv)
+            seed_trigger = False
+            if seed_interval_sec > 0 and st.inv <= 1e-9 and pmin <= py <= pmax:
+                seed_trigger = (st.last_fill_ts <= 0.0) or ((now - st.last_fill_ts) >= float(seed_interval_sec))
+
+            if remaining > 1e-9 and pmin <= py <= pmax and (py <= st.buy_target or seed_trigger) and size > 1e-9:
+                buy_shares = min(size, remaining)
+                fill = _clamp(py + slip, 0.001, 0.999)
+                unit_cost = fill + fee
+                inv_before = st.inv
+                total_cost = st.avg_cost * st.inv + buy_shares * unit_cost
+                st.inv += buy_shares
+                st.avg_cost = total_cost / st.inv if st.inv > 0 else 0.0
+                fills_buy += 1
+                st.buy_target = max(0.001, py - half)
+                st.sell_target = min(0.999, py + half)
+                st.last_quote_ts = now
+                st.last_fill_ts = now
+                if inv_before <= 1e-9 and st.inv > 1e-9:
+                    st.cycle_open_ts = now
+                    st.cycle_start_realized = st.realized
+
+            if st.inv > 1e-9 and size > 1e-9:
+                hold = max(0.0, now - (st.cycle_open_ts or now))
+                sell_target = st.sell_target
+                if p.sell_decay_cpm > 0 and hold > 0:
+                    sell_target = max(0.001, sell_target - (p.sell_decay_cpm / 100.0) * (hold / 60.0))
+                force = p.max_hold_sec > 0 and hold >= p.max_hold_sec
+                if force or py >= sell_target:
+                    sell_shares = min(size, st.inv)
+                    fill = _clamp(py - slip, 0.001, 0.999)
+                    pnl = ((fill - fee) - st.avg_cost) * sell_shares
+                    st.realized += pnl
+                    st.inv = max(0.0, st.inv - sell_shares)
+                    if st.inv <= 1e-9:
+                        st.inv = 0.0
+                        st.avg_cost = 0.0
+                    fills_sell += 1
+                    st.buy_target = max(0.001, py - half)
+                    st.sell_target = min(0.999, py + half)
+                    st.last_quote_ts = now
+                    st.last_fill_ts = now
+                    if st.inv <= 1e-9 and st.cycle_open_ts > 0:
+                        cycle_pnls.append(st.realized - st.cycle_start_realized)
+                        st.cycle_open_ts = 0.0
+                        st.cycle_start_realized = st.realized
+
+            portfolio_realized += st.realized - realized_before
+            st.last_unrealized = (py - st.avg_cost) * st.inv if st.inv > 1e-9 and st.avg_cost > 0 else 0.0
+            portfolio_unrealized += st.last_unrealized
+
+            equity = portfolio_realized + portfolio_unrealized
+            if prev_equity is not None:
+                equity_deltas.append(equity - prev_equity)
+            prev_equity = equity
+            peak = max(peak, equity)
+            max_dd = max(max_dd, peak - equity)
+            seg_peak = max(seg_peak, equity)
+            seg_dd = max(seg_dd, seg_peak - equity)
+
+        self.fills_buy, self.fills_sell = fills_buy, fills_sell
+        self.prev_equity = prev_equity
+        self.portfolio_realized, self.portfolio_unrealized = portfolio_realized, portfolio_unrealized
+        self.peak, self.max_dd = peak, max_dd
+        self.seg_peak, self.seg_dd = seg_peak, seg_dd
+        return self
+
+    def result(self, dd_penalty: float, sharpe_weight: float, expectancy_weight: float) -> SimResult:
+        """Score everything fed so far as one run."""
+        return _score_result(
+            self.p,
+            self.fills_buy,
+            self.fills_sell,
+            self.cycle_pnls,
+            self.equity_deltas,
+            self.portfolio_realized + self.portfolio_unrealized,
+            self.max_dd,
+            dd_penalty,
+            sharpe_weight,
+            expectancy_weight,
+        )
+
+    def mark(self, dd_penalty: float, sharpe_weight: float, expectancy_weight: float) -> SimResult:
+        """Score the segment fed since the previous mark() and start a new one here."""
+        fb, fs, nc, nd, eq0 = self._seg_start
+        equity = self.portfolio_realized + self.portfolio_unrealized
+        res = _score_result(
+            self.p,
+            self.fills_buy - fb,
+            self.fills_sell - fs,
+            self.cycle_pnls[nc:],
+            self.equity_deltas[nd:],
+            equity - eq0,
+            self.seg_dd,
+            dd_penalty,
+            sharpe_weight,
+            expectancy_weight,
+        )
+        self._seg_start = (self.fills_buy, self.fills_sell, len(self.cycle_pnls), len(self.equity_deltas), equity)
+        self.seg_peak, self.seg_dd = equity, 0.0
+        return res
+
+
+def _simulate(
+    samples: list[Sample],
+    p: Param,
+    dd_penalty: float,
+    sharpe_weight: float,
+    expectancy_weight: float,
+    per_share_fee: float,
+    slippage_cents: float,
+    entry_prob_min: float,
+    entry_prob_max: float,
+    seed_interval_sec: float,
+) -> SimResult:
+    run = _Replay(p, per_share_fee, slippage_cents, entry_prob_min, entry_prob_max, seed_interval_sec)
+    return run.feed(samples).result(dd_penalty, sharpe_weight, expectancy_weight)
+
+
 def _grid_params(args) -> list[Param]:
     spreads = [x for x in _flist(args.spreads_cents) if x > 0]
     refreshes = [x for x in _flist(args.quote_refresh_secs) if x > 0]
@@ -383,53 +503,50 @@ def _random_params(args, seen: set[tuple]) -> list[Param]:
     return out
 
 
-def _segments(samples: list[Sample], n: int) -> list[list[Sample]]:
+def _segment_bounds(total: int, n: int) -> list[tuple[int, int]]:
+    """Contiguous [a, b) walk-forward cuts of `total` samples (empty cuts dropped)."""
     if n <= 1:
-        return [samples]
-    out: list[list[Sample]] = []
-    total = len(samples)
+        return [(0, total)]
+    out: list[tuple[int, int]] = []
     for i in range(n):
         a = int((i * total) / n)
         b = int(((i + 1) * total) / n)
-        seg = samples[a:b]
-        if seg:
-            out.append(seg)
-    return out or [samples]
-
-
-def _evaluate(prm: Param, samples: list[Sample], segs: list[list[Sample]], args) -> Candidate:
-    full = _simulate(
-        samples,
-        prm,
-        args.dd_penalty,
-        args.sharpe_weight,
-        args.expectancy_weight,
-        args.per_share_fee,
-        args.slippage_cents,
-        args.entry_prob_min,
-        args.entry_prob_max,
-        args.seed_interval_sec,
-    )
-    seg_scores: list[float] = []
-    seg_pnls: list[float] = []
-    for seg in segs:
-        r = _simulate(
-            seg,
-            prm,
-            args.dd_penalty,
-            args.sharpe_weight,
-            args.expectancy_weight,
-            args.per_share_fee,
-            args.slippage_cents,
-            args.entry_prob_min,
-            args.entry_prob_max,
-            args.seed_interval_sec,
-        )
-        seg_scores.append(r.score)
-        seg_pnls.append(r.total_pnl)
+        if b > a:
+            out.append((a, b))
+    return out or [(0, total)]
+
+
+def _segments(samples: list[Sample], n: int) -> list[list[Sample]]:
+    return [samples[a:b] for a, b in _segment_bounds(len(samples), n)]
+
+
+def _evaluate(prm: Param, samples: list[Sample], bounds: list[tuple[int, int]], args) -> Candidate:
+    """
+    Full-window result plus walk-forward scores over `bounds` (index cuts covering the run).
+
+    The full run is assembled from the segment passes: with --walkforward-mode fresh
+    each segment is also replayed from a fresh state, and the first one doubles as
+    the opening stretch of the full run; with carry every segment resumes from the
+    previous boundary, so the whole window is replayed exactly once.
+    """
+    sim = (args.per_share_fee, args.slippage_cents, args.entry_prob_min, args.entry_prob_max, args.seed_interval_sec)
+    weights = (args.dd_penalty, args.sharpe_weight, args.expectancy_weight)
+    carry = str(getattr(args, "walkforward_mode", "fresh")) == "carry"
+    run = _Replay(prm, *sim)
+    segs: list[SimResult] = []
+    for k, (a, b) in enumerate(bounds):
+        run.feed(islice(samples, a, b))
+        if carry or k == 0:
+            segs.append(run.mark(*weights))
+        else:
+            segs.append(_Replay(prm, *sim).feed(islice(samples, a, b)).mark(*weights))
+    full = run.result(*weights)
+
+    seg_scores = [r.score for r in segs]
+    seg_pnls = [r.total_pnl for r in segs]
     wf_mean, wf_std = _mean(seg_scores), _stdev(seg_scores)
     wf_prof = (sum(1 for x in seg_pnls if x > 0) / len(seg_pnls)) if seg_pnls else 0.0
-    robust = wf_mean - float(args.wf_std_penalty) * wf_std if len(segs) > 1 else full.score
+    robust = wf_mean - float(args.wf_std_penalty) * wf_std if len(bounds) > 1 else full.score
     ok = True
     if full.closed_cycles < int(args.min_closed_cycles):
         ok = False
@@ -442,6 +559,41 @@ def _evaluate(prm: Param, samples: list[Sample], segs: list[list[Sample]], args)
     return Candidate(prm, full, robust, wf_mean, wf_std, wf_prof, ok)
 
 
+def _evaluate_all(
+    params: list[Param],
+    samples: list[Sample],
+    bounds: list[tuple[int, int]],
+    args,
+    workers: int = 1,
+) -> list[Candidate]:
+    """_evaluate() for every Param, in input order; workers > 1 spreads candidates over processes."""
+    out: list[Candidate | None] = [None] * len(params)
+    for i, cand in pool_map(_evaluate, params, (samples, bounds, args), workers):
+        out[i] = cand
+    return [c for c in out if c is not None]
+
+
+def _rank_key(c: Candidate, ranked_by: str) -> tuple:
+    s = c.full
+    if ranked_by == "robust":
+        return (c.robust_score, s.score, s.total_pnl, -s.max_drawdown, s.closed_cycles)
+    return (s.score, s.total_pnl, -s.max_drawdown, s.sharpe_like, s.closed_cycles)
+
+
+def _param_features(p: Param) -> tuple:
+    return (
+        p.spread_cents,
+        p.quote_refresh_sec,
+        p.trade_shares,
+        p.max_inventory_shares,
+        p.max_hold_sec,
+        p.sell_decay_cpm,
+        1.0 if p.risk_mode == "inverse_vol" else 0.0,
+        float(p.vol_lookback_samples),
+        p.target_volatility,
+    )
+
+
 def _probe_cmd(p: Param) -> str:
     return (
         "python scripts/simmer_pingpong_mm.py "
@@ -459,6 +611,7 @@ def main() -> int:
     p.add_argument("--hours", type=float, default=24.0)
     p.add_argument("--since", default="")
     p.add_argument("--until", default="")
+    add_loader_args(p)
     p.add_argument("--min-samples", type=int, default=200)
     p.add_argument("--min-markets", type=int, default=1)
     p.add_argument("--sample-step", type=int, default=1, help="Keep every Nth sample after sorting (1=no downsample)")
@@ -480,6 +633,12 @@ def main() -> int:
     p.add_argument("--max-candidates", type=int, default=5000)
     p.add_argument("--walkforward-splits", type=int, default=1)
     p.add_argument("--walkforward-min-segment-samples", type=int, default=50)
+    p.add_argument(
+        "--walkforward-mode",
+        choices=["fresh", "carry"],
+        default="fresh",
+        help="fresh=each segment replays from an empty state; carry=segments resume from the previous boundary state",
+    )
     p.add_argument("--rank-by", choices=["auto", "score", "robust"], default="auto")
     p.add_argument("--wf-std-penalty", type=float, default=0.5)
     p.add_argument("--entry-prob-min", type=float, default=0.0)
@@ -495,23 +654,20 @@ def main() -> int:
     p.add_argument("--max-drawdown", type=float, default=0.0)
     p.add_argument("--min-total-pnl", type=float, default=-1e18)
     p.add_argument("--top-n", type=int, default=12)
+    add_halving_args(p)
+    p.add_argument("--workers", type=int, default=1, help="Processes for candidate evaluation (0=all cores)")
     p.add_argument("--out-json", default=str(root / "logs" / "simmer-pingpong-optimize-latest.json"))
     p.add_argument("--out-commands", default="")
     args = p.parse_args()
 
     until = _parse_ts(args.until) if args.until else dt.datetime.now()
     since = _parse_ts(args.since) if args.since else until - dt.timedelta(hours=float(args.hours))
-    files = _resolve_metric_files(args.metrics_file, args.metrics_glob)
+    files = _resolve_metric_files(args.metrics_file, args.metrics_glob, rotated=args.with_rotated)
     if not files:
         print("No metrics files found.")
         return 2
 
-    samples: list[Sample] = []
-    for mf in files:
-        with open(mf, "r", encoding="utf-8", errors="replace") as f:
-            for r in iter_metrics(f):
-                if since <= r.ts <= until and r.market_id and 0.0 < float(r.p_yes or 0.0) < 1.0:
-                    samples.append(Sample(int(r.ts_ms), str(r.market_id), float(r.p_yes)))
+    samples = load_samples(files, since, until, **loader_kwargs(args))
     if len(samples) < int(args.min_samples):
         print(f"Not enough samples: {len(samples)} < {int(args.min_samples)}")
         return 3
@@ -546,28 +702,49 @@ def main() -> int:
         keep = sorted(idx[: int(args.max_candidates)])
         params = [params[i] for i in keep]
 
-    segs = _segments(samples, max(1, int(args.walkforward_splits)))
-    if any(len(seg) < int(args.walkforward_min_segment_samples) for seg in segs):
-        sizes = ",".join(str(len(seg)) for seg in segs)
-        print(f"Walk-forward segments too small: [{sizes}]")
+    splits = max(1, int(args.walkforward_splits))
+    bounds = _segment_bounds(len(samples), splits)
+    seg_sizes = [b - a for a, b in bounds]
+    if any(n < int(args.walkforward_min_segment_samples) for n in seg_sizes):
+        print(f"Walk-forward segments too small: [{','.join(str(n) for n in seg_sizes)}]")
         return 6
 
     ranked_by = args.rank_by
     if ranked_by == "auto":
-        ranked_by = "robust" if len(segs) > 1 else "score"
-
-    evaluated = [_evaluate(prm, samples, segs, args) for prm in params]
+        ranked_by = "robust" if len(bounds) > 1 else "score"
+    workers = int(args.workers) if int(args.workers) > 0 else (os.cpu_count() or 1)
+
+    report = None
+    if args.search_strategy == "halving":
+        # Rungs replay the most recent slice; walk-forward splits are re-cut inside each slice.
+        def _eval_slice(cands: list[Param], budget: float) -> list[Candidate]:
+            if budget >= 1.0:
+                return _evaluate_all(cands, samples, bounds, args, workers)
+            off = len(samples) - len(tail_fraction(samples, budget))
+            sub_bounds = [(a + off, b + off) for a, b in _segment_bounds(len(samples) - off, splits)]
+            return _evaluate_all(cands, samples, sub_bounds, args, workers)
+
+        report = successive_halving(
+            params,
+            _eval_slice,
+            lambda c: (c.pass_constraints,) + _rank_key(c, ranked_by),
+            keep_min=max(1, int(args.top_n)),
+            features=_param_features,
+            **halving_kwargs(args),
+        )
+        evaluated = [c for _, c in report.final]
+    else:
+        evaluated = _evaluate_all(params, samples, bounds, args, workers)
     filtered = [c for c in evaluated if c.pass_constraints]
     pool = filtered if filtered else evaluated
-    if ranked_by == "robust":
-        pool.sort(key=lambda c: (c.robust_score, c.full.score, c.full.total_pnl, -c.full.max_drawdown, c.full.closed_cycles), reverse=True)
-    else:
-        pool.sort(key=lambda c: (c.full.score, c.full.total_pnl, -c.full.max_drawdown, c.full.sharpe_like, c.full.closed_cycles), reverse=True)
+    pool.sort(key=lambda c: _rank_key(c, ranked_by), reverse=True)
     top = pool[: max(1, int(args.top_n))]
 
     print(f"Window: {since:%Y-%m-%d %H:%M:%S} -> {until:%Y-%m-%d %H:%M:%S}")
-    print(f"Data: samples={len(samples)} markets={len(markets)} files={len(files)} segments={len(segs)}")
+    print(f"Data: samples={len(samples)} markets={len(markets)} files={len(files)} segments={len(bounds)}")
     print(f"Search: mode={args.search_mode} candidates={len(params)} passing={len(filtered)} rank_by={ranked_by}")
+    if report is not None:
+        print(report.summary())
     print("rank  spread refresh size inv hold decay risk        cycles win%   pnl_total dd_max score/robust wf_mean wf_std")
     for i, c in enumerate(top, 1):
         s = c.full
@@ -582,8 +759,16 @@ def main() -> int:
     payload = {
         "generated_at": dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "window": {"since": since.strftime("%Y-%m-%d %H:%M:%S"), "until": until.strftime("%Y-%m-%d %H:%M:%S")},
-        "data": {"metrics_files": files, "samples": len(samples), "markets": len(markets), "segment_sizes": [len(x) for x in segs]},
-        "search": {"mode": args.search_mode, "candidates": len(params), "passing": len(filtered), "rank_by": ranked_by},
+        "data": {"metrics_files": files, "samples": len(samples), "markets": len(markets), "segment_sizes": seg_sizes},
+        "search": {
+            "mode": args.search_mode,
+            "strategy": args.search_strategy,
+            "candidates": len(params),
+            "passing": len(filtered),
+            "rank_by": ranked_by,
+            "walkforward_mode": args.walkforward_mode,
+            "work_ratio": report.work_ratio if report is not None else 1.0,
+        },
         "top": [
             {
                 "rank": i + 1,
@@ -27,6 +27,8 @@ from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from lib.clob_books import fetch_books_batch
+
 
 GAMMA_API_BASE = "https://gamma-api.polymarket.com"
 CLOB_API_BASE = "https://clob.polymarket.com"
@@ -227,13 +229,10 @@ def fetch_gamma_event_by_slug(slug: str) -> Optional[dict]:
     return obj if isinstance(obj, dict) else None
 
 
-def fetch_clob_book(token_id: str) -> Optional[dict]:
-    url = f"{CLOB_API_BASE}/book?token_id={token_id}"
-    try:
-        obj = _http_get_json(url, timeout_sec=4.0)
-    except Exception:
-        return None
-    return obj if isinstance(obj, dict) else None
+def fetch_clob_book_pair(up_token_id: str, down_token_id: str) -> Tuple[Optional[dict], Optional[dict]]:
+    # One batched /books request for both legs; per-token fallback is handled by the client.
+    books = fetch_books_batch([up_token_id, down_token_id], timeout_sec=4.0)
+    return books.get(str(up_token_id)), books.get(str(down_token_id))
 
 
 def best_ask(book: Optional[dict]) -> float:
@@ -1417,8 +1416,7 @@ def main() -> int:
             best_side_allowed = False
 
             if current_window is not None and state.current_window_open_price > 0:
-                up_book = fetch_clob_book(current_window.up_token_id)
-                down_book = fetch_clob_book(current_window.down_token_id)
+                up_book, down_book = fetch_clob_book_pair(current_window.up_token_id, current_window.down_token_id)
                 up_ask = best_ask(up_book)
                 down_ask = best_ask(down_book)
                 up_bid = best_bid(up_book)
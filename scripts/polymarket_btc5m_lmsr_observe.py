@@ -23,6 +23,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+from lib.clob_books import fetch_books_batch
 from polymarket_clob_arb_scanner import as_float, fetch_gamma_event_by_slug, fetch_json, parse_json_string_field
 
 CLOB_API_BASE = "https://clob.polymarket.com"
@@ -282,9 +283,13 @@ def build_btc5m_pairs(windows_back: int, windows_forward: int) -> List[MarketPai
     return pairs
 
 
-def evaluate_market(pair: MarketPair, args, ts_now: float) -> Optional[Signal]:
-    book_a = fetch_book(pair.token_a)
-    book_b = fetch_book(pair.token_b)
+def evaluate_market(pair: MarketPair, args, ts_now: float, books: Optional[Dict[str, dict]] = None) -> Optional[Signal]:
+    if books is not None:
+        book_a = books.get(pair.token_a)
+        book_b = books.get(pair.token_b)
+    else:
+        book_a = fetch_book(pair.token_a)
+        book_b = fetch_book(pair.token_b)
     if not book_a or not book_b:
         return None
 
@@ -473,9 +478,11 @@ def main() -> int:
         if not pairs:
             logger.info(f"[{iso_now()}] warn: no btc-5m markets found")
         else:
+            # One batched /books request for every window in the universe.
+            books = fetch_books_batch([t for pair in pairs for t in (pair.token_a, pair.token_b)], timeout_sec=20.0)
             for pair in pairs:
                 stats.markets_evaluated += 1
-                signal = evaluate_market(pair, args, ts_now=ts_loop)
+                signal = evaluate_market(pair, args, ts_now=ts_loop, books=books)
                 if signal is None:
                     continue
 
@@ -40,7 +40,7 @@ from polymarket_btc5m_panic_observe import (
     build_market_window,
     day_pnl_usd,
     detect_panic_signal,
-    fetch_clob_book,
+    fetch_clob_book_pair,
     fetch_coinbase_candle_open_close,
     fetch_coinbase_price,
     iso_now_local,
@@ -719,8 +719,7 @@ def main() -> int:
             trigger_reason = ""
 
             if current_window is not None:
-                up_book = fetch_clob_book(current_window.up_token_id)
-                down_book = fetch_clob_book(current_window.down_token_id)
+                up_book, down_book = fetch_clob_book_pair(current_window.up_token_id, current_window.down_token_id)
                 up_ask = best_ask(up_book)
                 down_ask = best_ask(down_book)
                 up_bid = best_bid(up_book)
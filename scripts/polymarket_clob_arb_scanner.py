@@ -15,15 +15,18 @@ from __future__ import annotations
 import argparse
 import json
 import math
+import os
 import re
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from lib.clob_books import fetch_books_batch
+
 GAMMA_API_BASE = "https://gamma-api.polymarket.com"
 CLOB_API_BASE = "https://clob.polymarket.com"
 SIMMER_API_BASE = "https://api.simmer.markets"
@@ -377,78 +380,59 @@ def fetch_book(token_id: str) -> Optional[dict]:
     return None
 
 
-def build_opportunities(
-    markets: List[dict],
-    shares_per_leg: float,
+def _event_units(
+    markets: Iterable[dict],
     min_event_outcomes: int,
-    max_workers: int,
-    strategy: str,
-    winner_fee_rate: float,
-    fixed_cost: float,
-) -> List[EventOpportunity]:
-    weather = [m for m in markets if is_weather_bucket_market(m)]
+    need_buckets: bool,
+    need_yes_no: bool,
+) -> Iterator[Tuple[str, List[Tuple[dict, str]], List[Tuple[dict, str, str]]]]:
+    """
+    Group weather markets by event and yield one work unit per event:
+    (event_key, bucket_legs[(market, yes_token)], yes_no_pairs[(market, yes_token, no_token)]).
+    """
     grouped: Dict[str, List[dict]] = {}
-    for m in weather:
-        key = event_key_for_market(m)
-        grouped.setdefault(key, []).append(m)
+    for m in markets:
+        if is_weather_bucket_market(m):
+            grouped.setdefault(event_key_for_market(m), []).append(m)
 
-    need_buckets = strategy in {"buckets", "both"}
-    need_yes_no = strategy in {"yes-no", "both"}
-
-    # Flatten legs and prefetch orderbooks.
-    bucket_legs_raw: List[Tuple[str, dict, str]] = []
-    if need_buckets:
-        for key, ms in grouped.items():
-            if len(ms) < min_event_outcomes:
-                continue
+    for key, ms in grouped.items():
+        bucket_legs: List[Tuple[dict, str]] = []
+        if need_buckets and len(ms) >= min_event_outcomes:
             for m in ms:
                 token_id = extract_yes_token_id(m)
-                if not token_id:
-                    continue
-                bucket_legs_raw.append((key, m, token_id))
-
-    yes_no_raw: List[Tuple[dict, str, str]] = []
-    if need_yes_no:
-        for m in weather:
-            yes_tid, no_tid = extract_yes_no_token_ids(m)
-            if yes_tid and no_tid:
-                yes_no_raw.append((m, yes_tid, no_tid))
-
-    books: Dict[str, dict] = {}
-    token_ids: Set[str] = set()
-    token_ids.update(token for _, _, token in bucket_legs_raw)
-    for _, yes_tid, no_tid in yes_no_raw:
-        token_ids.add(yes_tid)
-        token_ids.add(no_tid)
-
-    token_ids = sorted(token_ids)
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = {ex.submit(fetch_book, tid): tid for tid in token_ids}
-        for fut in as_completed(futures):
-            tid = futures[fut]
-            try:
-                b = fut.result()
-                if b:
-                    books[tid] = b
-            except Exception:
-                pass
-
-    opportunities: List[EventOpportunity] = []
+                if token_id:
+                    bucket_legs.append((m, token_id))
+        yes_no: List[Tuple[dict, str, str]] = []
+        if need_yes_no:
+            for m in ms:
+                yes_tid, no_tid = extract_yes_no_token_ids(m)
+                if yes_tid and no_tid:
+                    yes_no.append((m, yes_tid, no_tid))
+        if bucket_legs or yes_no:
+            yield key, bucket_legs, yes_no
 
-    if need_buckets:
-        by_event: Dict[str, List[OutcomeLeg]] = {}
-        title_map: Dict[str, str] = {}
-        for key, m, token_id in bucket_legs_raw:
-            book = books.get(token_id)
-            if not book:
-                continue
-            asks = book.get("asks") or []
-            cost = order_cost_for_shares(asks, shares_per_leg)
-            if cost is None:
-                continue
 
-            label = str(m.get("groupItemTitle") or m.get("question") or m.get("slug") or "outcome")
-            leg = OutcomeLeg(
+def _bucket_opportunity(
+    key: str,
+    bucket_legs: List[Tuple[dict, str]],
+    books: Dict[str, dict],
+    shares_per_leg: float,
+    min_event_outcomes: int,
+    winner_fee_rate: float,
+    fixed_cost: float,
+) -> Optional[EventOpportunity]:
+    legs: List[OutcomeLeg] = []
+    title = key
+    for m, token_id in bucket_legs:
+        book = books.get(token_id)
+        if not book:
+            continue
+        cost = order_cost_for_shares(book.get("asks") or [], shares_per_leg)
+        if cost is None:
+            continue
+        label = str(m.get("groupItemTitle") or m.get("question") or m.get("slug") or "outcome")
+        legs.append(
+            OutcomeLeg(
                 market_id=str(m.get("id", "")),
                 question=str(m.get("question", "")),
                 label=label,
@@ -456,84 +440,192 @@ def build_opportunities(
                 side="yes",
                 ask_cost=cost,
             )
-            by_event.setdefault(key, []).append(leg)
-            title_map[key] = event_title_for_market(m)
+        )
+        title = event_title_for_market(m)
 
-        for key, legs in by_event.items():
-            if len(legs) < min_event_outcomes:
-                continue
-            if not buckets_look_exhaustive(legs):
-                continue
-            basket_cost = sum(l.ask_cost for l in legs)
-            payout = shares_per_leg * (1.0 - winner_fee_rate)
-            gross_edge = payout - basket_cost - fixed_cost
-            edge_pct = (gross_edge / payout) if payout > 0 else 0.0
-            opportunities.append(
-                EventOpportunity(
-                    kind="buckets",
-                    event_key=key,
-                    event_title=title_map.get(key, key),
-                    legs=legs,
-                    basket_cost=basket_cost,
-                    payout=payout,
-                    gross_edge=gross_edge,
-                    edge_pct=edge_pct,
-                )
-            )
+    if len(legs) < min_event_outcomes:
+        return None
+    if not buckets_look_exhaustive(legs):
+        return None
+    basket_cost = sum(l.ask_cost for l in legs)
+    payout = shares_per_leg * (1.0 - winner_fee_rate)
+    gross_edge = payout - basket_cost - fixed_cost
+    edge_pct = (gross_edge / payout) if payout > 0 else 0.0
+    return EventOpportunity(
+        kind="buckets",
+        event_key=key,
+        event_title=title,
+        legs=legs,
+        basket_cost=basket_cost,
+        payout=payout,
+        gross_edge=gross_edge,
+        edge_pct=edge_pct,
+    )
 
-    if need_yes_no:
-        for m, yes_tid, no_tid in yes_no_raw:
-            yes_book = books.get(yes_tid)
-            no_book = books.get(no_tid)
-            if not yes_book or not no_book:
-                continue
 
-            yes_cost = order_cost_for_shares(yes_book.get("asks") or [], shares_per_leg)
-            no_cost = order_cost_for_shares(no_book.get("asks") or [], shares_per_leg)
-            if yes_cost is None or no_cost is None:
-                continue
+def _yes_no_opportunity(
+    m: dict,
+    yes_tid: str,
+    no_tid: str,
+    books: Dict[str, dict],
+    shares_per_leg: float,
+    winner_fee_rate: float,
+    fixed_cost: float,
+) -> Optional[EventOpportunity]:
+    yes_book = books.get(yes_tid)
+    no_book = books.get(no_tid)
+    if not yes_book or not no_book:
+        return None
+
+    yes_cost = order_cost_for_shares(yes_book.get("asks") or [], shares_per_leg)
+    no_cost = order_cost_for_shares(no_book.get("asks") or [], shares_per_leg)
+    if yes_cost is None or no_cost is None:
+        return None
+
+    q = str(m.get("question") or "weather market")
+    key = f"yn:{m.get('id', '')}"
+    legs = [
+        OutcomeLeg(
+            market_id=str(m.get("id", "")),
+            question=q,
+            label="YES",
+            token_id=yes_tid,
+            side="yes",
+            ask_cost=yes_cost,
+        ),
+        OutcomeLeg(
+            market_id=str(m.get("id", "")),
+            question=q,
+            label="NO",
+            token_id=no_tid,
+            side="no",
+            ask_cost=no_cost,
+        ),
+    ]
+    basket_cost = yes_cost + no_cost
+    payout = shares_per_leg * (1.0 - winner_fee_rate)
+    gross_edge = payout - basket_cost - fixed_cost
+    edge_pct = (gross_edge / payout) if payout > 0 else 0.0
+    return EventOpportunity(
+        kind="yes-no",
+        event_key=key,
+        event_title=q,
+        legs=legs,
+        basket_cost=basket_cost,
+        payout=payout,
+        gross_edge=gross_edge,
+        edge_pct=edge_pct,
+    )
 
-            q = str(m.get("question") or "weather market")
-            key = f"yn:{m.get('id', '')}"
-            legs = [
-                OutcomeLeg(
-                    market_id=str(m.get("id", "")),
-                    question=q,
-                    label="YES",
-                    token_id=yes_tid,
-                    side="yes",
-                    ask_cost=yes_cost,
-                ),
-                OutcomeLeg(
-                    market_id=str(m.get("id", "")),
-                    question=q,
-                    label="NO",
-                    token_id=no_tid,
-                    side="no",
-                    ask_cost=no_cost,
-                ),
-            ]
-            basket_cost = yes_cost + no_cost
-            payout = shares_per_leg * (1.0 - winner_fee_rate)
-            gross_edge = payout - basket_cost - fixed_cost
-            edge_pct = (gross_edge / payout) if payout > 0 else 0.0
-            opportunities.append(
-                EventOpportunity(
-                    kind="yes-no",
-                    event_key=key,
-                    event_title=q,
-                    legs=legs,
-                    basket_cost=basket_cost,
-                    payout=payout,
-                    gross_edge=gross_edge,
-                    edge_pct=edge_pct,
-                )
+
+def iter_opportunities(
+    markets: Iterable[dict],
+    shares_per_leg: float,
+    min_event_outcomes: int,
+    max_workers: int,
+    strategy: str,
+    winner_fee_rate: float,
+    fixed_cost: float,
+    max_inflight_events: int = 8,
+) -> Iterator[EventOpportunity]:
+    """
+    Streaming evaluator: fetch books per event and yield each opportunity as soon
+    as all of that event's legs have arrived. At most `max_inflight_events` events
+    are fetched/held at once, so book memory stays flat for any universe size.
+    Yield order follows fetch completion, not edge.
+    """
+    need_buckets = strategy in {"buckets", "both"}
+    need_yes_no = strategy in {"yes-no", "both"}
+    window = max(1, int(max_inflight_events or 1))
+    # Split the fetch workers across in-flight events (each event is typically one /books chunk).
+    per_event_workers = max(1, int(max_workers or 1) // window)
+
+    def _evaluate(unit) -> List[EventOpportunity]:
+        key, bucket_legs, yes_no = unit
+        token_ids: Set[str] = {t for _, t in bucket_legs}
+        for _, yes_tid, no_tid in yes_no:
+            token_ids.add(yes_tid)
+            token_ids.add(no_tid)
+        books = fetch_books_batch(sorted(token_ids), workers=per_event_workers)
+        out: List[EventOpportunity] = []
+        if bucket_legs:
+            o = _bucket_opportunity(
+                key, bucket_legs, books, shares_per_leg, min_event_outcomes, winner_fee_rate, fixed_cost
             )
+            if o is not None:
+                out.append(o)
+        for m, yes_tid, no_tid in yes_no:
+            o = _yes_no_opportunity(m, yes_tid, no_tid, books, shares_per_leg, winner_fee_rate, fixed_cost)
+            if o is not None:
+                out.append(o)
+        return out
+
+    units = _event_units(markets, min_event_outcomes, need_buckets, need_yes_no)
+    with ThreadPoolExecutor(max_workers=window) as ex:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < window:
+                unit = next(units, None)
+                if unit is None:
+                    exhausted = True
+                    break
+                pending.add(ex.submit(_evaluate, unit))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    ops = fut.result()
+                except Exception:
+                    continue
+                for o in ops:
+                    yield o
+
 
+def build_opportunities(
+    markets: List[dict],
+    shares_per_leg: float,
+    min_event_outcomes: int,
+    max_workers: int,
+    strategy: str,
+    winner_fee_rate: float,
+    fixed_cost: float,
+    max_inflight_events: int = 8,
+) -> List[EventOpportunity]:
+    opportunities = list(
+        iter_opportunities(
+            markets=markets,
+            shares_per_leg=shares_per_leg,
+            min_event_outcomes=min_event_outcomes,
+            max_workers=max_workers,
+            strategy=strategy,
+            winner_fee_rate=winner_fee_rate,
+            fixed_cost=fixed_cost,
+            max_inflight_events=max_inflight_events,
+        )
+    )
     opportunities.sort(key=lambda o: o.gross_edge, reverse=True)
     return opportunities
 
 
+def opportunity_to_row(o: EventOpportunity) -> dict:
+    return {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "kind": o.kind,
+        "event_key": o.event_key,
+        "event_title": o.event_title,
+        "basket_cost": round(o.basket_cost, 6),
+        "payout": round(o.payout, 6),
+        "gross_edge": round(o.gross_edge, 6),
+        "edge_pct": round(o.edge_pct, 6),
+        "legs": [
+            {"label": l.label, "token_id": l.token_id, "side": l.side, "ask_cost": round(l.ask_cost, 6)}
+            for l in o.legs
+        ],
+    }
+
+
 def build_markets_from_simmer_weather(limit: int, workers: int) -> List[dict]:
     simmer_markets = fetch_simmer_weather_markets(limit)
     condition_ids = sorted(
@@ -637,6 +729,21 @@ def build_markets_from_gamma_weather(
     return list(full_markets.values())
 
 
+def print_opportunity(o: EventOpportunity) -> None:
+    print(
+        f"[{o.kind}] EDGE ${o.gross_edge:.4f} ({o.edge_pct:.2%}) | "
+        f"cost ${o.basket_cost:.4f} vs payout ${o.payout:.4f} | "
+        f"legs {len(o.legs)} | {o.event_title}"
+    )
+    # Print cheapest few legs for quick sanity.
+    sample = sorted(o.legs, key=lambda l: l.ask_cost)[:4]
+    for leg in sample:
+        print(f"  - {leg.label}: ask_cost=${leg.ask_cost:.4f}")
+    if len(o.legs) > 4:
+        print(f"  - ... {len(o.legs) - 4} more legs")
+    print()
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Scan Polymarket CLOB weather arbitrage opportunities")
     parser.add_argument(
@@ -659,6 +766,22 @@ def main() -> int:
         default="both",
         help="Arbitrage strategy to scan",
     )
+    parser.add_argument(
+        "--max-inflight-events",
+        type=int,
+        default=8,
+        help="Max events whose books are fetched/held at once (bounds memory on wide scans)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print each candidate as soon as its event is evaluated (unsorted) instead of a sorted top list",
+    )
+    parser.add_argument(
+        "--out-jsonl",
+        default="",
+        help="Append every evaluated opportunity to this JSONL file as it is produced",
+    )
     args = parser.parse_args()
 
     t0 = time.time()
@@ -672,40 +795,52 @@ def main() -> int:
         print("No markets fetched from Gamma API.")
         return 1
 
-    ops = build_opportunities(
-        markets=markets,
-        shares_per_leg=args.shares,
-        min_event_outcomes=args.min_outcomes,
-        max_workers=max(4, args.workers),
-        strategy=args.strategy,
-        winner_fee_rate=args.winner_fee_rate,
-        fixed_cost=args.fixed_cost,
-    )
-
     min_edge = args.min_edge_cents / 100.0
-    filtered = [o for o in ops if o.gross_edge >= min_edge]
-    buckets_count = sum(1 for o in ops if o.kind == "buckets")
-    yes_no_count = sum(1 for o in ops if o.kind == "yes-no")
+    out_f = None
+    if args.out_jsonl:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out_jsonl)), exist_ok=True)
+        out_f = open(args.out_jsonl, "a", encoding="utf-8")
+
+    # Only edge-passing rows are retained; everything else is counted and dropped.
+    counts = {"buckets": 0, "yes-no": 0}
+    filtered: List[EventOpportunity] = []
+    try:
+        for o in iter_opportunities(
+            markets=markets,
+            shares_per_leg=args.shares,
+            min_event_outcomes=args.min_outcomes,
+            max_workers=max(4, args.workers),
+            strategy=args.strategy,
+            winner_fee_rate=args.winner_fee_rate,
+            fixed_cost=args.fixed_cost,
+            max_inflight_events=args.max_inflight_events,
+        ):
+            counts[o.kind] = counts.get(o.kind, 0) + 1
+            if out_f is not None:
+                out_f.write(json.dumps(opportunity_to_row(o), ensure_ascii=True) + "\n")
+                out_f.flush()
+            if o.gross_edge < min_edge:
+                continue
+            if args.stream and len(filtered) < args.top:
+                print_opportunity(o)
+            filtered.append(o)
+    finally:
+        if out_f is not None:
+            out_f.close()
+
+    filtered.sort(key=lambda o: o.gross_edge, reverse=True)
+    buckets_count = counts.get("buckets", 0)
+    yes_no_count = counts.get("yes-no", 0)
 
     dt = time.time() - t0
     print(f"Scanned {len(markets)} active markets in {dt:.2f}s")
-    print(f"Opportunities analyzed: {len(ops)} (buckets={buckets_count}, yes-no={yes_no_count})")
+    print(f"Opportunities analyzed: {buckets_count + yes_no_count} (buckets={buckets_count}, yes-no={yes_no_count})")
     print(f"Arb candidates (edge >= {args.min_edge_cents:.2f}c): {len(filtered)}")
     print("-" * 110)
 
-    for o in filtered[: args.top]:
-        print(
-            f"[{o.kind}] EDGE ${o.gross_edge:.4f} ({o.edge_pct:.2%}) | "
-            f"cost ${o.basket_cost:.4f} vs payout ${o.payout:.4f} | "
-            f"legs {len(o.legs)} | {o.event_title}"
-        )
-        # Print cheapest few legs for quick sanity.
-        sample = sorted(o.legs, key=lambda l: l.ask_cost)[:4]
-        for leg in sample:
-            print(f"  - {leg.label}: ask_cost=${leg.ask_cost:.4f}")
-        if len(o.legs) > 4:
-            print(f"  - ... {len(o.legs) - 4} more legs")
-        print()
+    if not args.stream:
+        for o in filtered[: args.top]:
+            print_opportunity(o)
 
     if not filtered:
         print("No executable basket edge found at configured threshold.")
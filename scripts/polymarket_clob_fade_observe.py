@@ -22,16 +22,21 @@ import json
 import math
 import os
 import re
-import statistics
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import asdict, dataclass, field
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
-from polymarket_clob_arb_scanner import as_float, extract_yes_token_id, fetch_active_markets, fetch_book
+from lib.clob_books import fetch_books_batch
+from lib.clob_feature_feed import FeatureFeedReader
+from lib.clob_ws_books import WS_MARKET_URL, ClobMarketBookFeed, merge_ws_and_rest_books
+from lib.history_log import HistoryLog, history_log_path
+from lib.rolling_window import RollingWindow
+from polymarket_clob_arb_scanner import as_float, extract_yes_token_id, fetch_active_markets
 
 
 def now_ts() -> float:
@@ -73,19 +78,13 @@ def clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
 
 
-def safe_stdev(xs: List[float]) -> float:
-    if len(xs) < 2:
-        return 0.0
-    try:
-        return float(statistics.pstdev(xs))
-    except Exception:
-        return 0.0
+# Per-token feature histories (RollingWindow ring buffers); capacity follows --history-size.
+HISTORY_FIELDS = ("mids", "spreads", "imbalances", "returns")
+DEFAULT_HISTORY_SIZE = 300
 
 
-def append_limited(xs: List[float], x: float, max_len: int) -> None:
-    xs.append(float(x))
-    if len(xs) > max_len:
-        del xs[:-max_len]
+def _history() -> RollingWindow:
+    return RollingWindow(DEFAULT_HISTORY_SIZE)
 
 
 class Logger:
@@ -134,10 +133,10 @@ class TokenState:
     last_imbalance: float = 0.0
     last_update_ts: float = 0.0
 
-    mids: List[float] = field(default_factory=list)
-    spreads: List[float] = field(default_factory=list)
-    imbalances: List[float] = field(default_factory=list)
-    returns: List[float] = field(default_factory=list)
+    mids: RollingWindow = field(default_factory=_history)
+    spreads: RollingWindow = field(default_factory=_history)
+    imbalances: RollingWindow = field(default_factory=_history)
+    returns: RollingWindow = field(default_factory=_history)
 
     zscore: float = 0.0
     velocity_move: float = 0.0
@@ -204,18 +203,6 @@ class RuntimeState:
     disable_side_reason: str = ""
 
 
-def _as_list_float(value) -> List[float]:
-    if not isinstance(value, list):
-        return []
-    out: List[float] = []
-    for x in value:
-        try:
-            out.append(float(x))
-        except Exception:
-            continue
-    return out
-
-
 def _token_from_raw(raw: dict, token_id_hint: str = "") -> Optional[TokenState]:
     if not isinstance(raw, dict):
         return None
@@ -227,14 +214,18 @@ def _token_from_raw(raw: dict, token_id_hint: str = "") -> Optional[TokenState]:
         return None
     if not t.token_id:
         t.token_id = token_id_hint
-    t.mids = _as_list_float(t.mids)
-    t.spreads = _as_list_float(t.spreads)
-    t.imbalances = _as_list_float(t.imbalances)
-    t.returns = _as_list_float(t.returns)
+    for name in HISTORY_FIELDS:
+        # Accepts compact base64 windows and plain lists from older state files.
+        setattr(t, name, RollingWindow.from_state(getattr(t, name)))
     return t
 
 
-def load_state(path: Path) -> RuntimeState:
+def _token_to_raw(t: TokenState) -> dict:
+    # Histories live in the binary log next to the state file (see StateStore).
+    return {f.name: getattr(t, f.name) for f in fields(t) if f.name not in HISTORY_FIELDS}
+
+
+def _load_scalar_state(path: Path) -> RuntimeState:
     if not path.exists():
         return RuntimeState()
     try:
@@ -293,10 +284,9 @@ def _replace_with_retry(tmp: Path, path: Path, retries: int = 10) -> None:
             delay = min(0.2, delay * 2.0)
 
 
-def save_state(path: Path, st: RuntimeState) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    raw = {
-        "token_states": {k: asdict(v) for k, v in st.token_states.items()},
+def _state_to_raw(st: RuntimeState) -> dict:
+    return {
+        "token_states": {k: _token_to_raw(v) for k, v in st.token_states.items()},
         "active_token_ids": list(st.active_token_ids),
         "day_key": st.day_key,
         "day_anchor_total_pnl": st.day_anchor_total_pnl,
@@ -317,10 +307,75 @@ def save_state(path: Path, st: RuntimeState) -> None:
         "disable_short_until_ts": st.disable_short_until_ts,
         "disable_side_reason": st.disable_side_reason,
     }
-    # Atomic replace prevents readers (e.g., side router) from seeing partial JSON.
-    tmp = path.with_name(path.name + ".tmp")
-    tmp.write_text(json.dumps(raw, indent=2), encoding="utf-8")
-    _replace_with_retry(tmp, path)
+
+
+class StateStore:
+    """
+    Runtime persistence split in two files:
+    - `path`: scalar state as compact JSON. This is the small file readers
+      (side router, dashboard, checkpoint reports) load. It is rewritten only
+      when its content changed, and at most every `min_interval_sec` unless
+      entries/exits/halt/day moved.
+    - `path + ".hist"`: per-token feature histories in an append-only binary
+      log (lib/history_log.py); each save appends just the new samples.
+    Older state files with histories embedded in the JSON still load.
+    """
+
+    def __init__(self, path: Path, history_size: int = DEFAULT_HISTORY_SIZE, min_interval_sec: float = 0.0):
+        self.path = Path(path)
+        self.history_size = max(1, int(history_size))
+        self.min_interval_sec = max(0.0, float(min_interval_sec))
+        self.history = HistoryLog(history_log_path(self.path), HISTORY_FIELDS)
+        self.writes = 0
+        self._last_text: Optional[str] = None
+        self._last_critical: Optional[tuple] = None
+        self._last_write_ts = 0.0
+
+    def load(self) -> RuntimeState:
+        st = _load_scalar_state(self.path)
+        series = self.history.load(self.history_size)
+        for tid, t in st.token_states.items():
+            windows = series.get(tid) or {}
+            for name in HISTORY_FIELDS:
+                w = windows.get(name)
+                if w is not None:
+                    setattr(t, name, w)
+                elif getattr(t, name).maxlen != self.history_size:
+                    setattr(t, name, getattr(t, name).resized(self.history_size))
+        return st
+
+    def save(self, st: RuntimeState, force: bool = False) -> bool:
+        """Append new history samples; rewrite the scalar JSON if dirty. Returns True when it was written."""
+        self.history.sync({tid: {name: getattr(t, name) for name in HISTORY_FIELDS} for tid, t in st.token_states.items()})
+        text = json.dumps(_state_to_raw(st), ensure_ascii=True, separators=(",", ":"))
+        if text == self._last_text:
+            return False
+        critical = (st.entries, st.exits, st.halted, st.day_key)
+        now = now_ts()
+        if (
+            not force
+            and critical == self._last_critical
+            and (now - self._last_write_ts) < self.min_interval_sec
+        ):
+            return False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic replace prevents readers (e.g., side router) from seeing partial JSON.
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        _replace_with_retry(tmp, self.path)
+        self._last_text = text
+        self._last_critical = critical
+        self._last_write_ts = now
+        self.writes += 1
+        return True
+
+
+def load_state(path: Path, history_size: int = DEFAULT_HISTORY_SIZE) -> RuntimeState:
+    return StateStore(path, history_size=history_size).load()
+
+
+def save_state(path: Path, st: RuntimeState) -> None:
+    StateStore(path).save(st, force=True)
 
 
 def _pid_running(pid: int) -> bool:
@@ -608,23 +663,103 @@ def merge_universe(st: RuntimeState, tokens: List[TokenState]) -> None:
     st.active_token_ids = active_ids
 
 
-def fetch_books_parallel(token_ids: List[str], workers: int) -> Dict[str, dict]:
-    out: Dict[str, dict] = {}
-    if not token_ids:
-        return out
-    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
-        futures = {ex.submit(fetch_book, tid): tid for tid in token_ids}
-        for fut in as_completed(futures):
-            tid = futures[fut]
-            try:
-                book = fut.result()
-                if isinstance(book, dict):
-                    out[tid] = book
-            except Exception:
-                continue
+# TokenState fields a shared feed publishes with its universe (see clob_fade_book_feed.py).
+UNIVERSE_FIELDS = (
+    "token_id",
+    "market_id",
+    "label",
+    "tick_size",
+    "min_order_size",
+    "liquidity_num",
+    "volume24hr",
+    "spread_hint",
+    "score",
+)
+
+
+def universe_row(t: TokenState) -> dict:
+    return {name: getattr(t, name) for name in UNIVERSE_FIELDS}
+
+
+def tokens_from_feed_universe(rec: Optional[dict]) -> List[TokenState]:
+    out: List[TokenState] = []
+    for raw in (rec or {}).get("tokens") or []:
+        if not isinstance(raw, dict):
+            continue
+        t = _token_from_raw({k: raw[k] for k in UNIVERSE_FIELDS if k in raw})
+        if t and t.token_id:
+            out.append(t)
     return out
 
 
+class UniverseRefresher:
+    """
+    Runs `choose_universe` on one background worker so Gamma paging never stalls
+    the poll loop. The loop submits when a refresh is due and applies the result
+    with `merge_universe` once `poll()` returns it.
+    """
+
+    def __init__(self, choose: Callable[[object], List[TokenState]] = choose_universe):
+        self._choose = choose
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fade-universe")
+        self._future: Optional[Future] = None
+        self.started_ts = 0.0
+
+    @property
+    def pending(self) -> bool:
+        return self._future is not None
+
+    def submit(self, args) -> bool:
+        if self._future is not None:
+            return False
+        # Snapshot args: runtime control may mutate the live namespace while the worker runs.
+        self._future = self._pool.submit(self._choose, argparse.Namespace(**vars(args)))
+        self.started_ts = now_ts()
+        return True
+
+    def poll(self, wait: bool = False) -> Optional[Tuple[List[TokenState], Optional[BaseException]]]:
+        """Return (tokens, error) once the pending refresh finished, else None."""
+        fut = self._future
+        if fut is None or (not wait and not fut.done()):
+            return None
+        self._future = None
+        err = fut.exception()
+        return ([] if err else list(fut.result() or [])), err
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+def next_feed_sample(reader: FeatureFeedReader, pending: Deque[dict], st: RuntimeState) -> Tuple[Optional[dict], int]:
+    """
+    Advance the shared feed by at most one sample. Universe records met on the
+    way are merged into `st`. One sample per loop keeps every consumer on the
+    same decision sequence even when one of them is catching up on a backlog.
+    Returns (sample or None, universe_updates).
+    """
+    if not pending:
+        pending.extend(reader.poll())
+    updates = 0
+    while pending:
+        rec = pending.popleft()
+        kind = rec.get("type")
+        if kind == "universe":
+            tokens = tokens_from_feed_universe(rec)
+            if tokens:
+                merge_universe(st, tokens)
+                st.last_universe_refresh_ts = now_ts()
+                st.universe_refresh_count += 1
+                updates += 1
+        elif kind == "sample" and isinstance(rec.get("books"), dict):
+            return rec, updates
+    return None, updates
+
+
+def fetch_books_parallel(token_ids: List[str], workers: int) -> Dict[str, dict]:
+    # Batched POST /books over the shared pooled client (per-token GET fallback inside).
+    return fetch_books_batch(token_ids, workers=max(1, int(workers)))
+
+
 def update_token_from_book(t: TokenState, feat: dict, history_size: int) -> None:
     prev_mid = t.last_mid
     t.last_bid = float(feat.get("best_bid") or 0.0)
@@ -636,30 +771,90 @@ def update_token_from_book(t: TokenState, feat: dict, history_size: int) -> None
     t.last_imbalance = float(feat.get("imbalance") or 0.0)
     t.last_update_ts = now_ts()
 
+    size = max(1, int(history_size))
+    if t.mids.maxlen != size:
+        for name in HISTORY_FIELDS:
+            setattr(t, name, getattr(t, name).resized(size))
     if t.last_mid > 0:
-        append_limited(t.mids, t.last_mid, history_size)
-    append_limited(t.spreads, t.last_spread, history_size)
-    append_limited(t.imbalances, t.last_imbalance, history_size)
+        t.mids.append(t.last_mid)
+    t.spreads.append(t.last_spread)
+    t.imbalances.append(t.last_imbalance)
     if prev_mid > 0 and t.last_mid > 0:
-        append_limited(t.returns, t.last_mid - prev_mid, history_size)
+        t.returns.append(t.last_mid - prev_mid)
+
+@dataclass(frozen=True)
+class ConsensusParams:
+    """Signal/consensus/regime thresholds resolved from args once per poll."""
+
+    zscore_lookback: int
+    zscore_thr: float
+    velocity_window: int
+    velocity_thr: float
+    imbalance_thr: float
+    extreme_low: float
+    extreme_high: float
+    weight_zscore: float
+    weight_velocity: float
+    weight_imbalance: float
+    weight_extreme: float
+    min_score: float
+    min_score_agree1: float
+    min_score_agree2: float
+    min_agree: int
+    min_non_extreme_agree: int
+    min_mid_prob: float
+    max_mid_prob: float
+    max_spread: float
+    min_depth: float
+    vol_lookback: int
+    max_vol: float
+    min_vol: float
+
+    @classmethod
+    def from_args(cls, args) -> "ConsensusParams":
+        return cls(
+            zscore_lookback=max(5, int(args.zscore_lookback)),
+            zscore_thr=max(0.01, float(args.zscore_entry)),
+            velocity_window=max(2, int(args.velocity_window)),
+            velocity_thr=max(0.0001, float(args.velocity_threshold_cents) / 100.0),
+            imbalance_thr=max(0.01, float(args.imbalance_threshold)),
+            extreme_low=clamp(float(args.extreme_low), 0.001, 0.499),
+            extreme_high=clamp(float(args.extreme_high), 0.501, 0.999),
+            weight_zscore=float(args.weight_zscore),
+            weight_velocity=float(args.weight_velocity),
+            weight_imbalance=float(args.weight_imbalance),
+            weight_extreme=float(args.weight_extreme),
+            min_score=float(args.consensus_min_score),
+            min_score_agree1=float(args.consensus_min_score_agree1),
+            min_score_agree2=float(args.consensus_min_score_agree2),
+            min_agree=int(args.consensus_min_agree),
+            min_non_extreme_agree=int(args.min_non_extreme_agree),
+            min_mid_prob=float(args.min_mid_prob),
+            max_mid_prob=float(args.max_mid_prob),
+            max_spread=float(args.max_spread_cents) / 100.0,
+            min_depth=float(args.min_depth_shares),
+            vol_lookback=max(5, int(args.vol_lookback)),
+            max_vol=max(0.0, float(args.max_volatility_cents)) / 100.0,
+            min_vol=max(0.0, float(args.min_volatility_cents)) / 100.0,
+        )
 
-def zscore_signal(t: TokenState, args) -> Tuple[int, float]:
-    lookback = max(5, int(args.zscore_lookback))
+
+def zscore_signal(t: TokenState, p: ConsensusParams) -> Tuple[int, float]:
+    lookback = p.zscore_lookback
     if len(t.mids) < lookback:
         t.zscore = 0.0
         t.bot_zscore = 0.0
         return 0, 0.0
-    window = t.mids[-lookback:]
-    mu = statistics.mean(window)
-    sd = safe_stdev(window)
+    mu = t.mids.mean(lookback)
+    sd = t.mids.pstdev(lookback)
     if sd <= 1e-9:
         t.zscore = 0.0
         t.bot_zscore = 0.0
         return 0, 0.0
-    z = (window[-1] - mu) / sd
+    z = (t.mids[-1] - mu) / sd
     t.zscore = float(z)
     side = 0
-    thr = max(0.01, float(args.zscore_entry))
+    thr = p.zscore_thr
     if z >= thr:
         side = -1
     elif z <= -thr:
@@ -669,19 +864,19 @@ def zscore_signal(t: TokenState, args) -> Tuple[int, float]:
     return side, conf
 
 
-def velocity_signal(t: TokenState, args) -> Tuple[int, float]:
-    w = max(2, int(args.velocity_window))
+def velocity_signal(t: TokenState, p: ConsensusParams) -> Tuple[int, float]:
+    w = p.velocity_window
     if len(t.mids) < (w + 2):
         t.velocity_move = 0.0
         t.bot_velocity = 0.0
         return 0, 0.0
 
-    trend = t.mids[-1] - t.mids[-1 - w]
-    last = t.mids[-1] - t.mids[-2]
+    trend = t.mids.diff(w)
+    last = t.mids.diff(1)
     prev = t.mids[-2] - t.mids[-3]
     t.velocity_move = float(trend)
 
-    thr = max(0.0001, float(args.velocity_threshold_cents) / 100.0)
+    thr = p.velocity_thr
     side = 0
     if trend >= thr and last < 0 and prev > 0:
         side = -1
@@ -692,8 +887,8 @@ def velocity_signal(t: TokenState, args) -> Tuple[int, float]:
     return side, conf
 
 
-def imbalance_signal(t: TokenState, args) -> Tuple[int, float]:
-    thr = max(0.01, float(args.imbalance_threshold))
+def imbalance_signal(t: TokenState, p: ConsensusParams) -> Tuple[int, float]:
+    thr = p.imbalance_thr
     z = float(t.zscore or 0.0)
     imb = float(t.last_imbalance or 0.0)
     side = 0
@@ -706,10 +901,10 @@ def imbalance_signal(t: TokenState, args) -> Tuple[int, float]:
     return side, conf
 
 
-def extreme_signal(t: TokenState, args) -> Tuple[int, float]:
+def extreme_signal(t: TokenState, p: ConsensusParams) -> Tuple[int, float]:
     px = float(t.last_mid or 0.0)
-    low = clamp(float(args.extreme_low), 0.001, 0.499)
-    high = clamp(float(args.extreme_high), 0.501, 0.999)
+    low = p.extreme_low
+    high = p.extreme_high
     side = 0
     conf = 0.0
     if px >= high:
@@ -722,38 +917,34 @@ def extreme_signal(t: TokenState, args) -> Tuple[int, float]:
     return side, conf
 
 
-def regime_allows_entry(t: TokenState, args) -> bool:
+def regime_allows_entry(t: TokenState, p: ConsensusParams) -> bool:
     if t.last_mid <= 0:
         return False
-    if t.last_mid < float(args.min_mid_prob) or t.last_mid > float(args.max_mid_prob):
+    if t.last_mid < p.min_mid_prob or t.last_mid > p.max_mid_prob:
         return False
-    max_spread = float(args.max_spread_cents) / 100.0
-    if max_spread > 0 and t.last_spread > max_spread:
+    if p.max_spread > 0 and t.last_spread > p.max_spread:
         return False
-    if min(t.last_depth_bid, t.last_depth_ask) < float(args.min_depth_shares):
+    if min(t.last_depth_bid, t.last_depth_ask) < p.min_depth:
         return False
-    lb = max(5, int(args.vol_lookback))
-    vol = safe_stdev(t.returns[-lb:]) if len(t.returns) >= lb else safe_stdev(t.returns)
-    max_vol = max(0.0, float(args.max_volatility_cents)) / 100.0
-    min_vol = max(0.0, float(args.min_volatility_cents)) / 100.0
-    if max_vol > 0 and vol > max_vol:
+    vol = t.returns.pstdev(p.vol_lookback)
+    if p.max_vol > 0 and vol > p.max_vol:
         return False
-    if min_vol > 0 and vol < min_vol:
+    if p.min_vol > 0 and vol < p.min_vol:
         return False
     return True
 
 
-def evaluate_consensus(t: TokenState, args) -> Tuple[int, float, int]:
-    z_side, z_conf = zscore_signal(t, args)
-    v_side, v_conf = velocity_signal(t, args)
-    i_side, i_conf = imbalance_signal(t, args)
-    e_side, e_conf = extreme_signal(t, args)
+def evaluate_consensus(t: TokenState, p: ConsensusParams) -> Tuple[int, float, int]:
+    z_side, z_conf = zscore_signal(t, p)
+    v_side, v_conf = velocity_signal(t, p)
+    i_side, i_conf = imbalance_signal(t, p)
+    e_side, e_conf = extreme_signal(t, p)
 
     score = (
-        float(args.weight_zscore) * z_side * z_conf
-        + float(args.weight_velocity) * v_side * v_conf
-        + float(args.weight_imbalance) * i_side * i_conf
-        + float(args.weight_extreme) * e_side * e_conf
+        p.weight_zscore * z_side * z_conf
+        + p.weight_velocity * v_side * v_conf
+        + p.weight_imbalance * i_side * i_conf
+        + p.weight_extreme * e_side * e_conf
     )
     side = sign(score)
     agree = 0
@@ -768,26 +959,115 @@ def evaluate_consensus(t: TokenState, args) -> Tuple[int, float, int]:
 
     if side == 0:
         return 0, score, agree
-    req_score = float(args.consensus_min_score)
+    req_score = p.min_score
     if agree <= 1:
-        req_score = max(req_score, float(args.consensus_min_score_agree1))
+        req_score = max(req_score, p.min_score_agree1)
     elif agree == 2:
-        req_score = max(req_score, float(args.consensus_min_score_agree2))
+        req_score = max(req_score, p.min_score_agree2)
     if abs(score) < req_score:
         return 0, score, agree
-    if agree < int(args.consensus_min_agree):
+    if agree < p.min_agree:
         return 0, score, agree
     non_extreme_agree = 0
     for s in (z_side, v_side, i_side):
         if s == side:
             non_extreme_agree += 1
-    if non_extreme_agree < int(args.min_non_extreme_agree):
+    if non_extreme_agree < p.min_non_extreme_agree:
         return 0, score, agree
-    if not regime_allows_entry(t, args):
+    if not regime_allows_entry(t, p):
         return 0, score, agree
     return side, score, agree
 
 
+def evaluate_consensus_all(tokens: List[TokenState], p: ConsensusParams) -> List[Tuple[int, float, int]]:
+    """
+    Column-wise evaluate_consensus() over the eligible universe. Window stats are
+    read once per token into feature columns; each bot, the weighted score, the
+    agree counts and the entry gates then run as whole-column passes. Results and
+    the per-token zscore/bot_*/consensus_* fields match evaluate_consensus().
+    """
+    if not tokens:
+        return []
+    lens = [len(t.mids) for t in tokens]
+
+    # zscore bot.
+    lb = p.zscore_lookback
+    z_sd = [t.mids.pstdev(lb) if k >= lb else 0.0 for t, k in zip(tokens, lens)]
+    z = [
+        (t.mids[-1] - t.mids.mean(lb)) / sd if sd > 1e-9 else 0.0
+        for t, sd in zip(tokens, z_sd)
+    ]
+    thr = p.zscore_thr
+    z_side = [-1 if v >= thr else (1 if v <= -thr else 0) for v in z]
+    z_conf = [min(2.0, abs(v) / thr) if s != 0 else 0.0 for v, s in zip(z, z_side)]
+
+    # velocity bot.
+    w = p.velocity_window
+    v_ok = [k >= (w + 2) for k in lens]
+    trend = [t.mids.diff(w) if ok else 0.0 for t, ok in zip(tokens, v_ok)]
+    last = [t.mids.diff(1) if ok else 0.0 for t, ok in zip(tokens, v_ok)]
+    prev = [t.mids[-2] - t.mids[-3] if ok else 0.0 for t, ok in zip(tokens, v_ok)]
+    thr = p.velocity_thr
+    v_side = [
+        -1 if (tr >= thr and la < 0 and pr > 0) else (1 if (tr <= -thr and la > 0 and pr < 0) else 0)
+        for tr, la, pr in zip(trend, last, prev)
+    ]
+    v_conf = [min(2.0, abs(tr) / thr) if s != 0 else 0.0 for tr, s in zip(trend, v_side)]
+
+    # imbalance bot (reads this poll's zscore).
+    imb = [float(t.last_imbalance or 0.0) for t in tokens]
+    thr = p.imbalance_thr
+    i_side = [-1 if (zv > 0 and iv <= -thr) else (1 if (zv < 0 and iv >= thr) else 0) for zv, iv in zip(z, imb)]
+    i_conf = [min(2.0, abs(iv) / thr) if s != 0 else 0.0 for iv, s in zip(imb, i_side)]
+
+    # extreme bot.
+    px = [float(t.last_mid or 0.0) for t in tokens]
+    low = p.extreme_low
+    high = p.extreme_high
+    e_side = [-1 if v >= high else (1 if v <= low else 0) for v in px]
+    e_conf = [
+        min(2.0, (v - high) / max(1e-9, (1.0 - high))) if s < 0 else (min(2.0, (low - v) / max(1e-9, low)) if s > 0 else 0.0)
+        for v, s in zip(px, e_side)
+    ]
+
+    score = [
+        p.weight_zscore * zs * zc + p.weight_velocity * vs * vc + p.weight_imbalance * is_ * ic + p.weight_extreme * es * ec
+        for zs, zc, vs, vc, is_, ic, es, ec in zip(z_side, z_conf, v_side, v_conf, i_side, i_conf, e_side, e_conf)
+    ]
+    side = [sign(sc) for sc in score]
+    agree = [
+        ((zs == sd) + (vs == sd) + (is_ == sd) + (es == sd)) if sd != 0 else 0
+        for sd, zs, vs, is_, es in zip(side, z_side, v_side, i_side, e_side)
+    ]
+    non_extreme = [(zs == sd) + (vs == sd) + (is_ == sd) for sd, zs, vs, is_ in zip(side, z_side, v_side, i_side)]
+
+    out: List[Tuple[int, float, int]] = []
+    for k, t in enumerate(tokens):
+        t.zscore = float(z[k])
+        t.bot_zscore = z_side[k] * z_conf[k]
+        t.velocity_move = float(trend[k])
+        t.bot_velocity = v_side[k] * v_conf[k]
+        t.bot_imbalance = i_side[k] * i_conf[k]
+        t.bot_extreme = e_side[k] * e_conf[k]
+        t.consensus_score = float(score[k])
+        t.consensus_side = int(side[k])
+        t.consensus_agree = int(agree[k])
+        out.append((0, score[k], agree[k]))
+
+    # Entry gates, only for tokens with a directional score.
+    for k in [k for k, sd in enumerate(side) if sd != 0]:
+        req_score = p.min_score
+        if agree[k] <= 1:
+            req_score = max(req_score, p.min_score_agree1)
+        elif agree[k] == 2:
+            req_score = max(req_score, p.min_score_agree2)
+        if abs(score[k]) < req_score or agree[k] < p.min_agree or non_extreme[k] < p.min_non_extreme_agree:
+            continue
+        if regime_allows_entry(tokens[k], p):
+            out[k] = (side[k], score[k], agree[k])
+    return out
+
+
 def entry_price(t: TokenState, side: int, args) -> float:
     tick = max(float(t.tick_size or 0.01), 0.0001)
     slip = max(0.0, float(args.slippage_ticks)) * tick
@@ -839,10 +1119,7 @@ def _round_trip_cost_per_share(t: TokenState, args) -> float:
 
 def _expected_move_per_share(t: TokenState, score: float, args) -> float:
     lb = max(5, int(args.vol_lookback))
-    if len(t.returns) >= lb:
-        vol = safe_stdev(t.returns[-lb:])
-    else:
-        vol = safe_stdev(t.returns)
+    vol = t.returns.pstdev(lb)
     # If returns are flat, fall back to a spread-based proxy to avoid overfitting to zeros.
     if vol <= 1e-9:
         vol = max(float(t.last_spread or 0.0) * 0.5, max(float(t.tick_size or 0.01), 0.0001))
@@ -1266,7 +1543,7 @@ def maybe_reload_runtime_control(args, logger: Logger, control_file: Optional[Pa
     _apply_runtime_control(args, logger, payload, source=str(control_file))
     return sig
 
-def parse_args():
+def build_parser() -> argparse.ArgumentParser:
     script_dir = Path(__file__).resolve().parent
     p = argparse.ArgumentParser(description="Observe-only Polymarket fade monitor (multi-bot consensus)")
     p.add_argument("--gamma-limit", type=int, default=900, help="Gamma active markets limit for universe selection")
@@ -1294,6 +1571,33 @@ def parse_args():
 
     p.add_argument("--poll-sec", type=float, default=2.0, help="Order book polling interval")
     p.add_argument("--workers", type=int, default=12, help="Parallel workers for book fetch")
+    p.add_argument(
+        "--book-source",
+        choices=("rest", "ws", "feed"),
+        default="rest",
+        help=(
+            "Book source: REST polling, market-channel websocket with REST fallback when unhealthy, "
+            "or a shared feature feed written by clob_fade_book_feed.py (universe comes from the feed)"
+        ),
+    )
+    p.add_argument(
+        "--feed-file",
+        default=str(script_dir.parent / "logs" / "clob-fade-feed.jsonl"),
+        help="Shared feature feed JSONL (book-source=feed reads it; clob_fade_book_feed.py writes it)",
+    )
+    p.add_argument("--ws-url", default=WS_MARKET_URL, help="Market channel websocket URL (book-source=ws)")
+    p.add_argument(
+        "--ws-stale-sec",
+        type=float,
+        default=15.0,
+        help="Treat the websocket feed as unhealthy after this many seconds without messages",
+    )
+    p.add_argument(
+        "--sample-mode",
+        choices=("clock", "change"),
+        default="clock",
+        help="clock: sample every --poll-sec; change: sample when a websocket book changes (--poll-sec = max wait)",
+    )
     p.add_argument("--book-depth-levels", type=int, default=5, help="Top N levels for depth/imbalance")
     p.add_argument("--history-size", type=int, default=300, help="Per-token feature history size")
 
@@ -1500,14 +1804,24 @@ def parse_args():
     p.add_argument(
         "--state-file",
         default=str(script_dir.parent / "logs" / "clob_fade_observe_state.json"),
-        help="Runtime state JSON path",
+        help="Runtime state JSON path (scalar state; histories go to <state-file>.hist)",
+    )
+    p.add_argument(
+        "--state-save-sec",
+        type=float,
+        default=5.0,
+        help="Min seconds between scalar state rewrites when only marks changed (entries/exits flush immediately)",
     )
     p.add_argument(
         "--metrics-file",
         default=str(script_dir.parent / "logs" / "clob-fade-observe-metrics.jsonl"),
         help="Metrics JSONL path",
     )
-    return p.parse_args()
+    return p
+
+
+def parse_args():
+    return build_parser().parse_args()
 
 
 def run(args) -> int:
@@ -1520,7 +1834,12 @@ def run(args) -> int:
         return 2
 
     logger.info(f"[{iso_now()}] instance-lock acquired: {state_file}.lock")
-    state = load_state(state_file)
+    store = StateStore(
+        state_file,
+        history_size=int(args.history_size),
+        min_interval_sec=float(args.state_save_sec),
+    )
+    state = store.load()
     if not state.day_key:
         state.day_key = local_day_key()
 
@@ -1545,6 +1864,24 @@ def run(args) -> int:
         )
         control_sig = maybe_reload_runtime_control(args, logger, control_file, control_sig)
 
+    feed: Optional[ClobMarketBookFeed] = None
+    if str(args.book_source) == "ws":
+        feed = ClobMarketBookFeed(ws_url=str(args.ws_url), stale_sec=float(args.ws_stale_sec)).start()
+        logger.info(f"book-source=ws url={args.ws_url} sample={args.sample_mode} stale={float(args.ws_stale_sec):g}s")
+    feed_reader: Optional[FeatureFeedReader] = None
+    feed_pending: Deque[dict] = deque()
+    if str(args.book_source) == "feed":
+        feed_reader = FeatureFeedReader(str(args.feed_file))
+        seed = tokens_from_feed_universe(feed_reader.initial_universe())
+        if seed:
+            merge_universe(state, seed)
+            state.last_universe_refresh_ts = now_ts()
+        logger.info(f"book-source=feed file={args.feed_file} seeded_universe={len(seed)}")
+    feed_ok_prev: Optional[bool] = None
+    refresher = UniverseRefresher()
+    sampled_versions: Dict[str, int] = {}
+    last_rest_ts = 0.0
+
     t0 = now_ts()
     last_summary = now_ts()
     last_metrics = 0.0
@@ -1579,28 +1916,85 @@ def run(args) -> int:
             last_control_check = now_ts()
             control_sig = maybe_reload_runtime_control(args, logger, control_file, control_sig)
 
-        if (now_ts() - float(state.last_universe_refresh_ts or 0.0)) >= float(args.universe_refresh_sec):
-            uni = choose_universe(args)
-            merge_universe(state, uni)
-            state.last_universe_refresh_ts = now_ts()
-            state.universe_refresh_count += 1
-            logger.info(
-                f"[{iso_now()}] universe refresh: active={len(state.active_token_ids)} "
-                f"top={', '.join((state.token_states[t].label[:28] for t in state.active_token_ids[:3]))}"
-            )
+        feed_sample: Optional[dict] = None
+        refresh_sec = float(args.universe_refresh_sec)
+        if feed_reader is not None:
+            # Universe and features both come from the shared feed process.
+            result = None
+            feed_sample, uni_updates = next_feed_sample(feed_reader, feed_pending, state)
+            if uni_updates:
+                logger.info(
+                    f"[{iso_now()}] feed universe: active={len(state.active_token_ids)} "
+                    f"top={', '.join((state.token_states[t].label[:28] for t in state.active_token_ids[:3]))}"
+                )
+        else:
+            if (now_ts() - float(state.last_universe_refresh_ts or 0.0)) >= refresh_sec:
+                refresher.submit(args)
+            # Block only when there is nothing to monitor yet; otherwise keep sampling/exiting on schedule.
+            result = refresher.poll(wait=refresher.pending and not state.active_token_ids)
+        if result is not None:
+            uni, err = result
+            took = now_ts() - refresher.started_ts
+            if err is not None:
+                # Retry sooner than a full refresh interval.
+                state.last_universe_refresh_ts = now_ts() - refresh_sec + min(60.0, refresh_sec)
+                logger.info(f"[{iso_now()}] universe refresh error ({took:.1f}s): {type(err).__name__}: {err}")
+            else:
+                merge_universe(state, uni)
+                state.last_universe_refresh_ts = now_ts()
+                state.universe_refresh_count += 1
+                logger.info(
+                    f"[{iso_now()}] universe refresh: active={len(state.active_token_ids)} took={took:.1f}s "
+                    f"top={', '.join((state.token_states[t].label[:28] for t in state.active_token_ids[:3]))}"
+                )
 
         active_ids = [tid for tid in state.active_token_ids if (state.token_states.get(tid) and state.token_states[tid].active)]
-        books = fetch_books_parallel(active_ids, workers=int(args.workers))
-
+        versions: Dict[str, int] = {}
+        from_feed: set = set()
+        books: Dict[str, dict] = {}
+        sample_on_change = str(args.sample_mode) == "change"
+        if feed is not None:
+            feed.set_assets(active_ids)
+            # Change-driven wakeups can come at ws message rate; tokens still without a
+            # live snapshot are REST-fetched on the --poll-sec cadence only.
+            rest_due = (not sample_on_change) or (now_ts() - last_rest_ts) >= float(args.poll_sec)
+            if rest_due:
+                last_rest_ts = now_ts()
+            books, from_feed = merge_ws_and_rest_books(
+                feed,
+                active_ids,
+                lambda ids: fetch_books_parallel(ids, workers=int(args.workers)),
+                rest_due=rest_due,
+                versions=versions,
+            )
+            feed_ok = bool(from_feed)
+            if feed_ok != feed_ok_prev:
+                if feed_ok:
+                    logger.info(f"[{iso_now()}] ws feed live: {len(from_feed)}/{len(active_ids)} books")
+                else:
+                    logger.info(f"[{iso_now()}] ws feed unhealthy; REST fallback ({feed.last_error or 'no data yet'})")
+                feed_ok_prev = feed_ok
+        elif feed_reader is None:
+            books = fetch_books_parallel(active_ids, workers=int(args.workers))
+
+        feed_feats = (feed_sample or {}).get("books") or {}
         for tid in active_ids:
             t = state.token_states[tid]
-            book = books.get(tid)
-            if not book:
-                continue
-            feat = extract_book_features(book, depth_levels=int(args.book_depth_levels))
-            if not feat:
+            if feed_reader is not None:
+                # Features were extracted once by the feed process; apply them verbatim.
+                feat = feed_feats.get(tid)
+            else:
+                if sample_on_change and tid in from_feed and versions.get(tid, 0) == sampled_versions.get(tid, -1):
+                    # Unchanged live book: no new sample for this token.
+                    continue
+                book = books.get(tid)
+                if not book:
+                    continue
+                feat = extract_book_features(book, depth_levels=int(args.book_depth_levels))
+            if not isinstance(feat, dict) or not feat:
                 continue
             update_token_from_book(t, feat, history_size=int(args.history_size))
+        sampled_versions = versions
 
         # Exit checks first to keep risk bounded, including inactive open positions.
         for t in state.token_states.values():
@@ -1635,6 +2029,7 @@ def run(args) -> int:
             state.disable_side_reason = ""
             logger.info(f"[{iso_now()}] side-enable SHORT")
 
+        eligible: List[TokenState] = []
         for tid in active_ids:
             t = state.token_states[tid]
             now = now_ts()
@@ -1646,7 +2041,14 @@ def run(args) -> int:
                 t.disable_reason = ""
             if t.last_mid <= 0 or len(t.mids) < 5:
                 continue
-            side, score, agree = evaluate_consensus(t, args)
+            eligible.append(t)
+        if feed_reader is not None and feed_sample is None:
+            # No new feed sample: re-evaluating the same books would only add timing noise across consumers.
+            eligible = []
+
+        for t, (side, score, agree) in zip(eligible, evaluate_consensus_all(eligible, ConsensusParams.from_args(args))):
+            tid = t.token_id
+            now = now_ts()
             if side == 0:
                 continue
             allowed = str(args.allowed_sides)
@@ -1812,10 +2214,19 @@ def run(args) -> int:
                 )
 
         try:
-            save_state(state_file, state)
+            store.save(state)
         except Exception as e:
             logger.info(f"[{iso_now()}] state-save error: {type(e).__name__}: {e}")
-        time.sleep(max(0.2, float(args.poll_sec)))
+        if feed_reader is not None:
+            # Drain a backlog without sleeping; otherwise wake as soon as the feed appends.
+            if not feed_pending:
+                feed_reader.wait(timeout=max(0.2, float(args.poll_sec)))
+        elif feed is not None and str(args.sample_mode) == "change" and feed.healthy():
+            # Wake on the next book change; --poll-sec caps the wait so exits/summaries stay on schedule.
+            time.sleep(0.05)
+            feed.wait_for_change(sampled_versions, timeout=max(0.2, float(args.poll_sec)))
+        else:
+            time.sleep(max(0.2, float(args.poll_sec)))
 
     total, realized, unreal = total_pnl(state)
     day = total - float(state.day_anchor_total_pnl or 0.0)
@@ -1824,9 +2235,12 @@ def run(args) -> int:
         f"realized={realized:+.4f} unrealized={unreal:+.4f} entries={state.entries} exits={state.exits}"
     )
     try:
-        save_state(state_file, state)
+        store.save(state, force=True)
     except Exception as e:
         logger.info(f"[{iso_now()}] state-save error: {type(e).__name__}: {e}")
+    refresher.close()
+    if feed is not None:
+        feed.stop()
     try:
         release_lock()
     except Exception:
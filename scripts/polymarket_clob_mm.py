@@ -33,6 +33,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 from lib.clob_auth import build_clob_client_from_env
+from lib.clob_mm_universe import MMCandidate, rotate_universe, select_mm_tokens
 from lib.runtime_common import (
     day_key_local,
     env_bool as _env_bool,
@@ -46,13 +47,14 @@ from lib.runtime_common import (
 
 
 # Local dependency (same folder)
-from polymarket_clob_arb_scanner import fetch_active_markets, extract_yes_token_id, parse_json_string_field, as_float
+from polymarket_clob_arb_scanner import as_float
 
 
 DEFAULT_CLOB_HOST = "https://clob.polymarket.com"
 # Repo-local defaults (gitignored) to avoid mixing with other projects.
 _SCRIPT_DIR = Path(__file__).resolve().parent
 DEFAULT_METRICS_FILE = str(_SCRIPT_DIR.parent / "logs" / "clob-mm-metrics.jsonl")
+DEFAULT_GAMMA_CACHE_FILE = str(_SCRIPT_DIR.parent / "logs" / "clob-mm-gamma-cache.json")
 
 
 def local_day_key() -> str:
@@ -172,46 +174,164 @@ def _extract_best(book) -> Tuple[Optional[float], Optional[float]]:
     return best_bid, best_ask
 
 
+def _book_levels(book, depth: int) -> Tuple[List[List[float]], List[List[float]]]:
+    """
+    Return top-`depth` (bids, asks) as [[price, size], ...] sorted best-first.
+    Used for the optional book recording consumed by replay_clob_mm.py.
+    """
+    if isinstance(book, dict):
+        bids = book.get("bids") or []
+        asks = book.get("asks") or []
+    else:
+        bids = getattr(book, "bids", None) or []
+        asks = getattr(book, "asks", None) or []
+
+    def _levels(levels, reverse: bool) -> List[List[float]]:
+        out: List[List[float]] = []
+        for x in levels or []:
+            if isinstance(x, dict):
+                p = as_float(x.get("price"), math.nan)
+                sz = as_float(x.get("size"), math.nan)
+            else:
+                p = as_float(getattr(x, "price", None), math.nan)
+                sz = as_float(getattr(x, "size", None), math.nan)
+            if not (math.isfinite(p) and math.isfinite(sz)) or p <= 0 or sz <= 0:
+                continue
+            out.append([p, sz])
+        out.sort(key=lambda lv: lv[0], reverse=reverse)
+        return out[: max(0, int(depth))] if depth > 0 else out
+
+    return _levels(bids, True), _levels(asks, False)
+
+
+def _book_mid(best_bid: Optional[float], best_ask: Optional[float]) -> Optional[float]:
+    if best_bid is not None and best_ask is not None:
+        mid = (best_bid + best_ask) / 2.0
+    else:
+        mid = best_bid if best_bid is not None else best_ask
+    if mid is None or not math.isfinite(mid):
+        return None
+    return float(mid)
+
+
+def _desired_quotes(
+    mid: float,
+    best_bid: Optional[float],
+    best_ask: Optional[float],
+    tick: float,
+    spread_cents: float,
+) -> Optional[Tuple[float, float]]:
+    """
+    Return post-only (desired_buy, desired_sell) around mid, or None when the
+    book is too tight to quote without crossing.
+    """
+    half = max(tick, float(spread_cents or 2.0) / 200.0)  # cents -> dollars, half spread
+    desired_buy = _q_down(max(0.001, mid - half), tick)
+    desired_sell = _q_up(min(0.999, mid + half), tick)
+
+    # Enforce post-only by staying strictly inside the spread when possible.
+    if best_ask is not None:
+        desired_buy = min(desired_buy, _q_down(max(0.001, best_ask - tick), tick))
+    if best_bid is not None:
+        desired_sell = max(desired_sell, _q_up(min(0.999, best_bid + tick), tick))
+
+    # If spread is too tight, skip (avoid postOnly rejections and churn).
+    if best_bid is not None and best_ask is not None and (best_ask - best_bid) < (2 * tick):
+        return None
+    if desired_buy >= desired_sell:
+        return None
+    return desired_buy, desired_sell
+
+
+def _quote_sizes(
+    inventory_shares: float,
+    order_size_shares: float,
+    min_order_size: float,
+    max_inventory_shares: float,
+    reduce_only: bool = False,
+) -> Tuple[float, bool, float]:
+    """
+    Return (buy_size, allow_buy, sell_size). sell_size is 0 when flat.
+    reduce_only (token dropped from the universe) never bids.
+    """
+    size = max(float(order_size_shares or 1.0), float(min_order_size or 1.0))
+    # Inventory cap: stop bidding if too long.
+    allow_buy = inventory_shares < float(max_inventory_shares or 0.0) if float(max_inventory_shares or 0.0) > 0 else True
+    if reduce_only:
+        allow_buy = False
+    allow_sell = inventory_shares > 0.0
+    sell_size = min(size, inventory_shares) if allow_sell else 0.0
+    return size, allow_buy, sell_size
+
+
+def _quote_needs_refresh(
+    have_quote: bool,
+    quote_price: float,
+    desired_price: float,
+    quote_ts: float,
+    now: float,
+    tick: float,
+    quote_refresh_sec: float,
+    quote_size: Optional[float] = None,
+    desired_size: Optional[float] = None,
+) -> bool:
+    if not have_quote:
+        return True
+    if abs(quote_price - desired_price) >= tick:
+        return True
+    if (now - quote_ts) >= float(quote_refresh_sec or 15.0):
+        return True
+    if quote_size is not None and desired_size is not None and abs(quote_size - desired_size) >= 1e-6:
+        return True
+    return False
+
+
 def _choose_tokens_auto(
     gamma_limit: int,
     min_liquidity: float,
     min_volume24hr: float,
     min_spread_cents: float,
     count: int,
-) -> List[Tuple[str, str]]:
+    workers: int = 4,
+    cache_file: str = "",
+    cache_ttl_sec: float = 0.0,
+    book_check_multiple: float = 3.0,
+    depth_cents: float = 2.0,
+    log=None,
+) -> List[MMCandidate]:
     """
-    Auto-select tokens for MM from Gamma active markets.
-    Returns list of (token_id, label).
+    Auto-select tokens for MM: Gamma active markets (paged concurrently, cached on disk)
+    re-ranked by live book spread/depth. Returns candidates best-first.
     """
-    markets = fetch_active_markets(limit=max(50, int(gamma_limit or 500)), offset=0)
-    scored: List[Tuple[float, str, str]] = []
-    for m in markets or []:
-        if m.get("enableOrderBook") is False:
-            continue
-        if m.get("feesEnabled") is True:
-            continue
-        liq = as_float(m.get("liquidityNum", m.get("liquidity", 0.0)), 0.0)
-        vol = as_float(m.get("volume24hr", 0.0), 0.0)
-        spr = as_float(m.get("spread", 0.0), 0.0)
-        if liq < float(min_liquidity or 0.0) or vol < float(min_volume24hr or 0.0):
-            continue
-        if spr < (float(min_spread_cents or 0.0) / 100.0):
-            continue
-        token_id = extract_yes_token_id(m)
-        if not token_id:
-            continue
-        q = str(m.get("question") or "").strip()
-        if not q:
-            continue
-        # Score: prefer high volume, decent liquidity, and non-trivial spreads.
-        score = math.log10(1.0 + vol) + 0.3 * math.log10(1.0 + liq) + (3.0 * spr)
-        scored.append((score, str(token_id), q))
+    return select_mm_tokens(
+        gamma_limit=gamma_limit,
+        min_liquidity=min_liquidity,
+        min_volume24hr=min_volume24hr,
+        min_spread_cents=min_spread_cents,
+        count=count,
+        workers=workers,
+        cache_file=cache_file,
+        cache_ttl_sec=cache_ttl_sec,
+        book_check_multiple=book_check_multiple,
+        depth_cents=depth_cents,
+        log=log,
+    )
 
-    scored.sort(key=lambda x: x[0], reverse=True)
-    out: List[Tuple[str, str]] = []
-    for _, tid, q in scored[: max(0, int(count or 0))]:
-        out.append((tid, q))
-    return out
+
+def _choose_tokens_from_args(args, count: Optional[int] = None, log=None) -> List[MMCandidate]:
+    return _choose_tokens_auto(
+        gamma_limit=args.gamma_limit,
+        min_liquidity=args.gamma_min_liquidity,
+        min_volume24hr=args.gamma_min_volume24hr,
+        min_spread_cents=args.gamma_min_spread_cents,
+        count=args.auto_select_count if count is None else count,
+        workers=args.gamma_workers,
+        cache_file=args.gamma_cache_file,
+        cache_ttl_sec=args.gamma_cache_ttl_sec,
+        book_check_multiple=args.book_check_multiple,
+        depth_cents=args.book_depth_cents,
+        log=log,
+    )
 
 
 @dataclass
@@ -398,6 +518,83 @@ def _maybe_append_metrics(metrics_file: str, payload: dict) -> None:
         f.write(json.dumps(payload, ensure_ascii=True) + "\n")
 
 
+def _apply_universe(state: RuntimeState, candidates: List[MMCandidate], client, args, logger: Logger) -> List[str]:
+    """
+    Make `candidates` the active universe. Tokens that drop out get their tracked
+    orders cancelled; flat ones are pruned, ones still holding inventory stay in
+    state as inactive (reduce-only: the quote loop keeps their book and mark
+    fresh and works only the ask until flat, see _prune_if_unwound). Returns
+    dropped token_ids.
+    """
+    active_ids = [c.token_id for c in candidates]
+    active_set = set(active_ids)
+    state.active_token_ids = list(active_ids)
+    dropped = [tid for tid, s0 in state.token_states.items() if tid not in active_set and s0.active]
+    stale_ids = [tid for tid in list(state.token_states.keys()) if tid not in active_set]
+    if stale_ids:
+        cancel_ids = []
+        for tid in stale_ids:
+            s0 = state.token_states[tid]
+            for oid in [s0.buy_order_id, s0.sell_order_id]:
+                if oid:
+                    cancel_ids.append(oid)
+        if cancel_ids and args.execute:
+            # Best-effort cancel any stale orders we tracked.
+            try:
+                client.cancel_orders(cancel_ids)
+            except Exception as e:
+                logger.info(f"[{iso_now()}] warn: cancel stale orders failed: {e}")
+        for tid in stale_ids:
+            s0 = state.token_states[tid]
+            s0.buy_order_id = ""
+            s0.sell_order_id = ""
+            s0.buy_ts = 0.0
+            s0.sell_ts = 0.0
+            s0.active = False
+            if float(s0.inventory_shares or 0.0) <= 0:
+                del state.token_states[tid]
+
+    # Initialize per-token state and metadata.
+    for c in candidates:
+        tid = c.token_id
+        if tid not in state.token_states:
+            state.token_states[tid] = TokenMMState(token_id=tid, label=c.label)
+        else:
+            state.token_states[tid].label = c.label
+        state.token_states[tid].active = True
+
+        # Best-effort: read tick size from server; fallback to Gamma tick, then 0.01.
+        try:
+            tick = as_float(client.get_tick_size(tid), 0.01)
+            if tick > 0:
+                state.token_states[tid].tick_size = tick
+        except Exception:
+            state.token_states[tid].tick_size = float(c.tick_size or 0.01)
+
+        # Gamma min order size is known for auto-selected tokens; configured order_size is the floor.
+        state.token_states[tid].min_order_size = max(1.0, float(args.order_size_shares or 1.0), float(c.min_order_size or 0.0))
+    return dropped
+
+
+def _prune_if_unwound(state: RuntimeState, tid: str, client, args, logger: Logger) -> bool:
+    """
+    Drop a reduce-only (inactive) token from state once its inventory is flat,
+    cancelling any leftover ask. Returns True when pruned.
+    """
+    s0 = state.token_states.get(tid)
+    if s0 is None or s0.active or float(s0.inventory_shares or 0.0) > 0:
+        return False
+    for oid in [s0.buy_order_id, s0.sell_order_id]:
+        if oid and args.execute:
+            try:
+                client.cancel_orders([oid])
+            except Exception as e:
+                logger.info(f"[{iso_now()}] warn: cancel unwound order failed token={tid} oid={oid[:10]}: {e}")
+    del state.token_states[tid]
+    logger.info(f"[{iso_now()}] universe prune {tid} (unwound, pnl={float(s0.realized_pnl or 0.0):+.4f})")
+    return True
+
+
 async def run(args) -> int:
     script_dir = Path(__file__).resolve().parent
     log_file = args.log_file or str(script_dir.parent / "logs" / "clob-mm.log")
@@ -431,79 +628,41 @@ async def run(args) -> int:
         return 2
 
     # Select tokens.
-    tokens: List[Tuple[str, str]] = []
+    candidates: List[MMCandidate] = []
     if args.token_ids:
         for tid in [x.strip() for x in args.token_ids.split(",") if x.strip()]:
-            tokens.append((tid, f"token:{tid}"))
+            candidates.append(MMCandidate(token_id=tid, label=f"token:{tid}"))
     else:
-        tokens = _choose_tokens_auto(
-            gamma_limit=args.gamma_limit,
-            min_liquidity=args.gamma_min_liquidity,
-            min_volume24hr=args.gamma_min_volume24hr,
-            min_spread_cents=args.gamma_min_spread_cents,
-            count=args.auto_select_count,
-        )
+        candidates = _choose_tokens_from_args(args, log=lambda msg: logger.info(f"[{iso_now()}] {msg}"))
 
-    if not tokens:
+    if not candidates:
         logger.info(f"[{iso_now()}] fatal: no tokens selected (check gamma filters or --token-ids).")
         maybe_notify_discord(logger, "CLOBMM HALT: no tokens selected (check filters).")
         return 2
 
-    # Mark active tokens and prune stale state to avoid state bloat.
-    active_ids = [tid for tid, _ in tokens]
-    active_set = set(active_ids)
-    state.active_token_ids = list(active_ids)
-    stale_ids = [tid for tid in list(state.token_states.keys()) if tid not in active_set]
-    if stale_ids:
-        if args.execute:
-            # Best-effort cancel any stale orders we tracked.
-            cancel_ids = []
-            for tid in stale_ids:
-                s0 = state.token_states.get(tid)
-                if not s0:
-                    continue
-                for oid in [s0.buy_order_id, s0.sell_order_id]:
-                    if oid:
-                        cancel_ids.append(oid)
-            if cancel_ids:
-                try:
-                    client.cancel_orders(cancel_ids)
-                except Exception as e:
-                    logger.info(f"[{iso_now()}] warn: cancel stale orders failed: {e}")
-        for tid in stale_ids:
-            del state.token_states[tid]
-
+    _apply_universe(state, candidates, client, args, logger)
     logger.info("Selected tokens:")
-    for tid, label in tokens:
-        logger.info(f"  - {tid} | {label[:120]}")
+    for c in candidates:
+        logger.info(f"  - {c.token_id} | {c.label[:120]}")
 
-    # Initialize per-token state and metadata.
-    for tid, label in tokens:
-        if tid not in state.token_states:
-            state.token_states[tid] = TokenMMState(token_id=tid, label=label)
-        else:
-            state.token_states[tid].label = label
-        state.token_states[tid].active = True
-
-        # Best-effort: read tick size from server; fallback to 0.01.
-        try:
-            tick = as_float(client.get_tick_size(tid), 0.01)
-            if tick > 0:
-                state.token_states[tid].tick_size = tick
-        except Exception:
-            state.token_states[tid].tick_size = 0.01
+    save_state(state_file, state)
 
-        # Best-effort: Gamma provides min order size; derive from selected market if possible.
-        # We only have token_id here, so we cannot reliably map back; use configured order_size as floor.
-        state.token_states[tid].min_order_size = max(1.0, float(args.order_size_shares or 1.0))
+    book_record_file = str(args.book_record_file or "").strip()
+    if book_record_file:
+        logger.info(f"Book record: {book_record_file} | depth={int(args.book_record_depth or 0)}")
 
-    save_state(state_file, state)
+    rerank_sec = float(args.universe_rerank_sec or 0.0) if not args.token_ids else 0.0
+    if rerank_sec > 0:
+        logger.info(f"Universe re-rank: every {rerank_sec:.0f}s | hysteresis={int(args.universe_rerank_hysteresis or 0)}")
 
     # Main loop.
     start_ts = now_ts()
     last_trade_poll = 0.0
     last_summary = 0.0
     last_metrics = 0.0
+    last_rerank = now_ts()
+    rerank_future = None
+    aloop = asyncio.get_running_loop()
     while True:
         if int(args.run_seconds or 0) > 0 and (now_ts() - start_ts) >= int(args.run_seconds):
             logger.info(f"[{iso_now()}] run_seconds reached -> exiting")
@@ -513,6 +672,40 @@ async def run(args) -> int:
             continue
 
         try:
+            # Universe re-rank runs in a worker thread; apply when ready without stalling quotes.
+            if rerank_future is not None and rerank_future.done():
+                fut, rerank_future = rerank_future, None
+                last_rerank = now_ts()
+                try:
+                    ranked = fut.result()
+                except Exception as e:
+                    ranked = []
+                    logger.info(f"[{iso_now()}] warn: universe re-rank failed: {e}")
+                nxt = rotate_universe(
+                    state.active_token_ids,
+                    ranked,
+                    count=int(args.auto_select_count or 0),
+                    hysteresis=int(args.universe_rerank_hysteresis or 0),
+                )
+                if nxt and [c.token_id for c in nxt] != list(state.active_token_ids):
+                    before = set(state.active_token_ids)
+                    dropped = _apply_universe(state, nxt, client, args, logger)
+                    added = [c for c in nxt if c.token_id not in before]
+                    for tid in dropped:
+                        s0 = state.token_states.get(tid)
+                        inv = float(s0.inventory_shares or 0.0) if s0 else 0.0
+                        logger.info(f"[{iso_now()}] universe drop {tid} (inv={inv:g})")
+                    for c in added:
+                        logger.info(f"[{iso_now()}] universe add {c.token_id} | spread={c.book_spread:.3f} depth={c.book_depth:g} | {c.label[:80]}")
+                    if dropped or added:
+                        maybe_notify_discord(logger, f"CLOBMM universe rotated: +{len(added)} -{len(dropped)}")
+                    save_state(state_file, state)
+            if rerank_sec > 0 and rerank_future is None and (now_ts() - last_rerank) >= rerank_sec:
+                want = int(args.auto_select_count or 0) + max(0, int(args.universe_rerank_hysteresis or 0))
+                rerank_future = aloop.run_in_executor(
+                    None, _choose_tokens_from_args, args, want, lambda msg: logger.info(f"[{iso_now()}] {msg}")
+                )
+
             # Daily anchor update (for daily loss guard).
             today = local_day_key()
             if not state.day_key:
@@ -572,48 +765,43 @@ async def run(args) -> int:
             # Quote update (frequent).
             for tid in list(state.token_states.keys()):
                 s = state.token_states[tid]
-                if not s.active:
+                if _prune_if_unwound(state, tid, client, args, logger):
+                    save_state(state_file, state)
                     continue
                 tick = float(s.tick_size or 0.01)
-                size = max(float(args.order_size_shares or 1.0), float(s.min_order_size or 1.0))
-
-                # Inventory cap: stop bidding if too long.
-                allow_buy = s.inventory_shares < float(args.max_inventory_shares or 0.0) if float(args.max_inventory_shares or 0.0) > 0 else True
-                allow_sell = s.inventory_shares > 0.0
-                sell_size = min(size, s.inventory_shares) if allow_sell else 0.0
+                size, allow_buy, sell_size = _quote_sizes(
+                    s.inventory_shares,
+                    args.order_size_shares,
+                    s.min_order_size,
+                    args.max_inventory_shares,
+                    reduce_only=not s.active,
+                )
+                allow_sell = sell_size > 0.0
 
                 # Fetch book.
                 book = client.get_order_book(tid)
                 best_bid, best_ask = _extract_best(book)
                 if best_bid is None and best_ask is None:
                     continue
+                if book_record_file:
+                    bids, asks = _book_levels(book, int(args.book_record_depth or 0))
+                    _maybe_append_metrics(
+                        book_record_file,
+                        {"ts_ms": int(now_ts() * 1000.0), "token_id": tid, "bids": bids, "asks": asks},
+                    )
 
                 # Mid estimate.
-                if best_bid is not None and best_ask is not None:
-                    mid = (best_bid + best_ask) / 2.0
-                else:
-                    mid = best_bid if best_bid is not None else best_ask
-                if mid is None or not math.isfinite(mid):
+                mid = _book_mid(best_bid, best_ask)
+                if mid is None:
                     continue
                 s.last_mid = float(mid)
                 s.last_best_bid = float(best_bid or 0.0)
                 s.last_best_ask = float(best_ask or 0.0)
 
-                half = max(tick, float(args.spread_cents or 2.0) / 200.0)  # cents -> dollars, half spread
-                desired_buy = _q_down(max(0.001, mid - half), tick)
-                desired_sell = _q_up(min(0.999, mid + half), tick)
-
-                # Enforce post-only by staying strictly inside the spread when possible.
-                if best_ask is not None:
-                    desired_buy = min(desired_buy, _q_down(max(0.001, best_ask - tick), tick))
-                if best_bid is not None:
-                    desired_sell = max(desired_sell, _q_up(min(0.999, best_bid + tick), tick))
-
-                # If spread is too tight, skip (avoid postOnly rejections and churn).
-                if best_bid is not None and best_ask is not None and (best_ask - best_bid) < (2 * tick):
-                    continue
-                if desired_buy >= desired_sell:
+                quotes = _desired_quotes(mid, best_bid, best_ask, tick, args.spread_cents)
+                if quotes is None:
                     continue
+                desired_buy, desired_sell = quotes
 
                 now = now_ts()
                 if (now - s.last_quote_ts) < 0.05:
@@ -643,7 +831,7 @@ async def run(args) -> int:
                 # BUY quote management.
                 if allow_buy:
                     have_buy = bool(s.buy_order_id) if args.execute else (s.buy_ts > 0.0)
-                    need_new_buy = (not have_buy) or (abs(s.buy_price - desired_buy) >= tick) or (now - s.buy_ts) >= float(args.quote_refresh_sec or 15.0)
+                    need_new_buy = _quote_needs_refresh(have_buy, s.buy_price, desired_buy, s.buy_ts, now, tick, args.quote_refresh_sec)
                     if need_new_buy:
                         if s.buy_order_id and args.execute:
                             try:
@@ -693,7 +881,17 @@ async def run(args) -> int:
                 # SELL quote management (only if we have inventory).
                 if allow_sell and sell_size >= float(s.min_order_size or 1.0):
                     have_sell = bool(s.sell_order_id) if args.execute else (s.sell_ts > 0.0)
-                    need_new_sell = (not have_sell) or (abs(s.sell_price - desired_sell) >= tick) or (now - s.sell_ts) >= float(args.quote_refresh_sec or 15.0) or (abs(s.sell_size - sell_size) >= 1e-6)
+                    need_new_sell = _quote_needs_refresh(
+                        have_sell,
+                        s.sell_price,
+                        desired_sell,
+                        s.sell_ts,
+                        now,
+                        tick,
+                        args.quote_refresh_sec,
+                        quote_size=s.sell_size,
+                        desired_size=sell_size,
+                    )
                     if need_new_sell:
                         if s.sell_order_id and args.execute:
                             try:
@@ -745,7 +943,7 @@ async def run(args) -> int:
             if float(args.metrics_sample_sec or 0.0) > 0 and (now_ts() - last_metrics) >= float(args.metrics_sample_sec):
                 last_metrics = now_ts()
                 for tid, s in state.token_states.items():
-                    if not s.active:
+                    if not s.active and float(s.inventory_shares or 0.0) <= 0:
                         continue
                     bb = float(s.last_best_bid or 0.0)
                     ba = float(s.last_best_ask or 0.0)
@@ -762,6 +960,7 @@ async def run(args) -> int:
                             "mid": float(s.last_mid or 0.0),
                             "spread": float(spr),
                             "inv": float(s.inventory_shares or 0.0),
+                            "reduce_only": not s.active,
                         },
                     )
 
@@ -843,6 +1042,23 @@ def parse_args():
     p.add_argument("--gamma-min-liquidity", type=float, default=25000.0, help="Auto-select filter: min liquidityNum")
     p.add_argument("--gamma-min-volume24hr", type=float, default=2500.0, help="Auto-select filter: min volume24hr")
     p.add_argument("--gamma-min-spread-cents", type=float, default=2.0, help="Auto-select filter: min spread (cents)")
+    p.add_argument("--gamma-workers", type=int, default=4, help="Concurrent Gamma page / book fetch workers for auto-selection")
+    p.add_argument("--gamma-cache-file", default=DEFAULT_GAMMA_CACHE_FILE, help="Disk cache for Gamma candidate metadata")
+    p.add_argument("--gamma-cache-ttl-sec", type=float, default=900.0, help="Reuse cached Gamma candidates younger than N sec (0=disabled)")
+    p.add_argument(
+        "--book-check-multiple",
+        type=float,
+        default=3.0,
+        help="Auto-select: live-book check the top N*count Gamma candidates and rank by spread/depth (0=Gamma only)",
+    )
+    p.add_argument("--book-depth-cents", type=float, default=2.0, help="Auto-select: depth band around mid for book scoring (cents)")
+    p.add_argument("--universe-rerank-sec", type=float, default=0.0, help="Re-rank auto-selected tokens every N sec while running (0=disabled)")
+    p.add_argument(
+        "--universe-rerank-hysteresis",
+        type=int,
+        default=1,
+        help="Keep an incumbent token while it ranks within auto_select_count + N",
+    )
 
     p.add_argument("--spread-cents", type=float, default=3.0, help="Total target spread (cents)")
     p.add_argument("--order-size-shares", type=float, default=5.0, help="Order size in shares (must meet min order size)")
@@ -859,6 +1075,13 @@ def parse_args():
     p.add_argument("--metrics-file", default=DEFAULT_METRICS_FILE, help="JSONL metrics file path (separate from event log)")
     p.add_argument("--metrics-sample-sec", type=float, default=60.0, help="Write one metrics sample per token every N sec (0=disabled)")
 
+    p.add_argument(
+        "--book-record-file",
+        default="",
+        help="Optional JSONL path to record polled book snapshots for replay_clob_mm.py (empty=disabled)",
+    )
+    p.add_argument("--book-record-depth", type=int, default=10, help="Levels per side to record (0=all)")
+
     p.add_argument("--log-quotes", action="store_true", help="Log quote updates (debug). Default is quiet.")
     p.add_argument("--quote-log-min-change-ticks", type=float, default=1.0, help="When --log-quotes, only log if price changed by >= N ticks")
 
@@ -5,14 +5,17 @@ Observe-only late-resolution high-probability validator for Polymarket.
 Modes:
 - screen: scan active markets near resolution that are already high-probability
 - backtest: validate the same fixed rule on closed markets using prices-history
+- sweep: backtest a grid of entry offsets / price bands / side modes from one history fetch
 """
 
 from __future__ import annotations
 
 import argparse
+import bisect
 import csv
 import datetime as dt
 import json
+import os
 import re
 import statistics
 import sys
@@ -25,10 +28,15 @@ from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from lib.closed_market_catalog import add_catalog_args, closed_market_pages
+from lib.price_history_store import DEFAULT_HISTORY_DB, PriceHistoryStore, history_points
+from lib.process_pool import pool_map
+
 GAMMA_API_BASE = "https://gamma-api.polymarket.com"
 CLOB_API_BASE = "https://clob.polymarket.com"
 USER_AGENT = "Mozilla/5.0 (compatible; lateprob-observe/1.0)"
 DEFAULT_EXCLUDE_KEYWORDS = ["draft", "inflation", "unemployment", "interest rate", "fed "]
+SIDE_MODES = ["both", "yes-only", "no-only"]
 DEFAULT_WEATHER_INCLUDE_REGEX = r"weather|temperature|precipitation|forecast|\brain\b|\bsnow\b|\bwind\b|humidity"
 
 
@@ -97,9 +105,13 @@ def fetch_json(url: str, timeout_sec: float = 30.0, retries: int = 3) -> Optiona
     return None
 
 
-def fetch_markets_page(params: Dict[str, str]) -> List[dict]:
+def fetch_markets_json(params: Dict[str, str]) -> Optional[object]:
     q = urlencode(params)
-    data = fetch_json(f"{GAMMA_API_BASE}/markets?{q}", timeout_sec=35.0, retries=4)
+    return fetch_json(f"{GAMMA_API_BASE}/markets?{q}", timeout_sec=35.0, retries=4)
+
+
+def fetch_markets_page(params: Dict[str, str]) -> List[dict]:
+    data = fetch_markets_json(params)
     return data if isinstance(data, list) else []
 
 
@@ -313,17 +325,8 @@ def build_closed_candidates(args: argparse.Namespace) -> List[dict]:
     now_ts = int(now_utc().timestamp())
     rows: List[dict] = []
     seen = set()
-    for i, offset in enumerate(iter_offsets(args), 1):
-        params = {
-            "closed": "true",
-            "end_date_min": args.date_min,
-            "end_date_max": args.date_max,
-            "order": "endDate",
-            "ascending": "false",
-            "limit": str(args.page_size),
-            "offset": str(offset),
-        }
-        markets = fetch_markets_page(params)
+    pages = closed_market_pages(args, iter_offsets(args), fetch_markets_json, log=safe_print)
+    for i, (_offset, markets) in enumerate(pages, 1):
         if not markets:
             if args.sampling_mode == "contiguous":
                 break
@@ -368,19 +371,42 @@ def build_closed_candidates(args: argparse.Namespace) -> List[dict]:
     return rows
 
 
-def fetch_entry_sample(candidate: dict, args: argparse.Namespace) -> Optional[ClosedSample]:
-    start_ts = int(candidate["cutoff_ts"] - args.lookback_hours * 3600.0)
-    end_ts = int(candidate["cutoff_ts"])
-    q = urlencode({"market": str(candidate["yes_token"]), "startTs": str(start_ts), "endTs": str(end_ts), "fidelity": str(args.history_fidelity)})
+def fetch_prices_history(token: str, start_ts: int, end_ts: int, fidelity: int) -> Optional[list]:
+    q = urlencode({"market": str(token), "startTs": str(start_ts), "endTs": str(end_ts), "fidelity": str(fidelity)})
     data = fetch_json(f"{CLOB_API_BASE}/prices-history?{q}", timeout_sec=28.0, retries=3)
     if not isinstance(data, dict):
         return None
     hist = data.get("history")
-    if not isinstance(hist, list) or not hist:
-        return None
-    last = hist[-1] or {}
-    entry_ts = int(as_float(last.get("t"), -1))
-    entry_yes = as_float(last.get("p"), -1.0)
+    return hist if isinstance(hist, list) else None
+
+
+def fetch_entry_sample(
+    candidate: dict, args: argparse.Namespace, store: Optional[PriceHistoryStore] = None
+) -> Optional[ClosedSample]:
+    start_ts = int(candidate["cutoff_ts"] - args.lookback_hours * 3600.0)
+    end_ts = int(candidate["cutoff_ts"])
+    if store is not None:
+        hit = store.last_price(
+            str(candidate["yes_token"]), int(args.history_fidelity), start_ts, end_ts, fetch=fetch_prices_history
+        )
+        if hit is None:
+            return None
+        entry_ts, entry_yes, history_points = hit
+    else:
+        hist = fetch_prices_history(str(candidate["yes_token"]), start_ts, end_ts, args.history_fidelity)
+        if not hist:
+            return None
+        history_points = len(hist)
+        last = hist[-1] or {}
+        entry_ts = int(as_float(last.get("t"), -1))
+        entry_yes = as_float(last.get("p"), -1.0)
+    return sample_from_entry(candidate, entry_ts, entry_yes, history_points, args)
+
+
+def sample_from_entry(
+    candidate: dict, entry_ts: int, entry_yes: float, history_points: int, args: argparse.Namespace
+) -> Optional[ClosedSample]:
+    """Apply the stale limit and side/band rule of `args` to an entry quote taken at candidate["cutoff_ts"]."""
     if entry_ts <= 0 or not (0.0 <= entry_yes <= 1.0):
         return None
     stale_h = float(candidate["cutoff_ts"] - entry_ts) / 3600.0
@@ -424,7 +450,7 @@ def fetch_entry_sample(candidate: dict, args: argparse.Namespace) -> Optional[Cl
         won=1 if payout > 0.5 else 0,
         liquidity_num=float(candidate["liquidity_num"]),
         volume_24h=float(candidate["volume_24h"]),
-        history_points=len(hist),
+        history_points=int(history_points),
     )
 
 
@@ -533,15 +559,20 @@ def run_backtest(args: argparse.Namespace) -> int:
     candidates = build_closed_candidates(args)
     safe_print(f"[backtest] candidates={len(candidates)}")
     rows: List[ClosedSample] = []
-    with ThreadPoolExecutor(max_workers=args.workers) as ex:
-        futs = [ex.submit(fetch_entry_sample, c, args) for c in candidates]
-        for i, f in enumerate(as_completed(futs), 1):
-            r = f.result()
-            if r is not None and question_allowed(r.question, include_rx, exclude_rx, exclude_keywords):
-                if r.liquidity_num >= args.min_liquidity and r.volume_24h >= args.min_volume_24h:
-                    rows.append(r)
-            if i % args.progress_every == 0:
-                safe_print(f"[backtest] priced {i}/{len(futs)} | usable={len(rows)}")
+    store = PriceHistoryStore(args.history_db) if args.history_db else None
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as ex:
+            futs = [ex.submit(fetch_entry_sample, c, args, store) for c in candidates]
+            for i, f in enumerate(as_completed(futs), 1):
+                r = f.result()
+                if r is not None and question_allowed(r.question, include_rx, exclude_rx, exclude_keywords):
+                    if r.liquidity_num >= args.min_liquidity and r.volume_24h >= args.min_volume_24h:
+                        rows.append(r)
+                if i % args.progress_every == 0:
+                    safe_print(f"[backtest] priced {i}/{len(futs)} | usable={len(rows)}")
+    finally:
+        if store is not None:
+            store.close()
     rows = apply_risk_caps(rows, args.max_open_positions, args.max_open_per_category)
     rows.sort(key=lambda x: x.end_ts)
 
@@ -599,6 +630,211 @@ def run_backtest(args: argparse.Namespace) -> int:
     return 0 if rows else 2
 
 
+def parse_float_grid(raw: str) -> List[float]:
+    out: List[float] = []
+    for t in (raw or "").split(","):
+        s = t.strip()
+        if not s:
+            continue
+        try:
+            out.append(float(s))
+        except ValueError:
+            continue
+    return sorted(set(out))
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    hours_before_end: float
+    side_mode: str
+    yes_high_min: float
+    yes_high_max: float
+    yes_low_min: float
+    yes_low_max: float
+
+
+def sweep_configs(args: argparse.Namespace) -> List[SweepConfig]:
+    """Grid of offsets x side modes x bands; a band the side mode never uses is pinned to its first grid value."""
+    offsets = [h for h in parse_float_grid(args.hours_before_end_grid) if h >= 0.0]
+    modes = [m for m in dict.fromkeys(x.strip() for x in args.side_mode_grid.split(",")) if m in SIDE_MODES]
+    hi_min, hi_max = parse_float_grid(args.yes_high_min_grid), parse_float_grid(args.yes_high_max_grid)
+    lo_min, lo_max = parse_float_grid(args.yes_low_min_grid), parse_float_grid(args.yes_low_max_grid)
+    if not (hi_min and hi_max and lo_min and lo_max):
+        return []
+    out: List[SweepConfig] = []
+    for h in offsets:
+        for mode in modes:
+            highs = [(a, b) for a in hi_min for b in hi_max if a <= b] if mode != "no-only" else [(hi_min[0], hi_max[0])]
+            lows = [(a, b) for a in lo_min for b in lo_max if a <= b] if mode != "yes-only" else [(lo_min[0], lo_max[0])]
+            out.extend(SweepConfig(h, mode, a, b, c, d) for a, b in highs for c, d in lows)
+    return out
+
+
+def fetch_history_window(
+    candidate: dict, start_ts: int, end_ts: int, args: argparse.Namespace, store: Optional[PriceHistoryStore] = None
+) -> Optional[Tuple[List[int], List[float]]]:
+    """Time-sorted (ts, yes prices) of the candidate's history in [start_ts, end_ts], or None if the fetch failed."""
+    token, fidelity = str(candidate["yes_token"]), int(args.history_fidelity)
+    if store is not None:
+        if not store.sync(token, fidelity, start_ts, end_ts, fetch_prices_history):
+            return None
+        points = store.window(token, fidelity, start_ts, end_ts)
+    else:
+        hist = fetch_prices_history(token, start_ts, end_ts, fidelity)
+        if hist is None:
+            return None
+        points = sorted(dict(history_points(hist)).items())
+    return [t for t, _ in points], [p for _, p in points]
+
+
+def sweep_entries(
+    candidates: List[dict],
+    offsets: List[float],
+    args: argparse.Namespace,
+    store: Optional[PriceHistoryStore] = None,
+) -> Dict[float, List[tuple]]:
+    """
+    Fetch each candidate's history once, over the window spanning every offset,
+    and return per offset the (candidate, entry_ts, entry_yes, history_points)
+    quotes fetch_entry_sample() would take at that offset's cutoff, in candidate order.
+    """
+    lookback_sec = args.lookback_hours * 3600.0
+
+    def _one(c: dict):
+        cutoffs = [int(c["end_ts"]) - int(h * 3600.0) for h in offsets]
+        starts = [int(cut - lookback_sec) for cut in cutoffs]
+        return cutoffs, starts, fetch_history_window(c, min(starts), max(cutoffs), args, store)
+
+    fetched: List[Optional[tuple]] = [None] * len(candidates)
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        futs = {ex.submit(_one, c): i for i, c in enumerate(candidates)}
+        for k, f in enumerate(as_completed(futs), 1):
+            fetched[futs[f]] = f.result()
+            if k % args.progress_every == 0:
+                safe_print(f"[sweep] fetched history {k}/{len(futs)}")
+
+    out: Dict[float, List[tuple]] = {h: [] for h in offsets}
+    for c, (cutoffs, starts, hist) in zip(candidates, fetched):
+        if hist is None:
+            continue
+        ts, ps = hist
+        for h, cut, start in zip(offsets, cutoffs, starts):
+            if cut <= 0:
+                continue
+            lo, hi = bisect.bisect_left(ts, start), bisect.bisect_right(ts, cut)
+            if hi > lo:
+                out[h].append((dict(c, cutoff_ts=cut), ts[hi - 1], ps[hi - 1], hi - lo))
+    return out
+
+
+def evaluate_config(entries: List[tuple], cfg: SweepConfig, args: argparse.Namespace) -> dict:
+    """run_backtest()'s sample rule, risk caps and metrics for one config over pre-fetched entry quotes."""
+    cargs = argparse.Namespace(**{**vars(args), **asdict(cfg)})
+    rows: List[ClosedSample] = []
+    for c, entry_ts, entry_yes, n in entries:
+        r = sample_from_entry(c, entry_ts, entry_yes, n, cargs)
+        if r is not None:
+            rows.append(r)
+    rows = apply_risk_caps(rows, args.max_open_positions, args.max_open_per_category)
+    rows.sort(key=lambda x: x.end_ts)
+    return {
+        **asdict(cfg),
+        "metrics": metrics(rows, per_trade_cost=args.per_trade_cost),
+        "timing_quality": timing_quality(rows, target_hours_before_end=cfg.hours_before_end),
+        "by_side": {
+            side: metrics([r for r in rows if r.side == side], per_trade_cost=args.per_trade_cost)
+            for side in ("yes", "no")
+        },
+    }
+
+
+def _evaluate_sweep_config(cfg: SweepConfig, entries: Dict[float, List[tuple]], args: argparse.Namespace) -> dict:
+    return evaluate_config(entries[cfg.hours_before_end], cfg, args)
+
+
+def evaluate_sweep(
+    entries: Dict[float, List[tuple]], configs: List[SweepConfig], args: argparse.Namespace, workers: int = 1
+) -> List[dict]:
+    """evaluate_config() for every config, in input order; workers > 1 spreads configs over processes."""
+    out: List[Optional[dict]] = [None] * len(configs)
+    for i, res in pool_map(_evaluate_sweep_config, configs, (entries, args), workers):
+        out[i] = res
+    return [r for r in out if r is not None]
+
+
+def sweep_rank_key(res: dict, rank_by: str, min_trades: int) -> tuple:
+    m = res["metrics"]
+    return (m["n"] >= min_trades, float(m.get(rank_by, 0.0)), m["n"])
+
+
+def run_sweep(args: argparse.Namespace) -> int:
+    configs = sweep_configs(args)
+    if not configs:
+        safe_print("[sweep] empty config grid")
+        return 2
+    offsets = sorted({cfg.hours_before_end for cfg in configs})
+    include_rx = compile_regex(args.include_regex)
+    exclude_rx = compile_regex(args.exclude_regex)
+    exclude_keywords = parse_keywords(args.exclude_keywords)
+    # Filters on market attributes are config-independent: apply them before fetching history.
+    candidates = [
+        c
+        for c in build_closed_candidates(argparse.Namespace(**{**vars(args), "hours_before_end": max(offsets)}))
+        if question_allowed(c["question"], include_rx, exclude_rx, exclude_keywords)
+        and c["liquidity_num"] >= args.min_liquidity
+        and c["volume_24h"] >= args.min_volume_24h
+    ]
+    safe_print(f"[sweep] candidates={len(candidates)} offsets={len(offsets)} configs={len(configs)}")
+    store = PriceHistoryStore(args.history_db) if args.history_db else None
+    try:
+        entries = sweep_entries(candidates, offsets, args, store)
+    finally:
+        if store is not None:
+            store.close()
+
+    workers = int(args.eval_workers) if int(args.eval_workers) > 0 else (os.cpu_count() or 1)
+    results = evaluate_sweep(entries, configs, args, workers)
+    results.sort(key=lambda r: sweep_rank_key(r, args.rank_by, args.min_trades), reverse=True)
+    for i, r in enumerate(results, 1):
+        r["rank"] = i
+
+    summary = {
+        "generated_utc": now_utc().isoformat(),
+        "settings": vars(args),
+        "candidates": len(candidates),
+        "entries_by_offset": {f"{h:g}": len(entries[h]) for h in offsets},
+        "configs": results,
+    }
+    out_json = args.out_summary_json or f"logs/lateprob_sweep_summary_{utc_tag()}.json"
+    Path(out_json).parent.mkdir(parents=True, exist_ok=True)
+    Path(out_json).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    safe_print(f"[sweep] rank_by={args.rank_by} min_trades={args.min_trades}")
+    safe_print("rank  hours side      yes_high     yes_low         n   win%    return  within15m")
+    for r in results[: max(0, args.top_n)]:
+        m, tq = r["metrics"], r["timing_quality"]
+        safe_print(
+            f"{r['rank']:>4} {r['hours_before_end']:>6g} {r['side_mode']:<8} "
+            f"{r['yes_high_min']:.2f}-{r['yes_high_max']:.2f} {r['yes_low_min']:.2f}-{r['yes_low_max']:.2f} "
+            f"{m['n']:>8} {m['win_rate']:>6.1%} {m['capital_return']:>+9.4%} {tq['within_15m_ratio']:>9.1%}"
+        )
+    safe_print(f"[sweep] wrote {out_json}")
+    return 0 if any(r["metrics"]["n"] > 0 for r in results) else 2
+
+
+def add_closed_market_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--date-min", default="2024-01-01")
+    p.add_argument("--date-max", default=utc_day())
+    p.add_argument("--sampling-mode", choices=["stratified", "contiguous"], default="stratified")
+    p.add_argument("--page-size", type=int, default=500)
+    add_catalog_args(p)
+    p.add_argument("--max-pages", type=int, default=120)
+    p.add_argument("--offset-start", type=int, default=0)
+    p.add_argument("--offset-step", type=int, default=5000)
+    p.add_argument("--max-offset", type=int, default=425000)
+    p.add_argument("--max-candidates", type=int, default=0)
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Observe-only late-resolution high-probability validator (Polymarket).")
     sub = p.add_subparsers(dest="mode", required=True)
@@ -609,7 +845,7 @@ def build_parser() -> argparse.ArgumentParser:
     ps.add_argument("--min-hours-to-end", type=float, default=0.0)
     ps.add_argument("--max-hours-to-end", type=float, default=0.5)
     ps.add_argument("--max-active-stale-hours", type=float, default=6.0)
-    ps.add_argument("--side-mode", choices=["both", "yes-only", "no-only"], default="both")
+    ps.add_argument("--side-mode", choices=SIDE_MODES, default="both")
     ps.add_argument("--yes-high-min", type=float, default=0.90)
     ps.add_argument("--yes-high-max", type=float, default=0.99)
     ps.add_argument("--yes-low-min", type=float, default=0.01)
@@ -625,22 +861,15 @@ def build_parser() -> argparse.ArgumentParser:
     ps.add_argument("--out-json", default="")
 
     pb = sub.add_parser("backtest", help="Closed market backtest for fixed late high-probability rule.")
-    pb.add_argument("--date-min", default="2024-01-01")
-    pb.add_argument("--date-max", default=utc_day())
-    pb.add_argument("--sampling-mode", choices=["stratified", "contiguous"], default="stratified")
-    pb.add_argument("--page-size", type=int, default=500)
-    pb.add_argument("--max-pages", type=int, default=120)
-    pb.add_argument("--offset-start", type=int, default=0)
-    pb.add_argument("--offset-step", type=int, default=5000)
-    pb.add_argument("--max-offset", type=int, default=425000)
-    pb.add_argument("--max-candidates", type=int, default=0)
+    add_closed_market_args(pb)
     pb.add_argument("--hours-before-end", type=float, default=0.25)
     pb.add_argument("--lookback-hours", type=float, default=12.0)
     pb.add_argument("--max-stale-hours", type=float, default=0.5)
     pb.add_argument("--history-fidelity", type=int, default=10)
     pb.add_argument("--workers", type=int, default=16)
+    pb.add_argument("--history-db", default=DEFAULT_HISTORY_DB, help="Local prices-history store (''=always fetch)")
     pb.add_argument("--progress-every", type=int, default=100)
-    pb.add_argument("--side-mode", choices=["both", "yes-only", "no-only"], default="both")
+    pb.add_argument("--side-mode", choices=SIDE_MODES, default="both")
     pb.add_argument("--yes-high-min", type=float, default=0.90)
     pb.add_argument("--yes-high-max", type=float, default=0.99)
     pb.add_argument("--yes-low-min", type=float, default=0.01)
@@ -655,6 +884,34 @@ def build_parser() -> argparse.ArgumentParser:
     pb.add_argument("--exclude-regex", default="")
     pb.add_argument("--out-samples-csv", default="")
     pb.add_argument("--out-summary-json", default="")
+
+    pw = sub.add_parser("sweep", help="Closed market backtest over a grid of offsets/bands/side modes (one history fetch).")
+    add_closed_market_args(pw)
+    pw.add_argument("--hours-before-end-grid", default="0.1,0.25,0.5,1,2")
+    pw.add_argument("--side-mode-grid", default="both,yes-only,no-only")
+    pw.add_argument("--yes-high-min-grid", default="0.85,0.90,0.95")
+    pw.add_argument("--yes-high-max-grid", default="0.99")
+    pw.add_argument("--yes-low-min-grid", default="0.01")
+    pw.add_argument("--yes-low-max-grid", default="0.05,0.10,0.15")
+    pw.add_argument("--lookback-hours", type=float, default=12.0)
+    pw.add_argument("--max-stale-hours", type=float, default=0.5)
+    pw.add_argument("--history-fidelity", type=int, default=10)
+    pw.add_argument("--workers", type=int, default=16, help="Threads for prices-history fetch.")
+    pw.add_argument("--eval-workers", type=int, default=0, help="Processes for config evaluation (0=all cores).")
+    pw.add_argument("--history-db", default=DEFAULT_HISTORY_DB, help="Local prices-history store (''=always fetch)")
+    pw.add_argument("--progress-every", type=int, default=100)
+    pw.add_argument("--per-trade-cost", type=float, default=0.002)
+    pw.add_argument("--min-liquidity", type=float, default=0.0)
+    pw.add_argument("--min-volume-24h", type=float, default=0.0)
+    pw.add_argument("--max-open-positions", type=int, default=0)
+    pw.add_argument("--max-open-per-category", type=int, default=0)
+    pw.add_argument("--exclude-keywords", default=",".join(DEFAULT_EXCLUDE_KEYWORDS))
+    pw.add_argument("--include-regex", default="")
+    pw.add_argument("--exclude-regex", default="")
+    pw.add_argument("--rank-by", choices=["capital_return", "avg_pnl_per_trade", "win_rate"], default="capital_return")
+    pw.add_argument("--min-trades", type=int, default=30, help="Configs with fewer trades rank below all others.")
+    pw.add_argument("--top-n", type=int, default=20)
+    pw.add_argument("--out-summary-json", default="")
     return p
 
 
@@ -662,6 +919,8 @@ def main() -> int:
     args = build_parser().parse_args()
     if args.mode == "screen":
         return run_screen(args)
+    if args.mode == "sweep":
+        return run_sweep(args)
     return run_backtest(args)
 
 
@@ -10,22 +10,29 @@ Modes:
 from __future__ import annotations
 
 import argparse
+import bisect
 import csv
 import datetime as dt
 import json
 import math
+import operator
+import os
 import re
 import statistics
 import sys
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, asdict
+from itertools import compress, repeat
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from lib.closed_market_catalog import add_catalog_args, closed_market_pages
+from lib.price_history_store import DEFAULT_HISTORY_DB, PriceHistoryStore
+from lib.process_pool import pool_map
 from polymarket_clob_arb_scanner import parse_bucket_bounds
 
 
@@ -201,10 +208,14 @@ def extract_yes_no(market: dict) -> Optional[Tuple[str, float, float]]:
     return token_ids[yes_i], float(prices[yes_i]), float(prices[1 - yes_i])
 
 
-def fetch_markets_page(params: Dict[str, str]) -> List[dict]:
+def fetch_markets_json(params: Dict[str, str]) -> Optional[object]:
     q = urlencode(params)
     url = f"{GAMMA_API_BASE}/markets?{q}"
-    data = fetch_json(url, timeout_sec=35.0, retries=4)
+    return fetch_json(url, timeout_sec=35.0, retries=4)
+
+
+def fetch_markets_page(params: Dict[str, str]) -> List[dict]:
+    data = fetch_markets_json(params)
     if isinstance(data, list):
         return data
     return []
@@ -378,6 +389,235 @@ def _is_strict_disjoint(a_lo: float, a_hi: float, b_lo: float, b_hi: float, tol:
     return (a_hi < (b_lo - tol)) or (b_hi < (a_lo - tol))
 
 
+def _edge_mask(gross_edges: List[float], min_gross_edge: float, min_net_edge: float, per_leg_cost: float):
+    """Per-pair `gross >= min_gross and gross - 2 * per_leg_cost >= min_net`, evaluated at C level."""
+    return map(
+        operator.and_,
+        map(operator.ge, gross_edges, repeat(min_gross_edge)),
+        map(operator.ge, map(operator.sub, gross_edges, repeat(2.0 * per_leg_cost)), repeat(min_net_edge)),
+    )
+
+
+def _nested_pairs(
+    markets: List[GapMarket],
+    idx: List[int],
+    min_gross_edge: float,
+    min_net_edge: float,
+    per_leg_cost: float,
+    tol: float = 1e-12,
+) -> set:
+    """
+    Unordered index pairs (i < j) from `idx` whose bounds nest within `tol`
+    (the non-strict part of _is_strict_subset) and whose inner-minus-outer
+    YES price clears the subset edge thresholds; strictness is left to the caller.
+
+    Sweep in bound_lo order: every market whose `lo - tol` is <= the current
+    lower bound is inserted into a list sorted by `hi + tol`, so the enclosing
+    ranges are the suffix at bisect_left(current hi). O(n log n + pairs).
+    """
+    outer = sorted(idx, key=lambda k: markets[k].bound_lo - tol)
+    outer_lo = [markets[k].bound_lo - tol for k in outer]
+    hi_keys: List[float] = []
+    hi_ids: List[int] = []
+    hi_yes: List[float] = []
+    pairs = set()
+    p = 0
+    for x in sorted(idx, key=lambda k: markets[k].bound_lo):
+        x_lo = markets[x].bound_lo
+        while p < len(outer) and outer_lo[p] <= x_lo:
+            y = outer[p]
+            key = markets[y].bound_hi + tol
+            pos = bisect.bisect_right(hi_keys, key)
+            hi_keys.insert(pos, key)
+            hi_ids.insert(pos, y)
+            hi_yes.insert(pos, markets[y].yes_price)
+            p += 1
+        pos = bisect.bisect_left(hi_keys, markets[x].bound_hi)
+        gross_edges = list(map(operator.sub, repeat(markets[x].yes_price), hi_yes[pos:]))
+        for y in compress(hi_ids[pos:], _edge_mask(gross_edges, min_gross_edge, min_net_edge, per_leg_cost)):
+            if y != x:
+                pairs.add((x, y) if x < y else (y, x))
+    return pairs
+
+
+def _disjoint_pairs(
+    markets: List[GapMarket],
+    idx: List[int],
+    min_gross_edge: float,
+    min_net_edge: float,
+    per_leg_cost: float,
+    tol: float = 1e-12,
+) -> set:
+    """
+    Unordered index pairs (i < j) from `idx` that are _is_strict_disjoint and
+    whose (yes_a + yes_b) - 1 clears the disjoint edge thresholds.
+
+    Ranges strictly right of x are a suffix in `lo - tol` order; a suffix max
+    of YES prices skips whole suffixes where even the dearest partner falls
+    short (float + is monotone, so the skip never drops a qualifying pair).
+    O(n log n + pairs).
+    """
+    right = sorted(idx, key=lambda k: markets[k].bound_lo - tol)
+    right_lo = [markets[k].bound_lo - tol for k in right]
+    right_yes = [markets[k].yes_price for k in right]
+    best_yes = [0.0] * (len(right) + 1)
+    best_yes[-1] = -math.inf
+    for p in range(len(right) - 1, -1, -1):
+        best_yes[p] = max(best_yes[p + 1], right_yes[p])
+    pairs = set()
+    for x in idx:
+        p = bisect.bisect_right(right_lo, markets[x].bound_hi)
+        if p >= len(right):
+            continue
+        x_yes = markets[x].yes_price
+        gross_edge = (x_yes + best_yes[p]) - 1.0
+        if gross_edge < min_gross_edge or (gross_edge - (2.0 * per_leg_cost)) < min_net_edge:
+            continue
+        gross_edges = list(map(operator.sub, map(operator.add, repeat(x_yes), right_yes[p:]), repeat(1.0)))
+        for y in compress(right[p:], _edge_mask(gross_edges, min_gross_edge, min_net_edge, per_leg_cost)):
+            # An inverted range (lo > hi) lies right of itself.
+            if y != x:
+                pairs.add((x, y) if x < y else (y, x))
+    return pairs
+
+
+def _scan_gap_event(event_key: str, markets: List[GapMarket], args: argparse.Namespace) -> List[GapCandidate]:
+    """
+    Subset/disjoint candidates for one event, best first and capped at
+    --max-pairs-per-event; same rows and order as checking every pair.
+    """
+    min_gross_edge = args.min_gross_edge_cents / 100.0
+    min_net_edge = args.min_net_edge_cents / 100.0
+    per_leg_cost = float(args.per_leg_cost or 0.0)
+
+    groups: Dict[str, List[int]] = {}
+    for k, m in enumerate(markets):
+        groups.setdefault(m.logic_signature if args.require_same_signature else "", []).append(k)
+    keyed: List[Tuple[int, int, int]] = []
+    for idx in groups.values():
+        if len(idx) < 2:
+            continue
+        if args.relation in {"both", "subset"}:
+            keyed.extend(
+                (i, j, 0) for i, j in _nested_pairs(markets, idx, min_gross_edge, min_net_edge, per_leg_cost)
+            )
+        if args.relation in {"both", "disjoint"}:
+            keyed.extend(
+                (i, j, 1) for i, j in _disjoint_pairs(markets, idx, min_gross_edge, min_net_edge, per_leg_cost)
+            )
+    # Pair-loop order (i, j, subset before disjoint) keeps the stable edge sort below tie-for-tie identical.
+    keyed.sort()
+
+    local_rows: List[GapCandidate] = []
+    for i, j, kind in keyed:
+        a = markets[i]
+        b = markets[j]
+        if args.max_end_diff_hours > 0:
+            max_diff_sec = float(args.max_end_diff_hours) * 3600.0
+            if abs(float(a.end_ts) - float(b.end_ts)) > max_diff_sec:
+                continue
+
+        if kind == 0:
+            if _is_strict_subset(a.bound_lo, a.bound_hi, b.bound_lo, b.bound_hi):
+                overpriced_subset = a
+                superset = b
+            elif _is_strict_subset(b.bound_lo, b.bound_hi, a.bound_lo, a.bound_hi):
+                overpriced_subset = b
+                superset = a
+            else:
+                continue
+
+            gross_edge = overpriced_subset.yes_price - superset.yes_price
+            net_edge = gross_edge - (2.0 * per_leg_cost)
+            if gross_edge >= min_gross_edge and net_edge >= min_net_edge:
+                basket_cost = (1.0 - overpriced_subset.yes_price) + superset.yes_price
+                local_rows.append(
+                    GapCandidate(
+                        relation="subset_inversion",
+                        action="BUY NO(A) + YES(B)",
+                        event_key=event_key,
+                        event_title=overpriced_subset.event_title,
+                        market_a_id=overpriced_subset.market_id,
+                        market_a_question=overpriced_subset.question,
+                        market_a_yes=overpriced_subset.yes_price,
+                        market_a_no=overpriced_subset.no_price,
+                        market_a_bounds=_bounds_to_text(overpriced_subset.bound_lo, overpriced_subset.bound_hi),
+                        market_a_end_iso=overpriced_subset.end_iso,
+                        market_b_id=superset.market_id,
+                        market_b_question=superset.question,
+                        market_b_yes=superset.yes_price,
+                        market_b_no=superset.no_price,
+                        market_b_bounds=_bounds_to_text(superset.bound_lo, superset.bound_hi),
+                        market_b_end_iso=superset.end_iso,
+                        basket_cost=float(basket_cost),
+                        payout_floor=1.0,
+                        payout_ceiling=2.0,
+                        gross_edge=float(gross_edge),
+                        net_edge=float(net_edge),
+                        gross_edge_cents=float(gross_edge * 100.0),
+                        net_edge_cents=float(net_edge * 100.0),
+                        days_to_end_min=float(min(overpriced_subset.days_to_end, superset.days_to_end)),
+                        liquidity_sum=float(overpriced_subset.liquidity_num + superset.liquidity_num),
+                        volume_24h_sum=float(overpriced_subset.volume_24h + superset.volume_24h),
+                    )
+                )
+            continue
+
+        gross_edge = (a.yes_price + b.yes_price) - 1.0
+        net_edge = gross_edge - (2.0 * per_leg_cost)
+        if gross_edge >= min_gross_edge and net_edge >= min_net_edge:
+            basket_cost = (1.0 - a.yes_price) + (1.0 - b.yes_price)
+            local_rows.append(
+                GapCandidate(
+                    relation="disjoint_overlap",
+                    action="BUY NO(A) + NO(B)",
+                    event_key=event_key,
+                    event_title=a.event_title,
+                    market_a_id=a.market_id,
+                    market_a_question=a.question,
+                    market_a_yes=a.yes_price,
+                    market_a_no=a.no_price,
+                    market_a_bounds=_bounds_to_text(a.bound_lo, a.bound_hi),
+                    market_a_end_iso=a.end_iso,
+                    market_b_id=b.market_id,
+                    market_b_question=b.question,
+                    market_b_yes=b.yes_price,
+                    market_b_no=b.no_price,
+                    market_b_bounds=_bounds_to_text(b.bound_lo, b.bound_hi),
+                    market_b_end_iso=b.end_iso,
+                    basket_cost=float(basket_cost),
+                    payout_floor=1.0,
+                    payout_ceiling=2.0,
+                    gross_edge=float(gross_edge),
+                    net_edge=float(net_edge),
+                    gross_edge_cents=float(gross_edge * 100.0),
+                    net_edge_cents=float(net_edge * 100.0),
+                    days_to_end_min=float(min(a.days_to_end, b.days_to_end)),
+                    liquidity_sum=float(a.liquidity_num + b.liquidity_num),
+                    volume_24h_sum=float(a.volume_24h + b.volume_24h),
+                )
+            )
+
+    local_rows.sort(key=lambda r: (r.net_edge, r.gross_edge, r.liquidity_sum), reverse=True)
+    if args.max_pairs_per_event > 0:
+        local_rows = local_rows[: args.max_pairs_per_event]
+    return local_rows
+
+
+def _scan_gap_item(event: Tuple[str, List[GapMarket]], args: argparse.Namespace) -> List[GapCandidate]:
+    return _scan_gap_event(event[0], event[1], args)
+
+
+def _scan_gap_events(
+    events: List[Tuple[str, List[GapMarket]]], args: argparse.Namespace, workers: int = 1
+) -> List[List[GapCandidate]]:
+    """_scan_gap_event() per (event_key, markets), in input order; workers > 1 spreads events over processes."""
+    out: List[List[GapCandidate]] = [[] for _ in events]
+    for pos, rows in pool_map(_scan_gap_item, events, (args,), workers, max_chunk=64):
+        out[pos] = rows
+    return out
+
+
 def run_gap(args: argparse.Namespace) -> int:
     include_rx = compile_regex(args.include_regex)
     exclude_rx = compile_regex(args.exclude_regex)
@@ -470,119 +710,13 @@ def run_gap(args: argparse.Namespace) -> int:
     for m in active_interval:
         by_event.setdefault(m.event_key, []).append(m)
 
-    min_gross_edge = args.min_gross_edge_cents / 100.0
-    min_net_edge = args.min_net_edge_cents / 100.0
-    per_leg_cost = float(args.per_leg_cost or 0.0)
-    pairs_scanned = 0
-    event_considered = 0
     candidates: List[GapCandidate] = []
 
-    for event_key, markets in by_event.items():
-        if len(markets) < 2:
-            continue
-        event_considered += 1
-        local_rows: List[GapCandidate] = []
-        for i in range(len(markets)):
-            a = markets[i]
-            for j in range(i + 1, len(markets)):
-                b = markets[j]
-                pairs_scanned += 1
-
-                if args.max_end_diff_hours > 0:
-                    max_diff_sec = float(args.max_end_diff_hours) * 3600.0
-                    if abs(float(a.end_ts) - float(b.end_ts)) > max_diff_sec:
-                        continue
-                if args.require_same_signature and a.logic_signature != b.logic_signature:
-                    continue
-
-                if args.relation in {"both", "subset"}:
-                    if _is_strict_subset(a.bound_lo, a.bound_hi, b.bound_lo, b.bound_hi):
-                        overpriced_subset = a
-                        superset = b
-                    elif _is_strict_subset(b.bound_lo, b.bound_hi, a.bound_lo, a.bound_hi):
-                        overpriced_subset = b
-                        superset = a
-                    else:
-                        overpriced_subset = None
-                        superset = None
-
-                    if overpriced_subset is not None and superset is not None:
-                        gross_edge = overpriced_subset.yes_price - superset.yes_price
-                        net_edge = gross_edge - (2.0 * per_leg_cost)
-                        if gross_edge >= min_gross_edge and net_edge >= min_net_edge:
-                            basket_cost = (1.0 - overpriced_subset.yes_price) + superset.yes_price
-                            local_rows.append(
-                                GapCandidate(
-                                    relation="subset_inversion",
-                                    action="BUY NO(A) + YES(B)",
-                                    event_key=event_key,
-                                    event_title=overpriced_subset.event_title,
-                                    market_a_id=overpriced_subset.market_id,
-                                    market_a_question=overpriced_subset.question,
-                                    market_a_yes=overpriced_subset.yes_price,
-                                    market_a_no=overpriced_subset.no_price,
-                                    market_a_bounds=_bounds_to_text(overpriced_subset.bound_lo, overpriced_subset.bound_hi),
-                                    market_a_end_iso=overpriced_subset.end_iso,
-                                    market_b_id=superset.market_id,
-                                    market_b_question=superset.question,
-                                    market_b_yes=superset.yes_price,
-                                    market_b_no=superset.no_price,
-                                    market_b_bounds=_bounds_to_text(superset.bound_lo, superset.bound_hi),
-                                    market_b_end_iso=superset.end_iso,
-                                    basket_cost=float(basket_cost),
-                                    payout_floor=1.0,
-                                    payout_ceiling=2.0,
-                                    gross_edge=float(gross_edge),
-                                    net_edge=float(net_edge),
-                                    gross_edge_cents=float(gross_edge * 100.0),
-                                    net_edge_cents=float(net_edge * 100.0),
-                                    days_to_end_min=float(min(overpriced_subset.days_to_end, superset.days_to_end)),
-                                    liquidity_sum=float(overpriced_subset.liquidity_num + superset.liquidity_num),
-                                    volume_24h_sum=float(overpriced_subset.volume_24h + superset.volume_24h),
-                                )
-                            )
-
-                if args.relation in {"both", "disjoint"} and _is_strict_disjoint(
-                    a.bound_lo, a.bound_hi, b.bound_lo, b.bound_hi
-                ):
-                    gross_edge = (a.yes_price + b.yes_price) - 1.0
-                    net_edge = gross_edge - (2.0 * per_leg_cost)
-                    if gross_edge >= min_gross_edge and net_edge >= min_net_edge:
-                        basket_cost = (1.0 - a.yes_price) + (1.0 - b.yes_price)
-                        local_rows.append(
-                            GapCandidate(
-                                relation="disjoint_overlap",
-                                action="BUY NO(A) + NO(B)",
-                                event_key=event_key,
-                                event_title=a.event_title,
-                                market_a_id=a.market_id,
-                                market_a_question=a.question,
-                                market_a_yes=a.yes_price,
-                                market_a_no=a.no_price,
-                                market_a_bounds=_bounds_to_text(a.bound_lo, a.bound_hi),
-                                market_a_end_iso=a.end_iso,
-                                market_b_id=b.market_id,
-                                market_b_question=b.question,
-                                market_b_yes=b.yes_price,
-                                market_b_no=b.no_price,
-                                market_b_bounds=_bounds_to_text(b.bound_lo, b.bound_hi),
-                                market_b_end_iso=b.end_iso,
-                                basket_cost=float(basket_cost),
-                                payout_floor=1.0,
-                                payout_ceiling=2.0,
-                                gross_edge=float(gross_edge),
-                                net_edge=float(net_edge),
-                                gross_edge_cents=float(gross_edge * 100.0),
-                                net_edge_cents=float(net_edge * 100.0),
-                                days_to_end_min=float(min(a.days_to_end, b.days_to_end)),
-                                liquidity_sum=float(a.liquidity_num + b.liquidity_num),
-                                volume_24h_sum=float(a.volume_24h + b.volume_24h),
-                            )
-                        )
-
-        local_rows.sort(key=lambda r: (r.net_edge, r.gross_edge, r.liquidity_sum), reverse=True)
-        if args.max_pairs_per_event > 0:
-            local_rows = local_rows[: args.max_pairs_per_event]
+    events = [(k, v) for k, v in by_event.items() if len(v) >= 2]
+    event_considered = len(events)
+    pairs_scanned = sum(len(v) * (len(v) - 1) // 2 for _, v in events)
+    workers = int(args.workers) if int(args.workers) > 0 else (os.cpu_count() or 1)
+    for local_rows in _scan_gap_events(events, args, workers):
         candidates.extend(local_rows)
 
     candidates.sort(key=lambda r: (r.net_edge, r.gross_edge, r.liquidity_sum), reverse=True)
@@ -632,6 +766,7 @@ def run_gap(args: argparse.Namespace) -> int:
             "min_net_edge_cents": args.min_net_edge_cents,
             "per_leg_cost": args.per_leg_cost,
             "max_pairs_per_event": args.max_pairs_per_event,
+            "workers": args.workers,
             "exclude_keywords": exclude_keywords,
             "include_regex": args.include_regex,
             "exclude_regex": args.exclude_regex,
@@ -859,17 +994,8 @@ def build_closed_candidates(args: argparse.Namespace) -> Tuple[List[dict], Dict[
     }
 
     raw_rows: List[dict] = []
-    for i, offset in enumerate(offsets, 1):
-        params = {
-            "closed": "true",
-            "end_date_min": args.date_min,
-            "end_date_max": args.date_max,
-            "order": "endDate",
-            "ascending": "false",
-            "limit": str(args.page_size),
-            "offset": str(offset),
-        }
-        markets = fetch_markets_page(params)
+    pages = closed_market_pages(args, offsets, fetch_markets_json, log=safe_print, stats=stats)
+    for i, (offset, markets) in enumerate(pages, 1):
         if not markets:
             if args.sampling_mode == "contiguous":
                 break
@@ -943,15 +1069,13 @@ def build_closed_candidates(args: argparse.Namespace) -> Tuple[List[dict], Dict[
     return deduped, stats
 
 
-def fetch_entry_point(candidate: dict, args: argparse.Namespace) -> Optional[ClosedSample]:
-    start_ts = int(candidate["cutoff_ts"] - args.lookback_hours * 3600)
-    end_ts = int(candidate["cutoff_ts"])
+def fetch_prices_history(token: str, start_ts: int, end_ts: int, fidelity: int) -> Optional[list]:
     q = urlencode(
         {
-            "market": str(candidate["yes_token"]),
+            "market": str(token),
             "startTs": str(start_ts),
             "endTs": str(end_ts),
-            "fidelity": str(args.history_fidelity),
+            "fidelity": str(fidelity),
         }
     )
     url = f"{CLOB_API_BASE}/prices-history?{q}"
@@ -959,16 +1083,34 @@ def fetch_entry_point(candidate: dict, args: argparse.Namespace) -> Optional[Clo
     if not isinstance(data, dict):
         return None
     hist = data.get("history")
-    if not isinstance(hist, list) or not hist:
-        return None
-    history_points = len(hist)
+    return hist if isinstance(hist, list) else None
+
+
+def fetch_entry_point(
+    candidate: dict, args: argparse.Namespace, store: Optional[PriceHistoryStore] = None
+) -> Optional[ClosedSample]:
+    start_ts = int(candidate["cutoff_ts"] - args.lookback_hours * 3600)
+    end_ts = int(candidate["cutoff_ts"])
+    if store is not None:
+        hit = store.last_price(
+            str(candidate["yes_token"]), int(args.history_fidelity), start_ts, end_ts, fetch=fetch_prices_history
+        )
+        if hit is None:
+            return None
+        entry_ts, entry_yes, history_points = hit
+    else:
+        hist = fetch_prices_history(str(candidate["yes_token"]), start_ts, end_ts, args.history_fidelity)
+        if not hist:
+            return None
+        history_points = len(hist)
+
+        last = hist[-1] or {}
+        try:
+            entry_ts = int(last.get("t"))
+            entry_yes = float(last.get("p"))
+        except Exception:
+            return None
 
-    last = hist[-1] or {}
-    try:
-        entry_ts = int(last.get("t"))
-        entry_yes = float(last.get("p"))
-    except Exception:
-        return None
     if not (0.0 <= entry_yes <= 1.0):
         return None
 
@@ -1046,6 +1188,29 @@ def save_samples_csv(path: str, rows: List[ClosedSample]) -> None:
             writer.writerow(asdict(r))
 
 
+def sample_filter_mask(
+    rows: Iterable[ClosedSample],
+    include_rx: Optional[re.Pattern],
+    exclude_rx: Optional[re.Pattern],
+    exclude_keywords: List[str],
+    min_liquidity: float,
+    min_volume_24h: float,
+    min_history_points: int,
+    max_stale_hours: float,
+) -> List[bool]:
+    """Every subset_rows() filter except the yes-price band, evaluated once per sample."""
+    out: List[bool] = []
+    for r in rows:
+        out.append(
+            not (float(r.liquidity_num) < float(min_liquidity))
+            and not (float(r.volume_24h) < float(min_volume_24h))
+            and not (int(r.history_points) < int(min_history_points))
+            and not (float(r.stale_h) > float(max_stale_hours))
+            and question_allowed(r.question, include_rx, exclude_rx, exclude_keywords)
+        )
+    return out
+
+
 def subset_rows(
     rows: Iterable[ClosedSample],
     yes_min: float,
@@ -1058,22 +1223,22 @@ def subset_rows(
     min_history_points: int,
     max_stale_hours: float,
 ) -> List[ClosedSample]:
-    out: List[ClosedSample] = []
-    for r in rows:
-        if not (yes_min <= r.entry_yes_price <= yes_max):
-            continue
-        if float(r.liquidity_num) < float(min_liquidity):
-            continue
-        if float(r.volume_24h) < float(min_volume_24h):
-            continue
-        if int(r.history_points) < int(min_history_points):
-            continue
-        if float(r.stale_h) > float(max_stale_hours):
-            continue
-        if not question_allowed(r.question, include_rx, exclude_rx, exclude_keywords):
-            continue
-        out.append(r)
-    return out
+    rows = list(rows)
+    mask = sample_filter_mask(
+        rows,
+        include_rx,
+        exclude_rx,
+        exclude_keywords,
+        min_liquidity,
+        min_volume_24h,
+        min_history_points,
+        max_stale_hours,
+    )
+    return [r for r, ok in zip(rows, mask) if ok and yes_min <= r.entry_yes_price <= yes_max]
+
+
+def _risk_order_key(r: ClosedSample) -> Tuple[int, int, str]:
+    return (r.entry_ts, r.end_ts, r.market_id)
 
 
 def apply_risk_caps(
@@ -1081,7 +1246,7 @@ def apply_risk_caps(
     max_open_positions: int,
     max_open_per_category: int,
 ) -> Tuple[List[ClosedSample], Dict[str, int]]:
-    ordered = sorted(rows, key=lambda r: (r.entry_ts, r.end_ts, r.market_id))
+    ordered = sorted(rows, key=_risk_order_key)
     stats = {
         "input_n": len(ordered),
         "kept_n": 0,
@@ -1116,7 +1281,15 @@ def apply_risk_caps(
 
 
 def metrics(rows: List[ClosedSample], per_trade_cost: float = 0.0) -> dict:
-    if not rows:
+    return _metrics_values(
+        [r.pnl_per_no_share for r in rows],
+        [r.no_entry_price for r in rows],
+        per_trade_cost,
+    )
+
+
+def _metrics_values(pnl_values: List[float], costs: List[float], per_trade_cost: float = 0.0) -> dict:
+    if not pnl_values:
         return {
             "n": 0,
             "wins": 0,
@@ -1130,13 +1303,12 @@ def metrics(rows: List[ClosedSample], per_trade_cost: float = 0.0) -> dict:
             "worst_loss": 0.0,
         }
 
-    pnl_values = [r.pnl_per_no_share for r in rows]
     total_pnl = float(sum(pnl_values))
-    total_cost = float(sum(r.no_entry_price for r in rows))
-    n = len(rows)
+    total_cost = float(sum(costs))
+    n = len(pnl_values)
     adj_pnl = total_pnl - per_trade_cost * n
     adj_cost = total_cost + per_trade_cost * n
-    wins = sum(1 for v in pnl_values if v > 0.0)
+    wins = sum(map((0.0).__lt__, pnl_values))
     losses = n - wins
     cap_ret = (adj_pnl / adj_cost) if adj_cost > 1e-12 else 0.0
     return {
@@ -1153,6 +1325,52 @@ def metrics(rows: List[ClosedSample], per_trade_cost: float = 0.0) -> dict:
     }
 
 
+class YesBandGrid:
+    """
+    Filter-passing train rows of one fold, for scoring many (yes_min, yes_max) bands.
+
+    Rows are held in apply_risk_caps() order with a price-rank index, so a band is
+    a rank range turned into a compress() mask; bands admitting the same rows share
+    one metrics() result. Sums run in the same row order as the per-band path, so
+    metrics are identical.
+    """
+
+    def __init__(self, rows: List[ClosedSample]):
+        # NaN prices never fall inside a band; keep them out of the rank index.
+        self.rows = sorted((r for r in rows if r.entry_yes_price == r.entry_yes_price), key=_risk_order_key)
+        prices = [r.entry_yes_price for r in self.rows]
+        order = sorted(range(len(prices)), key=prices.__getitem__)
+        self.sorted_prices = [prices[i] for i in order]
+        self.rank = [0] * len(order)
+        for k, i in enumerate(order):
+            self.rank[i] = k
+        self.pnl = [r.pnl_per_no_share for r in self.rows]
+        self.cost = [r.no_entry_price for r in self.rows]
+        self._memo: Dict[Tuple[int, int, int, int, float], dict] = {}
+
+    def band_metrics(
+        self,
+        yes_min: float,
+        yes_max: float,
+        max_open_positions: int,
+        max_open_per_category: int,
+        per_trade_cost: float,
+    ) -> dict:
+        lo = bisect.bisect_left(self.sorted_prices, yes_min)
+        hi = max(lo, bisect.bisect_right(self.sorted_prices, yes_max))
+        key = (lo, hi, int(max_open_positions), int(max_open_per_category), float(per_trade_cost))
+        m = self._memo.get(key)
+        if m is None:
+            mask = list(map(range(lo, hi).__contains__, self.rank))
+            if max_open_positions > 0 or max_open_per_category > 0:
+                kept, _ = apply_risk_caps(list(compress(self.rows, mask)), max_open_positions, max_open_per_category)
+                m = metrics(kept, per_trade_cost=per_trade_cost)
+            else:
+                m = _metrics_values(list(compress(self.pnl, mask)), list(compress(self.cost, mask)), per_trade_cost)
+            self._memo[key] = m
+        return m
+
+
 def performance_window(rows: List[ClosedSample], capital_return: float) -> dict:
     if not rows:
         return {
@@ -1207,14 +1425,19 @@ def run_walkforward(args: argparse.Namespace) -> int:
             f"deduped={ingest_stats['deduped_candidates']}"
         )
         rows = []
-        with ThreadPoolExecutor(max_workers=args.workers) as ex:
-            futs = [ex.submit(fetch_entry_point, c, args) for c in candidates]
-            for i, f in enumerate(as_completed(futs), 1):
-                r = f.result()
-                if r is not None:
-                    rows.append(r)
-                if i % args.progress_every == 0:
-                    safe_print(f"[walkforward] priced {i}/{len(futs)} | usable={len(rows)}")
+        store = PriceHistoryStore(args.history_db) if args.history_db else None
+        try:
+            with ThreadPoolExecutor(max_workers=args.workers) as ex:
+                futs = [ex.submit(fetch_entry_point, c, args, store) for c in candidates]
+                for i, f in enumerate(as_completed(futs), 1):
+                    r = f.result()
+                    if r is not None:
+                        rows.append(r)
+                    if i % args.progress_every == 0:
+                        safe_print(f"[walkforward] priced {i}/{len(futs)} | usable={len(rows)}")
+        finally:
+            if store is not None:
+                store.close()
 
         ingest_stats["loaded_from_csv"] = False
         ingest_stats["usable_with_price"] = len(rows)
@@ -1256,10 +1479,23 @@ def run_walkforward(args: argparse.Namespace) -> int:
     fixed_metrics = metrics(fixed_rows, per_trade_cost=args.per_trade_cost)
     fixed_window = performance_window(fixed_rows, fixed_metrics["capital_return"])
 
+    # Question regex/keyword and liquidity/volume/history/staleness filters: once per sample.
+    allowed = sample_filter_mask(
+        rows,
+        include_rx,
+        exclude_rx,
+        exclude_keywords,
+        args.min_liquidity,
+        args.min_volume_24h,
+        args.min_history_points,
+        args.max_stale_hours,
+    )
     period_rows: Dict[str, List[ClosedSample]] = {}
-    for r in rows:
+    for r, ok in zip(rows, allowed):
         k = period_key(r.end_ts, args.period_frequency)
-        period_rows.setdefault(k, []).append(r)
+        bucket = period_rows.setdefault(k, [])
+        if ok:
+            bucket.append(r)
     periods = sorted(period_rows.keys(), key=lambda x: period_sort_key(x, args.period_frequency))
 
     folds: List[dict] = []
@@ -1267,7 +1503,7 @@ def run_walkforward(args: argparse.Namespace) -> int:
     for i in range(args.min_train_periods, len(periods)):
         train_keys = periods[:i]
         test_key = periods[i]
-        train_rows = [r for k in train_keys for r in period_rows.get(k, [])]
+        grid = YesBandGrid([r for k in train_keys for r in period_rows.get(k, [])])
         test_pool = period_rows.get(test_key, [])
 
         best: Optional[Tuple[float, float, dict]] = None
@@ -1275,24 +1511,13 @@ def run_walkforward(args: argparse.Namespace) -> int:
             for y1 in yes_max_grid:
                 if y0 > y1:
                     continue
-                train_subset = subset_rows(
-                    train_rows,
+                m = grid.band_metrics(
                     y0,
                     y1,
-                    include_rx,
-                    exclude_rx,
-                    exclude_keywords,
-                    args.min_liquidity,
-                    args.min_volume_24h,
-                    args.min_history_points,
-                    args.max_stale_hours,
-                )
-                train_subset, _train_risk_caps = apply_risk_caps(
-                    train_subset,
                     args.max_open_positions,
                     args.max_open_per_category,
+                    args.per_trade_cost,
                 )
-                m = metrics(train_subset, per_trade_cost=args.per_trade_cost)
                 if m["n"] < args.min_train_n:
                     continue
                 score = float(m["capital_return"])
@@ -1319,18 +1544,7 @@ def run_walkforward(args: argparse.Namespace) -> int:
             continue
 
         y0, y1, train_m = best
-        test_subset_raw = subset_rows(
-            test_pool,
-            y0,
-            y1,
-            include_rx,
-            exclude_rx,
-            exclude_keywords,
-            args.min_liquidity,
-            args.min_volume_24h,
-            args.min_history_points,
-            args.max_stale_hours,
-        )
+        test_subset_raw = [r for r in test_pool if y0 <= r.entry_yes_price <= y1]
         test_subset, test_risk_caps = apply_risk_caps(
             test_subset_raw,
             args.max_open_positions,
@@ -1388,6 +1602,7 @@ def run_walkforward(args: argparse.Namespace) -> int:
             "history_fidelity": args.history_fidelity,
             "min_duration_days": args.min_duration_days,
             "workers": args.workers,
+            "history_db": args.history_db,
             "per_trade_cost": args.per_trade_cost,
             "max_open_positions": args.max_open_positions,
             "max_open_per_category": args.max_open_per_category,
@@ -1528,6 +1743,7 @@ def build_parser() -> argparse.ArgumentParser:
     pg.add_argument("--min-net-edge-cents", type=float, default=0.0, help="Minimum net edge to keep candidate.")
     pg.add_argument("--per-leg-cost", type=float, default=0.0, help="Flat cost per leg in share-price units.")
     pg.add_argument("--max-pairs-per-event", type=int, default=20, help="Keep at most N best candidates per event.")
+    pg.add_argument("--workers", type=int, default=1, help="Processes for the per-event pair scan (0=all cores).")
     pg.add_argument(
         "--exclude-keywords",
         default=",".join(DEFAULT_EXCLUDE_KEYWORDS),
@@ -1550,6 +1766,7 @@ def build_parser() -> argparse.ArgumentParser:
     pw.add_argument("--date-max", default=utc_day(), help="Closed market end-date maximum (YYYY-MM-DD).")
     pw.add_argument("--sampling-mode", choices=["stratified", "contiguous"], default="stratified")
     pw.add_argument("--page-size", type=int, default=500, help="Rows per markets page.")
+    add_catalog_args(pw)
     pw.add_argument("--max-pages", type=int, default=120, help="Used when --sampling-mode contiguous.")
     pw.add_argument("--offset-start", type=int, default=0, help="Used when --sampling-mode stratified.")
     pw.add_argument("--offset-step", type=int, default=5000, help="Used when --sampling-mode stratified.")
@@ -1561,6 +1778,11 @@ def build_parser() -> argparse.ArgumentParser:
     pw.add_argument("--history-fidelity", type=int, default=60, help="prices-history fidelity parameter.")
     pw.add_argument("--min-duration-days", type=float, default=14.0, help="Minimum market lifetime.")
     pw.add_argument("--workers", type=int, default=16, help="Parallel workers for prices-history fetch.")
+    pw.add_argument(
+        "--history-db",
+        default=DEFAULT_HISTORY_DB,
+        help="Local prices-history store; only windows it does not hold are fetched (''=always fetch).",
+    )
     pw.add_argument("--min-liquidity", type=float, default=0.0, help="Minimum liquidityNum/liquidity filter.")
     pw.add_argument("--min-volume-24h", type=float, default=0.0, help="Minimum volume24hr filter.")
     pw.add_argument("--min-history-points", type=int, default=0, help="Minimum prices-history points in lookback window.")
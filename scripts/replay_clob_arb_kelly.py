@@ -6,17 +6,19 @@ Replay CLOB arb monitor metrics and estimate fractional Kelly scales (observe-on
 from __future__ import annotations
 
 import argparse
+import bisect
 import datetime as dt
-import glob
 import json
 import math
-import os
 import random
 import statistics
 import time
+from array import array
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import List, Optional
+
+from lib.metrics_loader import add_loader_args, iter_batches, json_loads, loader_kwargs, resolve_files
 
 
 def now_utc() -> dt.datetime:
@@ -57,7 +59,12 @@ def clamp(x: float, lo: float, hi: float) -> float:
 def percentile(values: List[float], q: float) -> Optional[float]:
     if not values:
         return None
-    arr = sorted(float(x) for x in values)
+    return _percentile_sorted(sorted(float(x) for x in values), q)
+
+
+def _percentile_sorted(arr, q: float) -> Optional[float]:
+    if not arr:
+        return None
     if len(arr) == 1:
         return arr[0]
     qq = clamp(float(q), 0.0, 1.0)
@@ -100,32 +107,8 @@ def parse_scales(raw: str) -> List[float]:
     return out
 
 
-def resolve_metric_files(metrics_file: str, metrics_glob: str) -> List[str]:
-    paths: List[str] = []
-    base = (metrics_file or "").strip()
-    if base:
-        for p in base.split(","):
-            pp = p.strip()
-            if pp and os.path.exists(pp):
-                paths.append(pp)
-    if (metrics_glob or "").strip():
-        paths.extend(glob.glob(metrics_glob.strip()))
-    uniq = sorted({os.path.abspath(p) for p in paths if os.path.exists(p)})
-    return uniq
-
-
-def iter_metric_rows(path: str) -> Iterable[dict]:
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
-        for line in f:
-            line = (line or "").strip()
-            if not line:
-                continue
-            try:
-                o = json.loads(line)
-            except Exception:
-                continue
-            if isinstance(o, dict):
-                yield o
+def resolve_metric_files(metrics_file: str, metrics_glob: str, rotated: bool = False) -> List[str]:
+    return resolve_files(metrics_file, metrics_glob, rotated=rotated)
 
 
 @dataclass(frozen=True)
@@ -138,31 +121,31 @@ class ReplaySample:
     proxy_return: float
 
 
-def _pick_edge_cost(row: dict, edge_mode: str) -> tuple[float, float]:
+def _pick_edge_cost(
+    edge_raw: float, cost_observed: float, edge_exec: float, cost_exec: float, edge_mode: str
+) -> tuple[float, float]:
     if edge_mode == "exec":
-        edge = as_float(row.get("net_edge_exec_est"), math.nan)
-        cost = as_float(row.get("basket_cost_exec_est"), math.nan)
+        edge, cost = edge_exec, cost_exec
         if not math.isfinite(edge):
-            edge = as_float(row.get("net_edge_raw"), math.nan)
+            edge = edge_raw
         if not math.isfinite(cost) or cost <= 0:
-            cost = as_float(row.get("basket_cost_observed"), math.nan)
+            cost = cost_observed
         return edge, cost
 
-    edge = as_float(row.get("net_edge_raw"), math.nan)
-    cost = as_float(row.get("basket_cost_observed"), math.nan)
+    edge, cost = edge_raw, cost_observed
     if not math.isfinite(edge):
-        edge = as_float(row.get("net_edge_exec_est"), math.nan)
+        edge = edge_exec
     if not math.isfinite(cost) or cost <= 0:
-        cost = as_float(row.get("basket_cost_exec_est"), math.nan)
+        cost = cost_exec
     return edge, cost
 
 
-def _pick_fill_ratio(row: dict, mode: str) -> float:
+def _pick_fill_ratio(fill_avg: float, fill_min: float, mode: str) -> float:
     if mode == "none":
         return 1.0
     if mode == "avg":
-        return clamp(as_float(row.get("fill_ratio_avg"), 1.0), 0.0, 1.0)
-    return clamp(as_float(row.get("fill_ratio_min"), 1.0), 0.0, 1.0)
+        return clamp(fill_avg, 0.0, 1.0)
+    return clamp(fill_min, 0.0, 1.0)
 
 
 def _dedupe_key(row: dict) -> str:
@@ -174,7 +157,49 @@ def _dedupe_key(row: dict) -> str:
     )
 
 
-def load_samples(files: List[str], args) -> tuple[List[ReplaySample], int]:
+# Metric columns load_samples() reads; bump METRIC_ROW_VERSION when _metric_values changes.
+METRIC_ROW_VERSION = "1"
+METRIC_COLUMNS = (
+    ("ts_ms", "q"),
+    ("key", "s"),
+    ("passes", "b"),
+    ("edge_raw", "d"),
+    ("cost_observed", "d"),
+    ("edge_exec", "d"),
+    ("cost_exec", "d"),
+    ("fill_avg", "d"),
+    ("fill_min", "d"),
+    ("worst_stale_sec", "d"),
+)
+
+
+def _metric_values(line: str) -> Optional[tuple]:
+    try:
+        row = json_loads(line)
+    except Exception:
+        return None
+    if not isinstance(row, dict):
+        return None
+    return (
+        parse_ts_ms(row),
+        _dedupe_key(row),
+        1 if as_bool(row.get("passes_raw_threshold")) else 0,
+        as_float(row.get("net_edge_raw"), math.nan),
+        as_float(row.get("basket_cost_observed"), math.nan),
+        as_float(row.get("net_edge_exec_est"), math.nan),
+        as_float(row.get("basket_cost_exec_est"), math.nan),
+        as_float(row.get("fill_ratio_avg"), 1.0),
+        as_float(row.get("fill_ratio_min"), 1.0),
+        as_float(row.get("worst_book_stale_sec"), 0.0),
+    )
+
+
+def load_samples(files: List[str], args, index_dir: str = "", use_index: bool = True) -> tuple[List[ReplaySample], int]:
+    """
+    Replay samples from metrics files via lib/metrics_loader.py. With --hours the
+    cutoff is pushed down to the loader, so rows_read counts rows inside the window
+    (plus rows without a timestamp, which are always kept).
+    """
     out: List[ReplaySample] = []
     rows_read = 0
 
@@ -184,33 +209,45 @@ def load_samples(files: List[str], args) -> tuple[List[ReplaySample], int]:
     min_gap_ms = max(0, int(args.min_gap_ms_per_event or 0))
     last_ts_by_key: dict[str, int] = {}
 
-    for path in files:
-        for row in iter_metric_rows(path):
+    batches = iter_batches(
+        files,
+        METRIC_COLUMNS,
+        _metric_values,
+        "ts_ms",
+        since=cutoff_ms if cutoff_ms > 0 else None,
+        version=METRIC_ROW_VERSION,
+        index_dir=index_dir,
+        use_index=use_index,
+    )
+    for _path, table in batches:
+        c = table.cols
+        keys = table.strings["key"]
+        cols = (
+            c["ts_ms"], c["key"], c["passes"], c["edge_raw"], c["cost_observed"], c["edge_exec"], c["cost_exec"],
+            c["fill_avg"], c["fill_min"], c["worst_stale_sec"],
+        )
+        for ts_ms, ki, passes, edge_raw, cost_obs, edge_exec, cost_exec, fill_avg, fill_min, worst_stale_sec in zip(*cols):
             rows_read += 1
 
-            ts_ms = parse_ts_ms(row)
-            if cutoff_ms > 0 and ts_ms > 0 and ts_ms < cutoff_ms:
-                continue
             if min_gap_ms > 0 and ts_ms > 0:
-                key = _dedupe_key(row)
+                key = keys[ki]
                 if key:
                     last_ts = int(last_ts_by_key.get(key, 0) or 0)
                     if last_ts > 0 and (ts_ms - last_ts) < min_gap_ms:
                         continue
                     last_ts_by_key[key] = ts_ms
-            if args.require_threshold_pass and not as_bool(row.get("passes_raw_threshold")):
+            if args.require_threshold_pass and not passes:
                 continue
 
-            edge, cost = _pick_edge_cost(row, args.edge_mode)
+            edge, cost = _pick_edge_cost(edge_raw, cost_obs, edge_exec, cost_exec, args.edge_mode)
             if not math.isfinite(edge) or not math.isfinite(cost) or cost <= 0:
                 continue
             if edge < float(args.min_edge_usd):
                 continue
 
-            fill_ratio = _pick_fill_ratio(row, args.fill_ratio_mode)
+            fill_ratio = _pick_fill_ratio(fill_avg, fill_min, args.fill_ratio_mode)
             if fill_ratio < float(args.min_fill_ratio):
                 continue
-            worst_stale_sec = as_float(row.get("worst_book_stale_sec"), 0.0)
             if not math.isfinite(worst_stale_sec):
                 worst_stale_sec = 0.0
             if float(args.max_worst_stale_sec) > 0 and worst_stale_sec > float(args.max_worst_stale_sec):
@@ -266,54 +303,96 @@ def expected_log_growth(returns: List[float], fraction: float) -> float:
     return float(statistics.mean(vals)) if vals else float("-inf")
 
 
-def bootstrap_growth(
+BOOTSTRAP_BANDS = (0.01, 0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95, 0.99)
+
+
+def _log_growth_table(returns: List[float], fraction: float) -> List[float]:
+    f = max(0.0, float(fraction))
+    out: List[float] = []
+    for r in returns:
+        x = 1.0 + (f * float(r))
+        out.append(math.log(x) if x > 0 else float("-inf"))
+    return out
+
+
+def _empty_bootstrap(iters: int, sample_size: int) -> dict:
+    return {
+        "iterations": int(iters),
+        "sample_size": int(sample_size),
+        "mean_log_growth": None,
+        "p05_log_growth": None,
+        "p50_log_growth": None,
+        "p95_log_growth": None,
+        "prob_negative_log_growth": None,
+        "prob_ruin": None,
+        "percentiles": {},
+    }
+
+
+def bootstrap_growth_multi(
     returns: List[float],
-    fraction: float,
+    fractions: List[float],
     iters: int,
     draw_n: int,
     rng: random.Random,
-) -> dict:
+) -> List[dict]:
+    """
+    Bootstrap mean log growth for several Kelly fractions at once.
+
+    Each iteration draws one resample of `draw_n` indices (common to every
+    fraction) and scores it against per-fraction log(1 + f*r) tables, so the
+    cost is one draw plus one fsum per fraction rather than a fresh resample and
+    log pass per fraction. Iterations whose resample contains a return with
+    1 + f*r <= 0 count towards `prob_ruin` and are excluded from the growth
+    statistics (as before). Results depend only on `rng`'s seed.
+    """
     n = len(returns)
     if n <= 0 or iters <= 0:
-        return {
-            "iterations": 0,
-            "sample_size": 0,
-            "mean_log_growth": None,
-            "p05_log_growth": None,
-            "p50_log_growth": None,
-            "p95_log_growth": None,
-            "prob_negative_log_growth": None,
-        }
+        return [_empty_bootstrap(0, 0) for _ in fractions]
 
     m = max(1, int(draw_n or n))
-    gs: List[float] = []
+    tables = [_log_growth_table(returns, f) for f in fractions]
+    growth = [array("d") for _ in fractions]
+    ruined = [0] * len(fractions)
+    population = range(n)
     for _ in range(int(iters)):
-        sample = [returns[rng.randrange(n)] for _ in range(m)]
-        g = expected_log_growth(sample, fraction)
-        if math.isfinite(g):
-            gs.append(g)
-
-    if not gs:
-        return {
-            "iterations": int(iters),
-            "sample_size": int(m),
-            "mean_log_growth": None,
-            "p05_log_growth": None,
-            "p50_log_growth": None,
-            "p95_log_growth": None,
-            "prob_negative_log_growth": None,
-        }
-
-    neg = sum(1 for x in gs if x < 0.0)
-    return {
-        "iterations": int(iters),
-        "sample_size": int(m),
-        "mean_log_growth": float(statistics.mean(gs)),
-        "p05_log_growth": percentile(gs, 0.05),
-        "p50_log_growth": percentile(gs, 0.50),
-        "p95_log_growth": percentile(gs, 0.95),
-        "prob_negative_log_growth": float(neg) / float(len(gs)),
-    }
+        idx = rng.choices(population, k=m)
+        for k, table in enumerate(tables):
+            g = math.fsum(map(table.__getitem__, idx)) / m
+            if math.isfinite(g):
+                growth[k].append(g)
+            else:
+                ruined[k] += 1
+
+    out: List[dict] = []
+    for gs, ruin in zip(growth, ruined):
+        row = _empty_bootstrap(iters, m)
+        row["prob_ruin"] = float(ruin) / float(iters)
+        if gs:
+            arr = sorted(gs)
+            bands = {f"p{int(round(q * 100)):02d}": _percentile_sorted(arr, q) for q in BOOTSTRAP_BANDS}
+            row.update(
+                {
+                    "mean_log_growth": math.fsum(arr) / len(arr),
+                    "p05_log_growth": bands["p05"],
+                    "p50_log_growth": bands["p50"],
+                    "p95_log_growth": bands["p95"],
+                    "prob_negative_log_growth": float(bisect.bisect_left(arr, 0.0)) / float(len(arr)),
+                    "percentiles": bands,
+                }
+            )
+        out.append(row)
+    return out
+
+
+def bootstrap_growth(
+    returns: List[float],
+    fraction: float,
+    iters: int,
+    draw_n: int,
+    rng: random.Random,
+) -> dict:
+    return bootstrap_growth_multi(returns, [fraction], iters, draw_n, rng)[0]
 
 
 def default_metrics_path() -> str:
@@ -331,6 +410,7 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--metrics-file", default=default_metrics_path(), help="Metrics JSONL path (comma-separated allowed)")
     p.add_argument("--metrics-glob", default="", help="Optional glob for additional metrics files")
     p.add_argument("--hours", type=float, default=0.0, help="Only use rows from the last N hours (0=all)")
+    add_loader_args(p)
     p.add_argument("--edge-mode", choices=("raw", "exec"), default="exec", help="Edge/cost series to replay")
     p.add_argument(
         "--fill-ratio-mode",
@@ -349,7 +429,7 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--max-samples", type=int, default=0, help="Keep only most recent N samples (0=all)")
     p.add_argument("--max-full-kelly", type=float, default=1.0, help="Clamp for estimated full Kelly fraction")
     p.add_argument("--scales", default="0.25,0.50,1.00", help="Comma-separated fractions of full Kelly to evaluate")
-    p.add_argument("--bootstrap-iters", type=int, default=2000, help="Bootstrap iterations per scale (0=disable)")
+    p.add_argument("--bootstrap-iters", type=int, default=2000, help="Bootstrap iterations (resamples shared by all scales; 0=disable)")
     p.add_argument("--bootstrap-sample-size", type=int, default=0, help="Bootstrap draw size per iteration (0=use sample size)")
     p.add_argument("--seed", type=int, default=42, help="Random seed for bootstrap")
     p.add_argument("--out-json", default=default_out_path(), help="Output summary JSON path")
@@ -359,14 +439,14 @@ def parse_args() -> argparse.Namespace:
 
 def main() -> int:
     args = parse_args()
-    files = resolve_metric_files(args.metrics_file, args.metrics_glob)
+    files = resolve_metric_files(args.metrics_file, args.metrics_glob, rotated=args.with_rotated)
     if not files:
         print(
             f"No metrics files found. --metrics-file={args.metrics_file} --metrics-glob={args.metrics_glob}",
         )
         return 2
 
-    samples, rows_read = load_samples(files, args)
+    samples, rows_read = load_samples(files, args, **loader_kwargs(args))
     if not samples:
         print(f"No usable samples. rows_read={rows_read} files={len(files)}")
         return 1
@@ -380,16 +460,16 @@ def main() -> int:
 
     scale_rows = []
     draw_n = int(args.bootstrap_sample_size or 0)
-    for scale in scales:
-        f = float(scale) * float(full_kelly)
+    fractions = [float(scale) * float(full_kelly) for scale in scales]
+    boots = bootstrap_growth_multi(
+        returns=returns,
+        fractions=fractions,
+        iters=int(args.bootstrap_iters or 0),
+        draw_n=draw_n,
+        rng=rng,
+    )
+    for scale, f, boot in zip(scales, fractions, boots):
         exp_g = expected_log_growth(returns, f)
-        boot = bootstrap_growth(
-            returns=returns,
-            fraction=f,
-            iters=int(args.bootstrap_iters or 0),
-            draw_n=draw_n,
-            rng=rng,
-        )
         scale_rows.append(
             {
                 "scale_of_full_kelly": float(scale),
@@ -474,9 +554,13 @@ def main() -> int:
         p50_s = f"{float(p50):.8f}" if p50 is not None else "NA"
         p05_s = f"{float(p05):.8f}" if p05 is not None else "NA"
         pneg_s = f"{float(pneg):.2%}" if pneg is not None else "NA"
+        p95 = boot.get("p95_log_growth")
+        p95_s = f"{float(p95):.8f}" if p95 is not None else "NA"
+        ruin = boot.get("prob_ruin")
+        ruin_s = f"{float(ruin):.2%}" if ruin is not None else "NA"
         print(
             f"  scale={sc:.2f} effective={eff:.4f} "
-            f"E[log]={g_s} boot_p50={p50_s} boot_p05={p05_s} boot_neg={pneg_s}"
+            f"E[log]={g_s} boot_p50={p50_s} boot_p05={p05_s} boot_p95={p95_s} boot_neg={pneg_s} boot_ruin={ruin_s}"
         )
     print(f"Saved: {out_path}")
     return 0
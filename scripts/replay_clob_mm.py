@@ -0,0 +1,699 @@
+#!/usr/bin/env python3
+"""
+Offline replay simulator for polymarket_clob_mm.py (observe-only, no network).
+
+Drives the same quote helpers used by the live loop (`_quote_sizes`,
+`_desired_quotes`, `_quote_needs_refresh`, `_update_inventory_from_fill`)
+over recorded book/trade streams:
+  - book rows:   {"ts_ms", "token_id", "bids": [[p, s], ...], "asks": [[p, s], ...]}
+                 (written by polymarket_clob_mm.py --book-record-file)
+  - top-of-book: clob-mm metrics rows with best_bid/best_ask (no depth)
+  - trade rows:  {"ts_ms", "token_id"|"asset_id", "price", "size", "side"}
+
+Fill model (queue position):
+  - A new quote joins the back of its price level; the displayed size at that
+    level when the quote is placed is the queue ahead of us.
+  - Recorded level shrinkage moves us forward (queue_ahead=min(queue_ahead, level)).
+  - Trades at our price consume queue_ahead first, then our remaining size.
+  - Trades through our price, or the opposite best crossing our price, fill us fully.
+  - Fills reach inventory only on the next trade poll (`--trade-poll-sec`), like live.
+
+Parameter sweeps (comma-separated lists) are evaluated across processes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import glob
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lib.process_pool import pool_map
+from lib.runtime_common import parse_iso_or_epoch_to_ms
+from polymarket_clob_mm import (
+    RuntimeState,
+    TokenMMState,
+    TradeFill,
+    _book_mid,
+    _compute_total_pnl,
+    _desired_quotes,
+    _quote_needs_refresh,
+    _quote_sizes,
+    _update_inventory_from_fill,
+)
+
+
+_SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_BOOK_FILE = str(_SCRIPT_DIR.parent / "logs" / "clob-mm-books.jsonl")
+
+EVENT_BOOK = 0
+EVENT_TRADE = 1
+
+# (ts_sec, kind, token_id, payload)
+#   book payload:  (bids, asks) as tuples of (price, size), best-first
+#   trade payload: (price, size, taker_side)
+Event = Tuple[float, int, str, tuple]
+
+
+def as_float(value, default: float = math.nan) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_float_list(raw: str) -> List[float]:
+    out: List[float] = []
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        out.append(float(part))
+    return out
+
+
+def _parse_levels(levels, reverse: bool) -> Tuple[Tuple[float, float], ...]:
+    out: List[Tuple[float, float]] = []
+    for lv in levels or []:
+        if isinstance(lv, dict):
+            p = as_float(lv.get("price"))
+            sz = as_float(lv.get("size"))
+        elif isinstance(lv, (list, tuple)) and len(lv) >= 2:
+            p = as_float(lv[0])
+            sz = as_float(lv[1])
+        else:
+            continue
+        if not (math.isfinite(p) and math.isfinite(sz)) or p <= 0 or sz < 0:
+            continue
+        out.append((p, sz))
+    out.sort(key=lambda x: x[0], reverse=reverse)
+    return tuple(out)
+
+
+def _row_ts_ms(row: dict) -> int:
+    for key in ("ts_ms", "timestamp"):
+        ms = parse_iso_or_epoch_to_ms(row.get(key))
+        if ms:
+            return int(ms)
+    ts = str(row.get("ts") or "").strip()
+    if ts:
+        try:
+            return int(dt.datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").timestamp() * 1000.0)
+        except ValueError:
+            return int(parse_iso_or_epoch_to_ms(ts) or 0)
+    return 0
+
+
+def parse_event(row: dict) -> Optional[Event]:
+    if not isinstance(row, dict):
+        return None
+    tid = str(row.get("token_id") or row.get("asset_id") or "").strip()
+    if not tid:
+        return None
+    ts_ms = _row_ts_ms(row)
+    if ts_ms <= 0:
+        return None
+    ts = ts_ms / 1000.0
+
+    if "bids" in row or "asks" in row:
+        bids = _parse_levels(row.get("bids"), True)
+        asks = _parse_levels(row.get("asks"), False)
+        if not bids and not asks:
+            return None
+        return (ts, EVENT_BOOK, tid, (bids, asks))
+
+    if "best_bid" in row or "best_ask" in row:
+        # clob-mm metrics rows: top-of-book only, displayed size unknown.
+        bb = as_float(row.get("best_bid"), 0.0)
+        ba = as_float(row.get("best_ask"), 0.0)
+        bids = ((bb, 0.0),) if bb > 0 else ()
+        asks = ((ba, 0.0),) if ba > 0 else ()
+        if not bids and not asks:
+            return None
+        return (ts, EVENT_BOOK, tid, (bids, asks))
+
+    price = as_float(row.get("price"))
+    size = as_float(row.get("size"))
+    if math.isfinite(price) and math.isfinite(size) and price > 0 and size > 0:
+        side = str(row.get("side") or "").strip().upper()
+        return (ts, EVENT_TRADE, tid, (price, size, side))
+    return None
+
+
+def resolve_files(paths_csv: str, pattern: str) -> List[str]:
+    paths: List[str] = []
+    for p in (paths_csv or "").split(","):
+        p = p.strip()
+        if p and os.path.exists(p):
+            paths.append(p)
+    if (pattern or "").strip():
+        paths.extend(glob.glob(pattern.strip()))
+    return sorted({os.path.abspath(p) for p in paths if os.path.exists(p)})
+
+
+def load_events(
+    files: List[str],
+    since_ms: int = 0,
+    until_ms: int = 0,
+    token_ids: Optional[set] = None,
+) -> List[Event]:
+    events: List[Event] = []
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = (line or "").strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except Exception:
+                    continue
+                ev = parse_event(row)
+                if ev is None:
+                    continue
+                ts_ms = int(ev[0] * 1000.0)
+                if since_ms and ts_ms < since_ms:
+                    continue
+                if until_ms and ts_ms > until_ms:
+                    continue
+                if token_ids and ev[2] not in token_ids:
+                    continue
+                events.append(ev)
+    # Stable sort keeps file order for identical timestamps (book before trade within a row batch).
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+@dataclass(frozen=True)
+class ReplayConfig:
+    spread_cents: float
+    order_size_shares: float
+    max_inventory_shares: float
+    quote_refresh_sec: float
+    poll_sec: float = 2.0
+    trade_poll_sec: float = 15.0
+    order_reconcile_sec: float = 30.0
+    tick_size: float = 0.01
+    daily_loss_limit_usd: float = 0.0
+    inventory_sample_sec: float = 300.0
+    dd_penalty: float = 0.0
+
+
+@dataclass
+class SimOrder:
+    order_id: str
+    side: str
+    price: float
+    remaining: float
+    queue_ahead: float
+
+
+@dataclass
+class SimToken:
+    state: TokenMMState
+    buy: Optional[SimOrder] = None
+    sell: Optional[SimOrder] = None
+    last_step_ts: float = 0.0
+
+
+@dataclass(frozen=True)
+class ReplayResult:
+    spread_cents: float
+    order_size_shares: float
+    max_inventory_shares: float
+    quote_refresh_sec: float
+    fills_buy: int
+    fills_sell: int
+    bought_shares: float
+    sold_shares: float
+    buy_quote_updates: int
+    sell_quote_updates: int
+    quote_updates_per_hour: float
+    inventory_shares: float
+    max_inventory_shares_seen: float
+    realized_pnl: float
+    unrealized_pnl: float
+    total_pnl: float
+    max_drawdown: float
+    halted: bool
+    score: float
+    inventory_path: List[List[float]] = field(default_factory=list)
+
+
+def _level_size(levels: Tuple[Tuple[float, float], ...], price: float) -> Optional[float]:
+    for p, sz in levels:
+        if abs(p - price) < 1e-9:
+            return sz
+    return None
+
+
+def _queue_ahead(levels: Tuple[Tuple[float, float], ...], price: float) -> float:
+    sz = _level_size(levels, price)
+    return float(sz) if sz is not None else 0.0
+
+
+def _fill_order(
+    tok: SimToken,
+    order: SimOrder,
+    qty: float,
+    ts: float,
+    pending: List[TradeFill],
+    counter: Dict[str, float],
+) -> None:
+    qty = min(qty, order.remaining)
+    if qty <= 1e-12:
+        return
+    order.remaining -= qty
+    counter["fill_seq"] += 1
+    pending.append(
+        TradeFill(
+            trade_id=f"sim-{int(counter['fill_seq'])}",
+            ts=ts,
+            created_at_raw=int(ts * 1000.0),
+            token_id=tok.state.token_id,
+            side=order.side,
+            price=order.price,
+            size=qty,
+        )
+    )
+    if order.side == "BUY":
+        counter["fills_buy"] += 1
+        counter["bought"] += qty
+    else:
+        counter["fills_sell"] += 1
+        counter["sold"] += qty
+    if order.remaining <= 1e-12:
+        if order.side == "BUY":
+            tok.buy = None
+        else:
+            tok.sell = None
+
+
+def _match_book(tok: SimToken, bids, asks, ts: float, pending: List[TradeFill], counter: Dict[str, float]) -> None:
+    best_bid = bids[0][0] if bids else None
+    best_ask = asks[0][0] if asks else None
+    if tok.buy is not None:
+        o = tok.buy
+        if best_ask is not None and best_ask <= o.price + 1e-12:
+            _fill_order(tok, o, o.remaining, ts, pending, counter)
+        else:
+            o.queue_ahead = min(o.queue_ahead, _queue_ahead(bids, o.price))
+    if tok.sell is not None:
+        o = tok.sell
+        if best_bid is not None and best_bid >= o.price - 1e-12:
+            _fill_order(tok, o, o.remaining, ts, pending, counter)
+        else:
+            o.queue_ahead = min(o.queue_ahead, _queue_ahead(asks, o.price))
+
+
+def _match_trade(tok: SimToken, price: float, size: float, taker_side: str, ts: float, pending, counter) -> None:
+    o = tok.buy
+    if o is not None and taker_side != "BUY":
+        if price < o.price - 1e-12:
+            _fill_order(tok, o, o.remaining, ts, pending, counter)
+        elif abs(price - o.price) <= 1e-12:
+            consumed = min(o.queue_ahead, size)
+            o.queue_ahead -= consumed
+            _fill_order(tok, o, size - consumed, ts, pending, counter)
+    o = tok.sell
+    if o is not None and taker_side != "SELL":
+        if price > o.price + 1e-12:
+            _fill_order(tok, o, o.remaining, ts, pending, counter)
+        elif abs(price - o.price) <= 1e-12:
+            consumed = min(o.queue_ahead, size)
+            o.queue_ahead -= consumed
+            _fill_order(tok, o, size - consumed, ts, pending, counter)
+
+
+def _quote_step(tok: SimToken, bids, asks, ts: float, cfg: ReplayConfig, counter: Dict[str, float]) -> None:
+    """One iteration of the live quote loop for a single token (execute-mode semantics)."""
+    s = tok.state
+    tick = float(s.tick_size or 0.01)
+    size, allow_buy, sell_size = _quote_sizes(
+        s.inventory_shares,
+        cfg.order_size_shares,
+        s.min_order_size,
+        cfg.max_inventory_shares,
+    )
+    best_bid = bids[0][0] if bids else None
+    best_ask = asks[0][0] if asks else None
+    if best_bid is None and best_ask is None:
+        return
+    mid = _book_mid(best_bid, best_ask)
+    if mid is None:
+        return
+    s.last_mid = mid
+    s.last_best_bid = float(best_bid or 0.0)
+    s.last_best_ask = float(best_ask or 0.0)
+
+    quotes = _desired_quotes(mid, best_bid, best_ask, tick, cfg.spread_cents)
+    if quotes is None:
+        return
+    desired_buy, desired_sell = quotes
+
+    now = ts
+    if (now - s.last_quote_ts) < 0.05:
+        return
+
+    # Live reconcile drops order ids that are no longer resting (filled).
+    if (now - float(s.last_reconcile_ts or 0.0)) >= float(cfg.order_reconcile_sec or 30.0):
+        s.last_reconcile_ts = now
+        if s.buy_order_id and tok.buy is None:
+            s.buy_order_id = ""
+        if s.sell_order_id and tok.sell is None:
+            s.sell_order_id = ""
+
+    if allow_buy:
+        if _quote_needs_refresh(bool(s.buy_order_id), s.buy_price, desired_buy, s.buy_ts, now, tick, cfg.quote_refresh_sec):
+            counter["order_seq"] += 1
+            s.buy_order_id = f"b{int(counter['order_seq'])}"
+            s.buy_price = desired_buy
+            s.buy_size = size
+            s.buy_ts = now
+            s.buy_quote_updates += 1
+            tok.buy = SimOrder(s.buy_order_id, "BUY", desired_buy, size, _queue_ahead(bids, desired_buy))
+    else:
+        s.buy_order_id = ""
+        tok.buy = None
+
+    if sell_size > 0.0 and sell_size >= float(s.min_order_size or 1.0):
+        if _quote_needs_refresh(
+            bool(s.sell_order_id),
+            s.sell_price,
+            desired_sell,
+            s.sell_ts,
+            now,
+            tick,
+            cfg.quote_refresh_sec,
+            quote_size=s.sell_size,
+            desired_size=sell_size,
+        ):
+            counter["order_seq"] += 1
+            s.sell_order_id = f"s{int(counter['order_seq'])}"
+            s.sell_price = desired_sell
+            s.sell_size = sell_size
+            s.sell_ts = now
+            s.sell_quote_updates += 1
+            tok.sell = SimOrder(s.sell_order_id, "SELL", desired_sell, sell_size, _queue_ahead(asks, desired_sell))
+    else:
+        s.sell_order_id = ""
+        tok.sell = None
+
+    s.last_quote_ts = now
+
+
+def simulate(events: List[Event], cfg: ReplayConfig) -> ReplayResult:
+    state = RuntimeState()
+    tokens: Dict[str, SimToken] = {}
+    pending: List[TradeFill] = []
+    counter: Dict[str, float] = {
+        "fill_seq": 0,
+        "order_seq": 0,
+        "fills_buy": 0,
+        "fills_sell": 0,
+        "bought": 0.0,
+        "sold": 0.0,
+    }
+    min_order_size = max(1.0, float(cfg.order_size_shares or 1.0))
+
+    last_trade_poll = 0.0
+    last_loop = 0.0
+    last_inv_sample = 0.0
+    peak = 0.0
+    max_dd = 0.0
+    max_inv = 0.0
+    inventory_path: List[List[float]] = []
+
+    def _flush_fills() -> None:
+        pending.sort(key=lambda x: x.ts)
+        for fill in pending:
+            t = tokens.get(fill.token_id)
+            if t is not None:
+                _update_inventory_from_fill(t.state, fill)
+        pending.clear()
+
+    for ts, kind, tid, payload in events:
+        tok = tokens.get(tid)
+        if tok is None:
+            st = TokenMMState(token_id=tid, label=f"token:{tid}", tick_size=float(cfg.tick_size or 0.01))
+            st.min_order_size = min_order_size
+            tok = SimToken(state=st)
+            tokens[tid] = tok
+            state.token_states[tid] = st
+
+        if kind == EVENT_TRADE:
+            price, size, side = payload
+            _match_trade(tok, price, size, side, ts, pending, counter)
+            continue
+
+        bids, asks = payload
+        _match_book(tok, bids, asks, ts, pending, counter)
+
+        if (ts - last_trade_poll) >= float(cfg.trade_poll_sec or 5.0):
+            last_trade_poll = ts
+            _flush_fills()
+
+        if state.halted:
+            continue
+
+        if (ts - tok.last_step_ts) >= float(cfg.poll_sec or 0.0):
+            tok.last_step_ts = ts
+            _quote_step(tok, bids, asks, ts, cfg, counter)
+
+        if (ts - last_loop) < float(cfg.poll_sec or 0.0):
+            continue
+        last_loop = ts
+
+        total = _compute_total_pnl(state)
+        day = dt.datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        if state.day_key != day:
+            state.day_key = day
+            state.day_pnl_anchor = total
+        peak = max(peak, total)
+        max_dd = max(max_dd, peak - total)
+        inv_total = sum(float(t.state.inventory_shares or 0.0) for t in tokens.values())
+        max_inv = max(max_inv, inv_total)
+        if cfg.inventory_sample_sec > 0 and (ts - last_inv_sample) >= cfg.inventory_sample_sec:
+            last_inv_sample = ts
+            inventory_path.append([int(ts * 1000.0), round(inv_total, 6), round(total, 6)])
+
+        if float(cfg.daily_loss_limit_usd or 0.0) > 0 and (total - state.day_pnl_anchor) <= -float(cfg.daily_loss_limit_usd):
+            state.halted = True
+            state.halt_reason = f"Daily loss guard hit at {dt.datetime.fromtimestamp(ts):%Y-%m-%d %H:%M:%S}"
+            for t in tokens.values():
+                t.buy = None
+                t.sell = None
+
+    _flush_fills()
+    total = _compute_total_pnl(state)
+    peak = max(peak, total)
+    max_dd = max(max_dd, peak - total)
+    realized = sum(float(t.state.realized_pnl or 0.0) for t in tokens.values())
+    inv_total = sum(float(t.state.inventory_shares or 0.0) for t in tokens.values())
+    max_inv = max(max_inv, inv_total)
+    if events:
+        inventory_path.append([int(events[-1][0] * 1000.0), round(inv_total, 6), round(total, 6)])
+
+    buy_updates = sum(int(t.state.buy_quote_updates) for t in tokens.values())
+    sell_updates = sum(int(t.state.sell_quote_updates) for t in tokens.values())
+    hours = ((events[-1][0] - events[0][0]) / 3600.0) if len(events) >= 2 else 0.0
+    churn = ((buy_updates + sell_updates) / hours) if hours > 0 else 0.0
+
+    return ReplayResult(
+        spread_cents=cfg.spread_cents,
+        order_size_shares=cfg.order_size_shares,
+        max_inventory_shares=cfg.max_inventory_shares,
+        quote_refresh_sec=cfg.quote_refresh_sec,
+        fills_buy=int(counter["fills_buy"]),
+        fills_sell=int(counter["fills_sell"]),
+        bought_shares=float(counter["bought"]),
+        sold_shares=float(counter["sold"]),
+        buy_quote_updates=buy_updates,
+        sell_quote_updates=sell_updates,
+        quote_updates_per_hour=churn,
+        inventory_shares=inv_total,
+        max_inventory_shares_seen=max_inv,
+        realized_pnl=realized,
+        unrealized_pnl=total - realized,
+        total_pnl=total,
+        max_drawdown=max_dd,
+        halted=bool(state.halted),
+        score=total - float(cfg.dd_penalty or 0.0) * max_dd,
+        inventory_path=inventory_path,
+    )
+
+
+def _simulate_config(cfg: ReplayConfig, events: List[Event]) -> ReplayResult:
+    return simulate(events, cfg)
+
+
+def run_sweep(events: List[Event], configs: List[ReplayConfig], workers: int) -> List[ReplayResult]:
+    out: List[Optional[ReplayResult]] = [None] * len(configs)
+    for i, res in pool_map(_simulate_config, configs, (events,), workers, max_chunk=len(configs)):
+        out[i] = res
+    return [r for r in out if r is not None]
+
+
+def build_configs(args) -> List[ReplayConfig]:
+    spreads = parse_float_list(args.spread_cents)
+    sizes = parse_float_list(args.order_size_shares)
+    max_invs = parse_float_list(args.max_inventory_shares)
+    refreshes = parse_float_list(args.quote_refresh_sec)
+    out: List[ReplayConfig] = []
+    for spr, sz, mi, ref in itertools.product(spreads, sizes, max_invs, refreshes):
+        if spr <= 0 or sz <= 0 or mi < 0 or ref <= 0:
+            continue
+        out.append(
+            ReplayConfig(
+                spread_cents=float(spr),
+                order_size_shares=float(sz),
+                max_inventory_shares=float(mi),
+                quote_refresh_sec=float(ref),
+                poll_sec=float(args.poll_sec),
+                trade_poll_sec=float(args.trade_poll_sec),
+                order_reconcile_sec=float(args.order_reconcile_sec),
+                tick_size=float(args.tick_size),
+                daily_loss_limit_usd=float(args.daily_loss_limit_usd),
+                inventory_sample_sec=float(args.inventory_sample_sec),
+                dd_penalty=float(args.dd_penalty),
+            )
+        )
+    return out
+
+
+def _format_table(rows: List[ReplayResult]) -> str:
+    header = "rank  spread(c)  size  max_inv  refresh(s)  fills(b/s)  quotes/h  inv_end  inv_max  pnl_total  realized  dd_max  score"
+    lines = [header]
+    for i, r in enumerate(rows, start=1):
+        lines.append(
+            f"{i:>4d}  "
+            f"{r.spread_cents:>9.2f}  "
+            f"{r.order_size_shares:>4.1f}  "
+            f"{r.max_inventory_shares:>7.1f}  "
+            f"{r.quote_refresh_sec:>10.1f}  "
+            f"{r.fills_buy:>4d}/{r.fills_sell:<5d}  "
+            f"{r.quote_updates_per_hour:>8.1f}  "
+            f"{r.inventory_shares:>7.1f}  "
+            f"{r.max_inventory_shares_seen:>7.1f}  "
+            f"{r.total_pnl:>+9.4f}  "
+            f"{r.realized_pnl:>+8.4f}  "
+            f"{r.max_drawdown:>6.4f}  "
+            f"{r.score:>+7.4f}"
+            + ("  HALT" if r.halted else "")
+        )
+    return "\n".join(lines)
+
+
+def _parse_window(args) -> Tuple[int, int]:
+    until_ms = 0
+    since_ms = 0
+    if args.until:
+        until_ms = int(dt.datetime.strptime(args.until, "%Y-%m-%d %H:%M:%S").timestamp() * 1000.0)
+    if args.since:
+        since_ms = int(dt.datetime.strptime(args.since, "%Y-%m-%d %H:%M:%S").timestamp() * 1000.0)
+    elif float(args.hours or 0.0) > 0:
+        end = until_ms or int(dt.datetime.now().timestamp() * 1000.0)
+        since_ms = end - int(float(args.hours) * 3600.0 * 1000.0)
+    return since_ms, until_ms
+
+
+def parse_args(argv: Optional[Iterable[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Replay polymarket_clob_mm quoting over recorded books/trades (observe-only)")
+    p.add_argument("--events-file", default=DEFAULT_BOOK_FILE, help="Book/trade JSONL path(s), comma-separated")
+    p.add_argument("--events-glob", default="", help="Optional glob for additional book/trade JSONL files")
+    p.add_argument("--token-ids", default="", help="Comma-separated token_ids to replay (empty=all in files)")
+    p.add_argument("--hours", type=float, default=0.0, help="Only use events from the last N hours (0=all)")
+    p.add_argument("--since", default="", help='Start timestamp "YYYY-MM-DD HH:MM:SS" (overrides --hours)')
+    p.add_argument("--until", default="", help='End timestamp "YYYY-MM-DD HH:MM:SS"')
+
+    p.add_argument("--spread-cents", default="3", help="Comma-separated total target spreads (cents)")
+    p.add_argument("--order-size-shares", default="5", help="Comma-separated order sizes (shares)")
+    p.add_argument("--max-inventory-shares", default="10", help="Comma-separated inventory caps (0=disabled)")
+    p.add_argument("--quote-refresh-sec", default="30", help="Comma-separated cancel/replace intervals (sec)")
+
+    p.add_argument("--poll-sec", type=float, default=2.0, help="Live book polling interval to emulate")
+    p.add_argument("--trade-poll-sec", type=float, default=15.0, help="Live fill polling interval to emulate")
+    p.add_argument("--order-reconcile-sec", type=float, default=30.0, help="Live open-order reconcile interval to emulate")
+    p.add_argument("--tick-size", type=float, default=0.01, help="Tick size used for all tokens")
+    p.add_argument("--daily-loss-limit-usd", type=float, default=0.0, help="Halt the replay on daily PnL <= -limit (0=disabled)")
+    p.add_argument("--inventory-sample-sec", type=float, default=300.0, help="Inventory/PnL path sampling interval (0=end only)")
+    p.add_argument("--dd-penalty", type=float, default=0.0, help="Score penalty weight for max drawdown (score=total-dd_penalty*dd)")
+
+    p.add_argument("--workers", type=int, default=0, help="Worker processes for sweeps (0=cpu count, 1=serial)")
+    p.add_argument("--top-n", type=int, default=10, help="Show top N configurations")
+    p.add_argument("--min-events", type=int, default=20, help="Minimum events required")
+    p.add_argument("--out-json", default="", help="Optional output JSON (all configs incl. inventory paths)")
+    return p.parse_args(list(argv) if argv is not None else None)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    args = parse_args(argv)
+    files = resolve_files(args.events_file, args.events_glob)
+    if not files:
+        print(f"No event files found: {args.events_file} {args.events_glob}".strip())
+        return 2
+
+    since_ms, until_ms = _parse_window(args)
+    token_filter = {x.strip() for x in (args.token_ids or "").split(",") if x.strip()} or None
+    events = load_events(files, since_ms=since_ms, until_ms=until_ms, token_ids=token_filter)
+    if len(events) < int(args.min_events):
+        print(f"Not enough events in window: {len(events)} < {int(args.min_events)}")
+        return 3
+
+    configs = build_configs(args)
+    if not configs:
+        print("No valid parameter configurations.")
+        return 4
+
+    workers = int(args.workers or 0) or (os.cpu_count() or 1)
+    workers = max(1, min(workers, len(configs)))
+    results = run_sweep(events, configs, workers)
+    ranked = sorted(
+        results,
+        key=lambda r: (r.score, r.total_pnl, -r.max_drawdown, -r.quote_updates_per_hour),
+        reverse=True,
+    )
+
+    span_sec = events[-1][0] - events[0][0]
+    n_tokens = len({e[2] for e in events})
+    n_trades = sum(1 for e in events if e[1] == EVENT_TRADE)
+    print(
+        f"Window: {dt.datetime.fromtimestamp(events[0][0]):%Y-%m-%d %H:%M:%S} -> "
+        f"{dt.datetime.fromtimestamp(events[-1][0]):%Y-%m-%d %H:%M:%S} | events={len(events)} "
+        f"(trades={n_trades}) tokens={n_tokens} files={len(files)}"
+    )
+    print(f"Search: configs={len(configs)} workers={workers}")
+    print(_format_table(ranked[: max(1, int(args.top_n))]))
+    totals = [r.total_pnl for r in results]
+    print(
+        "All configs: "
+        f"count={len(results)} pnl(mean/median/max)={statistics.mean(totals):+.4f}/"
+        f"{statistics.median(totals):+.4f}/{max(totals):+.4f} replay_span_h={span_sec / 3600.0:.2f}"
+    )
+
+    if args.out_json:
+        out = Path(args.out_json)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "generated_at": dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "files": files,
+            "events": len(events),
+            "tokens": n_tokens,
+            "span_sec": span_sec,
+            "results": [asdict(r) for r in ranked],
+        }
+        out.write_text(json.dumps(payload, ensure_ascii=True), encoding="utf-8")
+        print(f"Wrote {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
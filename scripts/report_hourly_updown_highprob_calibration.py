@@ -24,6 +24,8 @@ from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from lib.price_history_store import PriceHistoryStore
+
 try:
     from zoneinfo import ZoneInfo
 
@@ -131,11 +133,18 @@ def fetch_market_trades(
     page_size: int,
     max_trades: int,
     sleep_sec: float,
+    store: Optional[PriceHistoryStore] = None,
 ) -> List[dict]:
+    if store is not None:
+        cached = store.cached_trades(condition_id, max(1, int(max_trades)))
+        if cached is not None:
+            return cached
     rows: List[dict] = []
     offset = 0
     page_size = max(1, min(int(page_size), 500))
     max_trades = max(1, int(max_trades))
+    failed = False
+    exhausted = False
     while len(rows) < max_trades:
         batch = min(page_size, max_trades - len(rows))
         q = urlencode(
@@ -147,14 +156,22 @@ def fetch_market_trades(
         )
         url = f"{DATA_API_BASE}/trades?{q}"
         obj = _http_get_json(url, timeout_sec=20.0, retries=3)
-        if not isinstance(obj, list) or not obj:
+        if not isinstance(obj, list):
+            failed = True
+            break
+        if not obj:
+            exhausted = True
             break
         rows.extend(obj)
         if len(obj) < batch:
+            exhausted = True
             break
         offset += batch
         if sleep_sec > 0:
             time.sleep(max(0.0, float(sleep_sec)))
+    # Only closed markets reach here, so a complete fetch never changes.
+    if store is not None and not failed:
+        store.save_trades(condition_id, max_trades, rows, exhausted)
     return rows
 
 
@@ -337,6 +354,7 @@ def collect_market_samples(
     entry_max_age_minutes: int,
     price_min: float,
     price_max: float,
+    store: Optional[PriceHistoryStore] = None,
 ) -> List[SampleRow]:
     resolved = resolve_winner_and_loser(market)
     if resolved is None:
@@ -359,6 +377,7 @@ def collect_market_samples(
         page_size=int(page_size),
         max_trades=int(max_trades_per_market),
         sleep_sec=float(sleep_sec),
+        store=store,
     )
 
     total_valid = 0
@@ -591,6 +610,11 @@ def parse_args():
     p.add_argument("--page-size", type=int, default=500, help="Data API trades page size (max 500)")
     p.add_argument("--max-trades-per-market", type=int, default=3000, help="Cap fetched trades per market")
     p.add_argument("--sleep-sec", type=float, default=0.0, help="Optional sleep between market trade pages")
+    p.add_argument(
+        "--history-db",
+        default=str(LOGS_DIR / "prices_history.sqlite"),
+        help="Local store caching closed-market trade pages (''=always fetch)",
+    )
     p.add_argument("--out-json", default="", help="Output summary JSON path (simple filename -> logs/)")
     p.add_argument("--out-csv", default="", help="Output sample CSV path (simple filename -> logs/)")
     p.add_argument("--pretty", action="store_true", help="Pretty-print output JSON")
@@ -637,32 +661,38 @@ def main() -> int:
     markets_analyzed = 0
     markets_with_samples = 0
 
-    for asset, slug, slot_end_ts in jobs:
-        event_obj = fetch_gamma_event_by_slug(slug)
-        if not isinstance(event_obj, dict):
-            continue
-        events_found += 1
-        market = choose_best_closed_market(event_obj)
-        if not isinstance(market, dict):
-            continue
-        markets_analyzed += 1
-
-        market_rows = collect_market_samples(
-            asset=asset,
-            slug=slug,
-            slot_end_ts=int(slot_end_ts),
-            market=market,
-            page_size=int(args.page_size),
-            max_trades_per_market=int(args.max_trades_per_market),
-            sleep_sec=float(args.sleep_sec),
-            tte_minutes=int(args.tte_minutes),
-            entry_max_age_minutes=int(args.entry_max_age_minutes),
-            price_min=float(args.price_min),
-            price_max=float(args.price_max),
-        )
-        if market_rows:
-            markets_with_samples += 1
-            rows.extend(market_rows)
+    store = PriceHistoryStore(args.history_db) if args.history_db else None
+    try:
+        for asset, slug, slot_end_ts in jobs:
+            event_obj = fetch_gamma_event_by_slug(slug)
+            if not isinstance(event_obj, dict):
+                continue
+            events_found += 1
+            market = choose_best_closed_market(event_obj)
+            if not isinstance(market, dict):
+                continue
+            markets_analyzed += 1
+
+            market_rows = collect_market_samples(
+                asset=asset,
+                slug=slug,
+                slot_end_ts=int(slot_end_ts),
+                market=market,
+                page_size=int(args.page_size),
+                max_trades_per_market=int(args.max_trades_per_market),
+                sleep_sec=float(args.sleep_sec),
+                tte_minutes=int(args.tte_minutes),
+                entry_max_age_minutes=int(args.entry_max_age_minutes),
+                price_min=float(args.price_min),
+                price_max=float(args.price_max),
+                store=store,
+            )
+            if market_rows:
+                markets_with_samples += 1
+                rows.extend(market_rows)
+    finally:
+        if store is not None:
+            store.close()
 
     rows.sort(key=lambda x: (x.slot_end_ts, x.slug, x.outcome_index))
     summary = summarize(
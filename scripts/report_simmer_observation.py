@@ -22,6 +22,8 @@ from pathlib import Path
 from typing import Iterable, Optional
 from urllib.request import Request, urlopen
 
+from lib.metrics_loader import json_loads
+
 
 TS_RE = r"(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"
 WOULD_BUY_RE = re.compile(rf"^\[{TS_RE}\] would BUY ")
@@ -109,7 +111,7 @@ def iter_metrics(lines: Iterable[str]) -> Iterable[MetricRow]:
         if not line:
             continue
         try:
-            o = json.loads(line)
+            o = json_loads(line)
             ts = _parse_ts(str(o.get("ts") or ""))
             yield MetricRow(
                 ts=ts,
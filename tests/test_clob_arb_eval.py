@@ -374,3 +374,60 @@ def test_process_ws_raw_message_delegates_event_processing(monkeypatch):
     assert updated == 2.0
     assert set(calls) == {"event-1", "event-2"}
     assert live_ctx["state"] is state
+
+
+def test_size_ladder_matches_single_size_walks_and_finds_best_size():
+    basket = EventBasket(
+        key="k1",
+        title="Title",
+        strategy="yes-no",
+        legs=[
+            Leg(market_id="m1", question="q", label="yes", token_id="t1"),
+            Leg(market_id="m1", question="q", label="no", token_id="t2"),
+        ],
+    )
+    books = {
+        "t1": LocalBook(asks=[{"price": 0.40, "size": 4}, {"price": 0.45, "size": 4}, {"price": 0.70, "size": 100}], bids=[]),
+        "t2": LocalBook(asks=[{"price": 0.50, "size": 6}, {"price": 0.54, "size": 100}], bids=[]),
+    }
+    c = compute_candidate(
+        basket, books, shares_per_leg=4.0, winner_fee_rate=0.0, fixed_cost=0.1, size_ladder=[0.5, 1, 2, 4]
+    )
+    assert c is not None
+    assert c.shares_per_leg == 4.0
+    for sz, edge in c.size_ladder:
+        single = compute_candidate(basket, books, shares_per_leg=sz, winner_fee_rate=0.0, fixed_cost=0.1)
+        assert abs(single.net_edge - edge) < 1e-9
+    assert [sz for sz, _ in c.size_ladder] == [2.0, 4.0, 8.0, 16.0]
+    # Marginal basket ask: 0.90 -> 0.95 (t1 level 2 at 4) -> 0.99 (t2 level 2 at 6) -> 1.24 at 8.
+    assert c.marginal_zero_shares == 8.0
+    assert c.best_shares == 8.0
+
+    live = compute_candidate(
+        basket,
+        books,
+        shares_per_leg=4.0,
+        winner_fee_rate=0.0,
+        fixed_cost=0.1,
+        size_ladder=[0.5, 1, 2, 4],
+        ladder_live=True,
+    )
+    assert live.shares_per_leg == 8.0
+    assert abs(live.net_edge - c.best_net_edge) < 1e-9
+
+
+def test_size_ladder_respects_min_order_size():
+    basket = EventBasket(
+        key="k1",
+        title="Title",
+        strategy="buckets",
+        legs=[Leg(market_id="m1", question="q", label="yes", token_id="t1")],
+        min_order_size=5.0,
+    )
+    books = {"t1": LocalBook(asks=[{"price": 0.25, "size": 100}], bids=[])}
+    c = compute_candidate(
+        basket, books, shares_per_leg=4.0, winner_fee_rate=0.0, fixed_cost=0.0, size_ladder=[0.5, 2], ladder_live=True
+    )
+    assert [sz for sz, _ in c.size_ladder] == [8.0]
+    assert c.shares_per_leg == 8.0
+    assert compute_candidate(basket, books, shares_per_leg=4.0, winner_fee_rate=0.0, fixed_cost=0.0, size_ladder=[2]) is None
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import polymarket_clob_arb_scanner as scanner
+
+
+def _market(mid: int, event_id: str, label: str, ask: float) -> dict:
+    return {
+        "id": str(mid),
+        "question": f"Will the highest temperature in Testville be {label} on June 1?",
+        "groupItemTitle": label,
+        "clobTokenIds": json.dumps([f"y{mid}", f"n{mid}"]),
+        "outcomes": '["Yes", "No"]',
+        "events": [{"id": event_id, "title": f"Event {event_id}"}],
+        "_ask": ask,
+    }
+
+
+def _event(event_id: str, base: int, ask: float):
+    labels = ["59°F or below", "60-61°F", "62-63°F", "64°F or higher"]
+    return [_market(base + i, event_id, lb, ask) for i, lb in enumerate(labels)]
+
+
+def _install_books(monkeypatch, markets, calls, inflight):
+    asks = {}
+    for m in markets:
+        asks[f"y{m['id']}"] = m["_ask"]
+        asks[f"n{m['id']}"] = 0.99
+    lock = threading.Lock()
+
+    def fake_fetch(token_ids, workers=4, **_):
+        with lock:
+            inflight["now"] += 1
+            inflight["max"] = max(inflight["max"], inflight["now"])
+        calls.append(sorted(token_ids))
+        out = {t: {"asks": [{"price": str(asks[t]), "size": "100"}]} for t in token_ids if t in asks}
+        with lock:
+            inflight["now"] -= 1
+        return out
+
+    monkeypatch.setattr(scanner, "fetch_books_batch", fake_fetch)
+
+
+def test_iter_opportunities_fetches_per_event_and_matches_batch_result(monkeypatch):
+    markets = _event("A", 0, 0.20) + _event("B", 10, 0.30) + _event("C", 20, 0.22)
+    calls = []
+    inflight = {"now": 0, "max": 0}
+    _install_books(monkeypatch, markets, calls, inflight)
+
+    kw = dict(
+        shares_per_leg=5.0,
+        min_event_outcomes=4,
+        max_workers=8,
+        strategy="buckets",
+        winner_fee_rate=0.0,
+        fixed_cost=0.0,
+        max_inflight_events=2,
+    )
+    streamed = list(scanner.iter_opportunities(markets, **kw))
+    assert len(calls) == 3
+    assert all(len(c) == 4 for c in calls)
+    assert inflight["max"] <= 2
+    assert sorted(o.event_key for o in streamed) == ["event:A", "event:B", "event:C"]
+
+    ops = scanner.build_opportunities(markets, **kw)
+    assert [o.event_key for o in ops] == ["event:A", "event:C", "event:B"]
+    assert abs(ops[0].gross_edge - (5.0 - 4 * 5.0 * 0.20)) < 1e-9
+    assert ops[-1].gross_edge < 0
+
+
+def test_yes_no_pairs_share_the_event_fetch(monkeypatch):
+    markets = _event("A", 0, 0.005)
+    calls = []
+    _install_books(monkeypatch, markets, calls, {"now": 0, "max": 0})
+    ops = scanner.build_opportunities(
+        markets,
+        shares_per_leg=1.0,
+        min_event_outcomes=4,
+        max_workers=4,
+        strategy="both",
+        winner_fee_rate=0.0,
+        fixed_cost=0.0,
+    )
+    assert len(calls) == 1 and len(calls[0]) == 8
+    kinds = sorted(o.kind for o in ops)
+    assert kinds == ["buckets"] + ["yes-no"] * 4
+    row = scanner.opportunity_to_row(ops[0])
+    assert row["kind"] == ops[0].kind and len(row["legs"]) == len(ops[0].legs)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib import clob_books as books_mod
+
+
+def test_fetch_books_chunks_requests_and_keys_by_asset_id(monkeypatch):
+    client = books_mod.ClobBookClient(workers=3)
+    calls = []
+
+    def fake_post(token_ids):
+        calls.append(list(token_ids))
+        return {t: {"asset_id": t, "bids": [], "asks": []} for t in token_ids if t != "missing"}
+
+    monkeypatch.setattr(client, "post_books", fake_post)
+    ids = [f"t{i}" for i in range(7)] + ["missing", "t0"]
+    out = client.fetch_books(ids, chunk_size=3)
+    client.close()
+
+    assert sorted(len(c) for c in calls) == [2, 3, 3]
+    assert set(out) == {f"t{i}" for i in range(7)}
+
+
+def test_failed_batch_falls_back_to_single_book(monkeypatch):
+    client = books_mod.ClobBookClient(workers=1)
+
+    def failing_post(token_ids):
+        raise RuntimeError("HTTP 500")
+
+    monkeypatch.setattr(client, "post_books", failing_post)
+    monkeypatch.setattr(client, "get_book", lambda tid: {"asset_id": tid} if tid == "a" else None)
+    assert client.fetch_books(["a", "b"]) == {"a": {"asset_id": "a"}}
+
+
+def test_post_books_over_local_http_server():
+    seen = {"posts": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            seen["posts"] += 1
+            payload = json.dumps([{"asset_id": x["token_id"], "bids": [{"price": "0.4", "size": "10"}], "asks": []} for x in body]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    th = threading.Thread(target=srv.serve_forever, daemon=True)
+    th.start()
+    try:
+        client = books_mod.ClobBookClient(host=f"http://127.0.0.1:{srv.server_address[1]}", workers=2)
+        out = client.fetch_books([str(i) for i in range(5)], chunk_size=2)
+        client.close()
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    assert seen["posts"] == 3
+    assert sorted(out) == ["0", "1", "2", "3", "4"]
+    assert out["3"]["bids"][0]["price"] == "0.4"
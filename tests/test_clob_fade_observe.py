@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import copy
+import json
+import statistics
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import polymarket_clob_fade_observe as fade_mod
+
+
+def _feed(t: fade_mod.TokenState, mids, history_size: int = 60) -> None:
+    for m in mids:
+        fade_mod.update_token_from_book(
+            t,
+            {"best_bid": m - 0.01, "best_ask": m + 0.01, "mid": m, "spread": 0.02, "depth_bid": 50.0, "depth_ask": 40.0, "imbalance": 0.1},
+            history_size=history_size,
+        )
+
+
+def test_zscore_and_regime_stats_match_list_formulas():
+    mids = [0.50 + 0.01 * ((i * 7) % 5 - 2) for i in range(100)] + [0.58]
+    t = fade_mod.TokenState(token_id="t")
+    _feed(t, mids)
+    args = _consensus_args(zscore_lookback=40, zscore_entry=1.8)
+    fade_mod.zscore_signal(t, fade_mod.ConsensusParams.from_args(args))
+
+    window = mids[-60:][-40:]
+    expected = (window[-1] - statistics.mean(window)) / statistics.pstdev(window)
+    assert abs(t.zscore - expected) < 1e-9
+    assert len(t.mids) == 60 and len(t.returns) == 60
+    rets = [b - a for a, b in zip(mids[:-1], mids[1:])][-30:]
+    assert abs(t.returns.pstdev(30) - statistics.pstdev(rets)) < 1e-9
+
+
+def test_state_roundtrip_keeps_histories_compact(tmp_path: Path):
+    st = fade_mod.RuntimeState()
+    t = fade_mod.TokenState(token_id="t", label="x")
+    _feed(t, [0.4 + 0.001 * i for i in range(30)], history_size=20)
+    st.token_states["t"] = t
+    path = tmp_path / "state.json"
+    fade_mod.save_state(path, st)
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    assert "mids" not in raw["token_states"]["t"]
+    assert raw["token_states"]["t"]["last_mid"] == t.last_mid
+
+    back = fade_mod.load_state(path, history_size=20)
+    assert back.token_states["t"].mids.to_list() == t.mids.to_list()
+
+    # Older state files embedded histories (plain lists or base64 windows) in the JSON.
+    raw["token_states"]["t"]["mids"] = [0.1, 0.2, 0.3]
+    legacy_path = tmp_path / "legacy.json"
+    legacy_path.write_text(json.dumps(raw), encoding="utf-8")
+    legacy = fade_mod.load_state(legacy_path, history_size=20).token_states["t"]
+    assert legacy.mids.to_list() == [0.1, 0.2, 0.3]
+    _feed(legacy, [0.4], history_size=20)
+    assert legacy.mids.maxlen == 20 and legacy.mids.to_list() == [0.1, 0.2, 0.3, 0.4]
+
+
+def _consensus_args(**kw):
+    base = dict(
+        zscore_lookback=20,
+        zscore_entry=1.5,
+        velocity_window=4,
+        velocity_threshold_cents=1.0,
+        imbalance_threshold=0.2,
+        extreme_low=0.1,
+        extreme_high=0.9,
+        weight_zscore=1.0,
+        weight_velocity=0.8,
+        weight_imbalance=0.6,
+        weight_extreme=0.4,
+        consensus_min_score=0.5,
+        consensus_min_score_agree1=1.5,
+        consensus_min_score_agree2=1.0,
+        consensus_min_agree=1,
+        min_non_extreme_agree=0,
+        min_mid_prob=0.02,
+        max_mid_prob=0.98,
+        max_spread_cents=5.0,
+        min_depth_shares=1.0,
+        vol_lookback=10,
+        max_volatility_cents=10.0,
+        min_volatility_cents=0.0,
+    )
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def test_consensus_all_matches_per_token_evaluation():
+    import random
+
+    rng = random.Random(3)
+    args = _consensus_args()
+    tokens = []
+    for i in range(25):
+        t = fade_mod.TokenState(token_id=f"t{i}")
+        m = rng.uniform(0.05, 0.95)
+        mids = []
+        for _ in range(40):
+            m = min(0.99, max(0.01, m + rng.gauss(0.0, 0.01)))
+            mids.append(m)
+        mids.append(min(0.99, m + rng.choice([-0.05, 0.05])))
+        _feed(t, mids)
+        t.last_imbalance = rng.uniform(-0.6, 0.6)
+        tokens.append(t)
+
+    # Short and flat histories exercise the not-enough-data branches.
+    short = fade_mod.TokenState(token_id="short")
+    _feed(short, [0.5, 0.52, 0.49])
+    flat = fade_mod.TokenState(token_id="flat")
+    _feed(flat, [0.97] * 40)
+    tokens += [short, flat]
+
+    p = fade_mod.ConsensusParams.from_args(args)
+    copies = copy.deepcopy(tokens)
+    together = fade_mod.evaluate_consensus_all(tokens, p)
+    single = [fade_mod.evaluate_consensus(t, p) for t in copies]
+    assert together == single
+    assert any(side != 0 for side, _, _ in together)
+    fields = ["zscore", "bot_zscore", "velocity_move", "bot_velocity", "bot_imbalance", "bot_extreme",
+              "consensus_score", "consensus_side", "consensus_agree"]
+    for a, b in zip(tokens, copies):
+        assert [getattr(a, f) for f in fields] == [getattr(b, f) for f in fields]
+    assert fade_mod.evaluate_consensus_all([], p) == []
+
+
+def test_universe_refresher_runs_in_background_and_snapshots_args():
+    import threading
+
+    gate = threading.Event()
+    seen = {}
+
+    def slow_choose(a):
+        seen["max_tokens"] = a.max_tokens
+        gate.wait(5.0)
+        return [fade_mod.TokenState(token_id="x", label="X")]
+
+    args = SimpleNamespace(max_tokens=3)
+    r = fade_mod.UniverseRefresher(choose=slow_choose)
+    try:
+        assert r.submit(args) is True
+        assert r.submit(args) is False
+        args.max_tokens = 99
+        assert r.poll() is None and r.pending
+        gate.set()
+        tokens, err = r.poll(wait=True)
+        assert err is None and [t.token_id for t in tokens] == ["x"]
+        assert seen["max_tokens"] == 3
+        assert not r.pending
+
+        def broken(_a):
+            raise RuntimeError("gamma down")
+
+        r2 = fade_mod.UniverseRefresher(choose=broken)
+        r2.submit(args)
+        tokens, err = r2.poll(wait=True)
+        assert tokens == [] and isinstance(err, RuntimeError)
+        r2.close()
+    finally:
+        r.close()
+
+
+def test_feed_consumer_applies_universe_then_one_sample_per_step(tmp_path):
+    from collections import deque
+
+    from lib.clob_feature_feed import FeatureFeedReader, FeatureFeedWriter
+
+    path = tmp_path / "feed.jsonl"
+    w = FeatureFeedWriter(str(path))
+    tok = fade_mod.TokenState(token_id="a", market_id="m1", label="A?", tick_size=0.001, score=2.0)
+    w.publish_universe([fade_mod.universe_row(tok)])
+    for mid in (0.40, 0.42):
+        w.publish_sample({"a": {"best_bid": mid - 0.01, "best_ask": mid + 0.01, "mid": mid, "spread": 0.02}})
+
+    st = fade_mod.RuntimeState()
+    reader = FeatureFeedReader(str(path), from_start=True)
+    pending = deque()
+    sample, updates = fade_mod.next_feed_sample(reader, pending, st)
+    assert updates == 1 and st.active_token_ids == ["a"]
+    assert st.token_states["a"].tick_size == 0.001
+    assert sample["books"]["a"]["mid"] == 0.40
+    assert len(pending) == 1
+
+    sample, updates = fade_mod.next_feed_sample(reader, pending, st)
+    assert updates == 0 and sample["books"]["a"]["mid"] == 0.42
+    assert fade_mod.next_feed_sample(reader, pending, st) == (None, 0)
+
+
+def test_state_store_appends_history_and_skips_clean_scalar_writes(tmp_path: Path):
+    path = tmp_path / "state.json"
+    store = fade_mod.StateStore(path, history_size=50, min_interval_sec=3600.0)
+    st = store.load()
+    t = fade_mod.TokenState(token_id="t", label="x")
+    st.token_states["t"] = t
+    _feed(t, [0.40, 0.41], history_size=50)
+    assert store.save(st) is True
+    hist = fade_mod.history_log_path(path)
+    size0 = hist.stat().st_size
+
+    assert store.save(st) is False
+    _feed(t, [0.42], history_size=50)
+    # Marks moved but no entries/exits: scalar JSON is throttled, history still appended.
+    assert store.save(st) is False
+    assert hist.stat().st_size > size0
+    st.entries += 1
+    assert store.save(st) is True
+
+    back = fade_mod.StateStore(path, history_size=50).load()
+    assert back.entries == 1
+    assert back.token_states["t"].mids.to_list() == [0.40, 0.41, 0.42]
+    assert back.token_states["t"].returns.to_list() == t.returns.to_list()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib.clob_feature_feed import FeatureFeedReader, FeatureFeedWriter, universe_sidecar_path
+
+
+def test_reader_tails_complete_lines_and_holds_partial(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    w = FeatureFeedWriter(str(path))
+    w.publish_universe([{"token_id": "a", "label": "A"}], ts=100.0)
+    r = FeatureFeedReader(str(path), from_start=True)
+    w.publish_sample({"a": {"mid": 0.5}}, ts=101.0)
+
+    recs = r.poll()
+    assert [x["type"] for x in recs] == ["universe", "sample"]
+    assert recs[1]["books"]["a"]["mid"] == 0.5
+    assert r.last_sample_ts == 101.0
+
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"type":"sample","seq":9,"ts_ms":102000,"bo')
+    assert r.poll() == []
+    with path.open("a", encoding="utf-8") as f:
+        f.write('oks":{}}\n')
+    assert [x["seq"] for x in r.poll()] == [9]
+
+
+def test_reader_attaches_at_end_and_seeds_from_sidecar(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    w = FeatureFeedWriter(str(path))
+    w.publish_universe([{"token_id": "a"}])
+    w.publish_sample({"a": {"mid": 0.4}})
+
+    r = FeatureFeedReader(str(path))
+    assert r.initial_universe()["tokens"] == [{"token_id": "a"}]
+    assert r.poll() == []
+    assert r.wait(0.0) is False
+    w.publish_sample({"a": {"mid": 0.41}})
+    assert r.wait(0.5) is True
+    assert [x["books"]["a"]["mid"] for x in r.poll()] == [0.41]
+    assert json.loads(universe_sidecar_path(path).read_text())["type"] == "universe"
+
+
+def test_rotation_restarts_reader_with_universe_at_head(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    w = FeatureFeedWriter(str(path), max_bytes=200)
+    w.publish_universe([{"token_id": "a", "label": "x" * 40}])
+    r = FeatureFeedReader(str(path), from_start=True)
+    r.poll()
+    for i in range(3):
+        w.publish_sample({"a": {"mid": 0.5, "pad": "y" * 60, "i": i}})
+    r.poll()
+    w.publish_sample({"a": {"mid": 0.6}})
+    assert w.rotations >= 1
+
+    recs = r.poll()
+    assert r.resets == 1
+    assert recs[0]["type"] == "universe"
+    assert recs[-1]["books"]["a"]["mid"] == 0.6
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib import clob_mm_universe as uni
+
+
+def _market(i: int, liq: float = 50000.0, vol: float = 5000.0, spread: float = 0.03) -> dict:
+    return {
+        "id": str(i),
+        "question": f"Question {i}?",
+        "clobTokenIds": f'["yes{i}", "no{i}"]',
+        "outcomes": '["Yes", "No"]',
+        "liquidityNum": liq,
+        "volume24hr": vol,
+        "spread": spread,
+        "orderMinSize": 5,
+        "orderPriceMinTickSize": 0.01,
+    }
+
+
+def _book(bid: float, ask: float, size: float = 100.0) -> dict:
+    return {"bids": [{"price": str(bid), "size": str(size)}], "asks": [{"price": str(ask), "size": str(size)}]}
+
+
+def test_concurrent_paging_keeps_offset_order_and_stops_on_short_page():
+    data = [{"id": str(i)} for i in range(25)]
+    calls = []
+
+    def fetch_page(limit: int, offset: int):
+        calls.append(offset)
+        return data[offset : offset + limit]
+
+    out = uni.fetch_gamma_markets_concurrent(limit=40, workers=4, page_size=10, fetch_page=fetch_page)
+    assert [m["id"] for m in out] == [str(i) for i in range(25)]
+    assert sorted(calls) == [0, 10, 20, 30]
+
+
+def test_failed_page_is_retried_then_skipped_without_truncating():
+    data = [{"id": str(i)} for i in range(35)]
+    attempts = {}
+
+    def fetch_page(limit: int, offset: int):
+        attempts[offset] = attempts.get(offset, 0) + 1
+        if offset == 10 or (offset == 20 and attempts[offset] == 1):
+            raise OSError("boom")
+        return data[offset : offset + limit]
+
+    failed = []
+    out = uni.fetch_gamma_markets_concurrent(limit=40, workers=4, page_size=10, fetch_page=fetch_page, failed=failed)
+    assert [m["id"] for m in out] == [str(i) for i in list(range(10)) + list(range(20, 35))]
+    assert failed == [10] and attempts[10] == 2 and attempts[20] == 2
+
+
+def test_candidate_cache_roundtrip_and_key_mismatch(tmp_path: Path):
+    path = str(tmp_path / "cache.json")
+    key = uni._cache_key(500, 1.0, 2.0, 3.0)
+    c = uni.candidate_from_market(_market(1), 0.0, 0.0, 0.0)
+    uni.save_candidate_cache(path, key, [c])
+    loaded = uni.load_candidate_cache(path, key, ttl_sec=60.0)
+    assert loaded is not None and loaded[0].token_id == "yes1"
+    assert loaded[0].min_order_size == 5.0
+    assert uni.load_candidate_cache(path, uni._cache_key(501, 1.0, 2.0, 3.0), ttl_sec=60.0) is None
+    assert uni.load_candidate_cache(path, key, ttl_sec=0.0) is None
+
+
+def test_rank_candidates_prefers_wide_deep_books_and_drops_dead_ones():
+    cands = [uni.candidate_from_market(_market(i), 0.0, 0.0, 0.0) for i in range(3)]
+    books = {
+        "yes0": _book(0.50, 0.51),  # too tight
+        "yes1": _book(0.45, 0.55, 500.0),
+        # yes2 missing -> dead
+    }
+    ranked = uni.rank_candidates(cands, books, min_spread_cents=2.0, depth_cents=10.0)
+    assert [c.token_id for c in ranked] == ["yes1"]
+    assert abs(ranked[0].book_spread - 0.10) < 1e-9
+    assert ranked[0].book_depth == 1000.0
+
+
+def test_rotate_universe_keeps_incumbents_within_hysteresis():
+    ranked = [uni.MMCandidate(token_id=t, label=t) for t in ["a", "b", "c", "d"]]
+    out = uni.rotate_universe(["c", "z"], ranked, count=2, hysteresis=1)
+    assert [c.token_id for c in out] == ["c", "a"]
+    out = uni.rotate_universe(["d"], ranked, count=2, hysteresis=1)
+    assert [c.token_id for c in out] == ["a", "b"]
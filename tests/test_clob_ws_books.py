@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib import clob_ws_books as ws_mod
+
+
+def test_snapshot_then_deltas_build_local_book():
+    books = {}
+    changed = ws_mod.apply_market_message(
+        books,
+        [
+            {
+                "event_type": "book",
+                "asset_id": "a",
+                "bids": [{"price": "0.40", "size": "10"}, {"price": "0.41", "size": "5"}],
+                "asks": [{"price": "0.45", "size": "7"}],
+            }
+        ],
+        ts=1.0,
+    )
+    assert changed == {"a"}
+    ws_mod.apply_market_message(
+        books,
+        {
+            "event_type": "price_change",
+            "price_changes": [
+                {"asset_id": "a", "price": "0.41", "size": "0", "side": "BUY"},
+                {"asset_id": "a", "price": "0.44", "size": "3", "side": "SELL"},
+                {"asset_id": "b", "price": "0.50", "size": "3", "side": "SELL"},
+            ],
+        },
+        ts=2.0,
+    )
+    book = books["a"].to_book()
+    assert book["bids"] == [{"price": 0.40, "size": 10.0}]
+    assert [lv["price"] for lv in book["asks"]] == [0.44, 0.45]
+    assert books["a"].version == 3
+    # Deltas for a token without a snapshot are ignored.
+    assert "b" not in books
+
+
+def test_assets_filter_and_legacy_changes_layout():
+    books = {}
+    ws_mod.apply_market_message(books, {"event_type": "book", "asset_id": "x", "bids": [], "asks": []}, assets={"a"})
+    assert books == {}
+    ws_mod.apply_market_message(books, {"event_type": "book", "asset_id": "a", "bids": [], "asks": [["0.6", "2"]]})
+    ws_mod.apply_market_message(
+        books, {"event_type": "price_change", "asset_id": "a", "changes": [{"price": "0.55", "size": "4", "side": "BUY"}]}
+    )
+    assert books["a"].to_book()["bids"] == [{"price": 0.55, "size": 4.0}]
+
+
+class _FakeFeed:
+    def __init__(self, healthy, books):
+        self._healthy = healthy
+        self._books = books
+
+    def healthy(self):
+        return self._healthy
+
+    def snapshot(self, token_ids, versions=None):
+        out = {t: self._books[t] for t in token_ids if t in self._books}
+        if versions is not None:
+            versions.update({t: 1 for t in out})
+        return out
+
+
+def test_merge_falls_back_to_rest_for_missing_or_unhealthy():
+    rest_calls = []
+
+    def rest(ids):
+        rest_calls.append(list(ids))
+        return {t: {"rest": True} for t in ids}
+
+    books, from_feed = ws_mod.merge_ws_and_rest_books(_FakeFeed(True, {"a": {"ws": True}}), ["a", "b"], rest)
+    assert from_feed == {"a"} and books["a"] == {"ws": True} and rest_calls == [["b"]]
+
+    books, from_feed = ws_mod.merge_ws_and_rest_books(_FakeFeed(False, {"a": {"ws": True}}), ["a", "b"], rest)
+    assert from_feed == set() and books["a"] == {"rest": True}
+
+
+def test_merge_skips_rest_until_due_and_reports_snapshot_versions():
+    rest_calls = []
+
+    def rest(ids):
+        rest_calls.append(list(ids))
+        return {t: {"rest": True} for t in ids}
+
+    versions = {}
+    feed = _FakeFeed(True, {"a": {"ws": True}})
+    books, from_feed = ws_mod.merge_ws_and_rest_books(feed, ["a", "b"], rest, rest_due=False, versions=versions)
+    assert books == {"a": {"ws": True}} and from_feed == {"a"} and rest_calls == []
+    assert versions == {"a": 1}
+
+
+def test_snapshot_fills_versions_with_returned_books():
+    feed = ws_mod.ClobMarketBookFeed(stale_sec=5.0)
+    feed.set_assets(["a", "b"])
+    feed._on_raw('{"event_type": "book", "asset_id": "a", "bids": [["0.4", "1"]], "asks": []}')
+    feed._on_raw('{"event_type": "book", "asset_id": "a", "bids": [["0.41", "1"]], "asks": []}')
+    versions = {}
+    books = feed.snapshot(["a", "b"], versions=versions)
+    assert set(books) == {"a"} and versions == {"a": 2}
+
+
+def test_feed_without_connection_is_unhealthy_and_versions_track_changes():
+    feed = ws_mod.ClobMarketBookFeed(stale_sec=5.0)
+    assert not feed.healthy()
+    assert feed.set_assets(["a", "b"]) is True
+    assert feed.set_assets(["b", "a"]) is False
+    feed._on_raw('{"event_type": "book", "asset_id": "a", "bids": [["0.4", "1"]], "asks": []}')
+    assert feed.versions() == {"a": 1}
+    assert feed.wait_for_change({"a": 0}, timeout=0.0) is True
+    assert feed.wait_for_change({"a": 1}, timeout=0.01) is False
+    assert feed.snapshot(["a", "b"]) == {"a": {"bids": [{"price": 0.4, "size": 1.0}], "asks": []}}
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib.closed_market_catalog import ClosedMarketCatalog, closed_market_pages, iso_ts
+
+DAY = 86400
+T0 = iso_ts("2026-01-01")
+
+
+def _gamma(markets, calls, fail_day=None):
+    # Minimal /markets?closed=true: optional endDate range filter, desc paging on `order`.
+    def fetch(params):
+        calls.append(params)
+        lo, hi = iso_ts(params.get("end_date_min", "1970-01-01")), iso_ts(params.get("end_date_max", "2100-01-01"))
+        if fail_day is not None and lo <= T0 + fail_day * DAY + 1 <= hi:
+            return None
+        order = params["order"]
+        rows = sorted(
+            (m for m in markets if lo <= iso_ts(m["endDate"]) <= hi),
+            key=lambda m: (iso_ts(m[order]), m["id"]),
+            reverse=True,
+        )
+        off, lim = int(params["offset"]), int(params["limit"])
+        return rows[off : off + lim]
+
+    return fetch
+
+
+def _iso(ts: int) -> str:
+    return f"2026-{1 + (ts - T0) // (31 * DAY):02d}-{1 + (ts - T0) % (31 * DAY) // DAY:02d}T{(ts % DAY) // 3600:02d}:00:01Z"
+
+
+def _market(i: int, updated_ts: int = 0) -> dict:
+    ts = T0 + i * 7200 + 1
+    return {
+        "id": f"{i:04d}",
+        "endDate": _iso(ts),
+        "updatedAt": _iso(updated_ts or ts + 3600),
+        "category": "sports" if i % 3 == 0 else "wx",
+        "volumeNum": float(i),
+        "x": 1,
+    }
+
+
+def test_sync_is_incremental_and_pages_match_gamma(tmp_path):
+    markets = [_market(i) for i in range(120)]  # 10 days of 2-hourly closes
+    calls = []
+    db = tmp_path / "cat.sqlite"
+    opts = {"page_size": 5, "rate": 0, "now_ts": T0 + 12 * DAY, "settle_days": 0}
+    with ClosedMarketCatalog(db) as cat:
+        stats = cat.sync(T0, T0 + 10 * DAY, _gamma(markets, calls, fail_day=4), **opts)
+        assert stats["windows"] == 11 and stats["windows_failed"] == 1
+        assert cat.missing(T0, T0 + 10 * DAY) == [(T0 + 4 * DAY, T0 + 5 * DAY - 1)]
+
+        calls.clear()
+        stats = cat.sync(T0, T0 + 10 * DAY, _gamma(markets, calls), **opts)
+        assert stats["windows"] == 1 and stats["markets"] == 12
+        assert cat.high_water() == T0 + 10 * DAY and cat.count(T0, T0 + 10 * DAY) == 120
+
+        # Markets ending inside the settle window stay uncovered and are re-crawled.
+        calls.clear()
+        markets.append(_market(120))
+        assert cat.sync(T0, T0 + 11 * DAY, _gamma(markets, calls), **dict(opts, settle_days=1.5))["windows"] == 1
+        assert cat.missing(T0, T0 + 11 * DAY) == [(T0 + 10 * DAY + 12 * 3600 + 1, T0 + 11 * DAY)]
+        newest = {k: v for k, v in markets[-1].items() if k != "x"}
+        assert cat.page(T0, T0 + 11 * DAY, 2)[0] == newest
+        sports = cat.page(T0, T0 + 2 * DAY, 3, offset=1, category="sports", min_volume=10)
+        assert [m["id"] for m in sports] == ["0018", "0015", "0012"]
+
+        # A long-settled market that changes later comes back through the updatedAt pass.
+        assert cat.updated_high_water() == T0 + 12 * DAY
+        markets[3] = dict(_market(3, updated_ts=T0 + 14 * DAY), volumeNum=99.0)
+        calls.clear()
+        stats = cat.sync(T0, T0 + 11 * DAY, _gamma(markets, calls), **dict(opts, now_ts=T0 + 15 * DAY))
+        assert stats["updated_markets"] == 1 and all(c["order"] == "updatedAt" for c in calls[stats["windows"]:])
+        assert cat.page(T0, T0 + DAY, 1, offset=8)[0] == {k: v for k, v in markets[3].items() if k != "x"}
+        assert cat.updated_high_water() == T0 + 14 * DAY + 1
+        markets[3] = _market(3)
+
+    args = argparse.Namespace(
+        date_min="2026-01-02",
+        date_max="2026-01-09",
+        page_size=7,
+        catalog_db="",
+        catalog_workers=2,
+        catalog_rate=0.0,
+        catalog_settle_days=0.0,
+    )
+    want = list(closed_market_pages(args, [0, 14, 35, 91], _gamma(markets, [])))
+    args.catalog_db = str(db)
+    stats = {}
+    got = list(closed_market_pages(args, [0, 14, 35, 91], _gamma(markets, []), stats=stats))
+    strip = lambda pages: [(off, [m["id"] for m in ms]) for off, ms in pages]
+    assert strip(got) == strip(want) and stats["catalog_pages_fetched"] == 1 and stats["catalog_markets"] == 84
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib.history_log import HistoryLog
+from lib.rolling_window import RollingWindow
+
+
+def _series(**windows):
+    return {"tok": dict(windows)}
+
+
+def test_sync_appends_only_new_values_and_reloads(tmp_path):
+    path = tmp_path / "h.hist"
+    a = RollingWindow(4, [1.0, 2.0])
+    b = RollingWindow(4)
+    log = HistoryLog(path, ("a", "b"))
+    log.sync(_series(a=a, b=b))
+    size0 = path.stat().st_size
+
+    a.append(3.0)
+    written = log.sync(_series(a=a, b=b))
+    assert path.stat().st_size == size0 + written
+    assert written < 40
+    assert log.sync(_series(a=a, b=b)) == 0
+
+    for x in (4.0, 5.0, 6.0):
+        a.append(x)
+    b.append(9.0)
+    log.sync(_series(a=a, b=b))
+
+    back = HistoryLog(path, ("a", "b")).load(maxlen=4)
+    assert back["tok"]["a"].to_list() == [3.0, 4.0, 5.0, 6.0]
+    assert back["tok"]["b"].to_list() == [9.0]
+
+
+def test_torn_tail_is_ignored_and_truncated(tmp_path):
+    path = tmp_path / "h.hist"
+    w = RollingWindow(10, [0.5, 0.6])
+    HistoryLog(path, ("m",)).sync({"x": {"m": w}})
+    with path.open("ab") as f:
+        f.write(b"V\x00\x00")
+
+    log = HistoryLog(path, ("m",))
+    back = log.load(maxlen=10)
+    assert back["x"]["m"].to_list() == [0.5, 0.6]
+    back["x"]["m"].append(0.7)
+    log.sync(back)
+    assert HistoryLog(path, ("m",)).load(maxlen=10)["x"]["m"].to_list() == [0.5, 0.6, 0.7]
+
+
+def test_replaced_window_or_growth_triggers_compaction(tmp_path):
+    path = tmp_path / "h.hist"
+    w = RollingWindow(3, [1.0])
+    log = HistoryLog(path, ("m",), compact_ratio=2.0, min_compact_bytes=0)
+    log.sync({"x": {"m": w}})
+    for i in range(20):
+        w.append(float(i))
+        log.sync({"x": {"m": w}})
+    assert log.compactions > 1
+
+    n = log.compactions
+    log.sync({"x": {"m": w.resized(5)}})
+    assert log.compactions == n + 1
+    assert HistoryLog(path, ("m",)).load(maxlen=5)["x"]["m"].to_list() == [17.0, 18.0, 19.0]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib import metrics_loader as ml
+
+SPEC = (("ts_ms", "q"), ("key", "s"), ("v", "d"))
+
+
+def _write(path: Path, start: int, n: int, opener=open) -> None:
+    with opener(path, "at", encoding="utf-8") as f:
+        for i in range(start, start + n):
+            # A few rows are untimed; a bad line now and then.
+            row = {"ts_ms": 0 if i % 200 == 7 else 1_000_000 + 1000 * i, "key": f"k{i % 4}", "v": i / 8}
+            f.write(json.dumps(row) + ("\nnot json\n" if i % 37 == 0 else "\n"))
+
+
+def _parse(seen):
+    def parse(line):
+        seen.append(line)
+        try:
+            o = ml.json_loads(line)
+        except ValueError:
+            return None
+        return int(o["ts_ms"]), o["key"], float(o["v"])
+
+    return parse
+
+
+def _rows(batches):
+    out = []
+    for path, t in batches:
+        out.extend((Path(path).name, ts, t.strings["key"][k], v) for ts, k, v in zip(t.cols["ts_ms"], t.cols["key"], t.cols["v"]))
+    return out
+
+
+def _want(paths, lo, hi):
+    out = []
+    for p in paths:
+        opener = gzip.open if str(p).endswith(".gz") else open
+        with opener(p, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    o = json.loads(line)
+                except ValueError:
+                    continue
+                if o["ts_ms"] <= 0 or lo <= o["ts_ms"] <= hi:
+                    out.append((Path(p).name, o["ts_ms"], o["key"], o["v"]))
+    return out
+
+
+def test_time_index_skips_blocks_and_follows_appends(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml, "INDEX_BLOCK_BYTES", 2048)
+    live = tmp_path / "m.jsonl"
+    old = tmp_path / "m.jsonl.20260101-000000.gz"
+    _write(old, 0, 300, gzip.open)
+    os.utime(old, (1, 1))
+    _write(live, 300, 600)
+    (tmp_path / "m.jsonl.colcache").write_text("x")
+
+    paths = ml.resolve_files(str(live), rotated=True)
+    assert [Path(p).name for p in paths] == [old.name, live.name]
+    assert ml.resolve_files(str(live)) == [str(live)]
+
+    lo, hi = 1_000_000 + 1000 * 250, 1_000_000 + 1000 * 420
+    seen = []
+    first = _rows(ml.iter_batches(paths, SPEC, _parse(seen), "ts_ms", lo, hi, batch_rows=64))
+    assert first == _want([old, live], lo, hi)
+    full_parse = len(seen)
+
+    seen.clear()
+    assert _rows(ml.iter_batches(paths, SPEC, _parse(seen), "ts_ms", lo, hi)) == first
+    assert 0 < len(seen) < full_parse / 2
+    assert _rows(ml.iter_batches(paths, SPEC, _parse([]), "ts_ms")) == _want([old, live], 0, 10**12)
+
+    # Appended rows: the new tail is parsed once, indexed blocks stay skippable.
+    _write(live, 900, 20)
+    seen.clear()
+    hi2 = 1_000_000 + 1000 * 1000
+    got = _rows(ml.iter_batches(paths, SPEC, _parse(seen), "ts_ms", 1_000_000 + 1000 * 880, hi2))
+    assert got == _want([old, live], 1_000_000 + 1000 * 880, hi2)
+    assert any(r[1] == 1_000_000 + 1000 * 919 for r in got)
+    assert len(seen) < full_parse / 2
+    assert sum(f'"ts_ms": {1_000_000 + 1000 * 910}' in x for x in seen) == 1
+
+    # Without the index every line is parsed.
+    seen.clear()
+    assert _rows(ml.iter_batches(paths, SPEC, _parse(seen), "ts_ms", lo, hi, use_index=False)) == first
+    assert len(seen) > full_parse
+
+
+def test_tools_keep_separate_indexes_for_one_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml, "INDEX_BLOCK_BYTES", 2048)
+    path = tmp_path / "m.jsonl"
+    _write(path, 0, 400)
+    other_spec = (("ts_ms", "q"), ("v", "d"))
+
+    def other(seen):
+        parse = _parse(seen)
+
+        def parse_other(line):
+            vals = parse(line)
+            return None if vals is None else (vals[0], vals[2])
+
+        return parse_other
+
+    lo, hi = 1_000_000 + 1000 * 100, 1_000_000 + 1000 * 150
+    list(ml.iter_batches([str(path)], SPEC, _parse([]), "ts_ms", lo, hi))
+    list(ml.iter_batches([str(path)], other_spec, other([]), "ts_ms", lo, hi, version="2"))
+    assert len(list(tmp_path.glob("m.jsonl.*.tidx"))) == 2
+
+    # Alternating tools: each still skips blocks from its own index.
+    for spec, parser in ((SPEC, _parse), (other_spec, other)):
+        seen = []
+        list(ml.iter_batches([str(path)], spec, parser(seen), "ts_ms", lo, hi, version="1" if spec is SPEC else "2"))
+        assert 0 < len(seen) < 200
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import datetime as dt
+import itertools
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import optimize_bitflyer_mm_params as opt
+from lib import metrics_loader
+
+
+def _samples(n: int, seed: int, sub_second: bool, jitter: bool) -> list[opt.Sample]:
+    rng = random.Random(seed)
+    ts = dt.datetime(2026, 3, 1)
+    mid = 1.0e7
+    out = []
+    for _ in range(n):
+        if sub_second:
+            ts += dt.timedelta(milliseconds=rng.choice((500, 1000, 1500, 2500, 10000)))
+        else:
+            ts += dt.timedelta(seconds=rng.choice((1, 2, 3, 5)))
+        mid += rng.gauss(0.0, 400.0)
+        half = rng.choice((1.0, 50.0, 200.0))
+        out.append(opt.Sample(ts=ts, best_bid_jpy=mid - half, best_ask_jpy=mid + half, mid_jpy=mid))
+    if jitter:
+        # Out-of-order rows (clock steps) must take the same refresh decisions as the datetime path.
+        for _ in range(n // 20):
+            i = rng.randrange(n - 1)
+            out[i], out[i + 1] = out[i + 1], out[i]
+    return out
+
+
+def test_simulate_grid_matches_per_sample_simulate_exactly():
+    combos = list(itertools.product((150.0, 500.0, 800.0), (1.0, 2.5, 10.0, 60.0), (0.0005, 0.002, 0.004)))
+    for seed, sub_second, jitter in ((1, False, False), (2, True, False), (3, True, True)):
+        samples = _samples(1500, seed, sub_second, jitter)
+        arrs = opt.SampleArrays.from_samples(samples)
+        for fee, dd in ((0.0, 0.0), (1.5, 0.3)):
+            want = [opt._simulate(samples, h, ref, sz, 0.006, 1.0, fee, dd) for h, ref, sz in combos]
+            assert opt.simulate_grid(arrs, combos, 0.006, 1.0, fee, dd) == want
+
+        tail = opt.tail_fraction(samples, 0.3)
+        want = [opt._simulate(tail, h, ref, sz, 0.006, 1.0, 0.0, 0.0) for h, ref, sz in combos[:4]]
+        assert opt.simulate_grid(arrs.tail(0.3), combos[:4], 0.006, 1.0, 0.0, 0.0) == want
+
+
+def test_simulate_grid_edge_cases():
+    combos = [(100.0, 3.0, 0.5), (50.0, 3.0, 0.5), (10.0, 0.0, 1.0)]
+    base = dt.datetime(2026, 1, 1)
+    # Half spread above the price: non-positive quotes re-quote every sample.
+    samples = [
+        opt.Sample(base + dt.timedelta(seconds=i), 90.0 + i % 7, 95.0 + i % 5, 93.0 + i % 7) for i in range(200)
+    ]
+    arrs = opt.SampleArrays.from_samples(samples)
+    assert opt.simulate_grid(arrs, combos, 2.0, 1.0, 0.0, 0.0) == [opt._simulate(samples, *c, 2.0, 1.0, 0.0, 0.0) for c in combos]
+
+    empty = opt.SampleArrays.from_samples([])
+    assert opt.simulate_grid(empty, combos, 2.0, 1.0, 0.0, 0.0) == [opt._simulate([], *c, 2.0, 1.0, 0.0, 0.0) for c in combos]
+
+
+def test_load_samples_matches_line_parse(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_loader, "INDEX_BLOCK_BYTES", 4096)
+    rng = random.Random(9)
+    path = tmp_path / "bf.jsonl"
+    t = dt.datetime(2026, 3, 1)
+    with path.open("w", encoding="utf-8") as f:
+        for _ in range(3000):
+            t += dt.timedelta(seconds=rng.randint(0, 20))
+            bid = rng.choice((0, 9_000_000 + rng.random() * 1000))
+            o = {"best_bid_jpy": bid, "best_ask_jpy": bid + rng.choice((-1, 0, 500.5))}
+            if rng.random() < 0.5:
+                o["mid_jpy"] = bid + 250.0 + rng.random()
+            if rng.random() < 0.6:
+                o["ts"] = t.strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                o["ts_ms"] = int(t.timestamp() * 1000) + rng.randint(0, 999)
+            f.write(json.dumps(o) + "\n")
+
+    windows = [
+        (dt.datetime(2000, 1, 1), dt.datetime(2100, 1, 1)),
+        (dt.datetime(2026, 3, 1, 1), dt.datetime(2026, 3, 1, 2)),
+        (dt.datetime(2026, 3, 1, 3, 30), dt.datetime(2026, 3, 1, 19)),
+    ]
+    for since, until in windows:
+        # The per-line filter main() used before the shared loader.
+        with path.open("r", encoding="utf-8", errors="replace") as f:
+            want = [s for s in opt.iter_samples(f) if since <= s.ts <= until]
+        assert want
+        for kw in ({}, {}, {"use_index": False}):
+            assert opt.load_samples([str(path)], since, until, **kw) == want
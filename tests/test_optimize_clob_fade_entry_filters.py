@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import itertools
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import optimize_clob_fade_entry_filters as opt
+from lib import metrics_loader
+
+
+def _trades(n: int, seed: int, whole_seconds: bool) -> list[opt.Trade]:
+    rng = random.Random(seed)
+    base = dt.datetime(2026, 3, 1)
+    out = []
+    for i in range(n):
+        entry = base + dt.timedelta(seconds=30 * i)
+        hold = float(rng.randint(5, 400)) if whole_seconds else rng.uniform(5.0, 400.0)
+        out.append(
+            opt.Trade(
+                entry_ts=entry,
+                exit_ts=entry + dt.timedelta(seconds=hold),
+                hold_sec=hold,
+                side=rng.choice((-1, 1)),
+                score_abs=round(rng.uniform(0.0, 3.0), 2),
+                agree=rng.randint(0, 3),
+                edge=round(rng.uniform(-0.002, 0.004), 4),
+                tp=0.012,
+                sl=0.01,
+                pnl=rng.choice((-0.0, 0.0, round(rng.gauss(0.0, 0.05), 4))),
+                reason=rng.choice(("tp", "sl", "timeout", "end")),
+                label=f"m{i % 7}",
+                source_file="x.log",
+            )
+        )
+    return out
+
+
+def test_evaluate_grid_matches_per_combo_evaluate_exactly():
+    params = [
+        opt.Param(s, a, e, side)
+        for s, a, e, side in itertools.product(
+            (0.1, 0.5, 0.55, 1.2, 2.9, 5.0), (1, 2, 3), (0.0, 0.05, 0.051, 0.3, 1.0), ("both", "long", "short")
+        )
+    ]
+    for seed, whole in ((1, True), (2, False)):
+        trades = _trades(150, seed, whole)
+        want = [opt.evaluate(trades, pp, 0.5, 20, 0.01) for pp in params]
+        assert opt.evaluate_grid(trades, params, 0.5, 20, 0.01) == want
+    assert opt.evaluate_grid([], params[:3], 0.5, 20, 0.01) == [opt.evaluate([], pp, 0.5, 20, 0.01) for pp in params[:3]]
+
+
+def _write_log(path: Path, start: dt.datetime, n: int, rng: random.Random, opener=open) -> None:
+    t = start
+    with opener(path, "wt", encoding="utf-8") as f:
+        for _ in range(n):
+            t += dt.timedelta(seconds=rng.randint(0, 30))
+            s = t.strftime("%Y-%m-%d %H:%M:%S")
+            label = f"m{rng.randint(0, 4)} "
+            r = rng.random()
+            if r < 0.4:
+                side = rng.choice(("LONG", "SHORT"))
+                f.write(
+                    f"[{s}] entry {side} 5 @ 0.{rng.randint(10, 90)} | score={rng.uniform(-3, 3):+.3f} "
+                    f"agree={rng.randint(0, 4)} | exp_edge={rng.uniform(-2, 2):+.2f} tp/sl=0.03/0.02 | {label}\n"
+                )
+            elif r < 0.8:
+                reason = rng.choice(("tp", "sl", "time_stop"))
+                f.write(f"[{s}] exit {reason} pnl={rng.uniform(-1, 1):+.4f} realized=+1.0 trades=3 | {label}\n")
+            else:
+                f.write(f"[{s}] quote refresh\n")
+
+
+def _old_events(files: list[str], since: dt.datetime, until: dt.datetime) -> list[tuple]:
+    # The line-by-line parse parse_trades() used before the shared loader.
+    events = []
+    for fp in files:
+        opener = gzip.open if fp.endswith(".gz") else open
+        with opener(fp, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                m1 = opt.ENTRY_RE.match(line)
+                if m1:
+                    ts = opt.parse_ts(m1.group("ts"))
+                    if since <= ts <= until:
+                        payload = {
+                            "side": 1 if m1.group("side") == "LONG" else -1,
+                            "score_abs": abs(float(m1.group("score"))),
+                            "agree": int(m1.group("agree")),
+                            "edge": float(m1.group("edge")),
+                            "tp": float(m1.group("tp")),
+                            "sl": float(m1.group("sl")),
+                            "label": m1.group("label").strip(),
+                            "source_file": fp,
+                        }
+                        events.append((ts, "entry", payload))
+                    continue
+                m2 = opt.EXIT_RE.match(line)
+                if m2 and since <= opt.parse_ts(m2.group("ts")) <= until:
+                    payload = {"pnl": float(m2.group("pnl")), "reason": m2.group("reason"), "label": m2.group("label").strip()}
+                    events.append((opt.parse_ts(m2.group("ts")), "exit", payload))
+    return events
+
+
+def test_parse_trades_matches_line_parse_with_rotated_logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_loader, "INDEX_BLOCK_BYTES", 4096)
+    rng = random.Random(4)
+    live = tmp_path / "fade.log"
+    old = tmp_path / "fade.log.1.gz"
+    _write_log(old, dt.datetime(2026, 3, 1), 600, rng, gzip.open)
+    os.utime(old, (1, 1))
+    _write_log(live, dt.datetime(2026, 3, 1, 3), 900, rng)
+    files = opt.resolve_files(str(live), "", rotated=True)
+    assert files == [str(old), str(live)]
+
+    windows = [
+        (dt.datetime(2000, 1, 1), dt.datetime(2100, 1, 1)),
+        (dt.datetime(2026, 3, 1, 1), dt.datetime(2026, 3, 1, 3, 30)),
+        (dt.datetime(2026, 3, 1, 5), dt.datetime(2026, 3, 1, 6)),
+    ]
+    for since, until in windows:
+        want = opt.pair_events(_old_events(files, since, until))
+        assert want
+        for kw in ({}, {}, {"use_index": False}):
+            assert opt.parse_trades(files, since, until, **kw) == want
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import optimize_clob_fade_params as opt
+from lib import column_cache
+
+
+def _write_rows(path: Path, start: int, n: int) -> None:
+    base = dt.datetime(2026, 3, 1, 12, 0, 0)
+    with path.open("a", encoding="utf-8") as f:
+        for i in range(start, start + n):
+            ts = base + dt.timedelta(seconds=30 * i)
+            row = {
+                "ts": ts.strftime("%Y-%m-%d %H:%M:%S"),
+                "ts_ms": 1772366400000 + 30000 * i,
+                "token_id": f"tok{i % 3}",
+                "label": f"Market {i % 3}?",
+                "mid": 0.4 + 0.001 * (i % 7),
+                "best_bid": 0.39,
+                "best_ask": 0.41,
+                "depth_bid": 120.0,
+                "depth_ask": 80.0,
+                "consensus_score": 1.5 - 0.1 * (i % 5),
+                "consensus_side": (i % 3) - 1,
+                "consensus_agree": i % 4,
+                "bot_zscore": 0.2,
+            }
+            f.write(json.dumps(row) + "\n")
+        f.write("not json\n")
+
+
+def test_load_rows_matches_iter_rows_and_extends_cache(tmp_path, monkeypatch):
+    path = tmp_path / "m.jsonl"
+    _write_rows(path, 0, 50)
+    since = dt.datetime(2026, 3, 1, 12, 5, 0)
+    until = dt.datetime(2026, 3, 1, 13, 0, 0)
+
+    def expected():
+        return [r for r in opt.iter_rows(str(path)) if since <= r.ts <= until]
+
+    first = opt.load_rows(str(path), since, until)
+    assert first == expected()
+    assert (tmp_path / "m.jsonl.colcache").exists()
+
+    # Unchanged file: served from the cache without parsing.
+    monkeypatch.setattr(opt, "parse_row", lambda line: (_ for _ in ()).throw(AssertionError("reparsed")))
+    assert opt.load_rows(str(path), since, until) == first
+    monkeypatch.undo()
+
+    # Appended file: only the tail is parsed.
+    _write_rows(path, 50, 40)
+    want = expected()
+    seen = []
+    real = opt.parse_row
+    monkeypatch.setattr(opt, "parse_row", lambda line: seen.append(line) or real(line))
+    assert opt.load_rows(str(path), since, until) == want
+    assert len(seen) == 41
+
+
+def test_truncated_source_rebuilds_cache(tmp_path):
+    path = tmp_path / "m.jsonl"
+    _write_rows(path, 0, 20)
+    lo, hi = dt.datetime(2000, 1, 1), dt.datetime(2100, 1, 1)
+    assert len(opt.load_rows(str(path), lo, hi)) == 20
+    path.write_text("", encoding="utf-8")
+    _write_rows(path, 100, 5)
+    rows = opt.load_rows(str(path), lo, hi, cache_dir=str(tmp_path / "c"))
+    assert [r.ts_ms for r in rows] == [r.ts_ms for r in opt.iter_rows(str(path))]
+    table = column_cache.load_columns(path, opt.ROW_COLUMNS, opt._row_values, version=opt.ROW_CACHE_VERSION)
+    assert len(table) == 5
+
+
+def test_gzipped_rotation_loads_like_plain(tmp_path):
+    path = tmp_path / "m.jsonl"
+    _write_rows(path, 0, 60)
+    gz = tmp_path / "m.jsonl.1.gz"
+    gz.write_bytes(gzip.compress(path.read_bytes()))
+    since, until = dt.datetime(2026, 3, 1, 12, 10, 0), dt.datetime(2026, 3, 1, 12, 20, 0)
+    want = opt.load_rows(str(path), since, until, use_cache=False)
+    assert opt.load_rows(str(gz), since, until) == want == opt.load_rows(str(gz), since, until)
+    assert [r for r in opt.iter_rows(str(gz)) if since <= r.ts <= until] == want
+    assert opt.resolve_metric_files(str(path), "", rotated=True) == [str(gz), str(path)]
+
+
+def test_unterminated_last_line_is_loaded_but_not_cached(tmp_path):
+    path = tmp_path / "m.jsonl"
+    _write_rows(path, 0, 10)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    path.write_text("\n".join(lines[:-1]), encoding="utf-8")  # drop "not json", leave the last row open
+    gz = tmp_path / "m.jsonl.gz"
+    gz.write_bytes(gzip.compress(path.read_bytes()))
+    lo, hi = dt.datetime(2000, 1, 1), dt.datetime(2100, 1, 1)
+    want = list(opt.iter_rows(str(path)))
+    assert len(want) == 10
+    for kw in ({"use_cache": False}, {}, {}):
+        assert opt.load_rows(str(path), lo, hi, **kw) == want
+    assert opt.load_rows(str(gz), lo, hi) == want
+
+    # Completing the open line must not duplicate it.
+    with path.open("a", encoding="utf-8") as f:
+        f.write("\n")
+    _write_rows(path, 10, 2)
+    assert opt.load_rows(str(path), lo, hi) == list(opt.iter_rows(str(path)))
+    assert len(opt.load_rows(str(path), lo, hi)) == 12
+
+
+def _grid_inputs(tmp_path: Path):
+    path = tmp_path / "m.jsonl"
+    _write_rows(path, 0, 400)
+    rows = opt.load_rows(str(path), dt.datetime(2000, 1, 1), dt.datetime(2100, 1, 1), use_cache=False)
+    args = SimpleNamespace(
+        execution_mode="mid", tick_size=0.001, slippage_ticks=0.5, maker_spread_capture=0.4, fee_bps=0.0,
+        tp_cost_mult=1.8, sl_cost_mult=1.2, expected_move_vol_mult=1.6, max_spread_cents=2.5,
+        min_depth_shares=10.0, vol_lookback=30, max_volatility_cents=5.0, min_volatility_cents=0.0,
+        min_mid_prob=0.05, max_mid_prob=0.95, position_size_shares=12.0, max_open_positions=3,
+        cooldown_sec=45.0, daily_loss_limit_usd=8.0, history_size=300, token_loss_cut_usd=0.6,
+        token_loss_min_trades=5, token_min_winrate=0.2, token_disable_sec=1800.0, dd_penalty=0.25,
+        min_trades=12, undertrade_penalty=0.02,
+    )
+    params = [
+        opt.Param(s, a, 0, tp, 1.0, 180.0, 0.0, 0.5)
+        for s in (0.5, 1.0, 1.4)
+        for a in (1, 2)
+        for tp in (0.2, 0.8)
+    ]
+    return opt.group_rows(rows), params, args
+
+
+def test_parallel_grid_and_checkpoint_resume_match_serial(tmp_path, monkeypatch):
+    batches, params, args = _grid_inputs(tmp_path)
+    serial = [opt.simulate(batches, pp, args) for pp in params]
+    assert any(r.trades for r in serial)
+
+    assert opt.evaluate_grid(batches, params, args, workers=3) == serial
+
+    ckpt = tmp_path / "ckpt.jsonl"
+    opt.evaluate_grid(batches, params[:5], args, checkpoint_file=str(ckpt))
+    calls = []
+    real = opt.simulate
+    monkeypatch.setattr(opt, "simulate", lambda b, pp, a: calls.append(pp) or real(b, pp, a))
+    resumed = opt.evaluate_grid(batches, params, args, checkpoint_file=str(ckpt))
+    monkeypatch.undo()
+    assert resumed == serial
+    assert len(calls) == len(params) - 5
+
+    # Output-only args keep the fingerprint; simulation args and any row change invalidate it.
+    fp = opt.run_fingerprint(batches, args)
+    assert opt.run_fingerprint(batches, SimpleNamespace(**vars(args), top_n=3, some_new_flag="x")) == fp
+    mid = len(batches) // 2
+    edited = list(batches)
+    edited[mid] = (batches[mid][0], [replace(r, bz=r.bz + 0.5) for r in batches[mid][1]])
+    assert opt.run_fingerprint(edited, args) != fp
+    args.position_size_shares = 20.0
+    assert opt.load_checkpoint(str(ckpt), opt.run_fingerprint(batches, args)) == {}
+
+
+def test_halving_survivors_carry_full_window_results(tmp_path):
+    batches, params, args = _grid_inputs(tmp_path)
+    serial = {pp: opt.simulate(batches, pp, args) for pp in params}
+    report = opt.successive_halving(
+        params,
+        lambda ps, b: opt.evaluate_grid(opt.tail_fraction(batches, b), ps, args),
+        opt.rank_key,
+        keep_min=3,
+    )
+    assert len(report.final) == 3
+    assert all(r == serial[pp] for pp, r in report.final)
+    assert report.work < report.full_work
+
+
+def test_thresholds_admitting_the_same_rows_share_one_decision_pass(tmp_path, monkeypatch):
+    batches, params, args = _grid_inputs(tmp_path)
+    feats = opt.fade_features(batches, args)
+    assert opt.fade_features(batches, args) is feats
+    # Scores in the data are 1.1..1.5, so min_score 0.5 and 1.0 admit the same rows.
+    lo, hi = opt.Param(0.5, 1, 0, 0.2, 1.0, 180.0, 0.0, 0.5), opt.Param(1.0, 1, 0, 0.2, 1.0, 180.0, 0.0, 0.5)
+    assert feats.decision_key(lo) == feats.decision_key(hi)
+    assert feats.decision_key(lo) != feats.decision_key(opt.Param(1.4, 1, 0, 0.2, 1.0, 180.0, 0.0, 0.5))
+
+    calls = []
+    real = opt._decide
+    monkeypatch.setattr(opt, "_decide", lambda f, pp, a: calls.append(pp) or real(f, pp, a))
+    res = opt.evaluate_grid(batches, params, args)
+    monkeypatch.undo()
+    assert len(calls) == len({feats.decision_key(pp) for pp in params}) < len(params)
+    assert res == [opt.simulate(batches, pp, args) for pp in params]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import optimize_simmer_pingpong_params as opt
+from lib import metrics_loader
+from report_simmer_observation import iter_metrics
+
+
+def _samples(n: int, seed: int) -> list[opt.Sample]:
+    rng = random.Random(seed)
+    prices = {f"m{k}": rng.uniform(0.2, 0.8) for k in range(4)}
+    out = []
+    ts = 1_770_000_000_000
+    for _ in range(n):
+        ts += 5000
+        mid = f"m{rng.randrange(4)}"
+        prices[mid] = min(0.98, max(0.02, prices[mid] + rng.gauss(0.0, 0.008)))
+        out.append(opt.Sample(ts, mid, round(prices[mid], 4)))
+    return out
+
+
+def _args(**kw) -> argparse.Namespace:
+    base = dict(
+        dd_penalty=0.5,
+        sharpe_weight=0.2,
+        expectancy_weight=0.1,
+        per_share_fee=0.0,
+        slippage_cents=0.1,
+        entry_prob_min=0.05,
+        entry_prob_max=0.95,
+        seed_interval_sec=0.0,
+        wf_std_penalty=0.5,
+        min_closed_cycles=0,
+        min_win_rate=0.0,
+        max_drawdown=0.0,
+        min_total_pnl=-1e18,
+        walkforward_mode="fresh",
+    )
+    base.update(kw)
+    return argparse.Namespace(**base)
+
+
+PARAMS = [
+    opt.Param(0.8, 30.0, 5.0, 10.0, 0.0, 0.0, "static", 60, 0.0025, 0.5, 2.0),
+    opt.Param(1.2, 60.0, 3.0, 6.0, 60.0, 0.2, "inverse_vol", 20, 0.004, 0.5, 2.0),
+]
+
+
+def test_fresh_walkforward_matches_independent_replays():
+    samples = _samples(1200, 1)
+    args = _args()
+    bounds = opt._segment_bounds(len(samples), 3)
+    sim = (args.dd_penalty, args.sharpe_weight, args.expectancy_weight, args.per_share_fee, args.slippage_cents)
+    tail = (args.entry_prob_min, args.entry_prob_max, args.seed_interval_sec)
+    for prm in PARAMS:
+        cand = opt._evaluate(prm, samples, bounds, args)
+        assert cand.full == opt._simulate(samples, prm, *sim, *tail)
+        segs = [opt._simulate(seg, prm, *sim, *tail) for seg in opt._segments(samples, 3)]
+        scores = [r.score for r in segs]
+        assert cand.wf_mean_score == opt._mean(scores)
+        assert cand.wf_std_score == opt._stdev(scores)
+        assert cand.robust_score == opt._mean(scores) - 0.5 * opt._stdev(scores)
+
+
+def test_carry_walkforward_reuses_the_full_run_and_workers_keep_order():
+    samples = _samples(900, 2)
+    bounds = opt._segment_bounds(len(samples), 3)
+    fresh = opt._evaluate_all(PARAMS, samples, bounds, _args())
+    carry = opt._evaluate_all(PARAMS, samples, bounds, _args(walkforward_mode="carry"))
+    assert [c.full for c in carry] == [c.full for c in fresh]
+
+    run = opt._Replay(PARAMS[0], 0.0, 0.1, 0.05, 0.95, 0.0)
+    parts = [run.feed(samples[a:b]).mark(0.5, 0.2, 0.1) for a, b in bounds]
+    assert sum(r.fills_buy for r in parts) == carry[0].full.fills_buy
+    assert abs(sum(r.total_pnl for r in parts) - carry[0].full.total_pnl) < 1e-9
+
+    assert opt._evaluate_all(PARAMS * 3, samples, bounds, _args(), workers=2) == opt._evaluate_all(
+        PARAMS * 3, samples, bounds, _args()
+    )
+
+
+def test_load_samples_matches_line_parse(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_loader, "INDEX_BLOCK_BYTES", 4096)
+    rng = random.Random(5)
+    files = []
+    for k in range(2):
+        path = tmp_path / f"simmer-{k}.jsonl"
+        t = dt.datetime(2026, 3, 1)
+        with path.open("w", encoding="utf-8") as f:
+            for _ in range(1500):
+                t += dt.timedelta(seconds=rng.randint(0, 20))
+                o = {
+                    "ts": t.strftime("%Y-%m-%d %H:%M:%S"),
+                    "market_id": rng.choice(("a", "b", "", " c ")),
+                    "p_yes": rng.choice((0.0, 1.0, rng.random())),
+                }
+                if rng.random() < 0.7:
+                    o["ts_ms"] = int(t.timestamp() * 1000) + rng.randint(0, 999)
+                f.write(json.dumps(o) + ("\nnot json\n" if rng.random() < 0.02 else "\n"))
+        files.append(str(path))
+
+    windows = [
+        (dt.datetime(2000, 1, 1), dt.datetime(2100, 1, 1)),
+        (dt.datetime(2026, 3, 1, 1), dt.datetime(2026, 3, 1, 2)),
+        (dt.datetime(2026, 3, 1, 3, 30), dt.datetime(2026, 3, 1, 9)),
+    ]
+    for since, until in windows:
+        # The per-line loop main() used before the shared loader.
+        want = []
+        for mf in files:
+            with open(mf, "r", encoding="utf-8", errors="replace") as f:
+                for r in iter_metrics(f):
+                    if since <= r.ts <= until and r.market_id and 0.0 < float(r.p_yes or 0.0) < 1.0:
+                        want.append(opt.Sample(int(r.ts_ms), str(r.market_id), float(r.p_yes)))
+        assert want
+        for kw in ({}, {}, {"use_index": False}):
+            assert opt.load_samples(files, since, until, **kw) == want
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import polymarket_lateprob_observe as lp
+from lib.price_history_store import PriceHistoryStore
+
+
+def _candidates(n: int, seed: int) -> tuple[list[dict], dict]:
+    rng = random.Random(seed)
+    cands, series = [], {}
+    for i in range(n):
+        end_ts = 1_760_000_000 + i * 5400
+        token = f"tok{i}"
+        drift = rng.choice((0.97, 0.03, 0.5))
+        # Irregular points, with a gap before some closes so stale limits bite.
+        ts = sorted(rng.sample(range(end_ts - 20 * 3600, end_ts - rng.choice((60, 1800, 7200))), 40))
+        series[token] = [{"t": t, "p": round(min(1.0, max(0.0, drift + rng.gauss(0.0, 0.04))), 3)} for t in ts]
+        cands.append(
+            {
+                "market_id": str(i),
+                "question": f"q{i}",
+                "category": rng.choice(("wx", "sports")),
+                "end_ts": end_ts,
+                "end_iso": "",
+                "yes_token": token,
+                "yes_won": 1 if rng.random() < drift else 0,
+                "cutoff_ts": 0,
+                "liquidity_num": 1.0,
+                "volume_24h": 1.0,
+            }
+        )
+    return cands, series
+
+
+def test_sweep_matches_per_config_backtest(tmp_path, monkeypatch):
+    cands, series = _candidates(60, 7)
+    calls = []
+
+    def fake_history(token, start_ts, end_ts, fidelity):
+        calls.append(token)
+        return [x for x in series[token] if start_ts <= x["t"] <= end_ts]
+
+    monkeypatch.setattr(lp, "fetch_prices_history", fake_history)
+    args = argparse.Namespace(
+        hours_before_end_grid="0.25,1,3",
+        side_mode_grid="both,yes-only,no-only",
+        yes_high_min_grid="0.9,0.95",
+        yes_high_max_grid="0.99,1.0",
+        yes_low_min_grid="0.0",
+        yes_low_max_grid="0.05,0.1",
+        lookback_hours=6.0,
+        max_stale_hours=1.0,
+        history_fidelity=10,
+        workers=4,
+        progress_every=1000,
+        per_trade_cost=0.002,
+        max_open_positions=3,
+        max_open_per_category=0,
+    )
+    configs = lp.sweep_configs(args)
+    assert len(configs) == 3 * (4 * 2 + 4 + 2)
+    offsets = sorted({c.hours_before_end for c in configs})
+
+    want = []
+    for cfg in configs:
+        cargs = argparse.Namespace(**{**vars(args), **asdict(cfg)})
+        rows = []
+        for c in cands:
+            cut = c["end_ts"] - int(cfg.hours_before_end * 3600.0)
+            r = lp.fetch_entry_sample(dict(c, cutoff_ts=cut), cargs)
+            if r is not None:
+                rows.append(r)
+        rows = lp.apply_risk_caps(rows, args.max_open_positions, args.max_open_per_category)
+        rows.sort(key=lambda x: x.end_ts)
+        want.append((lp.metrics(rows, args.per_trade_cost), lp.timing_quality(rows, cfg.hours_before_end)))
+
+    calls.clear()
+    entries = lp.sweep_entries(cands, offsets, args)
+    assert len(calls) == len(cands)
+    for workers in (1, 2):
+        got = lp.evaluate_sweep(entries, configs, args, workers=workers)
+        assert [(r["metrics"], r["timing_quality"]) for r in got] == want
+
+    # Through the local store the second sweep answers from disk.
+    with PriceHistoryStore(tmp_path / "ph.sqlite") as store:
+        stored = lp.sweep_entries(cands, offsets, args, store)
+        calls.clear()
+        again = lp.sweep_entries(cands, offsets, args, store)
+    assert calls == [] and again == stored
+    got = lp.evaluate_sweep(stored, configs, args)
+    assert [(r["metrics"], r["timing_quality"]) for r in got] == want
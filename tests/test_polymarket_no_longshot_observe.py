@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import math
+import random
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import polymarket_no_longshot_observe as mod
+
+
+def _rows(n: int, seed: int) -> list[mod.ClosedSample]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        end = 1_704_067_200 + rng.randint(0, 400) * 86400
+        p = rng.choice((round(rng.uniform(0.0, 0.05), 4), 0.01, 0.005))
+        won = int(rng.random() > p * 3)
+        nep = 1.0 - p
+        out.append(
+            mod.ClosedSample(
+                market_id=f"m{i}",
+                question=rng.choice(("Will BTC hit 100k?", "Fed rate cut?", "Team wins?", "Rain in NYC?")),
+                category=rng.choice(("a", "b")),
+                created_ts=end - 30 * 86400,
+                end_ts=end,
+                end_iso=str(end),
+                duration_days=30.0,
+                yes_token="t",
+                yes_settle=0.0 if won else 1.0,
+                cutoff_ts=end - 86400,
+                entry_ts=end - 86400 - rng.randint(0, 40000),
+                entry_yes_price=p,
+                stale_h=rng.uniform(0.0, 30.0),
+                no_entry_price=nep,
+                pnl_per_no_share=(1.0 - nep) if won else -nep,
+                no_won=won,
+                liquidity_num=rng.uniform(0.0, 5000.0),
+                volume_24h=rng.uniform(0.0, 3000.0),
+                history_points=rng.randint(0, 80),
+                source_offset=0,
+            )
+        )
+    return out
+
+
+def test_yes_band_grid_matches_subset_rows_path_exactly():
+    rows = _rows(800, 3)
+    # Multi-week holds so the caps below really drop rows.
+    rows = [replace(r, entry_ts=r.end_ts - (1 + i % 20) * 86400) for i, r in enumerate(rows)]
+    exclude_rx = mod.compile_regex("btc")
+    kws = mod.parse_keywords("fed ")
+    filt = (None, exclude_rx, kws, 500.0, 0.0, 10, 24.0)
+    allowed = mod.sample_filter_mask(rows, *filt)
+    passing = [r for r, ok in zip(rows, allowed) if ok]
+    dropped = 0
+    for caps, cost in (((0, 0), 0.001), ((3, 0), 0.001), ((0, 1), 0.02), ((4, 2), 0.5)):
+        grid = mod.YesBandGrid(passing)
+        for y0 in (0.0, 0.003, 0.005, 0.01):
+            for y1 in (0.005, 0.01, 0.0125, 0.05):
+                if y0 > y1:
+                    continue
+                want_rows, stats = mod.apply_risk_caps(mod.subset_rows(rows, y0, y1, *filt), *caps)
+                dropped += stats["dropped_max_open"] + stats["dropped_category_open"]
+                want = mod.metrics(want_rows, per_trade_cost=cost)
+                assert grid.band_metrics(y0, y1, caps[0], caps[1], cost) == want
+                # A grid reused across settings must not serve another setting's memo.
+                uncapped, _ = mod.apply_risk_caps(mod.subset_rows(rows, y0, y1, *filt), 0, 0)
+                assert grid.band_metrics(y0, y1, 0, 0, 0.0) == mod.metrics(uncapped)
+    assert dropped > 0
+
+
+def _gap_scan_by_pairs(markets: list[mod.GapMarket], args) -> list[tuple]:
+    # Reference: every pair through _is_strict_subset / _is_strict_disjoint, in (i, j) order.
+    rows = []
+    for i, a in enumerate(markets):
+        for b in markets[i + 1 :]:
+            if abs(float(a.end_ts) - float(b.end_ts)) > float(args.max_end_diff_hours) * 3600.0:
+                continue
+            if args.require_same_signature and a.logic_signature != b.logic_signature:
+                continue
+            if mod._is_strict_subset(a.bound_lo, a.bound_hi, b.bound_lo, b.bound_hi):
+                rows.append(("subset_inversion", a, b, a.yes_price - b.yes_price))
+            elif mod._is_strict_subset(b.bound_lo, b.bound_hi, a.bound_lo, a.bound_hi):
+                rows.append(("subset_inversion", b, a, b.yes_price - a.yes_price))
+            if mod._is_strict_disjoint(a.bound_lo, a.bound_hi, b.bound_lo, b.bound_hi):
+                rows.append(("disjoint_overlap", a, b, (a.yes_price + b.yes_price) - 1.0))
+    keep = [r for r in rows if r[3] >= args.min_gross_edge_cents / 100.0 and r[3] - 2.0 * args.per_leg_cost >= 0.0]
+    keep.sort(key=lambda r: (r[3] - 2.0 * args.per_leg_cost, r[3], r[1].liquidity_num + r[2].liquidity_num), reverse=True)
+    return [(rel, a.market_id, b.market_id, gross) for rel, a, b, gross in keep[: args.max_pairs_per_event]]
+
+
+def test_gap_sweep_matches_all_pairs_scan():
+    rng = random.Random(5)
+    args = mod.build_parser().parse_args(["gap", "--per-leg-cost", "0.002", "--max-pairs-per-event", "15"])
+    events = []
+    for e in range(12):
+        markets = []
+        for i in range(rng.randint(2, 40)):
+            lo = float(rng.choice((-math.inf, 60, 62, 64, 66, 70)))
+            hi = float(rng.choice((64, 66, 68, 70, math.inf))) if lo != -math.inf else float(rng.choice((62, 66)))
+            y = rng.choice((0.02, 0.2, 0.5, 0.6, 0.9, round(rng.random(), 3)))
+            markets.append(
+                mod.GapMarket(
+                    f"m{e}-{i}", "q", f"e{e}", "E", "", rng.choice((0, 3600, 400000)), 1.0, 24.0, y, 1.0 - y,
+                    float(rng.choice((10, 500))), 0.0, "", lo, hi, rng.choice(("high", "high", "low")),
+                )
+            )
+        events.append((f"e{e}", markets))
+
+    got = mod._scan_gap_events(events, args, workers=1)
+    assert mod._scan_gap_events(events, args, workers=2) == got
+    for (_, markets), rows in zip(events, got):
+        want = _gap_scan_by_pairs(markets, args)
+        assert [(r.relation, r.market_a_id, r.market_b_id, r.gross_edge) for r in rows] == want
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib.price_history_store import PriceHistoryStore
+
+
+def _fake_api(calls):
+    # One point every 100s: p = t / 1e6.
+    def fetch(token, start_ts, end_ts, fidelity):
+        calls.append((token, start_ts, end_ts, fidelity))
+        if token == "down":
+            return None
+        first = -(-start_ts // 100) * 100
+        return [{"t": t, "p": t / 1e6} for t in range(first, end_ts + 1, 100)]
+
+    return fetch
+
+
+def test_sync_fetches_only_missing_ranges_and_answers_offline(tmp_path):
+    calls = []
+    fetch = _fake_api(calls)
+    db = tmp_path / "ph.sqlite"
+    with PriceHistoryStore(db) as store:
+        assert store.last_price("tok", 10, 1000, 2000, fetch=fetch) == (2000, 0.002, 11)
+        assert store.last_price("tok", 10, 1500, 2550, fetch=fetch) == (2500, 0.0025, 11)
+        assert calls == [("tok", 1000, 2000, 10), ("tok", 2001, 2550, 10)]
+        assert store.covered("tok", 10) == [(1000, 2550)]
+        # Different fidelity is a separate series; a failed fetch records nothing and yields None.
+        assert store.missing("tok", 60, 1000, 1100) == [(1000, 1100)]
+        assert store.last_price("down", 10, 0, 500, fetch=fetch) is None
+        assert store.covered("down", 10) == []
+
+    calls.clear()
+    with PriceHistoryStore(db) as store:
+        assert store.last_price("tok", 10, 900, 1250, fetch=fetch) == (1200, 0.0012, 4)
+        assert calls == [("tok", 900, 999, 10)]
+        assert store.missing("tok", 10, 800, 2600) == [(800, 899), (2551, 2600)]
+        assert store.window("tok", 10, 2390, 2550) == [(2400, 0.0024), (2500, 0.0025)]
+        # Still-forming history (within one fidelity bucket of now) is stored but not marked covered.
+        store.add("live", 1, 0, 1000, [(900, 0.5), (1000, 0.6)], now_ts=1000)
+        assert store.covered("live", 1) == [(0, 940)]
+        assert store.last_price("live", 1, 0, 1000) == (1000, 0.6, 2)
+
+
+def test_trade_pages_cache_serves_equal_or_smaller_requests(tmp_path):
+    with PriceHistoryStore(tmp_path / "ph.sqlite") as store:
+        assert store.cached_trades("0xabc", 10) is None
+        store.save_trades("0xabc", 3, [{"i": 0}, {"i": 1}, {"i": 2}], exhausted=False)
+        assert store.cached_trades("0xabc", 2) == [{"i": 0}, {"i": 1}]
+        assert store.cached_trades("0xabc", 5) is None
+        store.save_trades("0xdef", 100, [{"i": 0}], exhausted=True)
+        assert store.cached_trades("0xdef", 5000) == [{"i": 0}]
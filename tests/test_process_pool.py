@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import operator
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib import process_pool
+
+
+def test_pool_map_matches_serial_under_fork_and_spawn(monkeypatch):
+    items = list(range(50))
+    want = [(i, x * 7) for i, x in enumerate(items)]
+    assert list(process_pool.pool_map(operator.mul, items, (7,))) == want
+    assert sorted(process_pool.pool_map(operator.mul, items, (7,), workers=2, max_chunk=4)) == want
+    assert process_pool._SHARED == ()
+
+    monkeypatch.setattr(process_pool.mp, "get_all_start_methods", lambda: ["spawn"])
+    assert sorted(process_pool.pool_map(operator.mul, items, (7,), workers=2)) == want
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import replay_clob_arb_kelly as mod
+from lib import metrics_loader
+
+
+def test_bootstrap_multi_shares_draws_and_reports_bands():
+    rets = [0.01, -0.02, 0.03, -0.9, 0.005, 0.002] * 20
+    fracs = [0.1, 0.5, 2.0]
+
+    out = mod.bootstrap_growth_multi(rets, fracs, 300, 50, random.Random(7))
+    assert out == mod.bootstrap_growth_multi(rets, fracs, 300, 50, random.Random(7))
+    assert len(out) == 3
+
+    low, _, high = out
+    vals = [low["percentiles"][k] for k in ("p01", "p05", "p10", "p25", "p50", "p75", "p90", "p95", "p99")]
+    assert vals == sorted(vals)
+    assert low["p05_log_growth"] == low["percentiles"]["p05"]
+    assert low["prob_ruin"] == 0.0
+    # 1 + 2.0 * -0.9 <= 0: any resample containing that return is ruin.
+    assert high["prob_ruin"] > 0.5
+    assert high["iterations"] == 300 and high["sample_size"] == 50
+
+    single = mod.bootstrap_growth(rets, 0.5, 300, 50, random.Random(7))
+    assert single == mod.bootstrap_growth_multi(rets, [0.5], 300, 50, random.Random(7))[0]
+    assert mod.bootstrap_growth([], 0.5, 10, 5, random.Random(1))["mean_log_growth"] is None
+
+
+def _old_samples(path: str, args) -> list[mod.ReplaySample]:
+    # Row-dict replay load_samples() ran before the shared columnar loader.
+    def pick(row, key, default):
+        return mod.as_float(row.get(key), default)
+
+    out = []
+    cutoff_ms = int((mod.time.time() - float(args.hours) * 3600.0) * 1000.0) if float(args.hours) > 0 else 0
+    last_ts_by_key: dict[str, int] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(row, dict):
+                continue
+            ts_ms = mod.parse_ts_ms(row)
+            if cutoff_ms > 0 and 0 < ts_ms < cutoff_ms:
+                continue
+            if args.min_gap_ms_per_event > 0 and ts_ms > 0:
+                key = mod._dedupe_key(row)
+                if key:
+                    last = last_ts_by_key.get(key, 0)
+                    if last > 0 and ts_ms - last < args.min_gap_ms_per_event:
+                        continue
+                    last_ts_by_key[key] = ts_ms
+            if args.require_threshold_pass and not mod.as_bool(row.get("passes_raw_threshold")):
+                continue
+            raw = ("net_edge_raw", "basket_cost_observed", "net_edge_exec_est", "basket_cost_exec_est")
+            e_key, c_key, e_alt, c_alt = raw if args.edge_mode == "raw" else (raw[2], raw[3], raw[0], raw[1])
+            edge, cost = pick(row, e_key, math.nan), pick(row, c_key, math.nan)
+            if not math.isfinite(edge):
+                edge = pick(row, e_alt, math.nan)
+            if not math.isfinite(cost) or cost <= 0:
+                cost = pick(row, c_alt, math.nan)
+            if not math.isfinite(edge) or not math.isfinite(cost) or cost <= 0 or edge < args.min_edge_usd:
+                continue
+            fill = 1.0
+            if args.fill_ratio_mode != "none":
+                fill = mod.clamp(pick(row, f"fill_ratio_{args.fill_ratio_mode}", 1.0), 0.0, 1.0)
+            if fill < args.min_fill_ratio:
+                continue
+            stale = pick(row, "worst_book_stale_sec", 0.0)
+            stale = stale if math.isfinite(stale) else 0.0
+            if args.max_worst_stale_sec > 0 and stale > args.max_worst_stale_sec:
+                continue
+            ret = edge / cost * fill - args.miss_penalty * (1.0 - fill)
+            ret -= args.stale_penalty_per_sec * max(0.0, stale - args.stale_grace_sec)
+            out.append(mod.ReplaySample(ts_ms, edge, cost, fill, stale, mod.clamp(ret, -0.99, 5.0)))
+    out.sort(key=lambda x: x.ts_ms)
+    return out
+
+
+def test_load_samples_matches_row_dict_replay(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_loader, "INDEX_BLOCK_BYTES", 4096)
+    now = 1_772_000_000.0
+    monkeypatch.setattr(mod.time, "time", lambda: now)
+    rng = random.Random(3)
+    path = tmp_path / "arb.jsonl"
+    keys = ("net_edge_raw", "basket_cost_observed", "net_edge_exec_est", "basket_cost_exec_est")
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(1500):
+            t = int(now * 1000) - (1500 - i) * 160_000 + rng.randint(-60_000, 60_000)
+            row = {"event_key": rng.choice(("a", "b", "c", "")), "market_id": "m"}
+            if rng.random() < 0.05:
+                row["ts"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t / 1000))
+            elif rng.random() < 0.97:
+                row["ts_ms"] = t
+            for k in keys + ("fill_ratio_avg", "fill_ratio_min", "worst_book_stale_sec"):
+                x = rng.random()
+                if x < 0.1:
+                    continue
+                row[k] = rng.choice((rng.uniform(-0.5, 2), "0.3", None, "bad", True)) if x < 0.2 else rng.uniform(-0.2, 1.5)
+            row["passes_raw_threshold"] = rng.choice((True, False, "yes", 0, None))
+            f.write(json.dumps(row) + ("\ngarbage\n[1, 2]\n" if i % 97 == 0 else "\n"))
+
+    # Every third combination still covers each value of every axis.
+    combos = list(itertools.product((0, 24), ("raw", "exec"), ("min", "avg", "none"), (0, 60000), (False, True)))[::3]
+    for hours, edge_mode, fill_mode, gap, require in combos:
+        argv = ["x", "--metrics-file", str(path), "--hours", str(hours), "--edge-mode", edge_mode]
+        argv += ["--fill-ratio-mode", fill_mode, "--min-gap-ms-per-event", str(gap), "--max-worst-stale-sec", "1.0"]
+        argv += ["--stale-penalty-per-sec", "0.01"] + (["--require-threshold-pass"] if require else [])
+        monkeypatch.setattr(sys, "argv", argv)
+        args = mod.parse_args()
+        want = _old_samples(str(path), args)
+        assert want
+        for kw in ({}, {}, {"use_index": False}):
+            assert mod.load_samples([str(path)], args, **kw)[0] == want
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import polymarket_clob_mm as mm_mod
+import replay_clob_mm as replay_mod
+
+
+T0 = 1_700_000_000.0
+
+
+def _book(ts: float, tid: str, bids, asks):
+    return replay_mod.parse_event({"ts_ms": int((T0 + ts) * 1000), "token_id": tid, "bids": bids, "asks": asks})
+
+
+def _trade(ts: float, tid: str, price: float, size: float, side: str):
+    return replay_mod.parse_event({"ts_ms": int((T0 + ts) * 1000), "token_id": tid, "price": price, "size": size, "side": side})
+
+
+def _cfg(**kw) -> replay_mod.ReplayConfig:
+    base = dict(
+        spread_cents=4.0,
+        order_size_shares=5.0,
+        max_inventory_shares=10.0,
+        quote_refresh_sec=30.0,
+        poll_sec=1.0,
+        trade_poll_sec=1.0,
+        inventory_sample_sec=0.0,
+    )
+    base.update(kw)
+    return replay_mod.ReplayConfig(**base)
+
+
+def test_desired_quotes_match_post_only_clamps():
+    assert mm_mod._desired_quotes(0.50, 0.45, 0.55, 0.01, 4.0) == (0.48, 0.52)
+    buy, sell = mm_mod._desired_quotes(0.50, 0.49, 0.51, 0.01, 10.0)
+    assert round(buy, 2) == 0.45 and round(sell, 2) == 0.55
+    # Spread tighter than two ticks is skipped.
+    assert mm_mod._desired_quotes(0.505, 0.50, 0.51, 0.01, 4.0) is None
+
+
+def test_quote_needs_refresh_rules():
+    assert mm_mod._quote_needs_refresh(False, 0.0, 0.48, 0.0, 10.0, 0.01, 30.0)
+    assert not mm_mod._quote_needs_refresh(True, 0.48, 0.48, 5.0, 10.0, 0.01, 30.0)
+    assert mm_mod._quote_needs_refresh(True, 0.47, 0.48, 5.0, 10.0, 0.01, 30.0)
+    assert mm_mod._quote_needs_refresh(True, 0.48, 0.48, 5.0, 40.0, 0.01, 30.0)
+    assert mm_mod._quote_needs_refresh(True, 0.48, 0.48, 5.0, 10.0, 0.01, 30.0, quote_size=5.0, desired_size=3.0)
+
+
+def test_dropped_token_with_inventory_is_reduce_only_until_flat():
+    assert mm_mod._quote_sizes(3.0, 5.0, 1.0, 10.0, reduce_only=True) == (5.0, False, 3.0)
+    assert mm_mod._quote_sizes(3.0, 5.0, 1.0, 10.0)[1] is True
+
+    class _Client:
+        def __init__(self):
+            self.cancelled = []
+
+        def cancel_orders(self, ids):
+            self.cancelled.extend(ids)
+
+    state = mm_mod.RuntimeState()
+    state.token_states["a"] = mm_mod.TokenMMState(token_id="a", label="A", active=False, inventory_shares=3.0, sell_order_id="s1")
+    client = _Client()
+    args = type("A", (), {"execute": True})()
+    logger = mm_mod.Logger()
+    assert mm_mod._prune_if_unwound(state, "a", client, args, logger) is False
+    assert "a" in state.token_states
+
+    state.token_states["a"].inventory_shares = 0.0
+    assert mm_mod._prune_if_unwound(state, "a", client, args, logger) is True
+    assert "a" not in state.token_states and client.cancelled == ["s1"]
+
+    state.token_states["b"] = mm_mod.TokenMMState(token_id="b", label="B", active=True)
+    assert mm_mod._prune_if_unwound(state, "b", client, args, logger) is False
+
+
+def test_queue_position_consumed_before_fill():
+    events = [
+        _book(0.0, "t", [[0.48, 100.0]], [[0.56, 50.0]]),
+        # 60 traded at our level: only queue ahead is consumed.
+        _trade(1.0, "t", 0.48, 60.0, "SELL"),
+        _book(2.0, "t", [[0.48, 40.0]], [[0.56, 50.0]]),
+    ]
+    res = replay_mod.simulate(events, _cfg(spread_cents=8.0))
+    assert res.fills_buy == 0
+
+    events.append(_trade(3.0, "t", 0.48, 43.0, "SELL"))
+    events.append(_book(4.0, "t", [[0.47, 10.0]], [[0.56, 50.0]]))
+    res = replay_mod.simulate(events, _cfg(spread_cents=8.0))
+    assert res.fills_buy == 1
+    assert abs(res.bought_shares - 3.0) < 1e-9
+
+
+def test_crossing_book_fills_and_inventory_enables_sell_quote():
+    events = [
+        _book(0.0, "t", [[0.45, 10.0]], [[0.55, 10.0]]),
+        _book(1.0, "t", [[0.40, 10.0]], [[0.48, 10.0]]),
+        _book(2.0, "t", [[0.40, 10.0]], [[0.48, 10.0]]),
+        _book(3.0, "t", [[0.53, 10.0]], [[0.60, 10.0]]),
+        _book(4.0, "t", [[0.53, 10.0]], [[0.60, 10.0]]),
+    ]
+    res = replay_mod.simulate(events, _cfg())
+    assert res.fills_buy == 1
+    assert res.sell_quote_updates >= 1
+    assert res.bought_shares == 5.0
+
+
+def test_main_sweep_writes_results(tmp_path: Path):
+    path = tmp_path / "books.jsonl"
+    rows = []
+    for i in range(40):
+        mid = 0.50 + (0.03 if (i // 10) % 2 else -0.03)
+        rows.append({"ts_ms": 1_700_000_000_000 + i * 2000, "token_id": "t", "bids": [[round(mid - 0.03, 2), 20]], "asks": [[round(mid + 0.03, 2), 20]]})
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n", encoding="utf-8")
+    out = tmp_path / "out.json"
+    rc = replay_mod.main(
+        [
+            "--events-file",
+            str(path),
+            "--spread-cents",
+            "2,4",
+            "--quote-refresh-sec",
+            "10,30",
+            "--workers",
+            "1",
+            "--out-json",
+            str(out),
+        ]
+    )
+    assert rc == 0
+    payload = json.loads(out.read_text(encoding="utf-8"))
+    assert len(payload["results"]) == 4
+    assert all("inventory_path" in r for r in payload["results"])
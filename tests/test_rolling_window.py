@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import random
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib.rolling_window import RollingWindow
+
+
+def test_tail_stats_match_statistics_over_long_stream():
+    rng = random.Random(7)
+    w = RollingWindow(50)
+    ref = []
+    x = 0.5
+    for _ in range(1000):
+        x = min(0.99, max(0.01, x + rng.gauss(0.0, 0.01)))
+        w.append(x)
+        ref.append(x)
+        ref = ref[-50:]
+        for k in (5, 30, 50, 80):
+            tail = ref[-k:]
+            assert abs(w.mean(k) - statistics.mean(tail)) < 1e-12
+            if len(tail) >= 2:
+                assert abs(w.pstdev(k) - statistics.pstdev(tail)) < 1e-9
+    assert w.to_list() == ref
+    assert w[-1] == ref[-1] and w[-3:] == ref[-3:]
+    assert w.diff(7) == ref[-1] - ref[-8]
+
+
+def test_constant_window_has_zero_stdev_and_short_window_defaults():
+    w = RollingWindow(10, [0.37] * 25)
+    assert len(w) == 10
+    assert w.pstdev() < 1e-12
+    assert RollingWindow(5).pstdev() == 0.0
+    assert RollingWindow(5, [1.0]).pstdev() == 0.0
+
+
+def test_state_roundtrip_and_legacy_list():
+    w = RollingWindow(8, [0.1 * i for i in range(12)])
+    back = RollingWindow.from_state(w.to_state())
+    assert back.to_list() == w.to_list()
+    assert back.maxlen == 8
+    legacy = RollingWindow.from_state([0.2, "0.3", None, 0.4], maxlen=2)
+    assert legacy.to_list() == [0.3, 0.4]
+    assert legacy.resized(4).to_list() == [0.3, 0.4]
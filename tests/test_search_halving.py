@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from lib.search_halving import budget_schedule, idw_predict, successive_halving, tail_fraction
+
+
+def _noisy_eval(calls):
+    # True quality peaks at x=7; short budgets add a deterministic bias that shrinks with budget.
+    def evaluate(cands, budget):
+        calls.append((budget, list(cands)))
+        return [-(x - 7) ** 2 + (1.0 - budget) * ((x * 37) % 5) for x in cands]
+
+    return evaluate
+
+
+def test_schedule_and_tail_fraction_are_nested():
+    assert budget_schedule(3.0, 1.0 / 9.0) == [1.0 / 9.0, 1.0 / 3.0, 1.0]
+    assert budget_schedule(2.0, 1.0) == [1.0]
+    seq = list(range(10))
+    assert tail_fraction(seq, 0.25) == [7, 8, 9]
+    assert tail_fraction(seq, 0.01) == [9]
+    assert tail_fraction(seq, 1.0) is seq
+
+
+def test_halving_finds_full_grid_best_with_less_work():
+    calls = []
+    report = successive_halving(list(range(30)), _noisy_eval(calls), lambda r: (r,), eta=3.0, min_budget=1.0 / 9.0, keep_min=2)
+
+    assert [r.evaluated for r in report.rungs] == [30, 10, 4]
+    assert [c for c, _ in report.final][:3] == [7, 6, 8]
+    assert report.final[0] == (7, 0)
+    # Final rung runs on the full data only for the survivors.
+    assert calls[-1][0] == 1.0 and len(calls[-1][1]) == 4
+    assert report.work < 0.4 * report.full_work
+
+
+def test_surrogate_proposes_points_near_the_best_sample():
+    calls = []
+    report = successive_halving(
+        list(range(100)),
+        _noisy_eval(calls),
+        lambda r: (r,),
+        min_budget=1.0 / 3.0,
+        initial=10,
+        features=lambda x: (x,),
+        propose=4,
+        rounds=2,
+        seed=1,
+    )
+
+    assert report.proposed == 8
+    assert report.rungs[0].evaluated == 18
+    assert report.final[0][0] == 7
+    assert report.work < 0.25 * report.full_work
+    assert idw_predict([((0.0,), 1.0), ((1.0,), 3.0)], [(0.0,), (0.5,)]) == [1.0, 2.0]